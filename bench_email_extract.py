@@ -0,0 +1,187 @@
+# bench_email_extract.py
+# ----------------------
+# 본문 텍스트 → 이메일 추출 처리량(MB/s) 벤치마크: 예전 방식(re.sub 9번 + 공백 정리 2번 + findall) vs email_extract
+# - 코퍼스: 저장된 페이지(page_archive, --archive pages.sqlite)의 보이는 텍스트
+#           아카이브가 없으면 합성 페이지(--synthetic N, 정답 이메일 포함)
+# - 보이는 텍스트 추출(BeautifulSoup)은 미리 한 번 → 추출 단계만 시간 측정(--repeat 회 중 최소)
+# - 결과 비교: 페이지별 후보 집합이 같은지, 한쪽에만 나온 주소 예시, 합성 코퍼스면 정답 대비 recall/오탐
+#
+# 사용:
+#   python bench_email_extract.py --archive pages.sqlite
+#   python bench_email_extract.py --synthetic 2000 --out bench_email_extract.json
+
+import argparse
+import html
+import json
+import random
+import re
+import time
+from typing import Dict, List, Optional, Tuple
+
+from email_extract import EMAIL_REGEX, extract_emails, is_valid_email
+
+
+# =======================
+# 예전 방식(비교 기준) — email_error_check.deobfuscate_and_extract / search_email.py 인라인 블록과 같음
+# =======================
+def legacy_extract(text: str) -> set:
+  out = set()
+  deob = html.unescape(text)
+  for pat, rep in [
+    (r'\s*\[?\s*at\s*\]?\s*', '@'),
+    (r'\s*\(?\s*at\s*\)?\s*', '@'),
+    (r'\s+at\s+', '@'),
+    (r'\s*\[?\s*dot\s*\]?\s*', '.'),
+    (r'\s*\(?\s*dot\s*\)?\s*', '.'),
+    (r'\s+dot\s+', '.'),
+    (r'골뱅이', '@'),
+    (r'\s*점\s*', '.'),
+    (r'닷', '.'),
+  ]:
+    deob = re.sub(pat, rep, deob, flags=re.IGNORECASE)
+  deob = re.sub(r'\s*@\s*', '@', deob)
+  deob = re.sub(r'\s*\.\s*', '.', deob)
+  for e in EMAIL_REGEX.findall(deob):
+    if is_valid_email(e):
+      out.add(e)
+  return out
+
+
+# =======================
+# 코퍼스
+# =======================
+WORDS = ("we are a creative studio based in london that works with data driven brands what matters "
+         "is the craft at every stage of the project our team is dotted around the uk and meets at the "
+         "office near the station great service later this year we update our privacy policy chat with us "
+         "at reception opening hours monday to friday").split()
+LOCALS = ["info", "hello", "kate", "natalie", "office", "contact", "dottie", "matt", "enquiries", "j.smith"]
+DOMAINS = ["creativestudio.co.uk", "data-lab.com", "atelier.london", "dotdesign.co.uk", "studio.org.uk",
+           "matthews.com", "naver.com"]
+
+def obfuscate(email: str, form: str) -> str:
+  local, dom = email.split("@")
+  if form == "plain":
+    return email
+  if form == "brackets":
+    return f"{local} [at] {dom.replace('.', ' [dot] ')}"
+  if form == "parens":
+    return f"{local}(at){dom.replace('.', '(dot)')}"
+  if form == "words":
+    return f"{local} at {dom.replace('.', ' dot ')}"
+  if form == "spaced":
+    return f"{local} @ {dom}"
+  if form == "spaced_dots":
+    return f"{local} @ {dom.replace('.', ' . ')}"
+  if form == "korean":
+    return f"{local}골뱅이{dom.replace('.', '점')}"
+  if form == "sentence_end":
+    return f"{email}. Call us"
+  raise ValueError(form)
+
+FORMS = ["plain", "plain", "plain", "brackets", "parens", "words", "spaced", "spaced_dots", "korean", "sentence_end"]
+
+def synthetic_corpus(n: int, seed: int = 5) -> List[Tuple[str, set]]:
+  """(보이는 텍스트, 정답 이메일 set) 목록 — 'at'/'dot' 이 들어간 단어와 주소를 일부러 섞음"""
+  rnd = random.Random(seed)
+  pages = []
+  for _ in range(n):
+    words = [rnd.choice(WORDS) for _ in range(rnd.randint(400, 2500))]
+    truth = set()
+    for _ in range(rnd.choice([0, 1, 1, 2, 3])):
+      email = f"{rnd.choice(LOCALS)}@{rnd.choice(DOMAINS)}"
+      truth.add(email)
+      words.insert(rnd.randrange(len(words)), obfuscate(email, rnd.choice(FORMS)) + " ")
+    pages.append((" ".join(words), truth))
+  return pages
+
+def archive_corpus(path: str, limit: Optional[int] = None) -> List[Tuple[str, None]]:
+  from email_error_check import get_visible_text
+  from page_archive import PageArchive
+  archive = PageArchive(path, readonly=True)
+  pages = []
+  try:
+    for site in archive.sites():
+      for p in archive.pages_of(site):
+        pages.append((get_visible_text(p["html"]), None))
+        if limit and len(pages) >= limit:
+          return pages
+  finally:
+    archive.close()
+  return pages
+
+
+# =======================
+# 실행
+# =======================
+def timed(fn, texts: List[str], repeat: int) -> Tuple[float, List[set]]:
+  best = None
+  out: List[set] = []
+  for _ in range(repeat):
+    t0 = time.perf_counter()
+    out = [fn(t) for t in texts]
+    wall = time.perf_counter() - t0
+    best = wall if best is None else min(best, wall)
+  return best, out
+
+def compare(pages: List[Tuple[str, Optional[set]]], old: List[set], new: List[set]) -> Dict:
+  only_old: Dict[str, int] = {}
+  only_new: Dict[str, int] = {}
+  same = 0
+  for a, b in zip(old, new):
+    same += a == b
+    for e in a - b:
+      only_old[e] = only_old.get(e, 0) + 1
+    for e in b - a:
+      only_new[e] = only_new.get(e, 0) + 1
+  res = {"pages_identical": same, "only_old": sum(only_old.values()), "only_new": sum(only_new.values()),
+         "only_old_examples": sorted(only_old, key=lambda e: -only_old[e])[:8],
+         "only_new_examples": sorted(only_new, key=lambda e: -only_new[e])[:8]}
+  if pages and pages[0][1] is not None:
+    for name, found in (("old", old), ("new", new)):
+      truth_n = sum(len(t) for _, t in pages)
+      hit = sum(len(f & t) for f, (_, t) in zip(found, pages))
+      fp = sum(len(f - t) for f, (_, t) in zip(found, pages))
+      res[f"{name}_recall"] = round(hit / truth_n, 4) if truth_n else None
+      res[f"{name}_false_pos"] = fp
+  return res
+
+def main():
+  parser = argparse.ArgumentParser(description="이메일 추출 엔진 처리량(MB/s) — 예전 re.sub 방식 vs email_extract")
+  parser.add_argument("--archive", default=None, help="page_archive SQLite(저장된 페이지 코퍼스)")
+  parser.add_argument("--limit", type=int, default=None, help="아카이브에서 읽을 최대 페이지 수")
+  parser.add_argument("--synthetic", type=int, default=1000, help="아카이브가 없을 때 합성 페이지 수")
+  parser.add_argument("--repeat", type=int, default=3)
+  parser.add_argument("--out", default=None, help="결과 JSON 경로")
+  args = parser.parse_args()
+
+  if args.archive:
+    pages = archive_corpus(args.archive, args.limit)
+    source = args.archive
+  else:
+    pages = synthetic_corpus(args.synthetic)
+    source = f"synthetic({args.synthetic})"
+  texts = [t for t, _ in pages]
+  mb = sum(len(t.encode("utf-8")) for t in texts) / 1e6
+  print(f"코퍼스 {source}: 페이지 {len(texts)}개, 텍스트 {mb:.1f}MB")
+
+  old_s, old = timed(legacy_extract, texts, args.repeat)
+  new_s, new = timed(extract_emails, texts, args.repeat)
+  res = {"source": source, "pages": len(texts), "mb": round(mb, 2),
+         "old_mb_s": round(mb / old_s, 2), "new_mb_s": round(mb / new_s, 2), "speedup": round(old_s / new_s, 2)}
+  res.update(compare(pages, old, new))
+  print(f"예전 방식   {res['old_mb_s']:>8} MB/s")
+  print(f"email_extract {res['new_mb_s']:>6} MB/s  (x{res['speedup']})")
+  print(f"페이지별 결과 동일 {res['pages_identical']}/{len(texts)}, 예전에만 {res['only_old']} {res['only_old_examples']}, "
+        f"새 엔진에만 {res['only_new']} {res['only_new_examples']}")
+  if "old_recall" in res:
+    print(f"정답 대비: 예전 recall {res['old_recall']} 오탐 {res['old_false_pos']} / "
+          f"새 엔진 recall {res['new_recall']} 오탐 {res['new_false_pos']}")
+
+  if args.out:
+    with open(args.out, "w", encoding="utf-8") as f:
+      json.dump(res, f, ensure_ascii=False, indent=2)
+    print(f"결과 저장: {args.out}")
+
+
+if __name__ == "__main__":
+  main()
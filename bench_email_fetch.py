@@ -0,0 +1,228 @@
+# bench_email_fetch.py
+# --------------------
+# 이메일 수집 tier 별 처리량(사이트/분) 벤치마크 — 로컬 픽스처 사이트 묶음
+# - 실행할 때마다 합성 사이트 N개를 만들어 로컬 HTTP 서버로 제공(인터넷/실제 사이트 불필요)
+#     static_mailto : 메인에 mailto: 링크
+#     static_text   : 본문 텍스트에 우회 표기("info [at] x [dot] co.uk")
+#     contact_page  : 메인에는 없고 /contact 에만
+#     cfemail       : Cloudflare 이메일 보호(data-cfemail)
+#     csr           : 빈 <div id="root"> + 스크립트가 본문을 그림(JS 필요)
+#     no_email      : 이메일 없음
+#     chunked       : 큰 메인 페이지(~200KB)를 여러 번 나눠 보냄, 메일은 맨 끝 footer(본문을 끝까지 읽는지 확인)
+# - 응답마다 --latency-ms 지연(실제 네트워크 흉내)
+# - tier: http(HTTP만, escalate 는 미해결로 집계) / browser(전부 Selenium) / tiered(HTTP → 나머지만 브라우저)
+#   각 tier 의 사이트/분, 정답 이메일을 찾은 비율, 브라우저로 넘긴 사이트 수를 출력
+#
+# 사용:
+#   python bench_email_fetch.py --sites 300 --latency-ms 120
+#   python bench_email_fetch.py --tiers http tiered --out bench_email_fetch.json
+#   python bench_email_fetch.py --tiers browser --browser-workers 1 2 4 8   # 워커 풀 확장성
+
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+KINDS = ["static_mailto", "static_text", "contact_page", "cfemail", "csr", "no_email", "chunked"]
+KIND_WEIGHTS = [25, 15, 20, 5, 15, 10, 10]   # 소규모 사업체 사이트 구성 대략치(%)
+CHUNK_BYTES = 16 * 1024   # chunked 사이트: 이 크기씩 나눠 쓰고 사이사이 잠깐 쉼
+CHUNK_PAUSE_S = 0.005
+FILLER = ("We are an independent studio based in London working with brands across the UK. "
+          "Our team covers strategy, identity, digital design and campaigns. ") * 4
+
+
+# =======================
+# 픽스처 사이트
+# =======================
+def cf_encode(email: str, key: int = 0x5a) -> str:
+  return "".join(f"{b:02x}" for b in bytes([key] + [ord(c) ^ key for c in email]))
+
+def make_corpus(n: int, seed: int = 3) -> List[Dict]:
+  rnd = random.Random(seed)
+  sites = []
+  for i in range(n):
+    kind = rnd.choices(KINDS, KIND_WEIGHTS)[0]
+    email = None if kind == "no_email" else f"{rnd.choice(['info', 'hello', 'studio', 'office'])}@site{i}.co.uk"
+    sites.append({"id": i, "kind": kind, "email": email})
+  return sites
+
+def _page(title: str, body: str) -> str:
+  return f"<!doctype html><html><head><title>{title}</title></head><body>{body}</body></html>"
+
+def render(site: Dict, page: str) -> Optional[str]:
+  """사이트 하나의 페이지 HTML(없는 페이지는 None → 404)"""
+  i, kind, email = site["id"], site["kind"], site["email"]
+  nav = (f'<nav><a href="/site/{i}/">Home</a> <a href="/site/{i}/about">About us</a> '
+         f'<a href="/site/{i}/contact">Contact</a></nav>')
+  if page == "":
+    if kind == "csr":
+      # 정적 HTML 에는 껍데기만, 내용/메일은 스크립트가 그림
+      script = ("<script>document.getElementById('root').innerHTML = "
+                f"'{nav}<h1>Studio {i}</h1><p>{FILLER}</p><a href=\"mailto:{email}\">Email us</a>';</script>")
+      return _page(f"Studio {i}", f'<div id="root"></div>{script}'
+                                  "<noscript>You need to enable JavaScript to run this app.</noscript>")
+    body = f"{nav}<h1>Studio {i}</h1><p>{FILLER}</p>"
+    if kind == "chunked":
+      body += f"<p>{FILLER * 80}</p>" + f'<footer><a href="mailto:{email}">Email us</a></footer>'
+    if kind == "static_mailto":
+      body += f'<footer><a href="mailto:{email}?subject=Hello">Email us</a></footer>'
+    elif kind == "static_text":
+      local, dom = email.split("@")
+      body += f"<footer>Write to {local} [at] {dom.replace('.', ' [dot] ')}</footer>"
+    elif kind == "cfemail":
+      body += (f'<footer><a href="/cdn-cgi/l/email-protection#{cf_encode(email)}">'
+               f'<span class="__cf_email__" data-cfemail="{cf_encode(email)}">[email&#160;protected]</span></a></footer>')
+    return _page(f"Studio {i}", body)
+  if page in ("contact", "about"):
+    body = f"{nav}<h1>{page.title()}</h1><p>{FILLER}</p>"
+    if page == "contact" and kind == "contact_page":
+      body += f"<p>Email: {email}</p>"
+    return _page(page.title(), body)
+  return None
+
+def serve_corpus(sites: List[Dict], latency_s: float) -> ThreadingHTTPServer:
+  by_id = {s["id"]: s for s in sites}
+
+  class Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+      time.sleep(latency_s)
+      parts = self.path.split("?", 1)[0].strip("/").split("/")
+      html = None
+      if len(parts) >= 2 and parts[0] == "site" and parts[1].isdigit() and int(parts[1]) in by_id:
+        html = render(by_id[int(parts[1])], parts[2] if len(parts) > 2 else "")
+      body = (html or "<html><body>Not found</body></html>").encode()
+      self.send_response(200 if html else 404)
+      self.send_header("Content-Type", "text/html; charset=utf-8")
+      self.send_header("Content-Length", str(len(body)))
+      self.end_headers()
+      if html and by_id[int(parts[1])]["kind"] == "chunked":
+        for k in range(0, len(body), CHUNK_BYTES):
+          self.wfile.write(body[k:k + CHUNK_BYTES])
+          self.wfile.flush()
+          time.sleep(CHUNK_PAUSE_S)
+      else:
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+      pass
+
+  server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+  server.daemon_threads = True
+  server.request_queue_size = 256
+  threading.Thread(target=server.serve_forever, daemon=True).start()
+  return server
+
+
+# =======================
+# tier 실행
+# =======================
+def run_http(urls: List[str]) -> Dict[str, Dict]:
+  import email_http_fetch as ehf
+  # 픽스처는 전부 127.0.0.1 한 호스트 → 호스트당 제한을 풀어야 실제(사이트마다 다른 호스트)와 비슷
+  ehf.CONN_LIMIT_PER_HOST = 0
+  return ehf.fetch_sites(urls)
+
+def run_browser(urls: List[str], workers: int = 1) -> Dict[str, str]:
+  if workers > 1:
+    from email_worker_pool import pool_summary, run_pool
+    out = {}
+
+    def on_result(key, url, found):
+      out[url] = ", ".join(found or [])
+
+    print(pool_summary(run_pool([(u, u) for u in urls], workers, on_result)))
+    return out
+  from email_error_check import find_top_emails, make_driver
+  driver = make_driver(headless=True)
+  out = {}
+  try:
+    for u in urls:
+      try:
+        out[u] = find_top_emails(u, driver)
+      except Exception:
+        out[u] = ""
+  finally:
+    driver.quit()
+  return out
+
+def run_tier(tier: str, urls: List[str], workers: int = 1) -> Dict:
+  from email_http_fetch import needs_browser
+  t0 = time.perf_counter()
+  found: Dict[str, str] = {}
+  escalated: List[str] = []
+  if tier in ("http", "tiered"):
+    res = run_http(urls)
+    for u, r in res.items():
+      if needs_browser(r):
+        escalated.append(u)
+      else:
+        found[u] = ", ".join(r["emails"])
+  if tier == "browser":
+    found.update(run_browser(urls, workers))
+  elif tier == "tiered" and escalated:
+    found.update(run_browser(escalated, workers))
+  wall = time.perf_counter() - t0
+  return {"tier": tier if tier == "http" else f"{tier}x{workers}", "workers": workers, "found": found, "escalated": len(escalated), "wall_s": round(wall, 2),
+          "sites_per_min": round(len(urls) / wall * 60.0, 1) if wall > 0 else None}
+
+def score(sites: List[Dict], urls: List[str], found: Dict[str, str]) -> Dict:
+  hit = miss = false_pos = 0
+  for s, u in zip(sites, urls):
+    got = found.get(u) or ""
+    if s["email"]:
+      if s["email"] in got:
+        hit += 1
+      else:
+        miss += 1
+    elif "@" in got:
+      false_pos += 1
+  with_email = hit + miss
+  return {"recall": round(hit / with_email, 4) if with_email else None, "missed": miss, "false_pos": false_pos}
+
+
+def main():
+  parser = argparse.ArgumentParser(description="이메일 수집 tier 별 사이트/분 벤치마크(로컬 픽스처)")
+  parser.add_argument("--sites", type=int, default=200)
+  parser.add_argument("--latency-ms", type=float, default=100.0, help="픽스처 서버 응답 지연")
+  parser.add_argument("--tiers", nargs="*", default=["http", "tiered", "browser"], choices=["http", "tiered", "browser"])
+  parser.add_argument("--browser-workers", type=int, nargs="*", default=[1],
+                      help="브라우저 단계 헤드리스 크롬 수(여러 개면 각각 실행 → 확장성 비교)")
+  parser.add_argument("--seed", type=int, default=3)
+  parser.add_argument("--out", default=None, help="결과 JSON 경로")
+  args = parser.parse_args()
+
+  sites = make_corpus(args.sites, args.seed)
+  server = serve_corpus(sites, args.latency_ms / 1000.0)
+  base = f"http://127.0.0.1:{server.server_port}"
+  urls = [f"{base}/site/{s['id']}/" for s in sites]
+  kinds = {k: sum(1 for s in sites if s["kind"] == k) for k in KINDS}
+  print(f"픽스처 {len(sites)}개 사이트 {kinds}, 지연 {args.latency_ms:.0f}ms")
+
+  rows = []
+  try:
+    runs = [(t, w) for t in args.tiers for w in (args.browser_workers if t != "http" else [1])]
+    for tier, workers in runs:
+      try:
+        r = run_tier(tier, urls, workers)
+      except Exception as e:  # 크롬/드라이버가 없는 환경 등
+        print(f"{tier:8s} 건너뜀: {type(e).__name__}: {e}")
+        continue
+      r.update(score(sites, urls, r.pop("found")))
+      rows.append(r)
+      print(f"{r['tier']:10s} {r['sites_per_min']:>9} 사이트/분  {r['wall_s']:>7}s  recall {r['recall']}  "
+            f"미검출 {r['missed']}  브라우저로 {r['escalated']}")
+  finally:
+    server.shutdown()
+
+  if args.out:
+    with open(args.out, "w", encoding="utf-8") as f:
+      json.dump({"sites": len(sites), "latency_ms": args.latency_ms, "kinds": kinds, "results": rows}, f,
+                ensure_ascii=False, indent=2)
+    print(f"결과 저장: {args.out}")
+
+
+if __name__ == "__main__":
+  main()
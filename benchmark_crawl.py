@@ -0,0 +1,234 @@
+# benchmark_crawl.py
+# ------------------
+# 수집 전략 비교 벤치마크(로컬 mock 서버 — 실제 API 쿼터/비용 없음)
+# - mock_places_server 를 백그라운드로 띄우고 각 수집기의 엔드포인트 URL만 바꿔서 그대로 실행
+# - 전략: text 원 7분할(circle) / text 사각형 쿼드트리(rect) / nearby 7분할(hex7) / nearby 띠 분할(annulus) / text2 단일 원
+# - 지표: 서버가 받은 호출 수, 걸린 시간, 찾은 고유 장소 수, 정답(지역+기준선+쿼리 매칭) 대비 recall
+# - 캐시는 끄고(off) 속도 제한도 풀어서 전략 자체만 비교
+# - --scheduler fifo priority: 같은 예산(--budget)에서 타일 순서(BFS / 호출당 기대 새 장소 우선)별 recall 비교
+#
+# 사용 예)
+#   python benchmark_crawl.py
+#   python benchmark_crawl.py --only text_circle text_rect --synthetic 6000 --budget 3000
+#   python benchmark_crawl.py --xlsx agency_result.xlsx estate_result.xlsx --two-phase
+#   python benchmark_crawl.py --only text_circle nearby_hex7 --budget 400 --scheduler fifo priority
+
+import argparse
+import contextlib
+import json
+import os
+import tempfile
+import time
+from typing import Callable, Dict, List, Set
+
+import mock_places_server as mps
+import places_cache
+from rate_limiter import TokenBucket
+
+STRATEGIES = ["text_circle", "text_rect", "nearby_hex7", "nearby_annulus", "text2_single"]
+SCHEDULERS = ["fifo", "priority"]
+
+
+# =======================
+# 전략별 실행(모듈 설정만 바꿔서 main 호출)
+# =======================
+def _setup_common(base: str):
+  import place_details
+  places_cache.set_mode("off")
+  place_details.DETAILS_URL = base + "/v1/places/{place_id}"
+  place_details.DETAILS_LIMITER = TokenBucket()
+
+
+def run_text(mode: str, base: str, out_dir: str, budget: int, two_phase: bool, scheduler: str = "fifo") -> Dict:
+  import text_api_search as tas
+  tag = mode if scheduler == "fifo" else f"{mode}_{scheduler}"
+  tas.TEXT_URL = base + "/v1/places:searchText"
+  tas.RATE_LIMITER = TokenBucket()
+  tas.SPLIT_MODE = mode
+  tas.SCHEDULER = scheduler
+  tas.MAX_TOTAL_CALLS = budget
+  tas.DISCOVERY_MODE = "two_phase" if two_phase else "full"
+  tas.XLSX_PATH = os.path.join(out_dir, f"text_{tag}.xlsx")
+  tas.CHECKPOINT_DIR = os.path.join(out_dir, f"checkpoint_text_{tag}")
+  tas.METRICS_JSON_PATH = os.path.join(out_dir, f"metrics_text_{tag}.json")
+  tas.LEAVES_PATH = os.path.join(out_dir, f"leaves_text_{tag}.json")
+  tas.PAGINATION_STATS["early_stops"] = 0
+  return tas.main()
+
+
+def run_nearby(mode: str, base: str, out_dir: str, budget: int, two_phase: bool, scheduler: str = "fifo") -> Dict:
+  import nearby_api_search as nas
+  tag = mode if scheduler == "fifo" else f"{mode}_{scheduler}"
+  nas.URL = base + "/v1/places:searchNearby"
+  nas.SPLIT_MODE = mode
+  nas.SCHEDULER = scheduler
+  nas.MAX_CALLS = budget
+  nas.DISCOVERY_MODE = "two_phase" if two_phase else "full"
+  nas.XLSX_PATH = os.path.join(out_dir, f"nearby_{tag}.xlsx")
+  nas.RESULT_SINK_PATH = os.path.join(out_dir, f"nearby_{tag}.jsonl")
+  nas.CHECKPOINT_DIR = os.path.join(out_dir, f"checkpoint_nearby_{tag}")
+  nas.METRICS_JSON_PATH = os.path.join(out_dir, f"metrics_nearby_{tag}.json")
+  nas.LEAVES_PATH = os.path.join(out_dir, f"leaves_nearby_{tag}.json")
+  return nas.main()
+
+
+def run_text2(base: str, out_dir: str, two_phase: bool) -> Dict:
+  import text_api_search2 as ts2
+  ts2.URL_TEXT = base + "/v1/places:searchText"
+  ts2.DISCOVERY_MODE = "two_phase" if two_phase else "full"
+  return ts2.run_text_search_to_excel(os.path.join(out_dir, "text2_single.xlsx"))
+
+
+# =======================
+# 정답(ground truth): 각 수집기가 '찾아야 하는' 장소
+# =======================
+def truth_ids(name: str, mock: mps.MockPlaces) -> Set[str]:
+  if name.startswith("text_"):
+    import text_api_search as tas
+
+    def keep(p):
+      loc = p["location"]
+      if tas.FILTER_RESULTS_TO_RIGHT_ONLY and not tas.is_right_of_meridian(loc["longitude"], tas.CUTOFF_LNG):
+        return False
+      return tas.haversine_meters(tas.START_LAT, tas.START_LNG, loc["latitude"], loc["longitude"]) <= tas.BIG_RADIUS_M
+    return mock.ids_matching(tas.CREATIVE_QUERIES, keep)
+
+  if name.startswith("nearby_"):
+    import nearby_api_search as nas
+
+    def keep(p):
+      loc = p["location"]
+      if not nas.is_right_of_meridian(loc["longitude"], nas.CUTOFF_LNG):
+        return False
+      return nas.haversine_meters(nas.START_LAT, nas.START_LNG, loc["latitude"], loc["longitude"]) <= nas.START_RADIUS
+    return mock.ids_matching(nas.includedTypes, keep)
+
+  import text_api_search2 as ts2
+  rect = ts2.make_restriction_rectangle(ts2.CENTER_LAT, ts2.CENTER_LNG, ts2.SEARCH_RADIUS_M)["rectangle"]
+
+  def keep(p):
+    loc = p["location"]
+    if ts2.USE_EAST_OF_LONGITUDE and not ts2.is_right_of_meridian(loc["longitude"], ts2.CUTOFF_LNG):
+      return False
+    return (rect["low"]["latitude"] <= loc["latitude"] <= rect["high"]["latitude"]
+            and rect["low"]["longitude"] <= loc["longitude"] <= rect["high"]["longitude"])
+  return mock.ids_matching(ts2.CREATIVE_QUERIES, keep)
+
+
+def runner_for(name: str, base: str, out_dir: str, budget: int, two_phase: bool,
+               scheduler: str = "fifo") -> Callable[[], Dict]:
+  if name == "text_circle":
+    return lambda: run_text("circle", base, out_dir, budget, two_phase, scheduler)
+  if name == "text_rect":
+    return lambda: run_text("rect", base, out_dir, budget, two_phase, scheduler)
+  if name == "nearby_hex7":
+    return lambda: run_nearby("hex7", base, out_dir, budget, two_phase, scheduler)
+  if name == "nearby_annulus":
+    return lambda: run_nearby("annulus", base, out_dir, budget, two_phase, scheduler)
+  if name == "text2_single":
+    return lambda: run_text2(base, out_dir, two_phase)
+  raise ValueError(f"알 수 없는 전략: {name}")
+
+
+# =======================
+# 메인
+# =======================
+def run_benchmark(names: List[str], mock: mps.MockPlaces, out_dir: str, budget: int = 10000,
+                  two_phase: bool = False, verbose: bool = False, schedulers: List[str] = ("fifo",)) -> List[Dict]:
+  server = mps.serve(mock)
+  base = f"http://127.0.0.1:{server.server_port}"
+  _setup_common(base)
+  # text2_single은 타일 큐가 없으므로 스케줄러와 무관하게 한 번만
+  runs = [(name, sched) for name in names for sched in (schedulers if name != "text2_single" else ["fifo"])]
+  rows = []
+  try:
+    for name, sched in runs:
+      label = name if len(schedulers) == 1 else f"{name}[{sched}]"
+      truth = truth_ids(name, mock)
+      mock.reset_counts()
+      log_path = os.path.join(out_dir, f"{label}.log")
+      t0 = time.perf_counter()
+      with open(log_path, "w", encoding="utf-8") as log, \
+          (contextlib.nullcontext() if verbose else contextlib.redirect_stdout(log)):
+        summary = runner_for(name, base, out_dir, budget, two_phase, sched)()
+      wall = time.perf_counter() - t0
+      found = set(summary.get("place_ids") or [])
+      calls = dict(mock.calls)
+      row = {
+        "strategy": label,
+        "scheduler": sched,
+        "server_calls": sum(calls.values()),
+        "calls_by_endpoint": calls,
+        "wall_s": round(wall, 2),
+        "found": len(found),
+        "truth": len(truth),
+        "recall": len(found & truth) / len(truth) if truth else 1.0,
+        "outside_truth": len(found - truth),
+      }
+      row["found_per_call"] = len(found & truth) / max(row["server_calls"], 1)
+      if summary.get("metrics"):
+        # 깊이별 호출/포화율/호출당 새 장소(crawl_metrics) — 타일 파라미터 비교용
+        row["by_depth"] = summary["metrics"]["by_depth"]
+      rows.append(row)
+      print(f"[bench] {label}: calls={row['server_calls']} recall={row['recall']:.3f} wall={row['wall_s']}s (log: {log_path})")
+  finally:
+    server.shutdown()
+  return rows
+
+
+def print_table(rows: List[Dict]):
+  print("\n=== CRAWL BENCHMARK ===")
+  print(f"{'strategy':<26}{'calls':>8}{'wall_s':>9}{'found':>8}{'truth':>8}{'recall':>8}{'found/call':>12}")
+  for r in rows:
+    print(f"{r['strategy']:<26}{r['server_calls']:>8}{r['wall_s']:>9.2f}{r['found']:>8}{r['truth']:>8}"
+          f"{r['recall']:>8.3f}{r['found_per_call']:>12.3f}")
+
+
+def print_split_comparison(rows: List[Dict]):
+  """nearby annulus vs hex7: 서버가 실제로 받은 호출 수 기준(스케줄러별)"""
+  by = {r["strategy"]: r for r in rows}
+  for label, r in by.items():
+    if not label.startswith("nearby_annulus"):
+      continue
+    base = by.get(label.replace("nearby_annulus", "nearby_hex7"))
+    if base is None:
+      continue
+    d = r["server_calls"] - base["server_calls"]
+    print(f"[split] {label} vs hex7: calls {r['server_calls']} vs {base['server_calls']} "
+          f"({d:+d}, {d / max(base['server_calls'], 1):+.1%}), recall {r['recall']:.3f} vs {base['recall']:.3f}")
+
+
+def main():
+  parser = argparse.ArgumentParser(description="mock Places 서버로 수집 전략 호출 수/recall 비교")
+  parser.add_argument("--only", nargs="*", choices=STRATEGIES, default=None, help="실행할 전략(기본: 전부)")
+  parser.add_argument("--xlsx", nargs="*", default=None, help="장소 시드용 결과 엑셀(기본: 합성 데이터)")
+  parser.add_argument("--synthetic", type=int, default=4000, help="합성 장소 수")
+  parser.add_argument("--seed", type=int, default=7)
+  parser.add_argument("--budget", type=int, default=10000, help="전략별 호출 상한(MAX_TOTAL_CALLS / MAX_CALLS)")
+  parser.add_argument("--two-phase", action="store_true", help="DISCOVERY_MODE=two_phase 로 실행")
+  parser.add_argument("--out", default="benchmark_results.json")
+  parser.add_argument("--workdir", default=None, help="엑셀/체크포인트/로그 저장 폴더(기본: 임시 폴더)")
+  parser.add_argument("--verbose", action="store_true", help="수집기 로그를 화면에 그대로 출력")
+  parser.add_argument("--scheduler", nargs="*", choices=SCHEDULERS, default=["fifo"],
+                      help="타일 순서(여러 개면 같은 예산으로 각각 실행해 비교)")
+  args = parser.parse_args()
+
+  places = mps.xlsx_places(args.xlsx) if args.xlsx else mps.synthetic_places(args.synthetic, seed=args.seed)
+  mock = mps.MockPlaces(places)
+  out_dir = args.workdir or tempfile.mkdtemp(prefix="crawl_bench_")
+  os.makedirs(out_dir, exist_ok=True)
+  print(f"[bench] places={len(places)} workdir={out_dir}")
+
+  rows = run_benchmark(args.only or STRATEGIES, mock, out_dir, args.budget, args.two_phase, args.verbose,
+                       args.scheduler or ["fifo"])
+  print_table(rows)
+  print_split_comparison(rows)
+  with open(args.out, "w", encoding="utf-8") as f:
+    json.dump({"places": len(places), "two_phase": args.two_phase, "budget": args.budget,
+               "schedulers": args.scheduler, "results": rows},
+              f, ensure_ascii=False, indent=2)
+  print(f"Saved benchmark -> {args.out}")
+
+
+if __name__ == "__main__":
+  main()
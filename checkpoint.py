@@ -0,0 +1,174 @@
+# checkpoint.py
+# -------------
+# 타일 BFS 상태 체크포인트(크래시 안전 / 증분)
+# - snapshot.json : 전체 상태(대기 타일, 완료 타일 키, 결과, 호출 수) — 임시파일 + fsync + os.replace 로 원자적 교체
+# - journal.jsonl : 스냅샷 이후 완료된 타일마다 한 줄(키, 호출 수, 자식 타일, 새 결과, 잎 기록, 커버 원) append + fsync
+# - 커버 원(disc): 이 타일로 '전부 받았다'고 본 원(lat, lng, r) — 재생 시 meta["coverage"] 에 다시 추가
+#   (없으면 스냅샷 이후 끝난 타일의 영역을 재개 후 coverage_index 가 모름 → 그 안 타일을 다시 호출)
+# - 잎(leaf): 더 분할되지 않고 끝난 타일의 결과 지문(recrawl.make_leaf) — 재개해도 잃지 않게 함께 저장
+# - 복구 = 스냅샷 로드 + 저널 재생 → 완료된 타일은 다시 돌지 않고, 이미 비용을 낸 결과도 잃지 않음
+# - 진행 중이던 타일은 스냅샷의 pending에 남아 있으므로 재개 시 다시 실행(캐시가 있으면 무료)
+
+import json
+import os
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+SNAPSHOT_NAME = "snapshot.json"
+JOURNAL_NAME = "journal.jsonl"
+
+
+def _atomic_write_json(path: str, obj: Dict):
+  tmp = path + ".tmp"
+  with open(tmp, "w", encoding="utf-8") as f:
+    json.dump(obj, f, ensure_ascii=False)
+    f.flush()
+    os.fsync(f.fileno())
+  os.replace(tmp, path)
+
+
+def _tile_from_json(t: Dict) -> Dict:
+  # JSON에는 튜플이 없으므로 center 등을 튜플로 되돌림
+  t = dict(t)
+  for k in ("center", "rect"):
+    if isinstance(t.get(k), list):
+      t[k] = tuple(t[k])
+  return t
+
+
+class BfsCheckpoint:
+  def __init__(self, directory: str, snapshot_every: int = 50,
+               key_fn: Optional[Callable[[Dict], Tuple]] = None):
+    """
+    snapshot_every: 저널이 이만큼 쌓이면 스냅샷으로 압축
+    key_fn: 타일 → visited 키(대기열에서 완료 타일을 찾아 빼는 데 사용)
+    """
+    self.directory = directory
+    self.snapshot_every = snapshot_every
+    self.key_fn = key_fn or (lambda t: (round(t["center"][0], 6), round(t["center"][1], 6), round(t["radius"], 1)))
+    self.snapshot_path = os.path.join(directory, SNAPSHOT_NAME)
+    self.journal_path = os.path.join(directory, JOURNAL_NAME)
+    self._seq = 0
+    self._since_snapshot = 0
+    self._journal = None
+
+  def exists(self) -> bool:
+    return os.path.exists(self.snapshot_path)
+
+  # -----------------------
+  # 저장
+  # -----------------------
+  def snapshot(self, pending: Iterable[Dict], visited: Set[Tuple], results_by_id: Dict[str, Dict],
+               total_calls: int, processed: int, meta: Optional[Dict] = None, leaves: Optional[List[Dict]] = None):
+    """
+    pending: 아직 완료되지 않은 타일 전부(진행 중 + 대기열)
+    visited: '완료된' 타일 키만(진행 중 타일 키는 빼고 넘길 것)
+    leaves: 지금까지 기록된 잎 타일(recrawl 용)
+    """
+    os.makedirs(self.directory, exist_ok=True)
+    _atomic_write_json(self.snapshot_path, {
+      "seq": self._seq,
+      "pending": list(pending),
+      "visited": [list(k) for k in visited],
+      "results": list(results_by_id.values()),
+      "total_calls": total_calls,
+      "processed": processed,
+      "meta": meta or {},
+      "leaves": leaves or [],
+    })
+    # 스냅샷에 반영된 저널은 비움(seq로 중복 재생도 방지)
+    if self._journal is not None:
+      self._journal.close()
+    self._journal = open(self.journal_path, "w", encoding="utf-8")
+    self._since_snapshot = 0
+
+  def record_tile(self, tile: Dict, calls_used: int, children: List[Dict], new_places: List[Dict],
+                  leaf: Optional[Dict] = None, disc: Optional[Tuple[float, float, float]] = None):
+    """
+    타일 하나 완료 시 저널에 한 줄 기록(fsync). leaf: 분할 없이 끝난 타일이면 그 잎 기록
+    disc: coverage_index 에 넣은 커버 원(lat, lng, r) — 없으면 None
+    """
+    if self._journal is None:
+      os.makedirs(self.directory, exist_ok=True)
+      self._journal = open(self.journal_path, "a", encoding="utf-8")
+    self._seq += 1
+    self._journal.write(json.dumps({
+      "seq": self._seq,
+      "key": list(self.key_fn(tile)),
+      "calls": calls_used,
+      "children": children,
+      "places": new_places,
+      "leaf": leaf,
+      "disc": list(disc) if disc else None,
+    }, ensure_ascii=False) + "\n")
+    self._journal.flush()
+    os.fsync(self._journal.fileno())
+    self._since_snapshot += 1
+
+  def due(self) -> bool:
+    return self._since_snapshot >= self.snapshot_every
+
+  def close(self):
+    if self._journal is not None:
+      self._journal.close()
+      self._journal = None
+
+  # -----------------------
+  # 복구
+  # -----------------------
+  def load(self) -> Optional[Dict]:
+    """스냅샷 + 저널 재생 결과. 체크포인트가 없으면 None"""
+    if not self.exists():
+      return None
+    with open(self.snapshot_path, encoding="utf-8") as f:
+      snap = json.load(f)
+
+    pending = [_tile_from_json(t) for t in snap["pending"]]
+    visited = {tuple(k) for k in snap["visited"]}
+    results_by_id = {p["id"]: p for p in snap["results"] if p.get("id")}
+    total_calls = snap["total_calls"]
+    processed = snap["processed"]
+    seq = snap.get("seq", 0)
+    leaves = snap.get("leaves", [])
+    meta = snap.get("meta", {})
+
+    replayed = 0
+    if os.path.exists(self.journal_path):
+      with open(self.journal_path, encoding="utf-8") as f:
+        for line in f:
+          try:
+            entry = json.loads(line)
+          except ValueError:
+            break  # 기록 도중 끊긴 마지막 줄
+          if entry["seq"] <= seq:
+            continue
+          key = tuple(entry["key"])
+          visited.add(key)
+          for i, t in enumerate(pending):
+            if self.key_fn(t) == key:
+              del pending[i]
+              break
+          pending.extend(_tile_from_json(c) for c in entry["children"])
+          for p in entry["places"]:
+            if p.get("id") and p["id"] not in results_by_id:
+              results_by_id[p["id"]] = p
+          if entry.get("leaf"):
+            leaves.append(entry["leaf"])
+          if entry.get("disc"):
+            meta.setdefault("coverage", []).append(entry["disc"])
+          total_calls += entry["calls"]
+          processed += 1
+          seq = entry["seq"]
+          replayed += 1
+
+    self._seq = seq
+    print(f"[resume] snapshot+journal({replayed}) → pending={len(pending)} done={len(visited)} "
+          f"uniq={len(results_by_id)} calls={total_calls}")
+    return {
+      "pending": pending,
+      "visited": visited,
+      "results_by_id": results_by_id,
+      "total_calls": total_calls,
+      "processed": processed,
+      "meta": meta,
+      "leaves": [dict(leaf, tile=_tile_from_json(leaf["tile"])) for leaf in leaves],
+    }
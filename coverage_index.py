@@ -0,0 +1,100 @@
+# coverage_index.py
+# -----------------
+# 완료된(포화되지 않은) 원 타일들의 합집합 인덱스
+# - 포화되지 않고 끝난 타일 = 그 원 안의 장소는 이미 전부 수집됨
+# - 새 타일이 이 원들의 합집합 안에 '완전히' 들어가면 호출할 필요 없음 → 스케줄러가 호출 전에 확인
+# - 격자(버킷) 인덱스: 원은 자신의 bbox가 걸치는 모든 버킷에 등록
+# - 포함 판정: 질의 원을 한 변 s인 격자 셀로 덮고, 각 셀 중심이 어떤 완료 원에 (반지름 - s/√2) 여유를 두고
+#   들어가면 그 셀 전체가 덮인 것 → 샘플링이지만 누락 없이 보수적
+
+import math
+import threading
+from typing import Dict, List, Tuple
+
+M_PER_DEG_LAT = 111_320.0
+
+
+class CoverageIndex:
+  def __init__(self, origin_lat: float, origin_lng: float, bucket_m: float = 250.0, min_sample_m: float = 10.0):
+    # 좁은 영역(수 km)이므로 원점 기준 등장방형 투영으로 충분
+    self.origin_lat = origin_lat
+    self.origin_lng = origin_lng
+    self._m_per_deg_lng = M_PER_DEG_LAT * math.cos(math.radians(origin_lat))
+    self.bucket_m = bucket_m
+    self.min_sample_m = min_sample_m
+    self._buckets: Dict[Tuple[int, int], List[Tuple[float, float, float]]] = {}
+    self._discs: List[Tuple[float, float, float]] = []  # (lat, lng, r) — 체크포인트 저장용
+    self._lock = threading.Lock()
+    self.discs = 0
+    self.pruned_tiles = 0
+    self.avoided_calls = 0
+
+  def _xy(self, lat: float, lng: float) -> Tuple[float, float]:
+    return (lng - self.origin_lng) * self._m_per_deg_lng, (lat - self.origin_lat) * M_PER_DEG_LAT
+
+  def add(self, lat: float, lng: float, radius_m: float):
+    """수집이 끝난(이 원 안은 전부 받은) 원 등록"""
+    if radius_m <= 0:
+      return
+    x, y = self._xy(lat, lng)
+    b = self.bucket_m
+    disc = (x, y, radius_m)
+    with self._lock:
+      for i in range(math.floor((x - radius_m) / b), math.floor((x + radius_m) / b) + 1):
+        for j in range(math.floor((y - radius_m) / b), math.floor((y + radius_m) / b) + 1):
+          self._buckets.setdefault((i, j), []).append(disc)
+      self._discs.append((lat, lng, radius_m))
+      self.discs += 1
+
+  def to_list(self) -> List[List[float]]:
+    with self._lock:
+      return [list(d) for d in self._discs]
+
+  def load_list(self, discs: List[List[float]]):
+    for lat, lng, r in discs:
+      self.add(lat, lng, r)
+
+  def _point_covered(self, px: float, py: float, margin: float) -> bool:
+    for cx, cy, cr in self._buckets.get((math.floor(px / self.bucket_m), math.floor(py / self.bucket_m)), ()):
+      if cr > margin and (px - cx) ** 2 + (py - cy) ** 2 <= (cr - margin) ** 2:
+        return True
+    return False
+
+  def covers(self, lat: float, lng: float, radius_m: float) -> bool:
+    """질의 원 전체가 완료 원들의 합집합 안에 있는지(보수적: 애매하면 False)"""
+    x, y = self._xy(lat, lng)
+    s = max(radius_m / 8.0, self.min_sample_m)
+    margin = s * math.sqrt(2) / 2.0
+    n = math.ceil(radius_m / s)
+    with self._lock:
+      if not self._buckets:
+        return False
+      # 안 덮인 셀이 하나라도 나오면 즉시 False
+      for i in range(-n, n):
+        for j in range(-n, n):
+          # 셀 [x+i*s, x+(i+1)*s] × [y+j*s, y+(j+1)*s] 이 질의 원과 겹칠 때만 검사
+          nx = 0.0 if i <= 0 <= i + 1 else min(abs(i * s), abs((i + 1) * s))
+          ny = 0.0 if j <= 0 <= j + 1 else min(abs(j * s), abs((j + 1) * s))
+          if nx * nx + ny * ny > radius_m * radius_m:
+            continue
+          if not self._point_covered(x + (i + 0.5) * s, y + (j + 0.5) * s, margin):
+            return False
+    return True
+
+  def contains_point(self, lat: float, lng: float) -> bool:
+    """점이 완료 원 안에 있는지(recrawl: 이 위치의 장소가 사라졌다고 말할 수 있는지)"""
+    x, y = self._xy(lat, lng)
+    with self._lock:
+      return self._point_covered(x, y, 0.0)
+
+  def prune(self, lat: float, lng: float, radius_m: float, calls_per_tile: int = 1) -> bool:
+    """덮여 있으면 True + 절감 카운터 증가(스케줄러용)"""
+    if not self.covers(lat, lng, radius_m):
+      return False
+    with self._lock:
+      self.pruned_tiles += 1
+      self.avoided_calls += calls_per_tile
+    return True
+
+  def summary(self) -> str:
+    return f"coverage discs={self.discs} pruned_tiles={self.pruned_tiles} avoided_calls>={self.avoided_calls}"
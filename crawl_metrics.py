@@ -0,0 +1,321 @@
+# crawl_metrics.py
+# ----------------
+# 수집기 계측(표준 라이브러리만) — 어디서 호출이 낭비되는지 보고 MAX_CELL_RADIUS / OVERLAP_RATIO /
+# SPLIT_COUNT_THRESHOLD 를 데이터로 조정하기 위함
+# - Metrics: 카운터 / 게이지 / 히스토그램(라벨 포함, 스레드 안전) → Prometheus 텍스트 형식
+#   · 파일(node_exporter textfile collector 용, 원자적 교체) 또는 HTTP 엔드포인트(/metrics)
+# - CrawlRecorder: 수집기 한 번 실행의 타일 단위 기록
+#   · 깊이별 타일/호출/포화/새 장소/낭비 호출(새 장소 0인 타일), 쿼리당 페이지 수, 예산 소진 속도
+#   · 시간축 샘플(경과 초, 누적 호출, 누적 고유 장소) → 구간별 호출당 새 장소
+#   · 끝나면 JSON 요약(깊이별 표 + 시간 구간 + HTTP 지연 분위수 추정)
+# - HTTP 지연/상태 코드는 places_http 가 METRICS 에 직접 기록(엔드포인트별)
+
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+PAGE_BUCKETS = (1, 2, 3, 5, 10)
+CALL_BUCKETS = (1, 2, 4, 8, 16, 32, 64)
+TIMELINE_WINDOW_CALLS = 100   # JSON 요약의 시간 구간 = 호출 N번마다
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _labels(labels: Optional[Dict]) -> Labels:
+  return tuple(sorted((k, str(v)) for k, v in (labels or {}).items()))
+
+
+def _fmt_labels(labels: Labels, extra: Optional[Tuple[str, str]] = None) -> str:
+  items = list(labels) + ([extra] if extra else [])
+  if not items:
+    return ""
+  esc = lambda v: v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+  return "{" + ",".join(f'{k}="{esc(v)}"' for k, v in items) + "}"
+
+
+class Metrics:
+  def __init__(self):
+    self._lock = threading.Lock()
+    self._types: Dict[str, str] = {}
+    self._help: Dict[str, str] = {}
+    self._values: Dict[str, Dict[Labels, float]] = {}
+    # 히스토그램: 이름 → 라벨 → [버킷별 누적 수..., sum, count]
+    self._buckets: Dict[str, Tuple[float, ...]] = {}
+    self._hist: Dict[str, Dict[Labels, List[float]]] = {}
+
+  def _declare(self, name: str, kind: str, help_text: str):
+    if name not in self._types:
+      self._types[name] = kind
+      self._help[name] = help_text
+
+  def inc(self, name: str, labels: Optional[Dict] = None, n: float = 1.0, help_text: str = ""):
+    with self._lock:
+      self._declare(name, "counter", help_text)
+      series = self._values.setdefault(name, {})
+      key = _labels(labels)
+      series[key] = series.get(key, 0.0) + n
+
+  def set(self, name: str, value: float, labels: Optional[Dict] = None, help_text: str = ""):
+    with self._lock:
+      self._declare(name, "gauge", help_text)
+      self._values.setdefault(name, {})[_labels(labels)] = float(value)
+
+  def observe(self, name: str, value: float, labels: Optional[Dict] = None,
+              buckets: Tuple[float, ...] = LATENCY_BUCKETS, help_text: str = ""):
+    with self._lock:
+      self._declare(name, "histogram", help_text)
+      bounds = self._buckets.setdefault(name, tuple(buckets))
+      h = self._hist.setdefault(name, {}).setdefault(_labels(labels), [0.0] * (len(bounds) + 2))
+      for i, b in enumerate(bounds):
+        if value <= b:
+          h[i] += 1
+      h[-2] += value
+      h[-1] += 1
+
+  def get(self, name: str, labels: Optional[Dict] = None) -> float:
+    with self._lock:
+      return self._values.get(name, {}).get(_labels(labels), 0.0)
+
+  def reset(self):
+    with self._lock:
+      self._types.clear()
+      self._help.clear()
+      self._values.clear()
+      self._buckets.clear()
+      self._hist.clear()
+
+  # -----------------------
+  # 내보내기
+  # -----------------------
+  def render(self) -> str:
+    """Prometheus text exposition format(0.0.4)"""
+    out = []
+    with self._lock:
+      for name in sorted(self._types):
+        kind = self._types[name]
+        if self._help[name]:
+          out.append(f"# HELP {name} {self._help[name]}")
+        out.append(f"# TYPE {name} {kind}")
+        if kind == "histogram":
+          bounds = self._buckets[name]
+          for labels, h in sorted(self._hist.get(name, {}).items()):
+            for i, b in enumerate(bounds):
+              out.append(f"{name}_bucket{_fmt_labels(labels, ('le', f'{b:g}'))} {h[i]:g}")
+            out.append(f"{name}_bucket{_fmt_labels(labels, ('le', '+Inf'))} {h[-1]:g}")
+            out.append(f"{name}_sum{_fmt_labels(labels)} {h[-2]:.6g}")
+            out.append(f"{name}_count{_fmt_labels(labels)} {h[-1]:g}")
+        else:
+          for labels, v in sorted(self._values.get(name, {}).items()):
+            out.append(f"{name}{_fmt_labels(labels)} {v:.6g}")
+    return "\n".join(out) + "\n"
+
+  def write_textfile(self, path: str):
+    """임시파일 + os.replace(수집기가 읽는 도중에 반쯤 쓴 파일을 보지 않게)"""
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+      f.write(self.render())
+    os.replace(tmp, path)
+
+  def serve(self, port: int, host: str = "0.0.0.0") -> ThreadingHTTPServer:
+    """GET /metrics 엔드포인트를 백그라운드 스레드로"""
+    metrics = self
+
+    class Handler(BaseHTTPRequestHandler):
+      def log_message(self, fmt, *args):
+        pass
+
+      def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+          self.send_response(404)
+          self.end_headers()
+          return
+        raw = metrics.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(raw)))
+        self.end_headers()
+        self.wfile.write(raw)
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"[metrics] http://{host}:{server.server_port}/metrics")
+    return server
+
+  def histogram_summary(self, name: str) -> Dict[str, Dict]:
+    """라벨별 count / mean / p50·p90·p99(버킷 상한 기준 추정)"""
+    out = {}
+    with self._lock:
+      bounds = self._buckets.get(name, ())
+      for labels, h in self._hist.get(name, {}).items():
+        count = h[-1]
+        if not count:
+          continue
+
+        def quantile(q: float):
+          for i, b in enumerate(bounds):
+            if h[i] >= q * count:
+              return b
+          return None  # 마지막 버킷보다 큼
+
+        key = ",".join(f"{k}={v}" for k, v in labels) or "all"
+        out[key] = {"count": int(count), "mean": h[-2] / count,
+                    "p50": quantile(0.5), "p90": quantile(0.9), "p99": quantile(0.99)}
+    return out
+
+
+METRICS = Metrics()
+
+
+def observe_pages(collector: str, pages: int, metrics: Metrics = METRICS):
+  """쿼리 하나의 페이지네이션 체인 길이(Text Search — 타일 함수 안에서 바로 기록)"""
+  metrics.observe("crawl_pages_per_query", pages, {"collector": collector}, PAGE_BUCKETS, "쿼리당 페이지 수")
+
+
+class CrawlRecorder:
+  def __init__(self, collector: str, budget: Optional[int] = None, metrics: Metrics = METRICS,
+               prom_path: Optional[str] = None, port: Optional[int] = None, flush_every: int = 20,
+               calls: int = 0, unique: int = 0):
+    """
+    collector: 라벨(text_search / nearby_search …) / budget: 호출 상한(소진 속도·예상 소진 시각 계산)
+    prom_path: Prometheus 텍스트 파일(flush_every 타일마다 갱신) / port: /metrics 엔드포인트
+    calls / unique: 시작 시점 누적값(--resume 이면 체크포인트 값 → 소진 속도는 이번 실행분만)
+    """
+    self.collector = collector
+    self.budget = budget
+    self.m = metrics
+    self.prom_path = prom_path
+    self.flush_every = flush_every
+    self.started = time.monotonic()
+    self._lock = threading.Lock()
+    self._by_depth: Dict[int, Dict[str, float]] = {}
+    self._timeline: List[Tuple[float, int, int]] = [(0.0, calls, unique)]
+    self._tiles = 0
+    self.server = self.m.serve(port) if port is not None else None
+    if budget:
+      self.m.set("crawl_budget_calls", budget, {"collector": collector}, "호출 상한")
+
+  def _depth(self, depth: int) -> Dict[str, float]:
+    return self._by_depth.setdefault(depth, {"tiles": 0, "pruned": 0, "calls": 0, "saturated": 0, "found": 0,
+                                             "new": 0, "wasted_calls": 0, "radius_sum": 0.0})
+
+  def tile(self, depth: int, radius_m: float, calls: int, count: int, new: int, saturated: bool):
+    """완료된 타일 1개(calls: 이 타일에 쓴 호출, count: 타일 안 결과, new: 처음 본 장소)"""
+    lab = {"collector": self.collector, "depth": depth}
+    self.m.inc("crawl_tiles_total", dict(lab, outcome="saturated" if saturated else "complete"),
+               help_text="완료 타일 수(깊이/포화 여부별)")
+    self.m.inc("crawl_calls_total", lab, calls, "타일 깊이별 API 호출 수")
+    self.m.inc("crawl_new_places_total", lab, new, "타일 깊이별 새 고유 장소 수")
+    self.m.observe("crawl_tile_calls", calls, {"collector": self.collector}, CALL_BUCKETS, "타일당 호출 수")
+    if new == 0:
+      self.m.inc("crawl_wasted_calls_total", lab, calls, "새 장소가 0인 타일에 쓴 호출")
+    with self._lock:
+      d = self._depth(depth)
+      d["tiles"] += 1
+      d["calls"] += calls
+      d["saturated"] += int(saturated)
+      d["found"] += count
+      d["new"] += new
+      d["radius_sum"] += radius_m
+      if new == 0:
+        d["wasted_calls"] += calls
+      self._tiles += 1
+      flush = self.prom_path and self._tiles % self.flush_every == 0
+    if flush:
+      self.m.write_textfile(self.prom_path)
+
+  def pruned(self, depth: int):
+    self.m.inc("crawl_tiles_total", {"collector": self.collector, "depth": depth, "outcome": "pruned"},
+               help_text="완료 타일 수(깊이/포화 여부별)")
+    with self._lock:
+      self._depth(depth)["pruned"] += 1
+
+  def progress(self, calls: int, unique: int):
+    """누적 호출/고유 장소 → 시간축 샘플 + 게이지(소진 속도, 호출당 새 장소)"""
+    elapsed = time.monotonic() - self.started
+    lab = {"collector": self.collector}
+    with self._lock:
+      self._timeline.append((elapsed, calls, unique))
+      first = self._timeline[0]
+    self.m.set("crawl_calls_used", calls, lab, "누적 호출 수")
+    self.m.set("crawl_unique_places", unique, lab, "누적 고유 장소 수")
+    if elapsed > 0:
+      self.m.set("crawl_budget_burn_per_min", (calls - first[1]) / elapsed * 60.0, lab, "분당 호출 소진 속도")
+    self.m.set("crawl_unique_per_call", unique / max(calls, 1), lab, "누적 호출당 고유 장소")
+
+  # -----------------------
+  # 요약
+  # -----------------------
+  def _windows(self) -> List[Dict]:
+    """TIMELINE_WINDOW_CALLS 호출마다 구간: 그 구간의 호출당 새 장소 / 분당 호출"""
+    out = []
+    start = self._timeline[0]
+    for t, calls, unique in self._timeline[1:]:
+      if calls - start[1] >= TIMELINE_WINDOW_CALLS:
+        dt = t - start[0]
+        out.append({"until_s": round(t, 1), "calls": calls, "unique": unique,
+                    "new_per_call": (unique - start[2]) / (calls - start[1]),
+                    "calls_per_min": (calls - start[1]) / dt * 60.0 if dt > 0 else None})
+        start = (t, calls, unique)
+    return out
+
+  def summary(self, json_path: Optional[str] = None, extra: Optional[Dict] = None) -> Dict:
+    elapsed = time.monotonic() - self.started
+    with self._lock:
+      last = self._timeline[-1]
+      depths = {}
+      for depth, d in sorted(self._by_depth.items()):
+        done = d["tiles"]
+        depths[str(depth)] = {
+          "tiles": int(done), "pruned": int(d["pruned"]), "calls": int(d["calls"]),
+          "mean_radius_m": d["radius_sum"] / done if done else None,
+          "saturation_rate": d["saturated"] / done if done else None,
+          "calls_per_tile": d["calls"] / done if done else None,
+          "new_per_call": d["new"] / d["calls"] if d["calls"] else None,
+          "duplicate_ratio": 1.0 - d["new"] / d["found"] if d["found"] else None,
+          "wasted_calls": int(d["wasted_calls"]),
+        }
+      windows = self._windows()
+    first = self._timeline[0]
+    burn = (last[1] - first[1]) / elapsed * 60.0 if elapsed > 0 else None
+    out = {
+      "collector": self.collector,
+      "elapsed_s": round(elapsed, 1),
+      "calls": last[1],
+      "unique": last[2],
+      "unique_per_call": last[2] / max(last[1], 1),
+      "budget": self.budget,
+      "burn_per_min": burn,
+      "budget_used": last[1] / self.budget if self.budget else None,
+      "minutes_to_budget": max(0.0, self.budget - last[1]) / burn if self.budget and burn else None,
+      "by_depth": depths,
+      "timeline": windows,
+      "pages_per_query": self.m.histogram_summary("crawl_pages_per_query"),
+      "http_latency_s": self.m.histogram_summary("places_http_request_seconds"),
+    }
+    if extra:
+      out.update(extra)
+    if self.prom_path:
+      self.m.write_textfile(self.prom_path)
+    if json_path:
+      with open(json_path, "w", encoding="utf-8") as f:
+        json.dump(out, f, ensure_ascii=False, indent=2)
+      print(f"[metrics] summary -> {json_path}")
+    return out
+
+  def print_depth_table(self, summary: Dict):
+    print(f"{'depth':>5}{'r(m)':>8}{'tiles':>7}{'pruned':>8}{'calls':>7}{'sat%':>7}{'new/call':>10}{'wasted':>8}")
+    for depth, d in summary["by_depth"].items():
+      r = f"{d['mean_radius_m']:.0f}" if d["mean_radius_m"] else "-"
+      sat = f"{100 * d['saturation_rate']:.0f}" if d["saturation_rate"] is not None else "-"
+      npc = f"{d['new_per_call']:.2f}" if d["new_per_call"] is not None else "-"
+      print(f"{depth:>5}{r:>8}{d['tiles']:>7}{d['pruned']:>8}{d['calls']:>7}{sat:>7}{npc:>10}{d['wasted_calls']:>8}")
+
+  def close(self):
+    if self.server is not None:
+      self.server.shutdown()
+      self.server = None
@@ -1,6 +1,6 @@
 # retry_error_only.py
 # -*- coding: utf-8 -*-
-import time, subprocess, re, html, random
+import time, subprocess, re, random
 import pandas as pd
 from urllib.parse import urlparse, urljoin, urlsplit, parse_qs, unquote
 from bs4 import BeautifulSoup
@@ -12,17 +12,26 @@ from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
 from webdriver_manager.chrome import ChromeDriverManager
 
+from email_extract import extract_emails, is_valid_email
+from place_store import PlaceStore
+from url_canon import UnitPlan
+
 INPUT_XLSX = "wealth_result_filled_retry.xlsx"         # 기존 결과 파일
 OUTPUT_XLSX = "wealth_result_filled_retry_retry.xlsx"  # 리트라이 결과 저장
+# SQLite 저장소 사용 시(예: "places.sqlite"): 오류 행만 꺼내 한 행씩 바로 기록, OUTPUT_XLSX는 내보내기 뷰
+STORE_PATH = None
+STORE_CATEGORY = None   # 예: "wealth". None이면 INPUT_XLSX 파일 이름을 카테고리로 사용
 TARGET_COL_URL = "웹사이트 주소"
 TARGET_COL_EMAIL = "이메일 주소"
 RETRY_LABEL = "조회 중 오류"
-
-EMAIL_REGEX = re.compile(r'\b[A-Z0-9._%+-]+@[A-Z0-9.-]+\.[A-Z]{2,24}\b', re.IGNORECASE)
-BAD_TLDS = {
-  "css","js","map","json","png","jpg","jpeg","gif","webp","svg","ico",
-  "woff","woff2","ttf","otf","mp4","webm","mov","avi","pdf","zip","rar","7z","gz","tar","xml","html","htm"
-}
+# 수집 방식: "http"(email_http_fetch 로 먼저, JS 렌더링/차단 사이트만 브라우저) / "browser"(전부 Selenium)
+FETCH_TIER = "http"
+# 브라우저 단계 병렬화: 2 이상이면 헤드리스 크롬 N개 프로세스(email_worker_pool, 리눅스용), 1이면 기존 단일 드라이버
+BROWSER_WORKERS = 1
+# 같은 사이트 묶기(url_canon): "domain"(등록 도메인 단위 — 체인/지점 공용 사이트는 한 번만) / "url"(정규화 URL 단위)
+DEDUPE_BY = "domain"
+# 받은 페이지를 압축 저장(page_archive) → 규칙을 고친 뒤 `python page_archive.py re-extract` 로 재크롤링 없이 다시 추출
+ARCHIVE_PATH = "pages.sqlite"   # None 이면 저장 안 함
 
 def link_weight(txt_lower, href_lower):
   if "contact" in txt_lower or "contact" in href_lower: return 3
@@ -30,21 +39,6 @@ def link_weight(txt_lower, href_lower):
   if "support" in txt_lower or "support" in href_lower: return 1
   return 0
 
-def is_valid_email(e: str) -> bool:
-  if not e or "@" not in e: return False
-  e = e.strip()
-  if not EMAIL_REGEX.fullmatch(e): return False
-  if any(ch in e for ch in [' ', ',', ';', '<', '>', '"', "'"]): return False
-  if e.count("@") != 1: return False
-  local, _, dom = e.rpartition("@")
-  if not local or not dom: return False
-  if local.startswith(".") or local.endswith(".") or ".." in local: return False
-  if dom.startswith(".")   or dom.endswith(".")   or ".." in dom:   return False
-  tld = dom.split(".")[-1].lower()
-  if tld in BAD_TLDS: return False
-  if len(e) > 254 or len(local) > 64: return False
-  return True
-
 def base_domain(u: str) -> str:
   host = urlparse(u).netloc.lower()
   parts = host.split(".")
@@ -70,29 +64,14 @@ def score_and_pick(emails: set, u: str, k: int = 3) -> str:
   return ", ".join([e for _, e in ranked[:k]]) if ranked else RETRY_LABEL
 
 def deobfuscate_and_extract(text: str) -> set:
-  out = set()
-  deob = html.unescape(text)
-  for pat, rep in [
-    (r'\s*\[?\s*at\s*\]?\s*', '@'),
-    (r'\s*\(?\s*at\s*\)?\s*', '@'),
-    (r'\s+at\s+', '@'),
-    (r'\s*\[?\s*dot\s*\]?\s*', '.'),
-    (r'\s*\(?\s*dot\s*\)?\s*', '.'),
-    (r'\s+dot\s+', '.'),
-    (r'골뱅이', '@'),
-    (r'\s*점\s*', '.'),
-    (r'닷', '.'),
-  ]:
-    deob = re.sub(pat, rep, deob, flags=re.IGNORECASE)
-  deob = re.sub(r'\s*@\s*', '@', deob)
-  deob = re.sub(r'\s*\.\s*', '.', deob)
-  for e in EMAIL_REGEX.findall(deob):
-    if is_valid_email(e):
-      out.add(e)
-  return out
+  # 우회 표기 복원 + 추출은 email_extract 의 단일 스캔 엔진으로
+  return extract_emails(text)
 
 def get_visible_text(html_str: str) -> str:
-  soup = BeautifulSoup(html_str or "", "lxml")
+  return visible_text(BeautifulSoup(html_str or "", "lxml"))
+
+def visible_text(soup) -> str:
+  # 주의: soup 를 직접 고침(script/style 제거) → mailto/링크는 먼저 뽑아 둘 것
   for tag in soup(["script","style","noscript","template"]):
     tag.decompose()
   # aria-label 힌트도 텍스트로 포함
@@ -106,32 +85,67 @@ def get_visible_text(html_str: str) -> str:
 def collect_from_mailto(driver, emails: set):
   anchors = driver.find_elements(By.CSS_SELECTOR, 'a[href^="mailto:"]')
   for a in anchors:
-    href = (a.get_attribute("href") or "").strip()
-    if not href: continue
-    base = href.split("?", 1)[0].replace("mailto:", "").strip()
-    base = unquote(base)
-    if is_valid_email(base):
-      emails.add(base)
-    qs = urlsplit(href).query
-    if not qs: continue
-    qd = parse_qs(qs)
-    for key in ("to","cc","bcc"):
-      for val in qd.get(key, []):
-        for e in unquote(val).split(","):
-          e = e.strip()
-          if is_valid_email(e):
-            emails.add(e)
-
-def find_top_emails(url: str, driver) -> str:
+    emails |= emails_from_mailto(a.get_attribute("href") or "")
+
+def emails_from_mailto(href: str) -> set:
+  """mailto: 링크 하나 → 주소 + to/cc/bcc"""
+  out = set()
+  href = href.strip()
+  if not href: return out
+  base = href.split("?", 1)[0].replace("mailto:", "").strip()
+  base = unquote(base)
+  if is_valid_email(base):
+    out.add(base)
+  qs = urlsplit(href).query
+  if not qs: return out
+  qd = parse_qs(qs)
+  for key in ("to","cc","bcc"):
+    for val in qd.get(key, []):
+      for e in unquote(val).split(","):
+        e = e.strip()
+        if is_valid_email(e):
+          out.add(e)
+  return out
+
+def pick_contact_links(url: str, anchors, k: int = 3) -> list:
+  """[(href, 소문자 링크 텍스트)] → 같은 호스트의 contact/about/support 링크 상위 k개"""
+  host = urlparse(url).netloc
+  scored = []
+  for href, txt in anchors:
+    if not href or href.startswith("mailto:"): continue
+    href2 = urljoin(url, href)
+    if urlparse(href2).netloc != host: continue
+    w = link_weight(txt, href2.lower())
+    if w > 0:
+      scored.append((w, len(href2), href2))
+  scored.sort(key=lambda x: (-x[0], x[1], x[2]))
+  return [h for _,_,h in scored[:k]]
+
+def find_top_emails(url: str, driver, archive=None) -> str:
+  found = find_email_candidates(url, driver, archive)
+  return RETRY_LABEL if found is None else score_and_pick(found, url, k=3)
+
+def archive_page(archive, site: str, url: str, driver, role: str):
+  if archive is None:
+    return
+  try:
+    archive.add(site, url, driver.current_url, None, driver.page_source or "", role=role, tier="browser")
+  except Exception:
+    pass
+
+def find_email_candidates(url: str, driver, archive=None):
+  """브라우저로 메인 + contact 후보 3개 → 이메일 후보 set(메인 로드 실패면 None)
+  archive: page_archive.PageArchive 면 렌더링된 페이지 저장"""
   try:
     driver.get(url)
     WebDriverWait(driver, 12).until(EC.presence_of_element_located((By.TAG_NAME, "body")))
     WebDriverWait(driver, 8).until(lambda d: d.execute_script('return document.readyState') in ('interactive','complete'))
     time.sleep(0.4)
   except Exception:
-    return RETRY_LABEL
+    return None
 
   all_candidates = set()
+  archive_page(archive, url, url, driver, "main")
 
   # 1) mailto:
   try:
@@ -152,23 +166,14 @@ def find_top_emails(url: str, driver) -> str:
       return Array.from(document.querySelectorAll('a[href]'))
         .map(a => [a.href, (a.textContent||'').trim().toLowerCase()]);
     """) or []
-    host = urlparse(url).netloc
-    scored = []
-    for href, txt in anchors:
-      if not href or href.startswith("mailto:"): continue
-      href2 = urljoin(url, href)
-      if urlparse(href2).netloc != host: continue
-      w = link_weight(txt, href2.lower())
-      if w > 0:
-        scored.append((w, len(href2), href2))
-    scored.sort(key=lambda x: (-x[0], x[1], x[2]))
-    cand_links = [h for _,_,h in scored[:3]]
+    cand_links = pick_contact_links(url, anchors, k=3)
 
     for link in cand_links:
       try:
         driver.get(link)
         WebDriverWait(driver, 8).until(EC.presence_of_element_located((By.TAG_NAME, "body")))
         time.sleep(0.3)
+        archive_page(archive, url, link, driver, "link")
         collect_from_mailto(driver, all_candidates)
         text2 = get_visible_text(driver.page_source or "")
         all_candidates |= deobfuscate_and_extract(text2)
@@ -178,9 +183,9 @@ def find_top_emails(url: str, driver) -> str:
   except Exception:
     pass
 
-  return score_and_pick(all_candidates, url, k=3)
+  return all_candidates
 
-def make_driver():
+def make_driver(headless: bool = False):
   # 기존 크롬 프로필 + 디버깅 포트에 붙고 싶다면 주석 해제
   # subprocess.Popen('C:\\Program Files\\Google\\Chrome\\Application\\chrome.exe --remote-debugging-port=9222 --user-data-dir="C:\\chromeCookie\\kmong_Rohmin_leisure"')
   options = Options()
@@ -193,6 +198,11 @@ def make_driver():
                        "Chrome/126.0.0.0 Safari/537.36")
   # 디버깅 세션에 붙을 때는 아래 줄 활성화
   # options.add_experimental_option("debuggerAddress", "127.0.0.1:9222")
+  if headless:
+    # 리눅스 서버/워커 풀(email_worker_pool)용: 화면 없이, 프로필 없이
+    options.add_argument("--headless=new")
+    options.add_argument("--disable-gpu")
+    options.add_argument("--window-size=1366,900")
   options.page_load_strategy = 'eager'
 
   service = Service(ChromeDriverManager().install())
@@ -218,62 +228,148 @@ def sanitize(v):
   return v
 
 def main():
-  df = pd.read_excel(INPUT_XLSX)
-  if TARGET_COL_URL not in df.columns or TARGET_COL_EMAIL not in df.columns:
-    raise RuntimeError(f"엑셀에 '{TARGET_COL_URL}' 또는 '{TARGET_COL_EMAIL}' 컬럼이 없습니다.")
+  store = None
+  if STORE_PATH:
+    store = PlaceStore(STORE_PATH)
+    category = store.ensure_imported(INPUT_XLSX, STORE_CATEGORY)
+    jobs = store.pending_email(category, status="error")
+
+    def write(key, value):
+      store.set_email(key, value)
+
+    def checkpoint():
+      pass  # 행마다 커밋됨
+  else:
+    df = pd.read_excel(INPUT_XLSX)
+    if TARGET_COL_URL not in df.columns or TARGET_COL_EMAIL not in df.columns:
+      raise RuntimeError(f"엑셀에 '{TARGET_COL_URL}' 또는 '{TARGET_COL_EMAIL}' 컬럼이 없습니다.")
 
-  mask = (df[TARGET_COL_EMAIL].astype(str).str.strip() == RETRY_LABEL)
-  error_idxs = list(df.index[mask])
+    mask = (df[TARGET_COL_EMAIL].astype(str).str.strip() == RETRY_LABEL)
+    jobs = [(i, df.at[i, TARGET_COL_URL]) for i in df.index[mask]]
 
-  if not error_idxs:
+    def write(key, value):
+      df.at[key, TARGET_COL_EMAIL] = value
+
+    def checkpoint():
+      df.to_excel(OUTPUT_XLSX, index=False)
+      print(f"체크포인트 저장: {OUTPUT_XLSX}")
+
+  if not jobs:
     print("리트라이 대상(조회 중 오류) 행이 없습니다.")
+    if store is not None:
+      store.close()
     return
 
-  print(f"리트라이 대상 행 수: {len(error_idxs)}")
+  print(f"리트라이 대상 행 수: {len(jobs)}")
+
+  # 같은 사이트는 한 번만 조회하고 그 결과를 같은 단위의 모든 행에 복사
+  plan = UnitPlan([u for _, u in jobs], by=DEDUPE_BY)
+  print(plan.report())
+
+  archive = None
+  if ARCHIVE_PATH:
+    from page_archive import PageArchive
+    archive = PageArchive(ARCHIVE_PATH)
+
+  # 1단계: 정적 사이트는 HTTP 로 먼저 끝냄(브라우저는 나머지에만)
+  http_results = {}
+  if FETCH_TIER == "http":
+    from email_http_fetch import fetch_sites, needs_browser, tier_summary
+    http_results = fetch_sites(plan.crawl_urls(), archive=archive)
+    print(tier_summary(http_results))
 
-  driver = make_driver()
+  driver = None
   processed = 0
+  browser_loads = 0
+  browser_jobs = []   # BROWSER_WORKERS > 1: 워커 풀로 넘길 (단위, URL)
+  unit_results = {}   # 단위 → 결과(이미 조회한 사이트는 재사용)
+  waiting = {}        # 풀로 넘긴 단위 → 결과를 받을 행 키들
   RESTART_EVERY = 80
   CHECKPOINT_EVERY = 50
 
-  try:
-    for i in error_idxs:
-      url = str(df.at[i, TARGET_COL_URL]).strip()
-      if not url or url.lower() in ("nan", "none", "-"):
-        df.at[i, TARGET_COL_EMAIL] = RETRY_LABEL
-        continue
-      print(f"[{processed+1}/{len(error_idxs)}] 재조회: {url}")
+  def record(key, result):
+    nonlocal processed
+    write(key, sanitize(result))
+    processed += 1
 
-      try:
-        result = find_top_emails(url, driver)
-      except Exception:
-        result = RETRY_LABEL
+    # 체크포인트 저장
+    if processed % CHECKPOINT_EVERY == 0:
+      checkpoint()
 
-      df.at[i, TARGET_COL_EMAIL] = sanitize(result)
-      processed += 1
-
-      # 체크포인트 저장
-      if processed % CHECKPOINT_EVERY == 0:
-        df.to_excel(OUTPUT_XLSX, index=False)
-        print(f"체크포인트 저장: {OUTPUT_XLSX}")
+  try:
+    for key, url in jobs:
+      unit = plan.unit_of(url)
+      if unit is None:
+        write(key, RETRY_LABEL)
+        continue
+      if unit in unit_results:
+        record(key, unit_results[unit])
+        continue
+      if unit in waiting:
+        waiting[unit].append(key)
+        continue
 
-      # 장시간 안정성 위해 주기적 재기동
-      if processed % RESTART_EVERY == 0:
+      url = plan.crawl_url(unit)
+      http = http_results.get(url)
+      if http is not None and not needs_browser(http):
+        print(f"[{processed+1}/{len(jobs)}] HTTP: {url}")
+        result = score_and_pick(set(http["emails"]), url, k=3)
+      elif BROWSER_WORKERS > 1:
+        browser_jobs.append((unit, url))
+        waiting[unit] = [key]
+        continue
+      else:
+        reason = f" ({http['reason']})" if http else ""
+        print(f"[{processed+1}/{len(jobs)}] 재조회{reason}: {url}")
+        if driver is None:
+          driver = make_driver()
         try:
-          driver.quit()
+          result = find_top_emails(url, driver, archive)
         except Exception:
-          pass
-        time.sleep(1.0)
-        driver = make_driver()
-
-      time.sleep(random.uniform(0.2, 0.5))  # 매너 슬립
+          result = RETRY_LABEL
+        browser_loads += 1
+
+        # 장시간 안정성 위해 주기적 재기동
+        if browser_loads % RESTART_EVERY == 0:
+          try:
+            driver.quit()
+          except Exception:
+            pass
+          time.sleep(1.0)
+          driver = make_driver()
+
+        time.sleep(random.uniform(0.2, 0.5))  # 매너 슬립
+
+      unit_results[unit] = result
+      record(key, result)
+
+    if browser_jobs:
+      # 결과는 도착 순서대로 오지만 행 키로 기록 → 재기동/체크포인트 주기는 그대로(재기동은 워커별)
+      from email_worker_pool import pool_summary, run_pool
+
+      def on_result(unit, url, found):
+        print(f"[{processed+1}/{len(jobs)}] 재조회(풀): {url} ({len(waiting[unit])}행)")
+        result = RETRY_LABEL if found is None else score_and_pick(set(found), url, k=3)
+        for key in waiting[unit]:
+          record(key, result)
+
+      print(f"브라우저 워커 {BROWSER_WORKERS}개로 {len(browser_jobs)}건 조회")
+      print(pool_summary(run_pool(browser_jobs, BROWSER_WORKERS, on_result, restart_every=RESTART_EVERY,
+                                  archive=archive)))
   finally:
     try:
-      driver.quit()
+      if driver is not None:
+        driver.quit()
     except Exception:
       pass
-
-  df.to_excel(OUTPUT_XLSX, index=False)
+    if archive is not None:
+      archive.close()
+
+  if store is not None:
+    store.export_xlsx(OUTPUT_XLSX, category)
+    store.close()
+  else:
+    df.to_excel(OUTPUT_XLSX, index=False)
   print(f"리트라이 완료: {OUTPUT_XLSX}")
 
 if __name__ == "__main__":
@@ -0,0 +1,94 @@
+# email_extract.py
+# ----------------
+# 본문 텍스트 → 이메일 후보: 미리 컴파일한 정규식 하나로 텍스트를 한 번만 훑는 추출 엔진
+# (search_email.py / email_error_check.py / email_http_fetch.py / page_archive re-extract 공용)
+#
+# - 우회 표기도 같은 스캔에서 바로 인식(텍스트 전체를 치환하지 않음)
+#     @  : '@', ' @ ', '[at]', '(at)', '{at}', '<at>', ' at ', '골뱅이', '[골뱅이]'
+#     .  : '.', '[dot]', '(dot)', ' dot ', '점', '닷', '[점]', 도메인 쪽 ' . '(양쪽 공백 + 뒤에 라벨)
+# - 단어 경계: 'at'/'dot' 은 괄호 안이거나 양쪽이 공백일 때만 구분자
+#   (예전 방식은 'kate', 'data', 'creative', 'dotcom' 안의 at/dot 까지 바꿔서 멀쩡한 주소를 깨뜨림)
+# - 한쪽만 공백인 '.' 은 붙이지 않음(예전 방식은 'info@x.com. Next' → 'info@x.com.Next')
+#   양쪽 공백 ' . ' 은 @ 뒤 도메인에서만 구분자('info @ example . com')
+# - 찾은 부분만 정규화('[at]' → '@' 등)한 뒤 is_valid_email 로 검증
+#
+# 사용:
+#   extract_emails("Write to info [at] studio [dot] co [dot] uk")   # {'info@studio.co.uk'}
+
+import html
+import re
+
+EMAIL_REGEX = re.compile(r'\b[A-Z0-9._%+-]+@[A-Z0-9.-]+\.[A-Z]{2,24}\b', re.IGNORECASE)
+
+# 파일 확장자 같은 TLD는 이메일로 간주하지 않음(오탐 컷)
+BAD_TLDS = {
+  "css","js","map","json","png","jpg","jpeg","gif","webp","svg","ico",
+  "woff","woff2","ttf","otf","mp4","webm","mov","avi","pdf","zip","rar","7z","gz","tar","xml","html","htm"
+}
+
+def is_valid_email(e: str) -> bool:
+  if not e or "@" not in e: return False
+  e = e.strip()
+  if not EMAIL_REGEX.fullmatch(e): return False
+  if any(ch in e for ch in [' ', ',', ';', '<', '>', '"', "'"]): return False
+  if e.count("@") != 1: return False
+  local, _, dom = e.rpartition("@")
+  if not local or not dom: return False
+  # 로컬/도메인 양끝 점, 연속 점 방지
+  if local.startswith(".") or local.endswith(".") or ".." in local: return False
+  if dom.startswith(".")   or dom.endswith(".")   or ".." in dom:   return False
+  # TLD 필터
+  tld = dom.split(".")[-1].lower()
+  if tld in BAD_TLDS: return False
+  # 길이 제한(권장)
+  if len(e) > 254 or len(local) > 64: return False
+  return True
+
+
+# =======================
+# 엔진(모듈 로드 시 한 번 컴파일)
+# =======================
+_OPEN = r"[\[\(\{<]"
+_CLOSE = r"[\]\)\}>]"
+# 우회 표기된 구분자(괄호형 / 양쪽 공백형 / 한글)
+_AT_OBF = rf"\s*{_OPEN}\s*(?:at|골뱅이)\s*{_CLOSE}\s*|\s+at\s+|\s*골뱅이\s*"
+_DOT_OBF = rf"\s*{_OPEN}\s*(?:dot|점|닷)\s*{_CLOSE}\s*|\s+dot\s+|\s*(?:점|닷)\s*"
+
+_ATOM = r"[A-Z0-9_%+\-]+"
+_LABEL = r"[A-Z0-9\-]+"
+_DOT = rf"(?:\.|{_DOT_OBF})"
+# 양쪽 공백 ' . ' 은 @ 도 띄어 쓰거나 우회 표기한 주소의 도메인에서만
+# (로컬 쪽이면 'Read more . info@x.com' → 'more.info@', 붙여 쓴 주소 뒤면 'j@x.co.uk . Thanks' → '.Thanks')
+_DOT_SPACED = rf"\s+\.\s+(?={_LABEL})"
+_AT_LOOSE = rf"\s+@\s*|\s*@\s+|{_AT_OBF}"
+_DOM_DOT = rf"(?:\.|{_DOT_SPACED}|{_DOT_OBF})"
+_TLD_END = r"[A-Z]{2,24}(?![A-Z0-9_]|\s*@)"
+
+# 로컬 파트(앞이 단어 문자면 시작 안 함) → @ → 라벨(.라벨)* . TLD(뒤에 단어 문자나 @ 가 오면 안 됨 — "are at j.smith@x.com")
+# - (?=(X))\1 : X 를 되돌림 없이 한 번에 소비(원자 그룹 흉내) → 평범한 단어에서 글자마다 재시도하지 않음
+# - 단어 뒤에 구분자가 올 수 없으면(_SEP_AHEAD) 바로 실패 → 구분자 대안들을 하나씩 시도하지 않음
+_SEP_AHEAD = r"(?=\s*[.@\[({<골점닷]|\s+(?:at|dot)\s)"
+EMAIL_SCAN_RE = re.compile(
+  rf"(?<![A-Z0-9_%+\-])(?=({_ATOM}))\1{_SEP_AHEAD}(?:{_DOT}(?=({_ATOM}))\2)*"
+  rf"(?:@{_LABEL}(?:{_DOT}{_LABEL})*{_DOT}{_TLD_END}"
+  rf"|(?:{_AT_LOOSE}){_LABEL}(?:{_DOM_DOT}{_LABEL})*{_DOM_DOT}{_TLD_END})",
+  re.IGNORECASE,
+)
+_AT_NORM_RE = re.compile(rf"\s*@\s*|{_AT_OBF}", re.IGNORECASE)
+_DOT_NORM_RE = re.compile(rf"{_DOT_SPACED}|{_DOT_OBF}", re.IGNORECASE)
+
+def normalize_match(s: str) -> str:
+  """찾은 부분의 우회 표기 → 일반 주소('info [at] x [dot] com' → 'info@x.com')"""
+  return _DOT_NORM_RE.sub(".", _AT_NORM_RE.sub("@", s))
+
+def extract_emails(text: str) -> set:
+  """보이는 텍스트 → 유효한 이메일 후보 set(우회 표기 포함, 한 번 스캔)"""
+  out = set()
+  if not text:
+    return out
+  text = html.unescape(text)
+  for m in EMAIL_SCAN_RE.finditer(text):
+    e = normalize_match(m.group(0))
+    if is_valid_email(e):
+      out.add(e)
+  return out
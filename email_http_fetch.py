@@ -0,0 +1,251 @@
+# email_http_fetch.py
+# -------------------
+# 이메일 수집 1단계: 브라우저 없이 비동기 HTTP GET(aiohttp)으로 먼저 시도
+# - 대부분의 소규모 사이트는 정적 HTML → mailto:/보이는 텍스트가 Selenium 과 똑같이 들어 있음
+# - 커넥션 풀(TCPConnector) + 요청별 타임아웃, 사이트 SITE_CONCURRENCY 개를 동시에
+# - 메인 페이지 → contact/about/support 링크 상위 3개(email_error_check 와 같은 규칙)를 동시에 받아 추출
+# - 클라이언트 렌더링(본문 텍스트가 거의 없음 / SPA 루트만 있음 / "JavaScript 필요" 안내) 또는
+#   봇 차단(403/429/503 챌린지)으로 보이면 status="escalate" → 호출한 쪽이 그 사이트만 브라우저로
+# - Cloudflare 이메일 보호(data-cfemail / /cdn-cgi/l/email-protection#...)는 브라우저 JS 대신 여기서 복호화
+#
+# 사용:
+#   results = fetch_sites(urls)               # url → {"status", "reason", "emails", "pages", "final_url", ...}
+#   browser_urls = [u for u, r in results.items() if needs_browser(r)]
+#   results = fetch_sites(urls, archive=PageArchive("pages.sqlite"))   # 받은 페이지 저장(page_archive)
+#   python email_http_fetch.py https://example.co.uk ...   # 단독 실행(사이트별 결과 출력)
+
+import asyncio
+import re
+import time
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urljoin
+
+import aiohttp
+from bs4 import BeautifulSoup
+
+from email_error_check import emails_from_mailto, pick_contact_links, visible_text
+from email_extract import extract_emails, is_valid_email
+
+# =======================
+# 설정
+# =======================
+SITE_CONCURRENCY = 32     # 동시에 처리할 사이트 수
+CONN_LIMIT = 64           # 전체 커넥션 풀 크기
+CONN_LIMIT_PER_HOST = 4   # 호스트당 동시 커넥션
+TIMEOUT_S = 12.0          # 요청 하나 전체 타임아웃(브라우저 tier 의 body 대기와 비슷하게)
+CONNECT_TIMEOUT_S = 6.0
+MAX_BYTES = 2 * 1024 * 1024   # 페이지 본문 상한(넘으면 앞부분만)
+MAX_CONTACT_LINKS = 3
+USER_AGENT = ("Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) "
+              "Chrome/126.0.0.0 Safari/537.36")
+
+# 클라이언트 렌더링 판정
+MIN_TEXT_CHARS = 150       # 보이는 텍스트가 이보다 짧으면 JS 가 그리는 페이지로 봄
+SPA_TEXT_CHARS = 1000      # SPA 루트/noscript 안내가 있어도 텍스트가 이만큼 있으면 정적으로 충분
+ESCALATE_ERRORS = True     # 연결 실패/타임아웃/5xx 도 브라우저로 한 번 더(False 면 바로 오류 처리)
+
+SPA_ROOT_RE = re.compile(
+  r'<div[^>]+id=["\'](?:root|app|__next|__nuxt|___gatsby)["\'][^>]*>\s*</div>', re.IGNORECASE
+)
+NOSCRIPT_JS_RE = re.compile(r'<noscript[^>]*>[^<]{0,300}(?:enable|requires?|turn on)\s+javascript', re.IGNORECASE)
+CHALLENGE_RE = re.compile(r'cf-chl|challenge-platform|just a moment\.\.\.|captcha|attention required', re.IGNORECASE)
+CF_EMAIL_PATH = "/cdn-cgi/l/email-protection"
+
+
+# =======================
+# 추출(페이지 하나)
+# =======================
+def decode_cfemail(hex_str: str) -> Optional[str]:
+  """Cloudflare email protection: 첫 바이트가 XOR 키"""
+  try:
+    data = bytes.fromhex(hex_str.strip())
+  except ValueError:
+    return None
+  if len(data) < 2:
+    return None
+  return "".join(chr(b ^ data[0]) for b in data[1:])
+
+def csr_reason(html_str: str, text: str) -> Optional[str]:
+  """정적 HTML 만으로는 부족해 보이는 이유(없으면 None)"""
+  if len(text) < MIN_TEXT_CHARS:
+    return "empty_body"
+  if len(text) < SPA_TEXT_CHARS:
+    if SPA_ROOT_RE.search(html_str):
+      return "spa_root"
+    if NOSCRIPT_JS_RE.search(html_str):
+      return "noscript_js"
+  return None
+
+def status_verdict(status: int, ctype: str, body: str) -> Optional[Tuple[str, str]]:
+  """응답 상태/형식만으로 정해지는 결과 → (status, reason), 본문을 추출해도 되면 None"""
+  if status in (403, 429, 503) and CHALLENGE_RE.search(body):
+    return "escalate", f"challenge_{status}"
+  if status in (403, 429):
+    return "escalate", f"http_{status}"
+  if status >= 500:
+    return "error", f"http_{status}"
+  # 그 밖의 4xx(404 등)는 브라우저도 같은 페이지를 보게 되므로 그대로 추출
+  if ctype and "html" not in ctype.lower():
+    return "escalate", "not_html"
+  return None
+
+def extract_page(html_str: str, page_url: str) -> Tuple[set, List[Tuple[str, str]], str]:
+  """HTML → (이메일 후보, [(절대 href, 소문자 링크 텍스트)], 보이는 텍스트) — 파싱 1회"""
+  soup = BeautifulSoup(html_str or "", "lxml")
+  emails = set()
+  anchors = []
+  for a in soup.select("a[href]"):
+    href = (a.get("href") or "").strip()
+    if href.lower().startswith("mailto:"):
+      emails |= emails_from_mailto(href)
+      continue
+    if CF_EMAIL_PATH in href and "#" in href:
+      e = decode_cfemail(href.rsplit("#", 1)[1])
+      if e and is_valid_email(e):
+        emails.add(e)
+      continue
+    anchors.append((urljoin(page_url, href), a.get_text(" ", strip=True).lower()))
+  for el in soup.select("[data-cfemail]"):
+    e = decode_cfemail(el.get("data-cfemail") or "")
+    if e and is_valid_email(e):
+      emails.add(e)
+  text = visible_text(soup)
+  emails |= extract_emails(text)
+  return emails, anchors, text
+
+
+# =======================
+# 비동기 수집
+# =======================
+def make_session() -> aiohttp.ClientSession:
+  # 브라우저 tier(--ignore-certificate-errors)와 같게 인증서 오류는 무시
+  connector = aiohttp.TCPConnector(limit=CONN_LIMIT, limit_per_host=CONN_LIMIT_PER_HOST, ssl=False,
+                                   ttl_dns_cache=300)
+  timeout = aiohttp.ClientTimeout(total=TIMEOUT_S, sock_connect=CONNECT_TIMEOUT_S)
+  headers = {
+    "User-Agent": USER_AGENT,
+    "Accept": "text/html,application/xhtml+xml;q=0.9,*/*;q=0.8",
+    "Accept-Language": "en-GB,en;q=0.9",
+  }
+  return aiohttp.ClientSession(connector=connector, timeout=timeout, headers=headers)
+
+async def fetch_html(session: aiohttp.ClientSession, url: str) -> Tuple[int, str, str, str]:
+  """→ (HTTP 상태, 최종 URL(리다이렉트 후), Content-Type, 본문)"""
+  async with session.get(url, allow_redirects=True) as res:
+    ctype = res.headers.get("Content-Type", "")
+    # content.read(n) 는 이미 도착한 만큼만 돌려줌 → EOF 또는 상한까지 이어 읽기
+    chunks = []
+    size = 0
+    async for chunk in res.content.iter_chunked(64 * 1024):
+      chunks.append(chunk)
+      size += len(chunk)
+      if size >= MAX_BYTES:
+        break
+    raw = b"".join(chunks)[:MAX_BYTES]
+    charset = res.charset or "utf-8"
+    try:
+      body = raw.decode(charset, errors="replace")
+    except LookupError:
+      body = raw.decode("utf-8", errors="replace")
+    return res.status, str(res.url), ctype, body
+
+async def fetch_site(session: aiohttp.ClientSession, url: str, archive=None) -> Dict:
+  """사이트 하나: 메인 + contact 후보 페이지 → 결과 dict(status: ok / escalate / error)
+  archive: page_archive.PageArchive 면 받은 HTML 페이지를 모두 저장(re-extract 용)"""
+  t0 = time.perf_counter()
+  result = {"url": url, "final_url": url, "status": "ok", "reason": None, "emails": [], "pages": 0,
+            "elapsed_s": 0.0}
+
+  def done(status: str, reason: Optional[str] = None, emails: Optional[set] = None) -> Dict:
+    result.update(status=status, reason=reason, emails=sorted(emails or ()),
+                  elapsed_s=round(time.perf_counter() - t0, 3))
+    return result
+
+  try:
+    status, final_url, ctype, body = await fetch_html(session, url)
+  except (aiohttp.ClientError, asyncio.TimeoutError, UnicodeError, ValueError) as e:
+    return done("error", type(e).__name__)
+  result["pages"] = 1
+  result["final_url"] = final_url
+
+  verdict = status_verdict(status, ctype, body)
+  if archive is not None and (not ctype or "html" in ctype.lower()):
+    archive.add(url, url, final_url, status, body, role="main", tier="http")
+  if verdict is not None:
+    return done(*verdict)
+
+  emails, anchors, text = await asyncio.to_thread(extract_page, body, final_url)
+  reason = csr_reason(body, text)
+  if reason:
+    # 정적 HTML 에서 건진 주소는 참고용으로만 같이 돌려줌(호출한 쪽은 브라우저 결과를 씀)
+    return done("escalate", reason, emails)
+
+  # contact/about/support 후보(리다이렉트 후 호스트 기준)는 동시에
+  links = pick_contact_links(final_url, anchors, k=MAX_CONTACT_LINKS)
+
+  async def one(link: str) -> set:
+    try:
+      st, u, ct, b = await fetch_html(session, link)
+    except (aiohttp.ClientError, asyncio.TimeoutError, UnicodeError, ValueError):
+      return set()
+    if st >= 400 or (ct and "html" not in ct.lower()):
+      return set()
+    if archive is not None:
+      archive.add(url, link, u, st, b, role="link", tier="http")
+    result["pages"] += 1
+    found, _, _ = await asyncio.to_thread(extract_page, b, u)
+    return found
+
+  for found in await asyncio.gather(*(one(link) for link in links)):
+    emails |= found
+  return done("ok", None, emails)
+
+async def fetch_sites_async(urls: List[str], concurrency: int = SITE_CONCURRENCY, on_result=None,
+                            archive=None) -> Dict[str, Dict]:
+  sem = asyncio.Semaphore(concurrency)
+  out: Dict[str, Dict] = {}
+
+  async with make_session() as session:
+    async def run(u: str):
+      async with sem:
+        r = await fetch_site(session, u, archive)
+      out[u] = r
+      if on_result is not None:
+        on_result(r)
+
+    await asyncio.gather(*(run(u) for u in dict.fromkeys(urls)))
+  return out
+
+def fetch_sites(urls: List[str], concurrency: int = SITE_CONCURRENCY, on_result=None,
+                archive=None) -> Dict[str, Dict]:
+  """동기 진입점: url 목록 → url → 결과(on_result(r) 는 사이트가 끝날 때마다, archive 면 페이지 저장)"""
+  return asyncio.run(fetch_sites_async(urls, concurrency, on_result, archive))
+
+def needs_browser(result: Optional[Dict]) -> bool:
+  """HTTP 결과로 끝낼 수 없어서 브라우저 tier 로 넘길 사이트인지"""
+  if result is None:
+    return True
+  return result["status"] == "escalate" or (result["status"] == "error" and ESCALATE_ERRORS)
+
+def tier_summary(results: Dict[str, Dict]) -> str:
+  n = len(results)
+  ok = sum(1 for r in results.values() if r["status"] == "ok")
+  esc: Dict[str, int] = {}
+  for r in results.values():
+    if r["status"] != "ok":
+      esc[r["reason"]] = esc.get(r["reason"], 0) + 1
+  detail = ", ".join(f"{k}={v}" for k, v in sorted(esc.items(), key=lambda kv: -kv[1]))
+  return f"[http tier] {ok}/{n} 사이트 HTTP로 완료, 나머지 {n - ok} ({detail or '-'})"
+
+
+if __name__ == "__main__":
+  import argparse
+  parser = argparse.ArgumentParser(description="브라우저 없이 HTTP 로 사이트 이메일 후보 수집")
+  parser.add_argument("urls", nargs="+")
+  parser.add_argument("--concurrency", type=int, default=SITE_CONCURRENCY)
+  args = parser.parse_args()
+  res = fetch_sites(args.urls, args.concurrency)
+  for u in args.urls:
+    r = res[u]
+    print(f"{r['status']:8s} {r['reason'] or '':12s} {r['elapsed_s']:6.2f}s  {u}  -> {', '.join(r['emails']) or '-'}")
+  print(tier_summary(res))
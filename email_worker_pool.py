@@ -0,0 +1,236 @@
+# email_worker_pool.py
+# --------------------
+# 헤드리스 크롬 N개를 별도 프로세스로 띄워 이메일 조회를 병렬로(리눅스 서버용)
+# - 부모가 쉬는 워커마다 (행 키, URL) 작업을 하나씩 그 워커 전용 큐로 보내고, 워커는 email_error_check.find_email_candidates 실행
+#   → 어느 워커가 어떤 작업을 잡고 있는지 부모가 보낸 시점부터 알고 있음(워커가 어디서 죽어도 작업을 잃지 않음)
+# - 결과는 (행 키, URL, 후보 목록 | None) 으로 돌아와 부모의 on_result 에서 행 키 기준으로 반영
+#   → 기록/체크포인트(CHECKPOINT_EVERY)는 기존처럼 부모 한 곳에서, 처리 순서만 달라짐
+# - 워커마다 RESTART_EVERY 번 로드하면 드라이버 재기동(기존 단일 드라이버와 같은 의미, 드라이버 단위)
+# - 드라이버가 죽어서 실패한 로드는 드라이버를 새로 띄워 한 번 더
+# - 워커 프로세스가 통째로 죽으면 잡고 있던 작업을 다시 큐에 넣고(MAX_ATTEMPTS 까지) 워커를 새로 띄움
+# - 시작 방식: 가능하면 fork(리눅스) — 스크립트형 호출자(search_email.py)도 다시 실행되지 않음
+# - archive 를 주면 워커는 렌더링된 페이지를 결과와 함께 부모로 보내고, 부모가 그 archive(page_archive) 에 저장
+#   → 아카이브에 쓰는 연결은 부모 하나(워커끼리/부모와 SQLite 쓰기 잠금 경쟁 없음)
+#
+# 사용:
+#   def on_result(key, url, found):   # found: 이메일 후보 list, 메인 페이지 로드 실패면 None
+#     ...
+#   stats = run_pool(jobs, workers=4, on_result=on_result)
+
+import multiprocessing as mp
+import queue
+import random
+import time
+from collections import deque
+from typing import Callable, Dict, Hashable, List, Optional, Tuple
+
+RESTART_EVERY = 80     # 워커(드라이버)당 N번 로드마다 재기동
+MAX_ATTEMPTS = 2       # 워커가 죽어 잃어버린 작업의 최대 시도 횟수
+MAX_RESPAWNS = 3       # 워커 자리당 '연속'(작업 하나도 못 끝내고) 재시작 한도 — 크롬이 아예 안 뜨는 환경에서 무한 재시작 방지
+POLL_S = 1.0           # 결과 대기 중 워커 생존 확인 주기
+MANNER_SLEEP_S = (0.2, 0.5)
+
+OnResult = Callable[[Hashable, str, Optional[List[str]]], None]
+
+
+def _quit(driver):
+  if driver is None:
+    return
+  try:
+    driver.quit()
+  except Exception:
+    pass
+
+def _alive(driver) -> bool:
+  try:
+    driver.current_url
+    return True
+  except Exception:
+    return False
+
+class _PageBuffer:
+  """워커 쪽 archive 대신: add() 인자를 모아 두었다가 작업 결과와 함께 부모로"""
+  def __init__(self):
+    self.pages = []
+
+  def add(self, *args, **kwargs):
+    self.pages.append((args, kwargs))
+
+  def take(self) -> List[Tuple[tuple, Dict]]:
+    pages, self.pages = self.pages, []
+    return pages
+
+def _worker(wid: int, job_q, out_q, headless: bool, restart_every: int, keep_pages: bool = False):
+  """워커 프로세스: 드라이버 1개로 전용 작업 큐를 끝까지(None 을 받으면 종료)"""
+  from email_error_check import find_email_candidates, make_driver
+  driver = None
+  archive = _PageBuffer() if keep_pages else None
+  loads = 0
+  try:
+    while True:
+      job = job_q.get()
+      if job is None:
+        break
+      key, url, attempt = job
+      if driver is None:
+        driver = make_driver(headless=headless)
+      found = find_email_candidates(url, driver, archive)
+      if found is None and not _alive(driver):
+        # 로드 실패가 드라이버 문제 → 새로 띄워 한 번 더
+        out_q.put(("restart", wid, "dead_driver"))
+        _quit(driver)
+        driver = make_driver(headless=headless)
+        found = find_email_candidates(url, driver, archive)
+      pages = archive.take() if archive is not None else []
+      loads += 1
+      out_q.put(("done", wid, key, url, None if found is None else sorted(found), pages))
+
+      # 장시간 안정성 위해 주기적 재기동
+      if loads % restart_every == 0:
+        out_q.put(("restart", wid, "restart_every"))
+        _quit(driver)
+        driver = None
+        time.sleep(1.0)
+
+      time.sleep(random.uniform(*MANNER_SLEEP_S))  # 매너 슬립
+  finally:
+    _quit(driver)
+
+
+def _context(start_method: Optional[str]):
+  if start_method is None:
+    start_method = "fork" if "fork" in mp.get_all_start_methods() else "spawn"
+  return mp.get_context(start_method)
+
+def prepare_driver_binary():
+  """워커들이 동시에 chromedriver 를 내려받지 않도록 부모에서 한 번(디스크 캐시 채우기)"""
+  try:
+    from webdriver_manager.chrome import ChromeDriverManager
+    ChromeDriverManager().install()
+  except Exception as e:
+    print(f"[pool] chromedriver 준비 실패(워커에서 다시 시도): {e}")
+
+def run_pool(jobs: List[Tuple[Hashable, str]], workers: int, on_result: OnResult, headless: bool = True,
+             restart_every: int = RESTART_EVERY, start_method: Optional[str] = None,
+             archive=None) -> Dict:
+  """
+  jobs: [(행 키, URL)] — 행 키는 유일해야 함(pickle 가능한 값)
+  on_result(key, url, found): 결과가 올 때마다 부모 프로세스에서 호출
+  archive: page_archive.PageArchive(부모 연결, None 이면 저장 안 함) — 워커가 보낸 페이지를 부모에서 add
+  반환: 통계 dict(done/failed/restarts/respawns/wall_s/sites_per_min)
+  """
+  t0 = time.perf_counter()
+  stats = {"workers": workers, "jobs": len(jobs), "done": 0, "failed": 0, "restarts": 0, "respawns": 0}
+  if not jobs:
+    return stats
+  prepare_driver_binary()
+  ctx = _context(start_method)
+  out_q = ctx.Queue()
+  todo = deque((key, url, 1) for key, url in jobs)
+
+  procs: Dict[int, mp.Process] = {}
+  job_qs: Dict[int, "mp.Queue"] = {}  # 워커 자리 → 전용 작업 큐(재시작마다 새로)
+  respawns: Dict[int, int] = {}   # 워커 자리 → 연속 재시작 수(작업을 끝내면 0)
+  inflight: Dict[int, Tuple[Hashable, str, int]] = {}  # 부모가 보낸 시점부터 기록
+  pending = {key for key, _ in jobs}
+
+  def spawn(wid: int):
+    job_qs[wid] = ctx.Queue()
+    p = ctx.Process(target=_worker, args=(wid, job_qs[wid], out_q, headless, restart_every, archive is not None),
+                    daemon=True, name=f"email-worker-{wid}")
+    p.start()
+    procs[wid] = p
+
+  def assign():
+    # 쉬는(살아 있고 잡은 작업 없는) 워커마다 다음 작업 하나
+    for wid in procs:
+      while wid not in inflight and todo:
+        job = todo.popleft()
+        if job[0] not in pending:
+          continue
+        inflight[wid] = job
+        job_qs[wid].put(job)
+
+  def finish(key, url, found):
+    if key not in pending:
+      return  # 재시도한 작업의 늦게 온 중복 결과
+    pending.discard(key)
+    stats["done" if found is not None else "failed"] += 1
+    on_result(key, url, found)
+
+  def handle(msg):
+    kind, wid = msg[0], msg[1]
+    if kind == "done":
+      if wid in inflight and inflight[wid][0] == msg[2]:
+        inflight.pop(wid)
+      respawns[wid] = 0
+      if archive is not None:
+        for args, kwargs in msg[5]:
+          archive.add(*args, **kwargs)
+      finish(msg[2], msg[3], msg[4])
+    elif kind == "restart":
+      stats["restarts"] += 1
+
+  def drain():
+    while True:
+      try:
+        handle(out_q.get_nowait())
+      except queue.Empty:
+        return
+
+  for wid in range(max(1, min(workers, len(jobs)))):
+    spawn(wid)
+  assign()
+  try:
+    while pending:
+      try:
+        handle(out_q.get(timeout=POLL_S))
+      except queue.Empty:
+        pass
+      for wid, p in list(procs.items()):
+        if p.is_alive():
+          continue
+        p.join()
+        drain()  # 죽기 직전에 보낸 결과부터 반영
+        job = inflight.pop(wid, None)
+        if job is not None and job[0] in pending:
+          key, url, attempt = job
+          if attempt < MAX_ATTEMPTS:
+            todo.appendleft((key, url, attempt + 1))
+          else:
+            finish(key, url, None)
+        del procs[wid]
+        del job_qs[wid]
+        if pending and respawns.get(wid, 0) < MAX_RESPAWNS:
+          respawns[wid] = respawns.get(wid, 0) + 1
+          stats["respawns"] += 1
+          print(f"[pool] 워커 {wid} 종료(exit {p.exitcode}) → 재시작 {respawns[wid]}/{MAX_RESPAWNS}")
+          spawn(wid)
+      if pending and not procs:
+        # 모든 워커 자리가 재시작 한도를 넘김 → 남은 작업은 실패로
+        print(f"[pool] 살아 있는 워커 없음 → 남은 {len(pending)}건 실패 처리")
+        for key, url in jobs:
+          if key in pending:
+            finish(key, url, None)
+      assign()
+  finally:
+    if pending:
+      # 예외/중단으로 빠짐 → 남은 작업 없이 바로 정리
+      for p in procs.values():
+        p.terminate()
+    else:
+      for wid in procs:
+        job_qs[wid].put(None)
+    for p in procs.values():
+      p.join(timeout=30)
+      if p.is_alive():
+        p.terminate()
+  wall = time.perf_counter() - t0
+  stats["wall_s"] = round(wall, 2)
+  stats["sites_per_min"] = round(len(jobs) / wall * 60.0, 1) if wall > 0 else None
+  return stats
+
+def pool_summary(stats: Dict) -> str:
+  return (f"[pool] 워커 {stats['workers']}개: {stats['done']}/{stats['jobs']} 완료, 실패 {stats['failed']}, "
+          f"드라이버 재기동 {stats['restarts']}, 프로세스 재시작 {stats['respawns']}, "
+          f"{stats.get('wall_s')}s ({stats.get('sites_per_min')} 사이트/분)")
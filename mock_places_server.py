@@ -0,0 +1,396 @@
+# mock_places_server.py
+# ---------------------
+# 로컬 Places API(New) 대역 서버 — 실제 쿼터 없이 수집기/분할 전략을 측정하기 위함
+# - POST /v1/places:searchText   : locationRestriction.rectangle, pageSize(≤20), 쿼리당 최대 60건, nextPageToken
+# - POST /v1/places:searchNearby : locationRestriction.circle, maxResultCount(≤20), rankPreference DISTANCE/POPULARITY
+# - GET  /v1/places/{id}         : Place Details
+# - X-Goog-FieldMask 대로 필드만 잘라서 응답(전송량 비교용)
+# - 장소 데이터: 커밋된 *_result.xlsx 의 좌표(위도/경도)로 시드하거나, 시드 고정 합성 데이터
+# - 쿼리/유형 매칭은 (place id, 검색어) 해시로 결정 → 쿼리끼리 부분적으로 겹치는 결과(재현 가능)
+# - 장애 주입(FaultInjector): 확률적 429/503, 서버 측 QPS 한도 초과 429(+Retry-After), 응답 지연, 일정 구간 전면 장애
+#   → places_http 재시도/동시성 조절/서킷 브레이커 확인용
+#
+# 사용 예)
+#   python mock_places_server.py --port 8765 --xlsx agency_result.xlsx estate_result.xlsx
+#   python mock_places_server.py --port 8765 --synthetic 4000
+#   python mock_places_server.py --port 8765 --qps-limit 20 --fail-503 0.02 --outage 30 10
+
+import argparse
+import base64
+import hashlib
+import json
+import math
+import random
+import re
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Set, Tuple
+
+TEXT_MAX_RESULTS = 60     # 실제 Text Search와 같은 쿼리당 상한
+PAGE_SIZE_MAX = 20
+MATCH_PERCENT = 40        # 이름에 검색어가 없을 때 (id, 검색어) 해시로 매칭되는 비율
+
+DEFAULT_CENTER = (51.5055, -0.0865)
+
+
+def haversine_meters(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+  R = 6371000.0
+  dlat = math.radians(lat2 - lat1)
+  dlng = math.radians(lng2 - lng1)
+  a = (math.sin(dlat / 2) ** 2
+     + math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * math.sin(dlng / 2) ** 2)
+  return R * 2 * math.asin(math.sqrt(a))
+
+
+def _h(*parts: str) -> int:
+  return int(hashlib.sha1("|".join(parts).encode("utf-8")).hexdigest()[:8], 16)
+
+
+# =======================
+# 데이터
+# =======================
+def _make_place(i: int, lat: float, lng: float, name: str, types: List[str], website: Optional[str]) -> Dict:
+  pid = f"mock{i:06d}"
+  return {
+    "id": pid,
+    "displayName": {"text": name, "languageCode": "en"},
+    "location": {"latitude": lat, "longitude": lng},
+    "formattedAddress": f"{i} Mock Street, London, UK",
+    "postalAddress": {"regionCode": "GB", "locality": "London", "postalCode": f"SE{i % 28 + 1} {i % 9}AB",
+                      "addressLines": [f"{i} Mock Street"]},
+    "addressComponents": [{"longText": str(i), "types": ["street_number"]},
+                          {"longText": "Mock Street", "types": ["route"]}],
+    "types": types,
+    "primaryType": types[0] if types else None,
+    "websiteUri": website,
+    "nationalPhoneNumber": f"020 7{i % 1000:03d} {i % 10000:04d}",
+    "internationalPhoneNumber": f"+44 20 7{i % 1000:03d} {i % 10000:04d}",
+  }
+
+
+def synthetic_places(n: int, center=DEFAULT_CENTER, radius_m: float = 3500.0, seed: int = 7) -> List[Dict]:
+  """도심에 몰린(군집) 합성 장소"""
+  rnd = random.Random(seed)
+  lat0, lng0 = center
+  clusters = [(rnd.gauss(0, radius_m / 3), rnd.gauss(0, radius_m / 3), rnd.uniform(80, 500)) for _ in range(25)]
+  out = []
+  for i in range(n):
+    if rnd.random() < 0.7:
+      cx, cy, spread = rnd.choice(clusters)
+      x, y = rnd.gauss(cx, spread), rnd.gauss(cy, spread)
+    else:
+      ang, rr = rnd.uniform(0, 2 * math.pi), radius_m * math.sqrt(rnd.random())
+      x, y = rr * math.cos(ang), rr * math.sin(ang)
+    lat = lat0 + y / 111_320.0
+    lng = lng0 + x / (111_320.0 * math.cos(math.radians(lat0)))
+    out.append(_make_place(i, lat, lng, f"Mock Place {i}", ["point_of_interest", "establishment"],
+                           f"https://www.mock{i}.co.uk/"))
+  return out
+
+
+def xlsx_places(paths: List[str]) -> List[Dict]:
+  """커밋된 결과 엑셀(위도/경도/회사명/업종/웹사이트 주소)에서 장소 시드"""
+  import pandas as pd
+
+  out, seen = [], set()
+  for path in paths:
+    df = pd.read_excel(path)
+    for _, row in df.iterrows():
+      lat, lng = row.get("위도"), row.get("경도")
+      if not isinstance(lat, (int, float)) or not isinstance(lng, (int, float)) or math.isnan(lat) or math.isnan(lng):
+        continue
+      key = (round(lat, 6), round(lng, 6), str(row.get("회사명")))
+      if key in seen:
+        continue
+      seen.add(key)
+      types = re.findall(r"[a-z_]+", str(row.get("업종") or "")) or ["establishment"]
+      website = row.get("웹사이트 주소")
+      out.append(_make_place(len(out), float(lat), float(lng), str(row.get("회사명") or f"Place {len(out)}"),
+                             types, website if isinstance(website, str) else None))
+  return out
+
+
+def matches_term(place: Dict, term: str) -> bool:
+  t = term.lower().strip()
+  if t in (place["displayName"]["text"] or "").lower() or t in place.get("types", []):
+    return True
+  return _h(place["id"], t) % 100 < MATCH_PERCENT
+
+
+# =======================
+# 서버
+# =======================
+def _apply_mask(place: Dict, fields: Optional[Set[str]]) -> Dict:
+  if fields is None or "*" in fields:
+    return dict(place)
+  return {k: v for k, v in place.items() if k in fields}
+
+
+def _parse_mask(mask: str, prefix: str = "places.") -> Optional[Set[str]]:
+  if not mask:
+    return None
+  out = set()
+  for f in mask.split(","):
+    f = f.strip()
+    if prefix and f.startswith(prefix):
+      f = f[len(prefix):]
+    out.add(f.split(".")[0])
+  return out
+
+
+class MockPlaces:
+  def __init__(self, places: List[Dict]):
+    self.places = places
+    self.by_id = {p["id"]: p for p in places}
+    self._lock = threading.Lock()
+    self.calls: Dict[str, int] = {}
+
+  def count(self, endpoint: str):
+    with self._lock:
+      self.calls[endpoint] = self.calls.get(endpoint, 0) + 1
+
+  def reset_counts(self):
+    with self._lock:
+      self.calls = {}
+
+  def total_calls(self) -> int:
+    with self._lock:
+      return sum(self.calls.values())
+
+  # ---- searchText ----
+  def search_text(self, body: Dict) -> Dict:
+    query = body.get("textQuery", "")
+    rect = ((body.get("locationRestriction") or {}).get("rectangle")) or {}
+    low, high = rect.get("low") or {}, rect.get("high") or {}
+    page_size = min(int(body.get("pageSize") or PAGE_SIZE_MAX), PAGE_SIZE_MAX)
+
+    hits = []
+    for p in self.places:
+      loc = p["location"]
+      if rect and not (low["latitude"] <= loc["latitude"] <= high["latitude"]
+                       and low["longitude"] <= loc["longitude"] <= high["longitude"]):
+        continue
+      if matches_term(p, query):
+        hits.append(p)
+    # '관련도' 순서 = (id, 검색어) 해시 → 같은 요청이면 항상 같은 순서
+    hits.sort(key=lambda p: _h(p["id"], query.lower(), "rank"))
+    hits = hits[:TEXT_MAX_RESULTS]
+
+    # 페이지 토큰은 무상태(요청 본문 해시 + 오프셋) — 같은 본문으로 다시 보내야 유효
+    sig = self._body_sig(body)
+    offset = 0
+    if body.get("pageToken"):
+      tok = json.loads(base64.urlsafe_b64decode(body["pageToken"].encode()).decode())
+      if tok.get("sig") != sig:
+        raise ValueError("pageToken does not match request")
+      offset = tok["offset"]
+    page = hits[offset:offset + page_size]
+    out = {"places": page}
+    if offset + page_size < len(hits):
+      out["nextPageToken"] = base64.urlsafe_b64encode(
+        json.dumps({"sig": sig, "offset": offset + page_size}).encode()).decode()
+    return out
+
+  @staticmethod
+  def _body_sig(body: Dict) -> str:
+    b = {k: v for k, v in body.items() if k != "pageToken"}
+    return hashlib.sha1(json.dumps(b, sort_keys=True).encode()).hexdigest()[:16]
+
+  # ---- searchNearby ----
+  def search_nearby(self, body: Dict) -> Dict:
+    circle = ((body.get("locationRestriction") or {}).get("circle")) or {}
+    c = circle.get("center") or {}
+    radius = float(circle.get("radius") or 0)
+    types = body.get("includedTypes") or []
+    limit = min(int(body.get("maxResultCount") or PAGE_SIZE_MAX), PAGE_SIZE_MAX)
+
+    hits = []
+    for p in self.places:
+      loc = p["location"]
+      d = haversine_meters(c["latitude"], c["longitude"], loc["latitude"], loc["longitude"])
+      if d > radius:
+        continue
+      if types and not any(matches_term(p, t) for t in types):
+        continue
+      hits.append((d, p))
+    if body.get("rankPreference") == "DISTANCE":
+      hits.sort(key=lambda x: x[0])
+    else:
+      hits.sort(key=lambda x: _h(x[1]["id"], "popularity"))
+    return {"places": [p for _, p in hits[:limit]]}
+
+  # ---- 정답(ground truth) ----
+  def ids_matching(self, terms: List[str], keep=lambda p: True) -> Set[str]:
+    return {p["id"] for p in self.places if keep(p) and any(matches_term(p, t) for t in terms)}
+
+
+# =======================
+# 장애 주입
+# =======================
+class FaultInjector:
+  def __init__(self, rate_429: float = 0.0, rate_503: float = 0.0, qps_limit: Optional[float] = None,
+               retry_after_s: Optional[float] = None, latency_s: float = 0.0,
+               outage: Optional[Tuple[float, float]] = None, seed: int = 11):
+    """
+    rate_429 / rate_503: 요청마다 이 확률로 실패
+    qps_limit: 최근 1초 요청이 이만큼 이상이면 429(쿼터 초과 흉내, Retry-After: 1)
+    retry_after_s: 확률적 429/503에도 Retry-After 헤더를 붙임(None이면 안 붙임)
+    latency_s: 모든 응답 지연 / outage: (시작 초, 지속 초) — 첫 요청 기준 이 시간대에는 전부 503
+    """
+    self.rate_429 = rate_429
+    self.rate_503 = rate_503
+    self.qps_limit = qps_limit
+    self.retry_after_s = retry_after_s
+    self.latency_s = latency_s
+    self.outage = outage
+    self._rnd = random.Random(seed)
+    self._lock = threading.Lock()
+    self._recent: deque = deque()
+    self._t0: Optional[float] = None
+    self.requests = 0
+    self.injected: Dict[str, int] = {}
+
+  def decide(self) -> Optional[Tuple[int, Dict[str, str]]]:
+    """이번 요청을 실패시킬지 → (상태 코드, 헤더) 또는 None(정상 처리)"""
+    with self._lock:
+      self.requests += 1
+      now = time.monotonic()
+      if self._t0 is None:
+        self._t0 = now
+      while self._recent and now - self._recent[0] > 1.0:
+        self._recent.popleft()
+      self._recent.append(now)
+      headers = {"Retry-After": f"{self.retry_after_s:g}"} if self.retry_after_s is not None else {}
+      fault = None
+      if self.outage and self.outage[0] <= now - self._t0 < self.outage[0] + self.outage[1]:
+        fault = (503, headers, "outage")
+      elif self.qps_limit and len(self._recent) > self.qps_limit:
+        fault = (429, {"Retry-After": "1"}, "quota")
+      else:
+        r = self._rnd.random()
+        if r < self.rate_429:
+          fault = (429, headers, "429")
+        elif r < self.rate_429 + self.rate_503:
+          fault = (503, headers, "503")
+      if fault is None:
+        return None
+      self.injected[fault[2]] = self.injected.get(fault[2], 0) + 1
+      return fault[0], fault[1]
+
+  def summary(self) -> str:
+    with self._lock:
+      return f"faults requests={self.requests} injected={dict(self.injected)}"
+
+
+class _Handler(BaseHTTPRequestHandler):
+  protocol_version = "HTTP/1.1"
+  mock: MockPlaces = None  # serve()에서 주입
+  faults: Optional[FaultInjector] = None
+
+  def log_message(self, fmt, *args):
+    pass
+
+  def _send(self, status: int, obj: Dict, headers: Optional[Dict[str, str]] = None):
+    raw = json.dumps(obj, ensure_ascii=False).encode("utf-8")
+    self.send_response(status)
+    self.send_header("Content-Type", "application/json; charset=utf-8")
+    self.send_header("Content-Length", str(len(raw)))
+    for k, v in (headers or {}).items():
+      self.send_header(k, v)
+    self.end_headers()
+    self.wfile.write(raw)
+
+  def _fault(self) -> bool:
+    """장애 주입: 실패 응답을 보냈으면 True(실패 요청은 호출 수에 안 셈)"""
+    if self.faults is None:
+      return False
+    if self.faults.latency_s:
+      time.sleep(self.faults.latency_s)
+    fault = self.faults.decide()
+    if fault is None:
+      return False
+    status, headers = fault
+    status_name = "RESOURCE_EXHAUSTED" if status == 429 else "UNAVAILABLE"
+    self._send(status, {"error": {"code": status, "message": "injected fault", "status": status_name}}, headers)
+    return True
+
+  def do_POST(self):
+    length = int(self.headers.get("Content-Length") or 0)
+    body = json.loads(self.rfile.read(length) or b"{}")
+    if self._fault():
+      return
+    mask = _parse_mask(self.headers.get("X-Goog-FieldMask", ""))
+    try:
+      if self.path.endswith("places:searchText"):
+        self.mock.count("searchText")
+        data = self.mock.search_text(body)
+      elif self.path.endswith("places:searchNearby"):
+        self.mock.count("searchNearby")
+        data = self.mock.search_nearby(body)
+      else:
+        return self._send(404, {"error": {"code": 404, "message": "not found"}})
+    except (KeyError, ValueError) as e:
+      return self._send(400, {"error": {"code": 400, "message": str(e)}})
+    out = {"places": [_apply_mask(p, mask) for p in data["places"]]}
+    if "nextPageToken" in data and (mask is None or "nextPageToken" in mask):
+      out["nextPageToken"] = data["nextPageToken"]
+    if not out["places"]:
+      out.pop("places")
+    self._send(200, out)
+
+  def do_GET(self):
+    m = re.match(r"^/v1/places/([^/?]+)", self.path)
+    if not m:
+      return self._send(404, {"error": {"code": 404, "message": "not found"}})
+    if self._fault():
+      return
+    self.mock.count("details")
+    place = self.mock.by_id.get(m.group(1))
+    if place is None:
+      return self._send(404, {"error": {"code": 404, "message": "place not found"}})
+    self._send(200, _apply_mask(place, _parse_mask(self.headers.get("X-Goog-FieldMask", ""), prefix="")))
+
+
+def serve(mock: MockPlaces, host: str = "127.0.0.1", port: int = 0,
+          faults: Optional[FaultInjector] = None) -> ThreadingHTTPServer:
+  """백그라운드 스레드로 서버 시작(port=0 이면 빈 포트). base URL = f"http://{host}:{server.server_port}" """
+  handler = type("MockHandler", (_Handler,), {"mock": mock, "faults": faults})
+  server = ThreadingHTTPServer((host, port), handler)
+  server.daemon_threads = True
+  threading.Thread(target=server.serve_forever, daemon=True).start()
+  return server
+
+
+def main():
+  parser = argparse.ArgumentParser(description="로컬 Places API(New) 대역 서버")
+  parser.add_argument("--host", default="127.0.0.1")
+  parser.add_argument("--port", type=int, default=8765)
+  parser.add_argument("--xlsx", nargs="*", default=None, help="장소 시드용 결과 엑셀(위도/경도 컬럼)")
+  parser.add_argument("--synthetic", type=int, default=4000, help="엑셀이 없을 때 합성 장소 수")
+  parser.add_argument("--fail-429", type=float, default=0.0, help="요청마다 429를 돌려줄 확률")
+  parser.add_argument("--fail-503", type=float, default=0.0, help="요청마다 503을 돌려줄 확률")
+  parser.add_argument("--qps-limit", type=float, default=None, help="초당 요청이 이 수를 넘으면 429")
+  parser.add_argument("--retry-after", type=float, default=None, help="확률적 429/503에 붙일 Retry-After(초)")
+  parser.add_argument("--latency-ms", type=float, default=0.0, help="모든 응답 지연(ms)")
+  parser.add_argument("--outage", type=float, nargs=2, default=None, metavar=("START_S", "DURATION_S"),
+                      help="첫 요청 후 START_S초부터 DURATION_S초 동안 전부 503")
+  args = parser.parse_args()
+
+  places = xlsx_places(args.xlsx) if args.xlsx else synthetic_places(args.synthetic)
+  mock = MockPlaces(places)
+  faults = None
+  if args.fail_429 or args.fail_503 or args.qps_limit or args.latency_ms or args.outage:
+    faults = FaultInjector(args.fail_429, args.fail_503, args.qps_limit, args.retry_after, args.latency_ms / 1000.0,
+                           tuple(args.outage) if args.outage else None)
+  server = serve(mock, args.host, args.port, faults)
+  print(f"mock Places API: http://{args.host}:{server.server_port}/v1  places={len(places)}")
+  try:
+    threading.Event().wait()
+  except KeyboardInterrupt:
+    server.shutdown()
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,306 @@
+# multi_category_collector.py
+# ---------------------------
+# 여러 카테고리(law/estate/clinic/creative/beauty/gallery/wealth)를 한 번의 실행으로 수집
+# - 타일 계획(파일럿 + 띠 타일 + 7분할)은 하나를 공유, 각 타일에서 아직 필요한 카테고리만 차례로 조회
+# - 카테고리별로 따로 판단: 20개 꽉 찬 카테고리만 자식 타일에 따라감, 완료 영역(CoverageIndex)도 카테고리별
+# - HTTP 세션(스레드별) / 토큰 버킷 / 응답 캐시 / 전체 호출 예산(MAX_CALLS)은 모든 카테고리가 공유
+# - 분할은 nearby_api_search.split_tile 그대로(SPLIT_MODE hex7/annulus, 범위 필터 포함)
+# - 결과는 카테고리별 싱크(.jsonl, 도착 즉시 디듀프 기록) → 끝나면 카테고리별 *_collected.xlsx
+#   (기존 *_result.xlsx 와 같은 컬럼, 커밋된 보강 엑셀을 덮어쓰지 않게 이름을 따로 씀)
+# - BFS 체크포인트(checkpoint) — (타일, 카테고리) 조회 하나마다 저널 한 줄, 중단 후 --resume 으로 이어서 실행
+#
+# 사용 예)
+#   python multi_category_collector.py
+#   python multi_category_collector.py --only law estate --max-calls 3000
+#   python multi_category_collector.py --resume
+
+import argparse
+import threading
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Dict, List, Tuple
+
+import nearby_api_search as nas
+from checkpoint import BfsCheckpoint
+from coverage_index import CoverageIndex
+from places_cache import get_cache
+from rate_limiter import TokenBucket
+from place_store import PlaceStore, category_of
+from result_sink import ResultSink
+
+# =======================
+# 설정값
+# =======================
+# 카테고리 → (includedTypes, 출력 엑셀)  — nearby_api_search.py 주석의 카테고리 표와 같음
+# 출력은 *_collected.xlsx (커밋된 *_result.xlsx 는 이메일/전화 보강까지 끝난 파일이라 덮어쓰면 안 됨)
+CATEGORIES: Dict[str, Tuple[List[str], str]] = {
+  "law": (["lawyer"], "lawyer_collected.xlsx"),
+  "estate": (["real_estate_agency"], "estate_collected.xlsx"),
+  "clinic": (["doctor", "dentist", "physiotherapist", "spa", "beauty_salon"], "clinic_collected.xlsx"),
+  "creative": (["advertising_agency", "graphic_designer"], "creative_collected.xlsx"),
+  "beauty": (["hair_care", "beauty_salon"], "beauty_collected.xlsx"),
+  "gallery": (["art_gallery", "art_studio"], "gallery_collected.xlsx"),
+  "wealth": (["accounting", "bank", "insurance_agency"], "wealth_collected.xlsx"),
+}
+
+MAX_CALLS = 10000           # 모든 카테고리 합계 호출 상한
+TILE_WORKERS = 8            # 동시에 진행할 타일 수
+RATE_LIMIT_QPS = 10.0
+RATE_LIMIT_QPM = 600.0
+STORE_PATH = None   # 공용 SQLite 저장소(예: "places.sqlite")에도 카테고리별 upsert
+CHECKPOINT_DIR = "checkpoint_multi_category"
+CHECKPOINT_EVERY = 200   # (타일, 카테고리) 조회 N개마다 스냅샷 압축
+
+RATE_LIMITER = TokenBucket(qps=RATE_LIMIT_QPS, qpm=RATE_LIMIT_QPM)
+_calls_lock = threading.Lock()
+_calls_issued = 0
+
+
+def calls_issued() -> int:
+  with _calls_lock:
+    return _calls_issued
+
+def _count_calls(n: int):
+  global _calls_issued
+  with _calls_lock:
+    _calls_issued += n
+
+
+# =======================
+# 타일 하나(카테고리 여러 개)
+# =======================
+def search_tile_categories(lat: float, lng: float, r: float, cats: List[str]) -> Dict[str, Tuple[List[Dict], int, float]]:
+  """이 타일에서 cats 카테고리를 차례로 조회 → {cat: (오른쪽 places, 원시 count, 원시 maxDist)}
+  count/maxDist 는 기준선 필터 전(포화·완료 영역 판정용), 결과만 오른쪽으로 거름
+  호출 수는 부르는 쪽이 투입 시점에 예약(_count_calls)"""
+  out = {}
+  for cat in cats:
+    places = nas.nearby_once(lat, lng, r, types=CATEGORIES[cat][0], limiter=RATE_LIMITER)
+    right, dists = [], []
+    for p in places:
+      loc = p.get("location") or {}
+      plng, plat = loc.get("longitude"), loc.get("latitude")
+      if plat is not None and plng is not None:
+        d = nas.haversine_meters(lat, lng, plat, plng)
+        p["distanceMeters"] = d
+        dists.append(d)
+      if plng is None or not nas.is_right_of_meridian(plng, nas.CUTOFF_LNG):
+        continue
+      right.append(p)
+    out[cat] = (right, len(places), max(dists) if dists else 0.0)
+  return out
+
+
+# =======================
+# 체크포인트 형식
+# =======================
+# BfsCheckpoint 를 그대로 쓰되 기록 단위를 (타일, 카테고리) 조회 하나로 둠
+# - 키: (lat, lng, r, cat, ...) — 대기 타일은 남은 카테고리 전부, 저널은 카테고리 하나 → 재생하면 (타일, 카테고리) 가 visited 로
+#   (일부 카테고리만 끝난 타일은 대기열에 남고, 재개 시 visited 로 끝난 카테고리는 건너뜀)
+# - 결과: id = "카테고리/place id" → {"id", "category", "place"}
+# - 커버 원: (lat, lng, 반경, 카테고리) — 반경 0(꽉 찼는데 maxDist 없음)도 기록, 카테고리별 호출 수도 여기서 셈
+def tile_key(tile: Dict) -> Tuple:
+  lat, lng = tile["center"]
+  return (round(lat, 6), round(lng, 6), round(tile["radius"], 1)) + tuple(tile["cats"])
+
+def _entry(cat: str, place: Dict) -> Dict:
+  return {"id": f"{cat}/{place.get('id')}", "category": cat, "place": place}
+
+
+# =======================
+# 메인
+# =======================
+def main(categories: List[str], resume: bool = False) -> Dict[str, Dict]:
+  global _calls_issued
+  lat0, lng0, R = nas.START_LAT, nas.START_LNG, nas.START_RADIUS
+
+  ckpt = BfsCheckpoint(CHECKPOINT_DIR, snapshot_every=CHECKPOINT_EVERY, key_fn=tile_key)
+  state = ckpt.load() if resume else None
+  if resume and state is None:
+    print(f"[resume] 체크포인트 없음({CHECKPOINT_DIR}) → 처음부터 시작")
+  if state is not None and state["meta"].get("categories") != categories:
+    categories = state["meta"]["categories"]
+    print(f"[resume] 체크포인트의 카테고리로 이어서 실행: {','.join(categories)}")
+
+  # 결과 싱크: 새로 시작하면 비우고, 재개면 이어 씀(이미 기록된 id는 중복 처리)
+  sinks = {c: ResultSink(CATEGORIES[c][1].replace(".xlsx", ".jsonl"), nas.place_to_row, append=state is not None)
+           for c in categories}
+  coverage = {c: CoverageIndex(lat0, lng0) for c in categories}
+
+  if state is None:
+    _calls_issued = 0
+    visited = set()           # (lat, lng, r, 카테고리)
+    results_by_id = {}
+    processed = 0
+    meta = {"categories": categories, "coverage": [], "pruned": 0}
+    queue = deque()
+  else:
+    _calls_issued = state["total_calls"]
+    # 저널 키(카테고리 하나)는 그대로, 스냅샷의 완료 키도 카테고리 하나씩이라 펼칠 필요 없음
+    visited = state["visited"]
+    results_by_id = state["results_by_id"]
+    processed = state["processed"]
+    meta = state["meta"]
+    queue = deque(state["pending"])
+    # 싱크에 아직 없는 복구 결과(싱크 기록 전 중단)만 보충
+    for e in results_by_id.values():
+      sinks[e["category"]].add(e["place"])
+  discs = meta["coverage"]
+  for lat, lng, r, cat in discs:
+    coverage[cat].add(lat, lng, r)
+  calls_by_cat = Counter({c: 0 for c in categories})
+  calls_by_cat.update(d[3] for d in discs)
+
+  def absorb(cat: str, lat: float, lng: float, r: float, res: Tuple[List[Dict], int, float]) -> Tuple[List[Dict], Tuple]:
+    """카테고리 결과 합치기 + 완료 영역 등록 → (새 결과 항목, 커버 원)"""
+    places, count, maxdist = res
+    calls_by_cat[cat] += 1
+    new = []
+    for p in places:
+      if sinks[cat].add(p):
+        e = _entry(cat, p)
+        results_by_id[e["id"]] = e
+        new.append(e)
+    disc = (lat, lng, nas.known_radius(r, count, maxdist), cat)
+    coverage[cat].add(*disc[:3])
+    discs.append(list(disc))
+    return new, disc
+
+  if state is None:
+    # 0) 파일럿: 카테고리마다 시작 원 1회
+    _count_calls(len(categories))
+    pilot = search_tile_categories(lat0, lng0, R, categories)
+    pending_cats = []
+    pilot_maxdist = R
+    for cat, res in pilot.items():
+      absorb(cat, lat0, lng0, R, res)
+      if res[1] == 20:
+        pending_cats.append(cat)
+        pilot_maxdist = min(pilot_maxdist, res[2])
+      print(f"[pilot] {cat}: count={res[1]} maxDist={res[2]:.1f}m")
+
+    # 1) 띠 타일 계획 하나를 공유(가장 좁은 파일럿 maxDist 기준, 더 넓은 카테고리는 coverage가 안쪽 타일을 건너뜀)
+    seed_plan = []
+    if pending_cats:
+      seed_plan = nas.build_ring_tiles_plan(
+        lat0=lat0, lng0=lng0, R=R, max_distance=pilot_maxdist, margin=nas.MARGIN_M,
+        max_cell_radius=nas.MAX_CELL_RADIUS, overlap_ratio=nas.OVERLAP_RATIO
+      )
+    queue.extend(dict(t, cats=list(pending_cats)) for t in seed_plan
+                 if not nas.SKIP_TILES_LEFT_OF_LINE or nas.is_right_of_meridian(t["center"][1], nas.CUTOFF_LNG))
+
+  in_flight: Dict = {}      # future → (타일, 이번에 조회하는 카테고리)
+
+  def snapshot_now():
+    # 진행 중 타일은 '미완료'로 되돌려 저장(호출 수도 예약분을 빼고 끝난 것만)
+    running = list(in_flight.values())
+    running_keys = {tile_key(t)[:3] + (c,) for t, cats in running for c in cats}
+    reserved = sum(len(cats) for _, cats in running)
+    ckpt.snapshot([t for t, _ in running] + list(queue), visited - running_keys, results_by_id,
+                  calls_issued() - reserved, processed, meta)
+
+  snapshot_now()
+
+  try:
+    with ThreadPoolExecutor(max_workers=TILE_WORKERS) as pool:
+      while queue or in_flight:
+        while queue and len(in_flight) < TILE_WORKERS and calls_issued() < MAX_CALLS:
+          tile = queue.popleft()
+          lat, lng = tile["center"]
+          r = tile["radius"]
+          key = tile_key(dict(tile, cats=[]))
+
+          cats = []
+          for cat in tile["cats"]:
+            if key + (cat,) in visited:
+              continue
+            visited.add(key + (cat,))
+            if nas.USE_COVERAGE_INDEX and coverage[cat].prune(lat, lng, r):
+              meta["pruned"] += 1
+              continue
+            cats.append(cat)
+          if not cats:
+            continue
+          # 투입 시점에 호출 수(카테고리 수) 예약 → 진행 중 타일도 예산 판단에 포함(넘쳐도 마지막 타일 하나 분량까지)
+          _count_calls(len(cats))
+          fut = pool.submit(search_tile_categories, lat, lng, r, cats)
+          in_flight[fut] = (tile, cats)
+
+        if not in_flight:
+          break
+
+        done, _ = wait(list(in_flight), return_when=FIRST_COMPLETED)
+        for fut in done:
+          # 실패하면 타일이 in_flight에 남아 체크포인트의 미완료 목록으로 들어감
+          res = fut.result()
+          tile, _ = in_flight.pop(fut)
+          lat, lng = tile["center"]
+          r = tile["radius"]
+          depth = tile.get("depth", 0)
+
+          absorbed = {cat: absorb(cat, lat, lng, r, out) for cat, out in res.items()}
+          saturated = [cat for cat, out in res.items() if out[1] == 20]
+          print(f"[tile] depth={depth} r={r:.1f}m center=({lat:.6f},{lng:.6f}) "
+                f"cats={len(res)} saturated={','.join(saturated) or '-'} calls={calls_issued()}")
+
+          # 꽉 찬 카테고리만 자식 타일로(분할 지오메트리는 공유)
+          # annulus 면 가장 좁은 maxDist 기준 → 더 넓게 받은 카테고리는 coverage 가 안쪽 자식을 건너뜀
+          children = []
+          if saturated:
+            children, _ = nas.split_tile(tile, 20, min(res[c][2] for c in saturated))
+            for child in children:
+              child["cats"] = saturated
+            queue.extend(children)
+
+          # 저널: 카테고리마다 한 줄(자식 타일은 첫 줄에만)
+          for i, (cat, (new, disc)) in enumerate(absorbed.items()):
+            processed += 1
+            ckpt.record_tile(dict(tile, cats=[cat]), 1, children if i == 0 else [], new, None, disc)
+          if ckpt.due():
+            snapshot_now()
+  except BaseException:
+    # 네트워크 오류/중단 시: 상태 저장 + 지금까지 결과라도 엑셀로
+    snapshot_now()
+    ckpt.close()
+    for cat in categories:
+      sinks[cat].export_xlsx(CATEGORIES[cat][1])
+      sinks[cat].close()
+    print(f"[abort] checkpoint -> {CHECKPOINT_DIR} (--resume 으로 이어서 실행), partial Excel -> *_collected.xlsx")
+    raise
+
+  snapshot_now()
+  ckpt.close()
+
+  print("\n=== MULTI-CATEGORY SUMMARY ===")
+  print(f"{'category':<10}{'unique':>8}{'calls':>8}")
+  summary = {}
+  for cat in categories:
+    summary[cat] = {"unique": len(sinks[cat]), "calls": calls_by_cat[cat], "output": CATEGORIES[cat][1]}
+    print(f"{cat:<10}{len(sinks[cat]):>8}{calls_by_cat[cat]:>8}")
+  print(f"requests={processed} total_calls={calls_issued()} (budget {MAX_CALLS}) pruned_category_requests={meta['pruned']}")
+  print(f"Split mode: {nas.SPLIT_MODE}")
+  print(f"Rate limiter wait (s): {RATE_LIMITER.waited_s:.1f}")
+  print(get_cache().summary())
+
+  store = PlaceStore(STORE_PATH) if STORE_PATH else None
+  for cat in categories:
+    path = CATEGORIES[cat][1]
+    sinks[cat].export_xlsx(path)
+    if store is not None:
+      store.upsert_places(sinks[cat].rows(), category_of(path))
+    sinks[cat].close()
+    print(f"Saved {cat} -> {path}")
+  if store is not None:
+    store.close()
+  return summary
+
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description="여러 카테고리를 한 번의 타일 스윕으로 수집")
+  parser.add_argument("--only", nargs="*", choices=list(CATEGORIES), default=None, help="수집할 카테고리(기본: 전부)")
+  parser.add_argument("--max-calls", type=int, default=None, help="전체 호출 상한(기본: MAX_CALLS)")
+  parser.add_argument("--resume", action="store_true", help=f"{CHECKPOINT_DIR}의 마지막 체크포인트에서 이어서 실행")
+  args = parser.parse_args()
+  if args.max_calls:
+    MAX_CALLS = args.max_calls
+  main(args.only or list(CATEGORIES), resume=args.resume)
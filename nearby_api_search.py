@@ -1,8 +1,24 @@
+import argparse
 import math
+import threading
 import requests
-from typing import List, Dict, Tuple
-from collections import deque
-import pandas as pd
+from typing import List, Dict, Tuple, Optional
+
+from checkpoint import BfsCheckpoint
+from coverage_index import CoverageIndex
+from crawl_metrics import CrawlRecorder
+from recrawl import make_leaf, save_leaves
+from place_details import (
+  DISCOVERY_FIELD_MASK, TRAFFIC, details_mask_from_search_mask, fetch_place_details, merge_details,
+  print_two_phase_report
+)
+from places_cache import cached_call, get_cache
+from places_http import PLACES_HTTP
+from rate_limiter import TokenBucket
+from place_store import PlaceStore, category_of
+from region_polygon import Region, load_region, region_savings_report
+from result_sink import ResultSink
+from tile_scheduler import make_frontier
 
 # =======================
 # 설정값
@@ -25,8 +41,10 @@ headers = {
   "X-Goog-FieldMask": "places.id,places.displayName,places.formattedAddress,places.postalAddress,places.location,places.primaryType,places.types,places.websiteUri"
 }
 
-# 최종 결과 리스트
-RESULT_LIST = []
+# 수집 방식
+# - "full"     : 모든 타일에서 위 필드 전부 요청(기존)
+# - "two_phase": 스윕은 places.id,places.location 만 → 끝나고 고유 id마다 Details로 나머지 필드 1회
+DISCOVERY_MODE = "full"
 
 # 시작위치 및 반경 설정
 START_LAT = 51.5055
@@ -44,10 +62,49 @@ MIN_RADIUS_M = 120.0
 MAX_DEPTH = 4
 MAX_CALLS = 2000
 
+# 분할 방식
+# - "hex7": 기존 r/2 7분할(중심+육각)
+# - "annulus": DISTANCE 정렬 특성상 maxDist 안쪽은 이미 다 받았으므로
+#              maxDist~r 띠만 링 타일로 덮음(7분할보다 싸면 그 계획, 아니면 7분할)
+# 기본은 hex7: annulus 는 자식 수는 적어도 실제 호출은 대개 더 많았음(범위 필터/커버 제외 후 기준,
+#   benchmark_crawl.py --only nearby_hex7 nearby_annulus 로 비교)
+SPLIT_MODE = "hex7"
+SPLIT_INNER_OVERLAP_M = 10.0  # 띠 안쪽 경계를 maxDist보다 이만큼 안쪽에서 시작(동률 거리 누락 방지)
+ANNULUS_COVER_SLACK_M = 1.0   # 띠 덮개 간격 계산 시 자식 반경에서 빼는 여유(위경도 투영 오차)
+
+# 완료 영역 인덱스: 20 미만으로 끝난 원(전체) + 20개 꽉 찬 원의 maxDist 안쪽(DISTANCE 정렬)
+# 합집합에 완전히 들어가는 타일은 호출하지 않음
+USE_COVERAGE_INDEX = True
+
+# 타일 순서: "fifo"(BFS) / "priority"(tile_scheduler — MAX_CALLS 안에서 호출당 새 장소가 많을 타일 먼저)
+SCHEDULER = "fifo"
+SCHEDULER_PRIOR_PATH: Optional[str] = None   # priority: 이전 실행 밀도 격자(있으면 읽고, 끝나면 갱신)
+
 # 기준 경도선(오른쪽만 수집/호출)
 CUTOFF_LNG = -0.09038947216087369
 SKIP_TILES_LEFT_OF_LINE = True  # True면 왼쪽 타일은 큐에 안 넣음
 
+# 폴리곤 지역(GeoJSON 경로). 지정하면 중심+반경/기준선 대신 폴리곤과 겹치는 타일만 조회, 결과도 폴리곤 안만
+REGION_GEOJSON: Optional[str] = None
+REGION: Optional[Region] = None   # main()에서 로드
+
+# 저장 / 체크포인트(스냅샷 + 타일별 저널)
+# - 새 place는 도착 즉시 RESULT_SINK_PATH(.jsonl/.csv/.sqlite)에 한 번만 기록 → 끝나면 엑셀로 변환
+XLSX_PATH = "creative_result.xlsx"
+RESULT_SINK_PATH = "creative_result.jsonl"
+# 공용 SQLite 저장소(예: "places.sqlite")에도 upsert — 카테고리 이름은 XLSX_PATH에서(creative_result.xlsx → creative)
+STORE_PATH: Optional[str] = None
+CHECKPOINT_DIR = "checkpoint_nearby_search"
+CHECKPOINT_EVERY = 50   # 완료 타일 N개마다 스냅샷 압축
+
+# 계측(crawl_metrics): 깊이별 타일/포화율(20개 꽉 참)/호출당 새 장소, 엔드포인트별 지연, 예산 소진 속도
+METRICS_JSON_PATH: Optional[str] = "metrics_nearby_search.json"   # 실행 요약(None이면 안 씀)
+METRICS_PROM_PATH: Optional[str] = None   # Prometheus 텍스트 파일(node_exporter textfile collector)
+METRICS_PORT: Optional[int] = None        # 수집 중 /metrics HTTP 엔드포인트
+
+# 잎 타일(분할 없이 끝난 타일) + 타일별 결과 지문 → recrawl.py refresh 로 잎만 다시 조회(None이면 안 씀)
+LEAVES_PATH: Optional[str] = "leaves_nearby_search.json"
+
 # =======================
 # 유틸 함수
 # =======================
@@ -69,6 +126,18 @@ def offset_latlng(lat: float, lng: float, north_m: float = 0.0, east_m: float =
 def is_right_of_meridian(lng: float, cutoff_lng: float) -> bool:
   return lng > cutoff_lng
 
+def place_in_scope(lat: Optional[float], lng: float) -> bool:
+  # 결과 범위: 폴리곤 안 / 기준선 오른쪽
+  if REGION is not None:
+    return lat is not None and REGION.contains(lat, lng)
+  return is_right_of_meridian(lng, CUTOFF_LNG)
+
+def tile_in_scope(lat: float, lng: float, r: float) -> bool:
+  # 조회할 타일: 폴리곤과 겹침 / 기준선 오른쪽 중심(SKIP_TILES_LEFT_OF_LINE일 때)
+  if REGION is not None:
+    return REGION.intersects_circle(lat, lng, r)
+  return not SKIP_TILES_LEFT_OF_LINE or is_right_of_meridian(lng, CUTOFF_LNG)
+
 def build_ring_tiles_plan(
   lat0: float,
   lng0: float,
@@ -123,136 +192,461 @@ def split_circle_7(center_lat: float, center_lng: float, radius_m: float, parent
     subtiles.append({"center": (lat, lng), "radius": r2, "depth": parent_depth + 1})
   return subtiles
 
-def nearby_once(center_lat: float, center_lng: float, radius: float) -> List[Dict]:
-  """한 원을 조회하고 원시 places를 반환"""
+def build_annulus_cover(
+  lat0: float,
+  lng0: float,
+  r_inner: float,
+  r_outer: float,
+  tile_radius: float,
+  depth: int
+) -> List[Dict]:
+  """
+  build_ring_tiles_plan과 같은 발상(띠를 링 위의 원들로 덮기)이지만 분할용으로 간격을 정확히 계산.
+  링 중심 반경 c, 링 반두께 h, 이웃 중심 사이 각의 절반 a 일 때 가장 먼 점은 두 중심 사이 '바깥 가장자리'
+  → 거리^2 = h^2 + 2c(c+h)(1-cos a) <= rho^2 가 되도록 링당 원 개수 산출(중심 반경 기준 호 길이로 잡으면 틈이 남음).
+  """
+  w = r_outer - r_inner
+  if w <= 0:
+    return []
+  # 원 하나가 띠 두께를 넉넉히 덮을 수 있도록 링 수 결정(두께 ≤ 지름의 80%)
+  n_rings = max(1, math.ceil(w / (2 * tile_radius * 0.8)))
+  band = w / n_rings
+  h = band / 2
+  rho = tile_radius - ANNULUS_COVER_SLACK_M  # 투영 오차 여유
+
+  tiles: List[Dict] = []
+  for i in range(n_rings):
+    r_center = r_inner + (i + 0.5) * band
+    cos_a = 1 - (rho ** 2 - h ** 2) / (2 * r_center * (r_center + h))
+    half = math.acos(max(-1.0, min(1.0, cos_a)))
+    n = max(1, math.ceil(math.pi / half)) if half > 0 else 1
+    for k in range(n):
+      theta = (360.0 * k) / n
+      rad = math.radians(theta)
+      lat, lng = offset_latlng(lat0, lng0, north_m=r_center * math.cos(rad), east_m=r_center * math.sin(rad))
+      tiles.append({
+        "center": (lat, lng),
+        "radius": tile_radius,
+        "ring_index": i,
+        "bearing_deg": theta,
+        "depth": depth
+      })
+  return tiles
+
+def annulus_covered(lat0: float, lng0: float, r_inner: float, r_outer: float, tiles: List[Dict]) -> bool:
+  """
+  띠(r_inner~r_outer)를 극좌표 격자로 샘플링해 모든 점이 어떤 원 안에 드는지 확인
+  (각 방향 간격 ≤ 원 반경/8, 안쪽·바깥 가장자리 포함)
+  """
+  if not tiles:
+    return r_outer <= r_inner
+  rho = min(t["radius"] for t in tiles)
+  step = max(rho / 8.0, 1.0)
+  n_r = max(2, math.ceil((r_outer - r_inner) / step) + 1)
+  n_a = max(8, math.ceil(2 * math.pi * r_outer / step))
+  for j in range(n_r):
+    r = r_inner + (r_outer - r_inner) * j / (n_r - 1)
+    for k in range(n_a):
+      rad = 2 * math.pi * k / n_a
+      la, ln = offset_latlng(lat0, lng0, north_m=r * math.cos(rad), east_m=r * math.sin(rad))
+      if not any(haversine_meters(la, ln, *t["center"]) <= t["radius"] for t in tiles):
+        return False
+  return True
+
+def split_annulus(center_lat: float, center_lng: float, radius_m: float, max_dist: float,
+                  parent_depth: int) -> List[Dict]:
+  """
+  count==20 + rankPreference=DISTANCE 이면 중심~maxDist 원은 이미 전부 수집된 상태.
+  남은 띠(maxDist~r)만 r/2 원들로 덮는다(자식 반경은 7분할과 동일 → 깊이/최소반경 규칙 그대로).
+  띠 계획이 7분할보다 많거나 띠를 다 덮지 못하면(샘플 검사) 7분할을 쓰되, 이미 본 원 안에 완전히 들어가는 자식은 뺀다.
+  """
+  seen_r = max(0.0, max_dist - SPLIT_INNER_OVERLAP_M)
+  ring = build_annulus_cover(center_lat, center_lng, seen_r, radius_m, radius_m / 2.0, parent_depth + 1)
+
+  hex7 = [
+    c for c in split_circle_7(center_lat, center_lng, radius_m, parent_depth)
+    # 중심에서 자식 원의 가장 먼 점까지 거리 <= seen_r 이면 이미 다 본 영역
+    if haversine_meters(center_lat, center_lng, *c["center"]) + c["radius"] > seen_r
+  ]
+  if len(ring) > len(hex7):
+    return hex7
+  if not annulus_covered(center_lat, center_lng, seen_r, radius_m, ring):
+    print(f"[split] annulus cover gap r={seen_r:.1f}~{radius_m:.1f}m → 7분할")
+    return hex7
+  return ring
+
+def split_tile(tile: Dict, count: int, max_dist: float) -> Tuple[List[Dict], int]:
+  """
+  꽉 찬(20개) 타일 → (범위 안 자식 타일, 만든 자식 수(범위 필터 전)). 분할 조건이 아니면 ([], 0)
+  (recrawl.py 도 같은 규칙으로 새로 포화된 잎만 다시 내려감)
+  """
+  lat, lng = tile["center"]
+  r = tile["radius"]
+  depth = tile.get("depth", 0)
+  if not (count == 20 and r > MIN_RADIUS_M and depth < MAX_DEPTH):
+    return [], 0
+  if SPLIT_MODE == "annulus":
+    children = split_annulus(lat, lng, r, max_dist, parent_depth=depth)
+  else:
+    children = split_circle_7(lat, lng, r, parent_depth=depth)
+  # 범위 안 타일만(기준선: 경계 누락이 걱정되면 SKIP_TILES_LEFT_OF_LINE=False)
+  return [c for c in children if tile_in_scope(c["center"][0], c["center"][1], c["radius"])], len(children)
+
+def known_radius(radius_m: float, count: int, max_dist: float) -> float:
+  """이 원 조회로 '전부 수집됐다'고 볼 수 있는 반경(20 미만이면 전체, 꽉 찼으면 maxDist 안쪽)"""
+  if count < 20:
+    return radius_m
+  return max(0.0, max_dist - SPLIT_INNER_OVERLAP_M)
+
+def settled_leaf(tile: Dict, places: List[Dict], count: int, max_dist: float) -> Dict:
+  """
+  꽉 찬 타일의 maxDist 안쪽 원(이미 다 받은 영역)을 잎으로 기록
+  파일럿과 annulus 분할 타일은 자식이 그 바깥 띠만 덮으므로, 이 원이 없으면 refresh 에서 안쪽을 다시 보지 않음
+  """
+  r = known_radius(tile["radius"], count, max_dist)
+  inside = [p for p in places if p.get("distanceMeters", 0.0) <= r]
+  return make_leaf({"center": tile["center"], "radius": r, "depth": tile.get("depth", 0)}, inside, len(inside), False,
+                   max_dist)
+
+_thread_local = threading.local()
+
+def get_session() -> requests.Session:
+  # 스레드별 세션(커넥션 풀 재사용, 여러 카테고리를 동시에 돌릴 때 공유)
+  sess = getattr(_thread_local, "session", None)
+  if sess is None:
+    sess = requests.Session()
+    _thread_local.session = sess
+  return sess
+
+def nearby_once(center_lat: float, center_lng: float, radius: float,
+                types: Optional[List[str]] = None, limiter: Optional[TokenBucket] = None) -> List[Dict]:
+  """한 원을 조회하고 원시 places를 반환(types 없으면 includedTypes)"""
   payload = {
     "languageCode": "en",
     "regionCode": "GB",
-    "includedTypes": includedTypes,
+    "includedTypes": types or includedTypes,
     "maxResultCount": 20,
     "rankPreference": "DISTANCE",
     "locationRestriction": {
       "circle": {"center": {"latitude": center_lat, "longitude": center_lng}, "radius": radius}
     }
   }
-  res = requests.post(URL, headers=headers, json=payload, timeout=30)
-  res.raise_for_status()
-  data = res.json()
+  field_mask = DISCOVERY_FIELD_MASK if DISCOVERY_MODE == "two_phase" else headers["X-Goog-FieldMask"]
+  req_headers = dict(headers, **{"X-Goog-FieldMask": field_mask})
+
+  def fetch():
+    # 429/5xx는 PLACES_HTTP가 백오프 후 재시도
+    res = PLACES_HTTP.post(URL, session=get_session(), limiter=limiter, headers=req_headers, json=payload, timeout=30)
+    TRAFFIC.add("search", len(res.content), field_mask)
+    return res.json()
+
+  data = cached_call(URL, payload, field_mask, fetch)
   return data.get("places", [])
 
+def place_to_row(p: Dict) -> Dict:
+  """엑셀 한 행(기존 컬럼 구성 그대로)"""
+  loc = p.get("location") or {}
+  return {
+    "회사명": p.get("displayName", {}).get("text"),
+    "업종": p.get("types"),
+    "기본 유형" : p.get('primaryType'),
+    "주소": p.get("formattedAddress"),
+    "우편주소" : p.get("postalAddress"),
+    "이메일 주소": "-",
+    "전화번호": "-",
+    "웹사이트 주소": p.get("websiteUri"),
+    "위도" : loc.get("latitude"),
+    "경도" : loc.get("longitude")
+  }
+
 def search_nearby(center_lat: float, center_lng: float, radius: float):
-  """결과 요약: 오른쪽만, 개수/최대거리"""
-  places = nearby_once(center_lat, center_lng, radius)
+  """결과 요약: (범위 안 결과, 원시 개수, 원시 최대거리)"""
+  return summarize_in_scope(nearby_once(center_lat, center_lng, radius), center_lat, center_lng)
+
+def summarize_in_scope(places: List[Dict], center_lat: float, center_lng: float):
+  """
+  원시 결과 → (범위 안 결과, 원시 개수, 원시 최대거리)
+  범위(기준선/폴리곤) 필터는 저장할 결과에만: 포화 판정·분할·다 받은 반경은 API 가 돌려준 원시 결과 기준
+  (경계 타일이 20개 꽉 찼는데 범위 안이 15개라고 '완료'로 보면 상한 너머 장소를 영영 놓침)
+  """
   places_right = []
   dists = []
   for p in places:
     loc = p.get("location") or {}
     lng = loc.get("longitude")
-    if lng is None or not is_right_of_meridian(lng, CUTOFF_LNG):
-      continue
     lat = loc.get("latitude")
-    if lat is not None:
+    if lat is not None and lng is not None:
       d = haversine_meters(center_lat, center_lng, lat, lng)
       p["distanceMeters"] = d
       dists.append(d)
+    if lng is None or not place_in_scope(lat, lng):
+      continue
     places_right.append(p)
-  
-  for p in places_right:
-    name = p.get("displayName", {}).get("text")
-    types = p.get("types")
-    primaryType = p.get('primaryType')
-    addr = p.get("formattedAddress")
-    postalAddress = p.get("postalAddress")
-    websiteUri = p.get("websiteUri")
-    loc = p.get("location") or {}
-    lng = loc.get("longitude")
-    lat = loc.get("latitude")
 
-    RESULT_LIST.append({
-      "회사명": name,
-      "업종": types,
-      "기본 유형" : primaryType,
-      "주소": addr,
-      "우편주소" : postalAddress,
-      "이메일 주소": "-",
-      "전화번호": "-",
-      "웹사이트 주소": websiteUri,
-      "위도" : lat,
-      "경도" : lng
-    })
-
-  count = len(places_right)
+  count = len(places)
   max_dist = max(dists) if dists else 0.0
   return places_right, count, max_dist
 
 # =======================
 # 메인: 종료 조건이 명확한 BFS
 # =======================
-# 0) 파일럿: 시작 원 한 번 조회해서 inner_cutoff 계산 재료
-pilot_places, pilot_count, pilot_maxdist = search_nearby(START_LAT, START_LNG, START_RADIUS)
-print(f"[pilot] right_count={pilot_count}, maxDist={pilot_maxdist:.1f}m")
-
-# 1) annulus 타일링은 '한 번만' 해서 큐 시드 생성
-seed_plan = build_ring_tiles_plan(
-  lat0=START_LAT, lng0=START_LNG, R=START_RADIUS,
-  max_distance=pilot_maxdist, margin=MARGIN_M,
-  max_cell_radius=MAX_CELL_RADIUS, overlap_ratio=OVERLAP_RATIO
-)
-# 오른쪽 타일만 큐에 추가(필요 시 False로 두고 결과만 필터)
-queue = deque([t for t in seed_plan if is_right_of_meridian(t["center"][1], CUTOFF_LNG)])
+def new_frontier(tiles: List[Dict], origin_lat: float, origin_lng: float):
+  """SCHEDULER에 맞는 대기열(fifo: deque / priority: PriorityFrontier, Nearby는 타일당 1회 호출)"""
+  return make_frontier(tiles, SCHEDULER, origin_lat, origin_lng, prior_path=SCHEDULER_PRIOR_PATH)
 
-visited = set()
-calls = 1  # pilot에서 1회
-results_by_id = {p.get("id"): p for p in pilot_places if p.get("id")}
-processed = 0
+def main(resume: bool = False):
+  global REGION
+  REGION = load_region(REGION_GEOJSON) if REGION_GEOJSON else None
+  origin_lat, origin_lng = REGION.center if REGION is not None else (START_LAT, START_LNG)
+
+  ckpt = BfsCheckpoint(CHECKPOINT_DIR, snapshot_every=CHECKPOINT_EVERY)
+  state = ckpt.load() if resume else None
+  if resume and state is None:
+    print(f"[resume] 체크포인트 없음({CHECKPOINT_DIR}) → 처음부터 시작")
+
+  # 결과 싱크: 새로 시작하면 비우고, 재개면 이어 씀(이미 기록된 id는 중복 처리)
+  sink = ResultSink(RESULT_SINK_PATH, place_to_row, append=state is not None)
+  # two_phase는 아직 풍부한 필드가 없으므로 행은 Details 이후에 기록
+  stream_rows = DISCOVERY_MODE != "two_phase"
+
+  if state is None and REGION is not None:
+    # 폴리곤 지역: 파일럿 없이 폴리곤과 겹치는 육각 원 격자에서 시작
+    seed_plan = [{"center": c, "radius": MAX_CELL_RADIUS, "depth": 0} for c in REGION.circle_plan(MAX_CELL_RADIUS)]
+    # 비교용 기존 방식: 파일럿 + 띠 타일(파일럿 maxDist는 실행 전엔 모르므로 0 → 상한 추정)
+    baseline = [{"center": (START_LAT, START_LNG), "radius": START_RADIUS}] + build_ring_tiles_plan(
+      lat0=START_LAT, lng0=START_LNG, R=START_RADIUS, max_distance=0.0, margin=MARGIN_M,
+      max_cell_radius=MAX_CELL_RADIUS, overlap_ratio=OVERLAP_RATIO
+    )
+    region_savings_report(REGION, len(seed_plan), baseline, 1, CUTOFF_LNG if SKIP_TILES_LEFT_OF_LINE else None)
+    queue = new_frontier(seed_plan, origin_lat, origin_lng)
+    visited = set()
+    calls = 0
+    results_by_id = {}
+    processed = 0
+    leaves = []
+    meta = {"includedTypes": includedTypes, "splits": 0, "split_children": 0, "coverage": [],
+            "region": REGION_GEOJSON}
+  elif state is None:
+    # 0) 파일럿: 시작 원 한 번 조회해서 inner_cutoff 계산 재료
+    pilot_places, pilot_count, pilot_maxdist = search_nearby(START_LAT, START_LNG, START_RADIUS)
+    print(f"[pilot] count={pilot_count} right={len(pilot_places)}, maxDist={pilot_maxdist:.1f}m")
+
+    # 1) annulus 타일링은 '한 번만' 해서 큐 시드 생성
+    seed_plan = build_ring_tiles_plan(
+      lat0=START_LAT, lng0=START_LNG, R=START_RADIUS,
+      max_distance=pilot_maxdist, margin=MARGIN_M,
+      max_cell_radius=MAX_CELL_RADIUS, overlap_ratio=OVERLAP_RATIO
+    )
+    # 오른쪽 타일만 큐에 추가(필요 시 False로 두고 결과만 필터)
+    queue = new_frontier([t for t in seed_plan if is_right_of_meridian(t["center"][1], CUTOFF_LNG)],
+                         origin_lat, origin_lng)
+
+    visited = set()
+    calls = 1  # pilot에서 1회
+    results_by_id = {p.get("id"): p for p in pilot_places if p.get("id")}
+    if stream_rows:
+      for p in results_by_id.values():
+        sink.add(p)
+    processed = 0
+    # 분할 통계: 분할 횟수 / 분할로 생성된 자식 타일 수(왼쪽 타일 제외 전)
+    meta = {"includedTypes": includedTypes, "splits": 0, "split_children": 0,
+            "coverage": [[START_LAT, START_LNG, known_radius(START_RADIUS, pilot_count, pilot_maxdist)]]}
+    pilot = (pilot_count, len(results_by_id))
+    # 파일럿 잎 = 다 받았다고 볼 수 있는 원(띠 타일은 그 바깥부터)
+    leaves = [settled_leaf({"center": (START_LAT, START_LNG), "radius": START_RADIUS, "depth": 0},
+                           pilot_places, pilot_count, pilot_maxdist)]
+  else:
+    queue = new_frontier(state["pending"], origin_lat, origin_lng)
+    visited = state["visited"]
+    calls = state["total_calls"]
+    processed = state["processed"]
+    results_by_id = state["results_by_id"]
+    meta = state["meta"]
+    leaves = state["leaves"]
+    if SCHEDULER == "priority":
+      queue.note_places(results_by_id.values())
+    # 싱크에 아직 없는 복구 결과(싱크 기록 전 중단)만 보충
+    if stream_rows:
+      for p in results_by_id.values():
+        sink.add(p)
+
+  coverage = CoverageIndex(origin_lat, origin_lng)
+  coverage.load_list(meta.get("coverage", []))
+
+  def snapshot_now():
+    meta["coverage"] = coverage.to_list()
+    ckpt.snapshot(queue, visited, results_by_id, calls, processed, meta, leaves)
+
+  snapshot_now()
+
+  metrics = CrawlRecorder("nearby_search", MAX_CALLS, prom_path=METRICS_PROM_PATH, port=METRICS_PORT,
+                          calls=calls if state is not None else 0,
+                          unique=len(results_by_id) if state is not None else 0)
+  if state is None and REGION is None:
+    # 파일럿은 depth=-1 로 따로
+    metrics.tile(-1, START_RADIUS, 1, pilot[0], pilot[1], pilot[0] == 20)
+    metrics.progress(calls, len(results_by_id))
+
+  try:
+    # 호출 예산이 떨어지면 중단(남은 타일은 체크포인트에 남아 --resume 으로 이어서)
+    while queue and calls < MAX_CALLS:
+      print(f"[queue]\tremaining={len(queue)} processed={processed} calls={calls}")
+      tile = queue.popleft()
+      lat, lng = tile["center"]
+      r = tile["radius"]
+      depth = tile.get("depth", 0)
+
+      # 중복 타일 방지
+      key = (round(lat, 6), round(lng, 6), round(r, 1))
+      if key in visited:
+        continue
+
+      # 범위 밖 타일 건너뛰기(비용 절감)
+      if not tile_in_scope(lat, lng, r):
+        visited.add(key)
+        continue
+
+      # 이미 끝난 영역에 완전히 덮이면 호출 생략
+      if USE_COVERAGE_INDEX and coverage.prune(lat, lng, r):
+        visited.add(key)
+        print(f"[skip]\tcovered r={r:.1f}m center=({lat:.6f},{lng:.6f})")
+        metrics.pruned(depth)
+        continue
+
+      # 조회(실패하면 타일을 큐 앞으로 되돌려 체크포인트에 남김)
+      try:
+        places_right, count, maxdist = search_nearby(lat, lng, r)
+      except BaseException:
+        queue.appendleft(tile)
+        raise
+      visited.add(key)
+      calls += 1
+      processed += 1
+
+      # 결과 합치기(디듀프)
+      new_places = []
+      for p in places_right:
+        pid = p.get("id")
+        if pid and pid not in results_by_id:
+          results_by_id[pid] = p
+          new_places.append(p)
+          if stream_rows:
+            sink.add(p)
+
+      print(f"[tile]\tdepth={depth} r={r:.1f}m center=({lat:.6f},{lng:.6f}) "
+            f"→ count={count} right={len(places_right)} maxDist={maxdist:.1f}m uniq_total={len(results_by_id)}")
+      disc = (lat, lng, known_radius(r, count, maxdist))
+      coverage.add(*disc)
+      metrics.tile(depth, r, 1, count, len(new_places), count == 20)
+      metrics.progress(calls, len(results_by_id))
+      if SCHEDULER == "priority":
+        queue.observe(tile, count, count == 20, new_places, known_radius_m=maxdist)
+
+      # **종료/분할 로직**: 꽉 찼으면 더 쪼갠다(세로 탐색), 20 미만 → 이 타일은 완료(자식 없음)
+      queued = []
+      if calls < MAX_CALLS:
+        queued, made = split_tile(tile, count, maxdist)
+        if made:
+          meta["splits"] += 1
+          meta["split_children"] += made
+          queue.extend(queued)
+      leaf = None
+      if not queued:
+        leaf = make_leaf(tile, places_right, count, count == 20, maxdist)
+      elif SPLIT_MODE == "annulus":
+        leaf = settled_leaf(tile, places_right, count, maxdist)
+      if leaf is not None:
+        leaves.append(leaf)
+
+      ckpt.record_tile(tile, 1, queued, new_places, leaf, disc if disc[2] > 0 else None)
+      if ckpt.due():
+        snapshot_now()
+  except BaseException:
+    # 네트워크 오류/중단 시: 상태 저장 + 지금까지 결과라도 엑셀로
+    snapshot_now()
+    ckpt.close()
+    sink.export_xlsx(XLSX_PATH)
+    sink.close()
+    metrics.summary(METRICS_JSON_PATH, {"aborted": True})
+    metrics.close()
+    print(f"[abort] checkpoint -> {CHECKPOINT_DIR} (--resume 으로 이어서 실행), partial Excel -> {XLSX_PATH}")
+    raise
+
+  snapshot_now()
+  ckpt.close()
+  if SCHEDULER == "priority" and SCHEDULER_PRIOR_PATH:
+    queue.save_prior(SCHEDULER_PRIOR_PATH)
+
+  print("\n=== FINAL SUMMARY ===")
+  if REGION is not None:
+    print(f"Unique places in {REGION_GEOJSON}: {len(results_by_id)}")
+  else:
+    print(f"Unique places RIGHT of {CUTOFF_LNG}: {len(results_by_id)}")
+  print(f"HTTP calls (approx): {calls} (budget {MAX_CALLS}, scheduler={SCHEDULER}, tiles left={len(queue)})")
+  print(PLACES_HTTP.summary())
+  print(get_cache().summary())
+  print(coverage.summary())
+  # 자식 수(범위 필터/커버 제외 전)는 실제 호출 수와 다름 → 분할 방식 비교는 benchmark_crawl 의 실제 호출 수로
+  print(f"Split mode: {SPLIT_MODE} calls={calls} splits={meta['splits']} children={meta['split_children']}")
+  run_metrics = metrics.summary(METRICS_JSON_PATH, {
+    "split_mode": SPLIT_MODE, "scheduler": SCHEDULER, "max_cell_radius": MAX_CELL_RADIUS,
+    "overlap_ratio": OVERLAP_RATIO, "splits": meta["splits"], "split_children": meta["split_children"], "tiles_left": len(queue),
+  })
+  metrics.print_depth_table(run_metrics)
+  metrics.close()
+
+  # 2단계: 고유 id마다 Details 1회 → 디듀프된 결과로 행 구성
+  if DISCOVERY_MODE == "two_phase":
+    details = fetch_place_details(list(results_by_id), API_KEY, details_mask_from_search_mask(headers["X-Goog-FieldMask"]))
+    merge_details(results_by_id.values(), details)
+    for p in results_by_id.values():
+      sink.add(p)
+    print_two_phase_report(calls, len(results_by_id))
+  else:
+    print(TRAFFIC.summary())
+
+  if LEAVES_PATH:
+    save_leaves(LEAVES_PATH, "nearby_search", {
+      "includedTypes": includedTypes, "split_mode": SPLIT_MODE, "region": REGION_GEOJSON,
+      "discovery_mode": DISCOVERY_MODE,
+    }, leaves, results_by_id, pending=list(queue), calls=calls)
+
+  # 엑셀 파일로 저장(싱크에 쌓인 디듀프된 행을 스트리밍 변환)
+  print(sink.summary())
+  rows = sink.export_xlsx(XLSX_PATH)
+  if STORE_PATH:
+    store = PlaceStore(STORE_PATH)
+    n = store.upsert_places(sink.rows(), category_of(XLSX_PATH))
+    store.close()
+    print(f"[store] upsert {n} rows -> {STORE_PATH}")
+  sink.close()
+  print(f"Saved Excel -> {XLSX_PATH} ({rows} rows)")
+
+  return {
+    "split_mode": SPLIT_MODE,
+    "calls": calls,
+    "unique": len(results_by_id),
+    "tiles": processed,
+    "unique_per_call": len(results_by_id) / max(calls, 1),
+    "place_ids": list(results_by_id),
+    "metrics": run_metrics,
+  }
 
-while queue:
-  print(f"[queue]\tremaining={len(queue)} processed={processed} calls={calls}")
-  tile = queue.popleft()
-  lat, lng = tile["center"]
-  r = tile["radius"]
-  depth = tile.get("depth", 0)
 
-  # 중복 타일 방지
-  key = (round(lat, 6), round(lng, 6), round(r, 1))
-  if key in visited:
-    continue
-  visited.add(key)
-
-  # 왼쪽 타일 건너뛰기(비용 절감)
-  if SKIP_TILES_LEFT_OF_LINE and not is_right_of_meridian(lng, CUTOFF_LNG):
-    continue
-
-  # 조회
-  places_right, count, maxdist = search_nearby(lat, lng, r)
-  calls += 1
-  processed += 1
-
-  # 결과 합치기(디듀프)
-  for p in places_right:
-    pid = p.get("id")
-    if pid and pid not in results_by_id:
-      results_by_id[pid] = p
-
-  print(f"[tile]\tdepth={depth} r={r:.1f}m center=({lat:.6f},{lng:.6f}) "
-        f"→ count={count} maxDist={maxdist:.1f}m uniq_total={len(results_by_id)}")
-
-  # **종료/분할 로직**
-  if count == 20 and r > MIN_RADIUS_M and depth < MAX_DEPTH and calls < MAX_CALLS:
-    # 꽉 찼으니 더 쪼갠다(세로 탐색)
-    for child in split_circle_7(lat, lng, r, parent_depth=depth):
-      # 오른쪽 타일만 큐에 추가(경계 누락이 걱정되면 조건 제거)
-      if not SKIP_TILES_LEFT_OF_LINE or is_right_of_meridian(child["center"][1], CUTOFF_LNG):
-        queue.append(child)
-  # else: 20 미만 → 이 타일은 완료(자식 없음)
-
-print("\n=== FINAL SUMMARY ===")
-print(f"Unique places RIGHT of {CUTOFF_LNG}: {len(results_by_id)}")
-print(f"HTTP calls (approx): {calls}")
-
-# 엑셀 파일로 저장
-# 1) 결과를 DF로 만들기
-df = pd.DataFrame(RESULT_LIST)
-
-# 2) 엑셀로 저장 (openpyxl)
-df.to_excel("creative_result.xlsx", index=False, engine='openpyxl')
\ No newline at end of file
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description="Places Nearby Search 타일 수집기")
+  parser.add_argument("--resume", action="store_true", help=f"{CHECKPOINT_DIR}의 마지막 체크포인트에서 이어서 실행")
+  parser.add_argument("--region", default=None, help="수집 지역 GeoJSON(Polygon/MultiPolygon)")
+  parser.add_argument("--scheduler", choices=["fifo", "priority"], default=None, help="타일 순서(기본: SCHEDULER)")
+  parser.add_argument("--metrics-port", type=int, default=None, help="수집 중 Prometheus /metrics 엔드포인트 포트")
+  parser.add_argument("--metrics-file", default=None, help="Prometheus 텍스트 파일 경로(textfile collector)")
+  args = parser.parse_args()
+  if args.region:
+    REGION_GEOJSON = args.region
+  if args.scheduler:
+    SCHEDULER = args.scheduler
+  if args.metrics_port is not None:
+    METRICS_PORT = args.metrics_port
+  if args.metrics_file:
+    METRICS_PROM_PATH = args.metrics_file
+  main(resume=args.resume)
@@ -0,0 +1,316 @@
+# page_archive.py
+# ---------------
+# 이메일 단계에서 받은 페이지를 압축해 쌓아 두는 추가 전용(append-only) 아카이브(SQLite)
+# - 페이지 하나 = 한 행: 사이트(크롤링한 URL), 요청 URL, 최종 URL, HTTP 상태, 역할(main/link), tier(http/browser),
+#   받은 시각, 압축 방식, 압축된 HTML
+# - 압축: zstandard 가 설치돼 있으면 zstd, 없으면 zlib(표준 라이브러리) — 행마다 방식을 기록해 섞여 있어도 읽힘
+# - 덮어쓰기 없음: 같은 페이지를 다시 받으면 새 행, 읽을 때는 최신 행을 씀
+# - 쓰기는 수집 스크립트의 연결 하나(email_worker_pool 워커는 페이지를 부모로 보내 부모가 저장)
+#   → WAL: 쓰는 동안에도 re-extract/stats 같은 다른 프로세스가 읽을 수 있음
+#
+# re-extract: 추출/점수 규칙(email_extract 의 EMAIL_REGEX/BAD_TLDS/우회 표기, link_weight, score_and_pick)을 고친 뒤
+#   다시 크롤링하지 않고 아카이브만으로 이메일 컬럼을 다시 만듦(사이트 단위로 CPU 코어 수만큼 병렬)
+#   - 메인 페이지(사용 가능한 최신 행) → mailto/cfemail/보이는 텍스트
+#   - contact 후보는 '새' link_weight 로 다시 고르고, 아카이브에 있는 페이지만 추출(없는 건 통계에 missing_links)
+#   - 메인 페이지가 없거나 HTTP 로 받은 껍데기(JS 렌더링/차단)뿐이면 '조회 중 오류'
+#
+# 사용:
+#   archive = PageArchive("pages.sqlite"); archive.add(site, url, final_url, status, html, role="main", tier="http")
+#   python page_archive.py stats
+#   python page_archive.py re-extract agency_result.xlsx -o agency_result_reextract.xlsx --workers 8
+#   python page_archive.py re-extract --store places.sqlite --category agency
+
+import argparse
+import os
+import sqlite3
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+try:
+  import zstandard
+except ImportError:  # 선택 의존성: 없으면 zlib
+  zstandard = None
+
+DEFAULT_ARCHIVE_PATH = "pages.sqlite"
+ZSTD_LEVEL = 6
+ZLIB_LEVEL = 6
+COMMIT_EVERY = 50      # 쓰기 N건마다 커밋(flush()/close() 에서도)
+REEXTRACT_CHUNK = 200  # re-extract 워커에 한 번에 넘기는 사이트 수
+
+EMAIL_NONE_LABEL = "조회결과 없음"
+EMAIL_ERROR_LABEL = "조회 중 오류"
+
+
+# =======================
+# 압축
+# =======================
+def compress(data: bytes) -> Tuple[str, bytes]:
+  if zstandard is not None:
+    return "zstd", zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+  return "zlib", zlib.compress(data, ZLIB_LEVEL)
+
+def decompress(codec: str, blob: bytes) -> bytes:
+  if codec == "zlib":
+    return zlib.decompress(blob)
+  if codec == "zstd":
+    if zstandard is None:
+      raise RuntimeError("zstd 로 압축된 페이지: pip install zstandard 필요")
+    return zstandard.ZstdDecompressor().decompress(blob)
+  if codec == "none":
+    return blob
+  raise ValueError(f"알 수 없는 압축 방식: {codec}")
+
+
+# =======================
+# 아카이브
+# =======================
+class PageArchive:
+  def __init__(self, path: str = DEFAULT_ARCHIVE_PATH, readonly: bool = False):
+    self.path = path
+    self.pending = 0
+    if readonly:
+      self.conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+      return
+    self.conn = sqlite3.connect(path, timeout=30)
+    self.conn.execute("PRAGMA journal_mode=WAL")
+    self.conn.execute("PRAGMA synchronous=NORMAL")
+    self.conn.executescript("""
+      CREATE TABLE IF NOT EXISTS pages (
+        id INTEGER PRIMARY KEY,
+        site TEXT NOT NULL,
+        url TEXT NOT NULL,
+        final_url TEXT,
+        status INTEGER,
+        role TEXT NOT NULL,
+        tier TEXT NOT NULL,
+        fetched_at REAL NOT NULL,
+        codec TEXT NOT NULL,
+        body BLOB NOT NULL
+      );
+      CREATE INDEX IF NOT EXISTS idx_pages_site ON pages(site);
+    """)
+    self.conn.commit()
+
+  def add(self, site: str, url: str, final_url: Optional[str], status: Optional[int], html_str: str,
+          role: str = "main", tier: str = "http"):
+    """페이지 하나 추가(덮어쓰기 없음). 실패해도 크롤링은 계속되도록 예외는 삼킴"""
+    try:
+      codec, blob = compress((html_str or "").encode("utf-8", errors="replace"))
+      self.conn.execute(
+        "INSERT INTO pages(site, url, final_url, status, role, tier, fetched_at, codec, body) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        (site, url, final_url, status, role, tier, time.time(), codec, blob))
+      self.pending += 1
+      if self.pending >= COMMIT_EVERY:
+        self.flush()
+    except sqlite3.Error as e:
+      print(f"[archive] 저장 실패({url}): {e}")
+
+  def flush(self):
+    if self.pending:
+      self.conn.commit()
+      self.pending = 0
+
+  def close(self):
+    self.flush()
+    self.conn.close()
+
+  def sites(self) -> List[str]:
+    return [r[0] for r in self.conn.execute("SELECT DISTINCT site FROM pages ORDER BY site")]
+
+  def pages_of(self, site: str) -> List[Dict]:
+    """사이트의 페이지들(오래된 것 → 최신, HTML 은 압축 해제)"""
+    rows = self.conn.execute(
+      "SELECT url, final_url, status, role, tier, fetched_at, codec, body FROM pages WHERE site = ? ORDER BY id",
+      (site,))
+    return [{"url": u, "final_url": fu or u, "status": st, "role": role, "tier": tier, "fetched_at": at,
+             "html": decompress(codec, body).decode("utf-8", errors="replace")}
+            for u, fu, st, role, tier, at, codec, body in rows]
+
+  def stats(self) -> Dict:
+    n, sites, raw = self.conn.execute(
+      "SELECT COUNT(*), COUNT(DISTINCT site), COALESCE(SUM(LENGTH(body)), 0) FROM pages").fetchone()
+    by = dict(self.conn.execute("SELECT tier || '/' || role, COUNT(*) FROM pages GROUP BY tier, role"))
+    codecs = dict(self.conn.execute("SELECT codec, COUNT(*) FROM pages GROUP BY codec"))
+    size = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+    return {"pages": n, "sites": sites, "compressed_bytes": raw, "file_bytes": size, "by_tier_role": by,
+            "codecs": codecs}
+
+
+# =======================
+# re-extract(워커 프로세스)
+# =======================
+_reader: Optional[PageArchive] = None
+
+def _init_reader(path: str):
+  global _reader
+  _reader = PageArchive(path, readonly=True)
+
+def extract_site(site: str, pages: List[Dict]) -> Tuple[str, Dict]:
+  """아카이브된 페이지들만으로 사이트 하나의 결과(콤마로 합친 Top 3 또는 결과 문구)"""
+  from email_error_check import pick_contact_links, score_and_pick
+  from email_http_fetch import MAX_CONTACT_LINKS, csr_reason, extract_page, status_verdict
+
+  info = {"pages": 0, "missing_links": 0}
+  main = None
+  # 메인 페이지: 사용 가능한 최신 행(HTTP tier 가 브라우저로 넘겼던 껍데기/차단 페이지는 건너뜀)
+  for p in reversed([p for p in pages if p["role"] == "main"]):
+    if p["tier"] == "http" and status_verdict(p["status"] or 200, "text/html", p["html"]) is not None:
+      continue
+    emails, anchors, text = extract_page(p["html"], p["final_url"])
+    if p["tier"] == "http" and csr_reason(p["html"], text):
+      continue
+    main = p
+    break
+  if main is None:
+    return EMAIL_ERROR_LABEL, info
+  info["pages"] = 1
+  latest = {}
+  for p in pages:
+    if p["role"] == "link":
+      latest[p["url"]] = p
+
+  # 브라우저 tier 는 요청 URL 기준, HTTP tier 는 리다이렉트 후 URL 기준으로 링크를 골랐음
+  base = main["final_url"] if main["tier"] == "http" else main["url"]
+  for link in pick_contact_links(base, anchors, k=MAX_CONTACT_LINKS):
+    page = latest.get(link)
+    if page is None:
+      info["missing_links"] += 1
+      continue
+    found, _, _ = extract_page(page["html"], page["final_url"])
+    emails |= found
+    info["pages"] += 1
+  if not emails:
+    return EMAIL_NONE_LABEL, info
+  return score_and_pick(emails, site, k=3), info
+
+def _extract_chunk(sites: List[str]) -> List[Tuple[str, str, Dict]]:
+  out = []
+  for site in sites:
+    try:
+      value, info = extract_site(site, _reader.pages_of(site))
+    except Exception as e:
+      value, info = EMAIL_ERROR_LABEL, {"pages": 0, "missing_links": 0, "error": f"{type(e).__name__}: {e}"}
+    out.append((site, value, info))
+  return out
+
+def reextract_sites(path: str, sites: List[str], workers: Optional[int] = None) -> Dict[str, str]:
+  """사이트 목록 → 사이트 → 결과. 사이트 묶음을 프로세스 풀(기본: CPU 코어 수)로"""
+  t0 = time.perf_counter()
+  workers = workers or os.cpu_count() or 1
+  chunks = [sites[i:i + REEXTRACT_CHUNK] for i in range(0, len(sites), REEXTRACT_CHUNK)]
+  results: Dict[str, str] = {}
+  pages = missing = errors = 0
+  with ProcessPoolExecutor(max_workers=workers, initializer=_init_reader, initargs=(path,)) as ex:
+    for chunk in ex.map(_extract_chunk, chunks):
+      for site, value, info in chunk:
+        results[site] = value
+        pages += info["pages"]
+        missing += info["missing_links"]
+        errors += "error" in info
+  wall = time.perf_counter() - t0
+  print(f"[re-extract] 사이트 {len(sites)}개, 페이지 {pages}개, 워커 {workers}개: {wall:.1f}s "
+        f"({len(sites) / wall * 60.0 if wall > 0 else 0:.0f} 사이트/분), 아카이브에 없는 contact 링크 {missing}, "
+        f"예외 {errors}")
+  return results
+
+def results_by_unit(path: str, workers: Optional[int] = None, by: str = "domain") -> Dict[str, str]:
+  """아카이브 전체 → 작업 단위(url_canon)·site key → 결과(행 매칭용)
+  지점 경로로 나뉜 도메인은 사이트마다 따로 크롤링되므로 site key 로 먼저 맞추고, 단위는 루트(가장 짧은 key) 결과"""
+  from url_canon import site_key, work_unit
+  reader = PageArchive(path, readonly=True)
+  try:
+    sites = reader.sites()
+  finally:
+    reader.close()
+  out = {}
+  results = reextract_sites(path, sites, workers)
+  for site in sorted(results, key=lambda u: -len(site_key(u) or "")):
+    for unit in (work_unit(site, by), site_key(site)):
+      if unit is not None:
+        out[unit] = results[site]
+  return out
+
+def value_for(unit_values: Dict[str, str], url, by: str) -> Optional[str]:
+  """행의 웹사이트 → 결과(같은 site key 가 있으면 그것, 없으면 작업 단위)"""
+  from url_canon import site_key, work_unit
+  value = unit_values.get(site_key(url))
+  return value if value is not None else unit_values.get(work_unit(url, by))
+
+
+# =======================
+# CLI
+# =======================
+def reextract_xlsx(path: str, xlsx_in: str, xlsx_out: str, workers: Optional[int], by: str,
+                   url_col: str = "웹사이트 주소", email_col: str = "이메일 주소") -> int:
+  import pandas as pd
+  df = pd.read_excel(xlsx_in)
+  unit_values = results_by_unit(path, workers, by)
+  changed = 0
+  for i in df.index:
+    value = value_for(unit_values, df.at[i, url_col], by)
+    if value is None:
+      continue  # 아카이브에 없는 사이트는 그대로
+    if str(df.at[i, email_col]) != value:
+      changed += 1
+    df.at[i, email_col] = value
+  df.to_excel(xlsx_out, index=False)
+  print(f"[re-extract] {xlsx_in} → {xlsx_out}: {changed}행 변경")
+  return changed
+
+def reextract_store(path: str, store_path: str, category: Optional[str], workers: Optional[int], by: str) -> int:
+  from place_store import IN_CATEGORY, PlaceStore
+  unit_values = results_by_unit(path, workers, by)
+  store = PlaceStore(store_path)
+  changed = 0
+  try:
+    sql = "SELECT place_id, website, email FROM places WHERE website IS NOT NULL"
+    args: List = []
+    if category:
+      sql += IN_CATEGORY
+      args.append(category)
+    for place_id, website, email in list(store.conn.execute(sql, args)):
+      value = value_for(unit_values, website, by)
+      if value is not None and value != email:
+        store.set_email(place_id, value)
+        changed += 1
+  finally:
+    store.close()
+  print(f"[re-extract] {store_path} category={category or '*'}: {changed}행 변경")
+  return changed
+
+def main():
+  parser = argparse.ArgumentParser(description="이메일 단계 페이지 아카이브 — 현황 / 다시 추출")
+  parser.add_argument("--archive", default=DEFAULT_ARCHIVE_PATH)
+  sub = parser.add_subparsers(dest="cmd", required=True)
+  sub.add_parser("stats")
+  p_re = sub.add_parser("re-extract", help="아카이브만으로 이메일 컬럼 다시 만들기(재크롤링 없음)")
+  p_re.add_argument("xlsx", nargs="?", default=None)
+  p_re.add_argument("-o", "--out", default=None, help="기본: <입력>_reextract.xlsx")
+  p_re.add_argument("--store", default=None, help="엑셀 대신 place_store SQLite 의 이메일을 갱신")
+  p_re.add_argument("--category", default=None)
+  p_re.add_argument("--workers", type=int, default=None, help="기본: CPU 코어 수")
+  p_re.add_argument("--by", choices=["domain", "url"], default="domain", help="행 ↔ 사이트 매칭 단위(url_canon)")
+  args = parser.parse_args()
+
+  if args.cmd == "stats":
+    archive = PageArchive(args.archive, readonly=True)
+    try:
+      s = archive.stats()
+    finally:
+      archive.close()
+    print(f"페이지 {s['pages']}개 / 사이트 {s['sites']}개, 압축 본문 {s['compressed_bytes'] / 1e6:.1f}MB "
+          f"(파일 {s['file_bytes'] / 1e6:.1f}MB), {s['by_tier_role']}, {s['codecs']}")
+  elif args.store:
+    reextract_store(args.archive, args.store, args.category, args.workers, args.by)
+  elif args.xlsx:
+    out = args.out or os.path.splitext(args.xlsx)[0] + "_reextract.xlsx"
+    reextract_xlsx(args.archive, args.xlsx, out, args.workers, args.by)
+  else:
+    parser.error("re-extract: 엑셀 경로 또는 --store 필요")
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,133 @@
+# page_pipeline.py
+# ----------------
+# 한 타일(또는 한 원)의 쿼리별 페이지네이션 체인을 동시에 돌리고, 도착한 페이지를 바로 처리 단계로 넘김
+# - 쿼리 체인끼리는 서로 독립 → 스레드 풀에서 동시에(타일 지연 ≈ 가장 긴 체인 하나)
+# - 처리(거리 필터/중복 제거/행 만들기)는 호출한 스레드 한 곳에서만 → 콜백 안의 dict/set 에 잠금 불필요
+# - prefetch=True: 페이지를 넘기자마자 nextPageToken 으로 다음 페이지 요청(처리와 I/O 겹침)
+#   prefetch=False: 콜백 판정(계속/중단)을 받은 뒤 다음 페이지 요청 — 조기 종료가 있으면 헛호출 없음
+# - 체인 하나가 예외를 내면 나머지 체인을 멈추고 같은 예외를 다시 던짐
+#   (StalePageToken: 캐시에서 받은 토큰이 만료 → 그 체인만 1페이지부터 한 번 다시, 이미 넘긴 페이지는 다시 넘기지 않음)
+# - 체인은 모듈 공용 스레드 풀에서 실행: 스레드가 계속 살아 있어야 스레드별 세션(keep-alive)도 재사용됨
+#   호출마다 workers 개의 러너만 넣고, 러너가 남은 쿼리를 하나씩 가져가 체인을 끝까지 돌림
+#
+# 사용:
+#   def on_page(query, page_no, places, has_more) -> bool:   # False → 이 체인 중단
+#     ...
+#   chains = run_page_chains(queries, lambda q, tok: text_search_once(..., q, tok), on_page, max_pages=None)
+#   chains[q] = {"pages": 받은 페이지 수, "truncated": 페이지 한도로 끊김, "stopped": 콜백이 중단}
+
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+from places_cache import StalePageToken
+
+CHAIN_WORKERS = 4   # 기본 동시 체인 수(실제 QPS 는 각 수집기의 토큰 버킷/PLACES_HTTP 가 제한)
+POOL_THREADS = 32   # 공용 풀 크기(동시 타일 수 × 체인 수보다 작으면 남는 러너는 자리 날 때까지 대기)
+
+_pool: Optional[ThreadPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+FetchPage = Callable[[str, Optional[str]], Tuple[List[Dict], Optional[str]]]
+OnPage = Callable[[str, int, List[Dict], bool], Optional[bool]]
+
+
+def _shared_pool() -> ThreadPoolExecutor:
+  global _pool
+  with _pool_lock:
+    if _pool is None:
+      _pool = ThreadPoolExecutor(max_workers=POOL_THREADS, thread_name_prefix="page-chain")
+    return _pool
+
+
+def run_page_chains(queries: List[str], fetch_page: FetchPage, on_page: OnPage, max_pages: Optional[int] = None,
+                    workers: int = CHAIN_WORKERS, prefetch: bool = True) -> Dict[str, Dict]:
+  """
+  queries 각각의 페이지네이션 체인을 workers 개까지 동시에 실행, on_page 는 호출 스레드에서 도착 순서대로
+  반환: 쿼리 → {"pages", "truncated", "stopped"}
+  """
+  queries = list(dict.fromkeys(queries))  # 같은 쿼리가 두 번이면 한 번만
+  chains = {q: {"pages": 0, "truncated": False, "stopped": False} for q in queries}
+  if not queries:
+    return chains
+  inbox: "queue.Queue[tuple]" = queue.Queue()
+  stop = {q: False for q in queries}
+  abort = threading.Event()
+  todo = list(reversed(queries))  # pop() 이 앞 쿼리부터 꺼내도록
+
+  def chain(q: str):
+    token = None
+    pages = 0
+    fetched = 0
+    restarted = False
+    while not abort.is_set() and not stop[q]:
+      try:
+        places, token = fetch_page(q, token)
+      except StalePageToken:
+        if restarted:
+          raise
+        restarted, token, fetched = True, None, 0
+        continue
+      fetched += 1
+      if fetched <= pages:
+        # 재시작 후 이미 처리 단계로 넘긴 페이지 → 새 토큰만 받고 다음 페이지로
+        if not token:
+          break
+        continue
+      pages += 1
+      truncated = bool(token) and max_pages is not None and pages >= max_pages
+      more = bool(token) and not truncated
+      resume = None if (prefetch or not more) else threading.Event()
+      inbox.put(("page", q, pages, places, more, truncated, resume))
+      if not more:
+        break
+      # 처리 스레드가 예외로 빠져도 멈춰 있지 않도록 abort 도 같이 확인
+      while resume is not None and not resume.wait(0.05) and not abort.is_set():
+        pass
+
+  def runner():
+    while True:
+      with _pool_lock:
+        if not todo:
+          return
+        q = todo.pop()
+      try:
+        if not abort.is_set():
+          chain(q)
+      except BaseException as e:  # 처리 스레드에서 다시 던짐
+        inbox.put(("error", q, e))
+      finally:
+        inbox.put(("done", q))
+
+  pending = set(queries)
+  error: Optional[BaseException] = None
+  pool = _shared_pool()
+  try:
+    for _ in range(max(1, min(workers, len(queries)))):
+      pool.submit(runner)
+    while pending:
+      item = inbox.get()
+      kind, q = item[0], item[1]
+      if kind == "done":
+        pending.discard(q)
+        continue
+      if kind == "error":
+        error = error or item[2]
+        abort.set()
+        continue
+      _, _, page_no, places, more, truncated, resume = item
+      c = chains[q]
+      c["pages"] = page_no
+      c["truncated"] = truncated
+      if error is None and on_page(q, page_no, places, more) is False and more:
+        stop[q] = True
+        c["stopped"] = True
+      if resume is not None:
+        resume.set()
+  finally:
+    # 예외로 빠질 때도 러너들이 남은 체인을 바로 접도록
+    abort.set()
+  if error is not None:
+    raise error
+  return chains
@@ -0,0 +1,141 @@
+# place_details.py
+# ----------------
+# 2단계 수집(discovery → details)의 2단계
+# - 1단계: 타일 스윕은 places.id,places.location 만 요청(가벼운 필드 마스크) → 전역 디듀프
+# - 2단계: 고유 place id마다 Place Details(New) 1회씩, 풍부한 필드(websiteUri/postalAddress/전화번호 등) 조회
+# - 동시 요청(스레드 풀) + 토큰 버킷 속도 제한 + places_cache 경유(재실행 시 무료)
+# - 429/5xx 재시도·동시성 조절·서킷 브레이커는 검색과 같은 places_http.PLACES_HTTP 공유(같은 쿼터)
+# - 전송 바이트 / 풍부한 필드(과금 상위 SKU) 호출 수를 단계별로 집계
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional
+
+import requests
+
+from places_cache import cached_call
+from places_http import PLACES_HTTP
+from rate_limiter import TokenBucket
+
+DETAILS_URL = "https://places.googleapis.com/v1/places/{place_id}"
+DETAILS_WORKERS = 8
+DETAILS_QPS: Optional[float] = 10.0
+
+# 스윕용 최소 필드(Text Search는 페이지네이션 토큰 필요)
+DISCOVERY_FIELD_MASK = "places.id,places.location"
+
+# 이 필드가 마스크에 있으면 상위 과금 SKU(Pro/Enterprise) 호출로 집계
+RICH_FIELDS = (
+  "websiteUri", "nationalPhoneNumber", "internationalPhoneNumber",
+  "postalAddress", "addressComponents", "formattedAddress", "displayName", "types", "primaryType",
+)
+
+DETAILS_LIMITER = TokenBucket(qps=DETAILS_QPS)
+_thread_local = threading.local()
+
+
+def _session() -> requests.Session:
+  sess = getattr(_thread_local, "session", None)
+  if sess is None:
+    sess = requests.Session()
+    _thread_local.session = sess
+  return sess
+
+
+def _mask_fields(field_mask: str) -> set:
+  # "places.displayName.text" → "displayName", Details 마스크("websiteUri")도 그대로 처리
+  out = set()
+  for f in field_mask.split(","):
+    f = f.strip()
+    if f.startswith("places."):
+      f = f[len("places."):]
+    out.add(f.split(".")[0])
+  return out
+
+def is_rich_mask(field_mask: str) -> bool:
+  return bool(_mask_fields(field_mask) & set(RICH_FIELDS))
+
+
+def details_mask_from_search_mask(field_mask: str) -> str:
+  """검색용 마스크(places.xxx, nextPageToken) → Details용 마스크(xxx)"""
+  out = []
+  for f in field_mask.split(","):
+    f = f.strip()
+    if f.startswith("places."):
+      out.append(f[len("places."):])
+  return ",".join(out)
+
+
+class TrafficStats:
+  """단계별(search/details) 실제 네트워크 호출 수, 바이트, 풍부한 필드 호출 수(캐시 적중은 제외)"""
+
+  def __init__(self):
+    self._lock = threading.Lock()
+    self.by_phase: Dict[str, Dict[str, int]] = {}
+
+  def add(self, phase: str, nbytes: int, field_mask: str):
+    with self._lock:
+      st = self.by_phase.setdefault(phase, {"calls": 0, "bytes": 0, "rich_calls": 0})
+      st["calls"] += 1
+      st["bytes"] += nbytes
+      if is_rich_mask(field_mask):
+        st["rich_calls"] += 1
+
+  def summary(self) -> str:
+    with self._lock:
+      parts = [f"{ph}: calls={st['calls']} bytes={st['bytes'] / 1e6:.2f}MB rich_calls={st['rich_calls']}"
+               for ph, st in self.by_phase.items()]
+    return "traffic " + (" | ".join(parts) if parts else "(no network calls)")
+
+
+TRAFFIC = TrafficStats()
+
+
+def fetch_one(place_id: str, api_key: str, field_mask: str, limiter: Optional[TokenBucket] = None) -> Dict:
+  url = DETAILS_URL.format(place_id=place_id)
+
+  def fetch():
+    res = PLACES_HTTP.get(url, session=_session(), limiter=limiter or DETAILS_LIMITER,
+                          headers={"X-Goog-Api-Key": api_key, "X-Goog-FieldMask": field_mask}, timeout=30)
+    TRAFFIC.add("details", len(res.content), field_mask)
+    return res.json()
+
+  return cached_call(url, {}, field_mask, fetch)
+
+
+def fetch_place_details(place_ids: Iterable[str], api_key: str, field_mask: str,
+                        workers: int = DETAILS_WORKERS, limiter: Optional[TokenBucket] = None) -> Dict[str, Dict]:
+  """고유 id마다 Details 1회(동시). 실패한 id는 결과에서 빠지고 경고만 출력"""
+  ids: List[str] = list(dict.fromkeys(i for i in place_ids if i))
+  out: Dict[str, Dict] = {}
+
+  def work(pid: str):
+    try:
+      return pid, fetch_one(pid, api_key, field_mask, limiter)
+    except requests.RequestException as e:
+      print(f"[details] {pid} 실패: {e}")
+      return pid, None
+
+  with ThreadPoolExecutor(max_workers=workers) as pool:
+    for n, (pid, data) in enumerate(pool.map(work, ids), 1):
+      if data is not None:
+        out[pid] = data
+      if n % 100 == 0:
+        print(f"[details] {n}/{len(ids)}")
+  print(f"[details] fetched={len(out)}/{len(ids)}")
+  return out
+
+
+def merge_details(places: Iterable[Dict], details: Dict[str, Dict]):
+  """1단계 결과(id/location)에 Details 필드를 채움(이미 있는 키는 유지, 제자리 수정)"""
+  for p in places:
+    d = details.get(p.get("id"))
+    if d:
+      for k, v in d.items():
+        p.setdefault(k, v)
+
+
+def print_two_phase_report(search_calls: int, detail_calls: int):
+  """같은 스윕을 풍부한 마스크로 돌렸다면(full) vs 2단계 — 상위 SKU 호출 수와 실제 전송량 비교"""
+  print(TRAFFIC.summary())
+  print(f"rich-field calls: full-mode sweep would be {search_calls} → two-phase {detail_calls} (details only)")
@@ -0,0 +1,327 @@
+# place_store.py
+# --------------
+# 파이프라인 공용 SQLite 저장소(수집 → 이메일 → 전화번호 단계가 같은 DB를 읽고 씀)
+# - places : place id 기준 한 행(기본 정보 + 이메일/전화번호 + 단계별 조회 상태)
+# - place_categories : (place id, 카테고리) 소속 — 한 장소가 여러 카테고리에 들어갈 수 있음
+#   (예: clinic/beauty 둘 다 beauty_salon → 마지막에 넣은 카테고리가 장소를 가져가지 않도록)
+#   places.category 는 처음 들어온 카테고리(참고용), 카테고리 필터는 모두 place_categories 기준
+# - emails : 장소별 이메일 주소(순위 포함)
+# - 인덱스: place id(PK), 웹사이트 도메인, 카테고리+이메일 상태, 카테고리+전화번호 상태
+# - upsert는 멱등: 같은 행을 여러 번 넣어도 결과 동일, 이미 조회된 이메일/전화번호는 덮어쓰지 않음
+# - 엑셀은 가져오기/내보내기 용도(기존 *_result.xlsx 컬럼 그대로)
+# - 각 단계는 자기가 처리할 행만 꺼내고(pending_*) 처리한 행만 바로 기록(set_*) → 통째 읽기/쓰기 없음
+#
+# 사용 예)
+#   python place_store.py import lawyer_result.xlsx
+#   python place_store.py export lawyer_view.xlsx --category lawyer
+#   python place_store.py stats
+
+import argparse
+import hashlib
+import math
+import os
+import sqlite3
+import time
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from urllib.parse import urlparse
+
+from url_canon import registrable_domain
+
+DEFAULT_STORE_PATH = "places.sqlite"
+
+# 기존 결과 엑셀 컬럼 순서
+XLSX_COLUMNS = ["회사명", "업종", "기본 유형", "주소", "우편주소", "이메일 주소", "전화번호", "웹사이트 주소", "위도", "경도"]
+
+# 이메일 단계 결과 문구(search_email / email_error_check 와 같음)
+EMAIL_ERROR_LABEL = "조회 중 오류"
+EMAIL_NONE_LABEL = "조회결과 없음"
+PLACEHOLDER = "-"
+
+# places 조회에 붙이는 카테고리 소속 조건(인자: 카테고리)
+IN_CATEGORY = " AND place_id IN (SELECT place_id FROM place_categories WHERE category = ?)"
+
+
+def _clean(v):
+  # pandas NaN / 빈 문자열 → None, 리스트/딕셔너리는 기존 엑셀처럼 문자열
+  if v is None:
+    return None
+  if isinstance(v, float) and math.isnan(v):
+    return None
+  if isinstance(v, (list, tuple, dict)):
+    return str(v)
+  if isinstance(v, str) and not v.strip():
+    return None
+  return v
+
+
+def category_of(xlsx_path: str) -> str:
+  """'lawyer_result.xlsx' / 'lawyer_collected.xlsx'(multi_category_collector) → 'lawyer' (카테고리 이름 = 결과 엑셀 이름)"""
+  stem = os.path.splitext(os.path.basename(xlsx_path))[0]
+  for suffix in ("_result", "_collected"):
+    if stem.endswith(suffix):
+      return stem[:-len(suffix)]
+  return stem
+
+
+def website_domain(url: Optional[str]) -> Optional[str]:
+  """웹사이트 → 기준 도메인(www 제거, co.uk 등 2단계 접미사 고려 — url_canon 과 같은 규칙)"""
+  if not url:
+    return None
+  host = urlparse(url if "://" in url else "http://" + url).netloc.lower().split(":")[0]
+  return registrable_domain(host) if host else None
+
+
+def row_place_id(row: Dict) -> str:
+  """place id가 없는 엑셀 행용 결정적 id(같은 행이면 항상 같은 id → 재가져오기 멱등)"""
+  key = "|".join(str(_clean(row.get(c)) or "") for c in ("회사명", "주소", "위도", "경도"))
+  return "xlsx:" + hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+
+
+def email_status(value: Optional[str], website: Optional[str]) -> str:
+  if value is None or value == PLACEHOLDER:
+    return "pending" if website else "no_website"
+  if value == EMAIL_ERROR_LABEL:
+    return "error"
+  if value == EMAIL_NONE_LABEL:
+    return "none"
+  return "found"
+
+
+class PlaceStore:
+  def __init__(self, path: str = DEFAULT_STORE_PATH):
+    self.path = path
+    self.conn = sqlite3.connect(path)
+    self.conn.execute("PRAGMA journal_mode=WAL")
+    self.conn.executescript("""
+      CREATE TABLE IF NOT EXISTS places (
+        place_id TEXT PRIMARY KEY,
+        category TEXT,
+        name TEXT,
+        types TEXT,
+        primary_type TEXT,
+        address TEXT,
+        postal_address TEXT,
+        website TEXT,
+        website_domain TEXT,
+        lat REAL,
+        lng REAL,
+        email TEXT,
+        email_status TEXT NOT NULL DEFAULT 'pending',
+        phone TEXT,
+        phone_status TEXT NOT NULL DEFAULT 'pending',
+        updated REAL
+      );
+      CREATE INDEX IF NOT EXISTS idx_places_domain ON places(website_domain);
+      CREATE INDEX IF NOT EXISTS idx_places_email ON places(category, email_status);
+      CREATE INDEX IF NOT EXISTS idx_places_phone ON places(category, phone_status);
+      CREATE TABLE IF NOT EXISTS emails (
+        place_id TEXT NOT NULL,
+        email TEXT NOT NULL,
+        rank INTEGER NOT NULL,
+        PRIMARY KEY (place_id, email)
+      );
+      CREATE INDEX IF NOT EXISTS idx_emails_email ON emails(email);
+      CREATE TABLE IF NOT EXISTS place_categories (
+        place_id TEXT NOT NULL,
+        category TEXT NOT NULL,
+        PRIMARY KEY (place_id, category)
+      );
+      CREATE INDEX IF NOT EXISTS idx_place_categories_category ON place_categories(category);
+      -- 소속 테이블 이전에 만든 DB: places.category 를 소속으로 옮김(멱등)
+      INSERT OR IGNORE INTO place_categories(place_id, category)
+        SELECT place_id, category FROM places WHERE category IS NOT NULL;
+    """)
+    self.conn.commit()
+
+  def close(self):
+    self.conn.commit()
+    self.conn.close()
+
+  # -----------------------
+  # 쓰기(수집 단계)
+  # -----------------------
+  def upsert_place(self, row: Dict, category: Optional[str] = None, place_id: Optional[str] = None,
+                   commit: bool = True) -> str:
+    """결과 엑셀 형식 한 행 upsert. 기본 정보는 갱신, 이미 채워진 이메일/전화번호는 유지"""
+    pid = place_id or row.get("id") or row_place_id(row)
+    website = _clean(row.get("웹사이트 주소"))
+    email = _clean(row.get("이메일 주소"))
+    phone = _clean(row.get("전화번호"))
+    if phone == PLACEHOLDER:
+      phone = None
+    self.conn.execute("""
+      INSERT INTO places(place_id, category, name, types, primary_type, address, postal_address,
+                         website, website_domain, lat, lng, email, email_status, phone, phone_status, updated)
+      VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+      ON CONFLICT(place_id) DO UPDATE SET
+        category = COALESCE(places.category, excluded.category),
+        name = excluded.name, types = excluded.types, primary_type = excluded.primary_type,
+        address = excluded.address, postal_address = excluded.postal_address,
+        website = excluded.website, website_domain = excluded.website_domain,
+        lat = excluded.lat, lng = excluded.lng,
+        email = CASE WHEN places.email_status IN ('pending', 'no_website') THEN excluded.email ELSE places.email END,
+        email_status = CASE WHEN places.email_status IN ('pending', 'no_website')
+                            THEN excluded.email_status ELSE places.email_status END,
+        phone = COALESCE(places.phone, excluded.phone),
+        phone_status = CASE WHEN places.phone_status = 'pending' THEN excluded.phone_status ELSE places.phone_status END,
+        updated = excluded.updated
+    """, (
+      pid, category, _clean(row.get("회사명")), _clean(row.get("업종")), _clean(row.get("기본 유형")),
+      _clean(row.get("주소")), _clean(row.get("우편주소")), website, website_domain(website),
+      _clean(row.get("위도")), _clean(row.get("경도")),
+      email if email != PLACEHOLDER else None, email_status(email, website),
+      phone, "found" if phone else "pending", time.time(),
+    ))
+    if category:
+      self.conn.execute("INSERT OR IGNORE INTO place_categories(place_id, category) VALUES (?, ?)", (pid, category))
+    if email and email_status(email, website) == "found":
+      cur = self.conn.execute("SELECT email FROM places WHERE place_id = ?", (pid,)).fetchone()
+      if cur and cur[0] == email:
+        self._replace_emails(pid, email)
+    if commit:
+      self.conn.commit()
+    return pid
+
+  def upsert_places(self, rows: Iterable[Dict], category: Optional[str] = None) -> int:
+    n = 0
+    with self.conn:
+      for row in rows:
+        self.upsert_place(row, category, commit=False)
+        n += 1
+    return n
+
+  # -----------------------
+  # 이메일 단계
+  # -----------------------
+  def pending_email(self, category: Optional[str] = None, status: str = "pending") -> List[Tuple[str, Optional[str]]]:
+    """(place_id, website) — 기본은 아직 조회 안 한 행, status='error'면 리트라이 대상"""
+    sql = "SELECT place_id, website FROM places WHERE email_status = ?"
+    args: List = [status]
+    if category:
+      sql += IN_CATEGORY
+      args.append(category)
+    return list(self.conn.execute(sql + " ORDER BY rowid", args))
+
+  def _replace_emails(self, place_id: str, joined: str):
+    self.conn.execute("DELETE FROM emails WHERE place_id = ?", (place_id,))
+    for rank, e in enumerate([e.strip() for e in joined.split(",") if e.strip()], 1):
+      self.conn.execute("INSERT OR IGNORE INTO emails(place_id, email, rank) VALUES (?, ?, ?)", (place_id, e, rank))
+
+  def set_email(self, place_id: str, value: str):
+    """이메일 단계 결과(콤마로 합친 Top N 또는 결과 문구) 한 행 기록 + 커밋"""
+    website = self.conn.execute("SELECT website FROM places WHERE place_id = ?", (place_id,)).fetchone()
+    status = email_status(value, website[0] if website else None)
+    if status == "pending":
+      status = "no_website"  # 단계가 '-'를 쓰는 건 사이트 정보가 없을 때뿐
+    with self.conn:
+      self.conn.execute("UPDATE places SET email = ?, email_status = ?, updated = ? WHERE place_id = ?",
+                        (value, status, time.time(), place_id))
+      if status == "found":
+        self._replace_emails(place_id, value)
+
+  # -----------------------
+  # 전화번호 단계
+  # -----------------------
+  def pending_phone(self, category: Optional[str] = None) -> List[Tuple[str, str, Optional[str]]]:
+    """(place_id, 회사명, 주소)"""
+    sql = "SELECT place_id, name, address FROM places WHERE phone_status = 'pending'"
+    args: List = []
+    if category:
+      sql += IN_CATEGORY
+      args.append(category)
+    return list(self.conn.execute(sql + " ORDER BY rowid", args))
+
+  def set_phone(self, place_id: str, phone: str):
+    with self.conn:
+      self.conn.execute("UPDATE places SET phone = ?, phone_status = ?, updated = ? WHERE place_id = ?",
+                        (phone or None, "found" if phone else "none", time.time(), place_id))
+
+  # -----------------------
+  # 엑셀 가져오기 / 내보내기
+  # -----------------------
+  def import_xlsx(self, xlsx_path: str, category: Optional[str] = None) -> int:
+    import pandas as pd
+    df = pd.read_excel(xlsx_path)
+    n = self.upsert_places(df.to_dict("records"), category or category_of(xlsx_path))
+    print(f"[store] import {xlsx_path} → {n} rows (category={category or category_of(xlsx_path)})")
+    return n
+
+  def ensure_imported(self, xlsx_path: str, category: Optional[str] = None) -> str:
+    """카테고리 행이 하나도 없으면 엑셀에서 가져옴. 카테고리 이름 반환"""
+    category = category or category_of(xlsx_path)
+    if self.count(category) == 0 and os.path.exists(xlsx_path):
+      self.import_xlsx(xlsx_path, category)
+    return category
+
+  def count(self, category: Optional[str] = None) -> int:
+    if category:
+      return self.conn.execute("SELECT COUNT(*) FROM place_categories WHERE category = ?", (category,)).fetchone()[0]
+    return self.conn.execute("SELECT COUNT(*) FROM places").fetchone()[0]
+
+  def iter_rows(self, category: Optional[str] = None) -> Iterator[Dict]:
+    """기존 결과 엑셀 형식의 행(입력 순서)"""
+    sql = ("SELECT name, types, primary_type, address, postal_address, email, phone, website, lat, lng "
+           "FROM places")
+    args: List = []
+    if category:
+      sql += " WHERE 1" + IN_CATEGORY
+      args.append(category)
+    for r in self.conn.execute(sql + " ORDER BY rowid", args):
+      vals = list(r)
+      vals[5] = vals[5] if vals[5] is not None else PLACEHOLDER
+      vals[6] = vals[6] if vals[6] is not None else PLACEHOLDER
+      yield dict(zip(XLSX_COLUMNS, vals))
+
+  def export_xlsx(self, xlsx_path: str, category: Optional[str] = None) -> int:
+    from openpyxl import Workbook
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Sheet1")
+    ws.append(XLSX_COLUMNS)
+    n = 0
+    for row in self.iter_rows(category):
+      ws.append([row[c] for c in XLSX_COLUMNS])
+      n += 1
+    wb.save(xlsx_path)
+    print(f"[store] export → {xlsx_path} ({n} rows)")
+    return n
+
+  def stats(self) -> List[Tuple]:
+    return list(self.conn.execute("""
+      SELECT c.category, COUNT(*),
+             SUM(p.email_status = 'found'), SUM(p.email_status = 'pending'), SUM(p.email_status = 'error'),
+             SUM(p.phone_status = 'found'), SUM(p.phone_status = 'pending')
+      FROM place_categories c JOIN places p ON p.place_id = c.place_id
+      GROUP BY c.category ORDER BY c.category
+    """))
+
+
+def main():
+  parser = argparse.ArgumentParser(description="장소 SQLite 저장소 — 엑셀 가져오기/내보내기/현황")
+  parser.add_argument("--store", default=DEFAULT_STORE_PATH)
+  sub = parser.add_subparsers(dest="cmd", required=True)
+  p_imp = sub.add_parser("import")
+  p_imp.add_argument("xlsx", nargs="+")
+  p_imp.add_argument("--category", default=None, help="기본: 파일 이름(lawyer_result.xlsx → lawyer)")
+  p_exp = sub.add_parser("export")
+  p_exp.add_argument("xlsx")
+  p_exp.add_argument("--category", default=None)
+  sub.add_parser("stats")
+  args = parser.parse_args()
+
+  store = PlaceStore(args.store)
+  try:
+    if args.cmd == "import":
+      for path in args.xlsx:
+        store.import_xlsx(path, args.category)
+    elif args.cmd == "export":
+      store.export_xlsx(args.xlsx, args.category)
+    else:
+      print(f"{'category':<12}{'places':>8}{'email✓':>8}{'email…':>8}{'email✗':>8}{'phone✓':>8}{'phone…':>8}")
+      for row in store.stats():
+        print(f"{str(row[0]):<12}" + "".join(f"{v or 0:>8}" for v in row[1:]))
+  finally:
+    store.close()
+
+
+if __name__ == "__main__":
+  main()
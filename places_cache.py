@@ -0,0 +1,204 @@
+# places_cache.py
+# ---------------
+# Places API 응답 디스크 캐시(SQLite 한 파일)
+# - 키: sha256(엔드포인트 + JSON payload(pageToken 포함) + X-Goog-FieldMask) → 내용 주소 방식
+# - TTL 지난 항목은 online 모드에서 미스로 처리
+# - 전체 크기가 상한을 넘으면 오래 안 쓴 항목부터 삭제(LRU)
+# - 모드(환경변수 PLACES_CACHE_MODE 또는 set_mode)
+#     online : 캐시 우선, 없으면 실제 호출 후 저장(기본)
+#     replay : 캐시에서만 응답(오프라인, API 비용 0) — 없으면 CacheMiss
+#     off    : 캐시 미사용
+#     refresh: 읽지 않고 항상 실제 호출, 응답은 저장(recrawl.py refresh — 지난 응답 때문에 변화를 놓치지 않게)
+# - 페이지 체인: 캐시에서 꺼낸 페이지의 nextPageToken 은 이미 만료됐을 수 있음(다음 페이지만 캐시에 없을 때)
+#   → 그 토큰으로 한 실제 호출이 400 이면 체인(1페이지~그 페이지) 캐시를 지우고 StalePageToken
+#   → page_pipeline 체인이 1페이지부터 다시 받음(새 토큰)
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Callable, Dict, Optional
+
+import requests
+
+CACHE_PATH = os.environ.get("PLACES_CACHE_PATH", "places_cache.sqlite")
+CACHE_MODE = os.environ.get("PLACES_CACHE_MODE", "online")
+CACHE_TTL_S = 30 * 24 * 3600.0          # 30일
+CACHE_MAX_BYTES = 512 * 1024 * 1024     # 512MB(압축 후 기준)
+
+MODES = ("online", "replay", "off", "refresh")
+
+
+class CacheMiss(KeyError):
+  """replay 모드에서 캐시에 없는 호출을 만났을 때"""
+
+
+class StalePageToken(Exception):
+  """캐시에서 꺼낸 nextPageToken 이 만료(400) — 체인을 1페이지부터 다시 받아야 함"""
+
+
+def make_key(url: str, payload: Dict, field_mask: str) -> str:
+  # API 키 등 나머지 헤더는 응답 내용과 무관하므로 키에서 제외
+  raw = json.dumps(
+    {"url": url, "payload": payload, "fieldMask": field_mask},
+    sort_keys=True, separators=(",", ":"), ensure_ascii=False
+  )
+  return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+  def __init__(self, path: str = CACHE_PATH, mode: str = CACHE_MODE,
+               ttl_s: float = CACHE_TTL_S, max_bytes: int = CACHE_MAX_BYTES):
+    if mode not in MODES:
+      raise ValueError(f"알 수 없는 캐시 모드: {mode} (가능: {MODES})")
+    self.path = path
+    self.mode = mode
+    self.ttl_s = ttl_s
+    self.max_bytes = max_bytes
+    self.hits = 0
+    self.misses = 0
+    self.stores = 0
+    self.evicted = 0
+    self.stale_chains = 0
+    self._served_tokens = set()  # 캐시 적중 응답에서 넘겨준 nextPageToken(만료됐을 수 있음)
+    self._lock = threading.Lock()
+    self._conn: Optional[sqlite3.Connection] = None
+    self._total_bytes = 0
+
+  def _db(self) -> sqlite3.Connection:
+    if self._conn is None:
+      conn = sqlite3.connect(self.path, check_same_thread=False)
+      conn.execute("""
+        CREATE TABLE IF NOT EXISTS responses (
+          key TEXT PRIMARY KEY,
+          url TEXT NOT NULL,
+          body BLOB NOT NULL,
+          size INTEGER NOT NULL,
+          created REAL NOT NULL,
+          accessed REAL NOT NULL
+        )
+      """)
+      conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_accessed ON responses(accessed)")
+      conn.commit()
+      self._total_bytes = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+      self._conn = conn
+    return self._conn
+
+  def get(self, key: str) -> Optional[Dict]:
+    if self.mode in ("off", "refresh"):
+      return None
+    with self._lock:
+      row = self._db().execute("SELECT body, created FROM responses WHERE key = ?", (key,)).fetchone()
+      now = time.time()
+      # replay는 오프라인 재현용이므로 TTL 무시
+      if row is None or (self.mode == "online" and now - row[1] > self.ttl_s):
+        self.misses += 1
+        return None
+      self._db().execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+      self._db().commit()
+      self.hits += 1
+    data = json.loads(zlib.decompress(row[0]).decode("utf-8"))
+    if data.get("nextPageToken"):
+      with self._lock:
+        self._served_tokens.add(data["nextPageToken"])
+    return data
+
+  def served_token(self, token: Optional[str]) -> bool:
+    with self._lock:
+      return bool(token) and token in self._served_tokens
+
+  def invalidate_chain(self, url: str, payload: Dict, field_mask: str):
+    """payload(pageToken 포함) 에 이르는 체인의 캐시 항목(1페이지~토큰을 준 페이지) 삭제"""
+    token = payload.get("pageToken")
+    base = {k: v for k, v in payload.items() if k != "pageToken"}
+    key = make_key(url, base, field_mask)
+    with self._lock:
+      db = self._db()
+      for _ in range(100):  # 체인 길이 상한(순환 방지)
+        row = db.execute("SELECT body, size FROM responses WHERE key = ?", (key,)).fetchone()
+        if row is None:
+          break
+        db.execute("DELETE FROM responses WHERE key = ?", (key,))
+        self._total_bytes -= row[1]
+        nxt = json.loads(zlib.decompress(row[0]).decode("utf-8")).get("nextPageToken")
+        self._served_tokens.discard(nxt)
+        if not nxt or nxt == token:
+          break
+        key = make_key(url, dict(base, pageToken=nxt), field_mask)
+      db.commit()
+      self.stale_chains += 1
+
+  def put(self, key: str, url: str, data: Dict):
+    if self.mode not in ("online", "refresh"):
+      return
+    body = zlib.compress(json.dumps(data, ensure_ascii=False).encode("utf-8"))
+    now = time.time()
+    with self._lock:
+      db = self._db()
+      old = db.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+      db.execute(
+        "INSERT OR REPLACE INTO responses(key, url, body, size, created, accessed) VALUES (?, ?, ?, ?, ?, ?)",
+        (key, url, body, len(body), now, now)
+      )
+      self._total_bytes += len(body) - (old[0] if old else 0)
+      self.stores += 1
+      if self._total_bytes > self.max_bytes:
+        self._evict(db)
+      db.commit()
+
+  def _evict(self, db: sqlite3.Connection):
+    # 상한의 90%까지 LRU 순으로 삭제
+    target = int(self.max_bytes * 0.9)
+    for key, size in db.execute("SELECT key, size FROM responses ORDER BY accessed").fetchall():
+      if self._total_bytes <= target:
+        break
+      db.execute("DELETE FROM responses WHERE key = ?", (key,))
+      self._total_bytes -= size
+      self.evicted += 1
+
+  def summary(self) -> str:
+    return (f"cache mode={self.mode} hits={self.hits} misses={self.misses} "
+            f"stored={self.stores} evicted={self.evicted} stale_chains={self.stale_chains} size={self._total_bytes / 1e6:.1f}MB")
+
+
+_CACHE: Optional[ResponseCache] = None
+
+
+def get_cache() -> ResponseCache:
+  global _CACHE
+  if _CACHE is None:
+    _CACHE = ResponseCache()
+  return _CACHE
+
+
+def set_mode(mode: str, path: Optional[str] = None):
+  """스크립트/도구에서 캐시 모드를 바꿀 때(예: query_optimizer --replay)"""
+  global _CACHE
+  _CACHE = ResponseCache(path=path or CACHE_PATH, mode=mode)
+
+
+def cached_call(url: str, payload: Dict, field_mask: str, fetch: Callable[[], Dict]) -> Dict:
+  """
+  캐시에 있으면 그대로 반환, 없으면 fetch()(실제 HTTP 호출, 각 수집기 고유 에러 처리 포함)
+  결과를 저장 후 반환. replay 모드에서 없으면 CacheMiss.
+  캐시에서 받은 nextPageToken 으로 한 호출이 400 이면 체인 캐시를 지우고 StalePageToken.
+  """
+  cache = get_cache()
+  key = make_key(url, payload, field_mask)
+  hit = cache.get(key)
+  if hit is not None:
+    return hit
+  if cache.mode == "replay":
+    raise CacheMiss(f"replay 모드 캐시 미스: {url} {json.dumps(payload, ensure_ascii=False)[:200]}")
+  try:
+    data = fetch()
+  except requests.HTTPError as e:
+    if e.response is not None and e.response.status_code == 400 and cache.served_token(payload.get("pageToken")):
+      cache.invalidate_chain(url, payload, field_mask)
+      raise StalePageToken(f"만료된 캐시 페이지 토큰: {url} — 체인을 1페이지부터 다시 받음") from e
+    raise
+  cache.put(key, url, data)
+  return data
@@ -0,0 +1,296 @@
+# places_http.py
+# --------------
+# Places API 호출 공용 요청 계층(검색/상세 모든 수집기가 공유)
+# - 429 / 5xx / 연결 오류·타임아웃은 재시도: 지수 백오프 + full jitter, 서버가 준 Retry-After(초/HTTP 날짜) 우선
+# - 동시 호출 수를 AIMD로 조절: 성공마다 +1/limit(가산 증가), 429·5xx는 ×DECREASE_FACTOR(곱셈 감소),
+#   지연이 기준(관측 최저 EWMA)의 LATENCY_SLOWDOWN 배를 넘으면 ×LATENCY_DECREASE_FACTOR
+#   → 스레드 풀(TILE_WORKERS/DETAILS_WORKERS)은 상한, 실제 동시 호출은 쿼터에 맞춰 스스로 줄고 늘어남
+# - 서킷 브레이커(5xx/연결 오류만 — 429는 쿼터 신호라 백오프+AIMD로 처리):
+#   연속 실패 FAILURE_THRESHOLD 번 → OPEN(모든 호출 대기) → COOLDOWN_S 후 HALF-OPEN(탐침 1개)
+#   → 성공이면 CLOSED, 실패면 다시 OPEN(대기 시간 2배, 최대 MAX_COOLDOWN_S). 총 MAX_OPEN_S 넘게 막혀 있으면 CircuitOpenError
+# - 400/403/404 같은 요청 오류는 재시도하지 않고 그대로 raise_for_status()
+# - 토큰 버킷(rate_limiter)은 재시도마다 다시 acquire → 재시도도 QPS/QPM 한도 안에서
+# - 시도마다 엔드포인트별 지연 히스토그램 / 응답 코드 / 재시도 대기 시간을 crawl_metrics.METRICS 에 기록
+
+import email.utils
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+import requests
+
+from crawl_metrics import METRICS
+from rate_limiter import TokenBucket
+
+RETRY_STATUS = {429, 500, 502, 503, 504}
+MAX_RETRIES = 6
+BACKOFF_BASE_S = 0.5
+BACKOFF_MAX_S = 30.0
+RETRY_AFTER_MAX_S = 120.0
+
+# 동시성(AIMD)
+INITIAL_CONCURRENCY = 4
+MAX_CONCURRENCY = 32
+DECREASE_FACTOR = 0.5
+LATENCY_SLOWDOWN = 3.0           # 지연이 기준의 이 배수를 넘으면 감속
+LATENCY_DECREASE_FACTOR = 0.9
+DECREASE_INTERVAL_S = 1.0        # 감소는 이 간격에 한 번만(같은 폭주에 여러 번 반으로 줄지 않게)
+
+# 서킷 브레이커
+FAILURE_THRESHOLD = 5
+COOLDOWN_S = 5.0
+MAX_COOLDOWN_S = 60.0
+MAX_OPEN_S = 600.0
+
+
+class CircuitOpenError(requests.RequestException):
+  """서킷이 너무 오래 열려 있음(쿼터 소진/장애) → 수집기의 중단 경로(체크포인트 저장)로"""
+
+
+def endpoint_name(url: str) -> str:
+  """URL → 메트릭 라벨(searchText / searchNearby / details / 기타는 경로 마지막 조각)"""
+  path = url.split("?")[0]
+  m = re.search(r"places:(\w+)$", path)
+  if m:
+    return m.group(1)
+  if re.search(r"/places/[^/]+$", path):
+    return "details"
+  return path.rstrip("/").rsplit("/", 1)[-1] or "unknown"
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+  """Retry-After: 초 단위 숫자 또는 HTTP 날짜 → 대기 초(없거나 이상하면 None)"""
+  if not value:
+    return None
+  value = value.strip()
+  try:
+    return max(0.0, float(value))
+  except ValueError:
+    pass
+  try:
+    when = email.utils.parsedate_to_datetime(value)
+  except (TypeError, ValueError):
+    return None
+  if when is None:
+    return None
+  return max(0.0, when.timestamp() - time.time())
+
+
+def backoff_delay(attempt: int, base: float = BACKOFF_BASE_S, cap: float = BACKOFF_MAX_S) -> float:
+  """full jitter: [0, min(cap, base·2^attempt)] 균등"""
+  return random.uniform(0.0, min(cap, base * (2 ** attempt)))
+
+
+class AdaptiveConcurrency:
+  def __init__(self, initial: float = INITIAL_CONCURRENCY, min_limit: float = 1.0, max_limit: float = MAX_CONCURRENCY):
+    self._cond = threading.Condition()
+    self.limit = float(initial)
+    self.min_limit = float(min_limit)
+    self.max_limit = float(max_limit)
+    self.in_flight = 0
+    self._last_decrease = 0.0
+    self._ewma: Optional[float] = None
+    self._baseline: Optional[float] = None
+    self.decreases = 0
+    self.peak = self.limit
+
+  @contextmanager
+  def slot(self):
+    with self._cond:
+      while self.in_flight >= max(1, int(self.limit)):
+        self._cond.wait()
+      self.in_flight += 1
+    try:
+      yield
+    finally:
+      with self._cond:
+        self.in_flight -= 1
+        self._cond.notify()
+
+  def _decrease(self, factor: float):
+    # 호출부에서 self._cond 보유
+    now = time.monotonic()
+    if now - self._last_decrease < DECREASE_INTERVAL_S:
+      return
+    self._last_decrease = now
+    self.limit = max(self.min_limit, self.limit * factor)
+    self.decreases += 1
+
+  def on_success(self, latency_s: float):
+    with self._cond:
+      self._ewma = latency_s if self._ewma is None else 0.8 * self._ewma + 0.2 * latency_s
+      self._baseline = self._ewma if self._baseline is None else min(self._baseline, self._ewma)
+      if self._ewma > LATENCY_SLOWDOWN * self._baseline:
+        self._decrease(LATENCY_DECREASE_FACTOR)
+      else:
+        self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+        self.peak = max(self.peak, self.limit)
+      self._cond.notify_all()
+
+  def on_overload(self):
+    with self._cond:
+      self._decrease(DECREASE_FACTOR)
+
+
+class CircuitBreaker:
+  def __init__(self, failure_threshold: int = FAILURE_THRESHOLD, cooldown_s: float = COOLDOWN_S,
+               max_cooldown_s: float = MAX_COOLDOWN_S, max_open_s: float = MAX_OPEN_S):
+    self._cond = threading.Condition()
+    self.failure_threshold = failure_threshold
+    self.base_cooldown_s = cooldown_s
+    self.cooldown_s = cooldown_s
+    self.max_cooldown_s = max_cooldown_s
+    self.max_open_s = max_open_s
+    self.state = "closed"
+    self.failures = 0
+    self.opened_at = 0.0
+    self.open_since: Optional[float] = None   # 처음 열린 시각(연속으로 열려 있는 총 시간 계산)
+    self._probe = False
+    self.opens = 0
+
+  def wait_ready(self):
+    """호출 가능할 때까지 대기(OPEN이면 쿨다운, HALF-OPEN이면 탐침 하나만 통과)"""
+    with self._cond:
+      while True:
+        if self.state == "closed":
+          return
+        now = time.monotonic()
+        if self.open_since is not None and now - self.open_since > self.max_open_s:
+          raise CircuitOpenError(f"circuit open for {now - self.open_since:.0f}s")
+        if self.state == "open" and now - self.opened_at >= self.cooldown_s:
+          self.state = "half_open"
+        if self.state == "half_open" and not self._probe:
+          self._probe = True
+          return
+        remaining = self.cooldown_s - (now - self.opened_at) if self.state == "open" else 1.0
+        self._cond.wait(max(0.05, remaining))
+
+  def record_success(self):
+    with self._cond:
+      self.failures = 0
+      if self.state != "closed":
+        self.state = "closed"
+        self.cooldown_s = self.base_cooldown_s
+        self.open_since = None
+        self._cond.notify_all()
+      self._probe = False
+
+  def record_failure(self):
+    with self._cond:
+      self.failures += 1
+      if self.state == "half_open":
+        self.cooldown_s = min(self.max_cooldown_s, self.cooldown_s * 2)
+        self._open()
+      elif self.state == "closed" and self.failures >= self.failure_threshold:
+        self._open()
+      self._probe = False
+      self._cond.notify_all()
+
+  def abandon(self):
+    """예상 밖 예외로 결과를 못 알린 호출 → 탐침 자리만 반납"""
+    with self._cond:
+      self._probe = False
+      self._cond.notify_all()
+
+  def _open(self):
+    self.state = "open"
+    self.opened_at = time.monotonic()
+    if self.open_since is None:
+      self.open_since = self.opened_at
+    self.opens += 1
+    print(f"[http] circuit OPEN for {self.cooldown_s:.1f}s (consecutive failures={self.failures})")
+
+
+class PlacesClient:
+  def __init__(self, max_retries: int = MAX_RETRIES, concurrency: Optional[AdaptiveConcurrency] = None,
+               breaker: Optional[CircuitBreaker] = None):
+    self.max_retries = max_retries
+    self.concurrency = concurrency or AdaptiveConcurrency()
+    self.breaker = breaker or CircuitBreaker()
+    self._lock = threading.Lock()
+    self.stats: Dict[str, float] = {"requests": 0, "retries": 0, "throttled": 0, "server_errors": 0,
+                                    "network_errors": 0, "backoff_s": 0.0}
+
+  def _count(self, key: str, n: float = 1):
+    with self._lock:
+      self.stats[key] += n
+
+  def request(self, method: str, url: str, session: Optional[requests.Session] = None,
+              limiter: Optional[TokenBucket] = None, **kwargs) -> requests.Response:
+    """재시도/동시성/서킷 브레이커를 거친 요청. 성공 응답을 반환, 재시도 불가 오류나 재시도 소진은 예외"""
+    send = session.request if session is not None else requests.request
+    endpoint = endpoint_name(url)
+    for attempt in range(self.max_retries + 1):
+      self.breaker.wait_ready()
+      res, err = None, None
+      with self.concurrency.slot():
+        if limiter is not None:
+          limiter.acquire()
+        t0 = time.monotonic()
+        try:
+          res = send(method, url, **kwargs)
+        except (requests.ConnectionError, requests.Timeout) as e:
+          err = e
+        except BaseException:
+          self.breaker.abandon()
+          raise
+        latency = time.monotonic() - t0
+      self._count("requests")
+      METRICS.observe("places_http_request_seconds", latency, {"endpoint": endpoint},
+                      help_text="Places API 요청 지연(재시도 시도마다)")
+      METRICS.inc("places_http_responses_total",
+                  {"endpoint": endpoint, "code": res.status_code if res is not None else "network_error"},
+                  help_text="응답 코드별 요청 수")
+
+      if res is not None and res.status_code not in RETRY_STATUS:
+        # 성공 또는 재시도해도 소용없는 요청 오류(400/403/404…) — 서버는 정상
+        self.breaker.record_success()
+        if res.status_code < 400:
+          self.concurrency.on_success(latency)
+        res.raise_for_status()
+        return res
+
+      self.concurrency.on_overload()
+      if res is not None and res.status_code == 429:
+        # 서버는 살아 있음(쿼터 초과) → 서킷은 그대로, 탐침이었다면 성공으로
+        self._count("throttled")
+        self.breaker.record_success()
+      else:
+        self._count("network_errors" if res is None else "server_errors")
+        self.breaker.record_failure()
+
+      if attempt >= self.max_retries:
+        if err is not None:
+          raise err
+        res.raise_for_status()
+
+      retry_after = parse_retry_after(res.headers.get("Retry-After")) if res is not None else None
+      delay = min(retry_after, RETRY_AFTER_MAX_S) if retry_after is not None else backoff_delay(attempt)
+      self._count("retries")
+      self._count("backoff_s", delay)
+      METRICS.inc("places_http_backoff_seconds_total", {"endpoint": endpoint}, delay, "재시도 대기 시간 합")
+      time.sleep(delay)
+    raise AssertionError("unreachable")
+
+  def post(self, url: str, session: Optional[requests.Session] = None, limiter: Optional[TokenBucket] = None,
+           **kwargs) -> requests.Response:
+    return self.request("POST", url, session=session, limiter=limiter, **kwargs)
+
+  def get(self, url: str, session: Optional[requests.Session] = None, limiter: Optional[TokenBucket] = None,
+          **kwargs) -> requests.Response:
+    return self.request("GET", url, session=session, limiter=limiter, **kwargs)
+
+  def summary(self) -> str:
+    with self._lock:
+      s = dict(self.stats)
+    c = self.concurrency
+    return (f"http requests={s['requests']:.0f} retries={s['retries']:.0f} (429={s['throttled']:.0f} "
+            f"5xx={s['server_errors']:.0f} network={s['network_errors']:.0f}) backoff={s['backoff_s']:.1f}s "
+            f"concurrency={c.limit:.1f} (peak {c.peak:.1f}, decreases={c.decreases}) circuit_opens={self.breaker.opens}")
+
+
+# 모든 수집기/Details가 공유(같은 API 키 = 같은 쿼터)
+PLACES_HTTP = PlacesClient()
@@ -0,0 +1,154 @@
+# query_optimizer.py
+# ------------------
+# 텍스트 쿼리 목록 최적화 도구
+# - 파일럿 지역을 겹치지 않는 사각형 타일로 나누고, 후보 쿼리마다 따로 끝까지 수집(text_api_search와 같은 필터)
+# - 쿼리별 고유 장소 수 / 한계 기여도(그 쿼리만 찾은 장소) / 겹침 행렬 계산
+# - 호출당 새 장소가 가장 많은 쿼리부터 고르는 탐욕법으로 목표 recall을 채우는 최소 쿼리 집합 산출
+# - 응답은 places_cache를 거치므로 한 번 수집한 파일럿은 --replay 로 비용 없이 다시 분석 가능
+# - 결과 JSON → 수집기에서 QUERY_SET_PATH(또는 --query-set)로 불러 하드코딩 목록 대신 사용
+#
+# 사용 예)
+#   python query_optimizer.py --target-recall 0.95 --out query_set.json
+#   python query_optimizer.py --replay --target-recall 0.9
+
+import argparse
+import json
+from typing import Dict, List, Optional, Set, Tuple
+
+
+def load_query_set(path: Optional[str], default: List[str]) -> List[str]:
+  """query_set.json 의 queries 를 읽음. path가 없으면 default 그대로"""
+  if not path:
+    return default
+  with open(path, encoding="utf-8") as f:
+    data = json.load(f)
+  queries = data.get("queries") if isinstance(data, dict) else data
+  if not queries:
+    raise ValueError(f"쿼리 목록이 비어 있습니다: {path}")
+  print(f"[query-set] {path} → {len(queries)} queries")
+  return list(queries)
+
+
+def candidate_queries(source: str) -> List[str]:
+  """수집기들의 하드코딩 목록에서 후보 쿼리(대소문자 무시 중복 제거)"""
+  lists = []
+  if source in ("text_api_search", "both"):
+    import text_api_search
+    lists.append(text_api_search.CREATIVE_QUERIES)
+  if source in ("text_api_search2", "both"):
+    import text_api_search2
+    lists.append(text_api_search2.CREATIVE_QUERIES)
+  seen, out = set(), []
+  for qs in lists:
+    for q in qs:
+      if q.lower() not in seen:
+        seen.add(q.lower())
+        out.append(q)
+  return out
+
+
+def measure_queries(queries: List[str], lat: float, lng: float, radius_m: float,
+                    cell_m: float) -> Tuple[Dict[str, Set[str]], Dict[str, int]]:
+  """파일럿 지역에서 쿼리별 (장소 id 집합, 사용 호출 수)"""
+  import text_api_search as tas
+
+  tiles = tas.build_rect_grid_plan(lat, lng, radius_m, cell_m)
+  print(f"[pilot] tiles={len(tiles)} queries={len(queries)}")
+  ids: Dict[str, Set[str]] = {}
+  calls: Dict[str, int] = {}
+  for q in queries:
+    ids[q] = set()
+    calls[q] = 0
+    for t in tiles:
+      tlat, tlng = t["center"]
+      places, _, _, _, used, _ = tas.search_text_tile(tlat, tlng, t["radius"], [q], None, rect=t["rect"])
+      for p in places:
+        loc = p.get("location") or {}
+        # 파일럿 원 안의 장소만 집계(격자 모서리 제외)
+        if p.get("id") and tas.haversine_meters(lat, lng, loc["latitude"], loc["longitude"]) <= radius_m:
+          ids[q].add(p["id"])
+      calls[q] += used
+    print(f"  {q!r}: unique={len(ids[q])} calls={calls[q]}")
+  return ids, calls
+
+
+def overlap_matrix(ids: Dict[str, Set[str]]) -> Dict[str, Dict[str, float]]:
+  """overlap[a][b] = |A∩B| / |A| (a가 찾은 것 중 b도 찾은 비율)"""
+  return {
+    a: {b: (len(ids[a] & ids[b]) / len(ids[a]) if ids[a] else 0.0) for b in ids}
+    for a in ids
+  }
+
+
+def greedy_select(ids: Dict[str, Set[str]], calls: Dict[str, int], target_recall: float) -> Tuple[List[str], float]:
+  """호출당 새 장소 수가 큰 순으로 골라 전체 합집합 대비 recall이 목표에 닿으면 중단"""
+  universe: Set[str] = set().union(*ids.values()) if ids else set()
+  if not universe:
+    return [], 0.0
+  covered: Set[str] = set()
+  selected: List[str] = []
+  remaining = [q for q in ids]
+  while remaining and len(covered) / len(universe) < target_recall:
+    best = max(remaining, key=lambda q: (len(ids[q] - covered) / max(calls[q], 1), -calls[q]))
+    if not ids[best] - covered:
+      break
+    selected.append(best)
+    covered |= ids[best]
+    remaining.remove(best)
+    print(f"  + {best!r} → recall={len(covered) / len(universe):.3f}")
+  return selected, len(covered) / len(universe)
+
+
+def main():
+  import text_api_search as tas
+
+  parser = argparse.ArgumentParser(description="파일럿 지역 기반 텍스트 쿼리 집합 최적화")
+  parser.add_argument("--source", choices=["text_api_search", "text_api_search2", "both"], default="both")
+  parser.add_argument("--lat", type=float, default=tas.START_LAT)
+  parser.add_argument("--lng", type=float, default=tas.START_LNG)
+  parser.add_argument("--radius", type=float, default=tas.PILOT_RADIUS_M, help="파일럿 반경(m)")
+  parser.add_argument("--cell", type=float, default=2 * tas.MAX_CELL_RADIUS, help="파일럿 사각형 타일 한 변(m)")
+  parser.add_argument("--target-recall", type=float, default=0.95)
+  parser.add_argument("--out", default="query_set.json")
+  parser.add_argument("--replay", action="store_true", help="캐시에서만 응답(API 호출 없음)")
+  args = parser.parse_args()
+
+  if args.replay:
+    import places_cache
+    places_cache.set_mode("replay")
+
+  queries = candidate_queries(args.source)
+  ids, calls = measure_queries(queries, args.lat, args.lng, args.radius, args.cell)
+  universe = set().union(*ids.values()) if ids else set()
+  others = {q: set().union(*(ids[o] for o in ids if o != q)) for q in ids}
+  overlap = overlap_matrix(ids)
+
+  print("\n=== PER-QUERY ===")
+  print(f"{'query':<32}{'unique':>8}{'marginal':>10}{'calls':>7}")
+  for q in queries:
+    print(f"{q:<32}{len(ids[q]):>8}{len(ids[q] - others[q]):>10}{calls[q]:>7}")
+
+  print(f"\n=== GREEDY (target recall {args.target_recall}) ===")
+  selected, recall = greedy_select(ids, calls, args.target_recall)
+  total_calls = sum(calls.values())
+  sel_calls = sum(calls[q] for q in selected)
+  print(f"selected={len(selected)}/{len(queries)} recall={recall:.3f} "
+        f"pilot calls {total_calls} → {sel_calls} ({sel_calls / max(total_calls, 1):.0%})")
+
+  with open(args.out, "w", encoding="utf-8") as f:
+    json.dump({
+      "queries": selected,
+      "target_recall": args.target_recall,
+      "achieved_recall": recall,
+      "pilot": {"lat": args.lat, "lng": args.lng, "radius_m": args.radius, "cell_m": args.cell},
+      "universe": len(universe),
+      "per_query": {
+        q: {"unique": len(ids[q]), "marginal": len(ids[q] - others[q]), "calls": calls[q]} for q in queries
+      },
+      "overlap": overlap,
+    }, f, ensure_ascii=False, indent=2)
+  print(f"Saved query set -> {args.out}")
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,57 @@
+# rate_limiter.py
+# ---------------
+# Places API 호출용 토큰 버킷
+# - 초당(QPS) / 분당(QPM) 한도를 동시에 만족할 때만 토큰 발급
+# - 여러 스레드가 하나의 버킷을 공유해도 안전(threading.Lock)
+# - acquire()는 토큰이 생길 때까지 블로킹(고정 time.sleep 대체)
+
+import threading
+import time
+from typing import List, Optional
+
+
+class TokenBucket:
+  """
+  qps / qpm 중 None인 쪽은 제한하지 않음(둘 다 None이면 항상 즉시 통과).
+  - 초당 버킷 용량 = burst(기본: qps, 최소 1)
+  - 분당 버킷 용량 = qpm (분 단위 쿼터를 한 번에 몰아 쓰는 것은 초당 버킷이 막음)
+  """
+
+  def __init__(self, qps: Optional[float] = None, qpm: Optional[float] = None, burst: Optional[float] = None):
+    self._lock = threading.Lock()
+    # [초당 충전량, 용량, 현재 토큰]
+    self._buckets: List[List[float]] = []
+    if qps:
+      cap = float(burst) if burst else max(1.0, float(qps))
+      self._buckets.append([float(qps), cap, cap])
+    if qpm:
+      cap = max(1.0, float(qpm))
+      self._buckets.append([float(qpm) / 60.0, cap, cap])
+    self._last = time.monotonic()
+    self.acquired = 0
+    self.waited_s = 0.0
+
+  def _refill(self, now: float):
+    elapsed = now - self._last
+    self._last = now
+    if elapsed <= 0:
+      return
+    for b in self._buckets:
+      b[2] = min(b[1], b[2] + elapsed * b[0])
+
+  def acquire(self, n: float = 1.0):
+    """토큰 n개를 얻을 때까지 대기"""
+    started = time.monotonic()
+    while True:
+      with self._lock:
+        now = time.monotonic()
+        self._refill(now)
+        if all(b[2] >= n for b in self._buckets):
+          for b in self._buckets:
+            b[2] -= n
+          self.acquired += 1
+          self.waited_s += now - started
+          return
+        # 가장 늦게 차는 버킷 기준으로 대기 시간 계산
+        wait_s = max((n - b[2]) / b[0] for b in self._buckets if b[2] < n)
+      time.sleep(max(wait_s, 0.001))
@@ -0,0 +1,388 @@
+# recrawl.py
+# ----------
+# 증분 재수집: 지난 수집의 '잎 타일'만 다시 조회하고, 새로 포화된 곳만 다시 내려감
+# - 수집기(text_api_search / nearby_api_search)가 끝날 때 LEAVES_PATH(JSON)에 저장
+#   · 잎 = 더 분할되지 않고 끝난 타일(파일럿 포함) → 타일 + 결과 id 목록 / 개수 / 포화 여부 / 지문(sha1)
+#   · 결과 장소 전체 + 예산 때문에 못 돈 대기 타일(pending)도 함께 → 다음 refresh 의 기준
+# - refresh: 잎 타일을 처음 수집 때와 같은 설정(쿼리/분할 방식/지역)으로 다시 조회
+#   · 캐시는 읽지 않음(places_cache refresh 모드 — 응답은 저장)
+#   · Text Search 는 조기 종료 없이 끝까지 페이지네이션(조기 종료는 '이미 아는 장소'가 많으면 끊으므로 변화 판단에 부적합)
+#   · 지문 같음 → 그대로 / 바뀜 → 잎의 id 목록만 갱신
+#   · 새로 포화(Text: 페이지 한도·SPLIT_COUNT_THRESHOLD, Nearby: 20개 꽉 참) → 수집기의 split_tile 규칙으로 그 타일만 다시 내려감
+#   · 이번 refresh 에서 다 받은 영역(coverage_index)에 완전히 덮인 타일은 호출 생략(수집기와 같은 규칙)
+#   · 예산(--max-calls) 소진 시 못 돈 잎은 이전 결과 유지(stale), 못 돈 자식 타일은 pending 으로 남겨 다음 refresh 에서
+# - 결과: 추가/삭제된 장소 delta JSON + 잎 파일 갱신
+#   → 호출 수 ≈ 잎 수 × 타일당 호출(파일럿 위 단계·중간 분할 타일 호출이 빠짐)
+#   (삭제 = 이번에 포화되지 않고 끝난 타일(다 받은 영역) 안에 있는데 아무 타일에서도 안 나온 장소.
+#    그 밖 — 분할 자식 사이 틈, 최대 깊이에서도 포화된 곳, 예산 때문에 못 돈 잎 — 의 장소는 이전 결과 유지(unverified))
+#
+# 사용 예)
+#   python text_api_search.py                                     # 첫 수집 → leaves_text_search.json
+#   python recrawl.py refresh --leaves leaves_text_search.json    # 갱신 → leaves_text_search_delta.json
+#   python recrawl.py status --leaves leaves_nearby_search.json
+
+import argparse
+import hashlib
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import places_cache
+from coverage_index import CoverageIndex
+from crawl_metrics import CrawlRecorder
+
+# =======================
+# 설정값
+# =======================
+WORKERS = 8           # 동시에 다시 조회할 타일 수(QPS/QPM 은 각 수집기의 토큰 버킷이 제한)
+FORMAT_VERSION = 1
+TEXT_RESULTS_CAP = 60  # Text Search 쿼리당 최대 결과(3페이지) — 타일 결과가 이 이상이면 어느 쿼리가 잘렸을 수 있음
+
+
+# =======================
+# 잎 기록 / 파일
+# =======================
+def fingerprint(ids: Iterable[str]) -> str:
+  return hashlib.sha1("\n".join(sorted(ids)).encode("utf-8")).hexdigest()
+
+
+def make_leaf(tile: Dict, places: List[Dict], count: int, saturated: bool, max_dist: float = 0.0) -> Dict:
+  """타일 1개의 잎 기록(결과 id 목록 + 지문)"""
+  ids = sorted({p["id"] for p in places if p.get("id")})
+  return {"tile": tile, "ids": ids, "count": count, "saturated": bool(saturated), "max_dist": max_dist,
+          "fp": fingerprint(ids)}
+
+
+def _tile_from_json(t: Dict) -> Dict:
+  # JSON에는 튜플이 없으므로 center / rect 를 튜플로 되돌림
+  t = dict(t)
+  for k in ("center", "rect"):
+    if isinstance(t.get(k), list):
+      t[k] = tuple(t[k])
+  return t
+
+
+def save_leaves(path: str, collector: str, config: Dict, leaves: List[Dict], places_by_id: Dict[str, Dict],
+                pending: Optional[List[Dict]] = None, calls: int = 0, crawl_calls: Optional[int] = None):
+  """
+  collector: text_search / nearby_search, config: 다시 조회할 때 쓸 수집 설정
+  calls: 이번 실행 호출 수 / crawl_calls: 처음 전체 수집 호출 수(refresh 비용 비교 기준, 없으면 calls)
+  """
+  tmp = path + ".tmp"
+  with open(tmp, "w", encoding="utf-8") as f:
+    json.dump({
+      "version": FORMAT_VERSION,
+      "collector": collector,
+      "config": config,
+      "saved_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+      "calls": calls,
+      "crawl_calls": crawl_calls if crawl_calls is not None else calls,
+      "leaves": leaves,
+      "pending": pending or [],
+      "places": list(places_by_id.values()),
+    }, f, ensure_ascii=False, default=str)
+  os.replace(tmp, path)
+  print(f"[leaves] {len(leaves)} leaf tiles, {len(pending or [])} pending, {len(places_by_id)} places -> {path}")
+
+
+def load_leaves(path: str) -> Dict:
+  with open(path, encoding="utf-8") as f:
+    data = json.load(f)
+  if data.get("version") != FORMAT_VERSION:
+    raise ValueError(f"지원하지 않는 잎 파일 버전: {data.get('version')} ({path})")
+  data["leaves"] = [dict(leaf, tile=_tile_from_json(leaf["tile"])) for leaf in data["leaves"]]
+  data["pending"] = [_tile_from_json(t) for t in data["pending"]]
+  data["places"] = {p["id"]: p for p in data["places"] if p.get("id")}
+  return data
+
+
+# =======================
+# 수집기별 어댑터(조회 / 분할 규칙은 수집기 것을 그대로)
+# =======================
+class TextSearchAdapter:
+  name = "text_search"
+
+  def __init__(self, config: Dict):
+    import text_api_search as tas
+    from region_polygon import load_region
+    self.m = tas
+    tas.CREATIVE_QUERIES = config["queries"]
+    tas.SPLIT_MODE = config["split_mode"]
+    tas.MAX_TEXT_PAGES_PER_QUERY = config.get("max_pages")
+    tas.DISCOVERY_MODE = config.get("discovery_mode", "full")
+    tas.REGION_GEOJSON = config.get("region")
+    tas.REGION = load_region(tas.REGION_GEOJSON) if tas.REGION_GEOJSON else None
+    self.budget = tas.MAX_TOTAL_CALLS
+    self.calls_per_tile = len(tas.CREATIVE_QUERIES)
+    self.two_phase = tas.DISCOVERY_MODE == "two_phase"
+    self.origin = tas.REGION.center if tas.REGION is not None else (tas.START_LAT, tas.START_LNG)
+
+  def search(self, tile: Dict) -> Tuple[List[Dict], int, bool, float, int, Optional[float]]:
+    """
+    → (결과, 개수, 포화 여부, maxDist, 쓴 호출 수, 다 받았다고 확신할 수 있는 반경(없으면 None))
+    포화/분할 판단은 수집기 규칙 그대로, '다 받음'은 더 보수적으로(삭제 판정용)
+    """
+    lat, lng = tile["center"]
+    # can_split=False → 조기 종료 없이 끝까지(포화는 페이지 한도에서만)
+    places, count, maxdist, saturated, used, partial = self.m.search_text_tile(
+      lat, lng, tile["radius"], self.m.CREATIVE_QUERIES, self.m.MAX_TEXT_PAGES_PER_QUERY, tile.get("rect")
+    )
+    full = saturated or partial or count >= min(self.m.SPLIT_COUNT_THRESHOLD, TEXT_RESULTS_CAP)
+    return places, count, saturated, maxdist, used, None if full else tile["radius"]
+
+  def children(self, tile: Dict, count: int, saturated: bool, max_dist: float) -> List[Dict]:
+    return self.m.split_tile(tile, count, saturated)[0]
+
+  def settled(self, tile: Dict, places: List[Dict], count: int, max_dist: float) -> Optional[Dict]:
+    """분할된 타일에서 잎으로 남는 부분(Text 는 자식이 타일 전체를 덮으므로 없음)"""
+    return None
+
+
+  def enrich(self, places: List[Dict]):
+    """two_phase: 새로 찾은 장소만 Details 1회"""
+    from place_details import details_mask_from_search_mask, fetch_place_details, merge_details
+    mask = details_mask_from_search_mask(self.m.HEADERS["X-Goog-FieldMask"])
+    merge_details(places, fetch_place_details([p["id"] for p in places], self.m.API_KEY, mask,
+                                              limiter=self.m.RATE_LIMITER))
+
+
+class NearbySearchAdapter:
+  name = "nearby_search"
+
+  def __init__(self, config: Dict):
+    import nearby_api_search as nas
+    from region_polygon import load_region
+    self.m = nas
+    nas.includedTypes = config["includedTypes"]
+    nas.SPLIT_MODE = config["split_mode"]
+    nas.DISCOVERY_MODE = config.get("discovery_mode", "full")
+    nas.REGION_GEOJSON = config.get("region")
+    nas.REGION = load_region(nas.REGION_GEOJSON) if nas.REGION_GEOJSON else None
+    self.budget = nas.MAX_CALLS
+    self.calls_per_tile = 1
+    self.two_phase = nas.DISCOVERY_MODE == "two_phase"
+    self.origin = nas.REGION.center if nas.REGION is not None else (nas.START_LAT, nas.START_LNG)
+
+  def search(self, tile: Dict) -> Tuple[List[Dict], int, bool, float, int, Optional[float]]:
+    lat, lng = tile["center"]
+    raw = self.m.nearby_once(lat, lng, tile["radius"])
+    # count/maxdist 는 범위 필터 전 원시 결과 기준(기준선/폴리곤에 걸친 타일도 포화를 놓치지 않음)
+    places, count, maxdist = self.m.summarize_in_scope(raw, lat, lng)
+    return places, count, count == 20, maxdist, 1, self.m.known_radius(tile["radius"], count, maxdist)
+
+  def children(self, tile: Dict, count: int, saturated: bool, max_dist: float) -> List[Dict]:
+    return self.m.split_tile(tile, count, max_dist)[0]
+
+  def settled(self, tile: Dict, places: List[Dict], count: int, max_dist: float) -> Optional[Dict]:
+    # annulus 분할 자식은 maxDist 바깥 띠만 → 안쪽 원은 잎으로 남김
+    if self.m.SPLIT_MODE != "annulus":
+      return None
+    return self.m.settled_leaf(tile, places, count, max_dist)
+
+
+  def enrich(self, places: List[Dict]):
+    from place_details import details_mask_from_search_mask, fetch_place_details, merge_details
+    mask = details_mask_from_search_mask(self.m.headers["X-Goog-FieldMask"])
+    merge_details(places, fetch_place_details([p["id"] for p in places], self.m.API_KEY, mask))
+
+
+ADAPTERS = {"text_search": TextSearchAdapter, "nearby_search": NearbySearchAdapter}
+
+
+def _tile_key(tile: Dict) -> Tuple:
+  lat, lng = tile["center"]
+  return round(lat, 6), round(lng, 6), round(tile["radius"], 1), tuple(round(v, 6) for v in tile.get("rect", ()))
+
+
+# =======================
+# refresh
+# =======================
+def refresh(path: str, out_path: Optional[str] = None, delta_path: Optional[str] = None,
+            max_calls: Optional[int] = None, workers: int = WORKERS) -> Dict:
+  """잎 타일만 다시 조회 → 잎 파일 갱신(out_path, 기본은 덮어쓰기) + delta JSON. 요약 dict 반환"""
+  state = load_leaves(path)
+  adapter = ADAPTERS[state["collector"]](state["config"])
+  budget = max_calls or adapter.budget
+  old_places: Dict[str, Dict] = state["places"]
+  out_path = out_path or path
+  delta_path = delta_path or os.path.splitext(out_path)[0] + "_delta.json"
+
+  # (타일, 이전 잎 기록 또는 None) — 이전 pending 타일도 이번에 이어서
+  queue = deque([(leaf["tile"], leaf) for leaf in state["leaves"]] + [(t, None) for t in state["pending"]])
+  seen = set()
+  leaves: List[Dict] = []
+  fresh: Dict[str, Dict] = {}
+  stats = {"unchanged": 0, "changed": 0, "descended": 0, "new_tiles": 0, "pruned": 0, "stale": 0}
+  calls = 0
+  # 이번 refresh 에서 '다 받은' 영역: 원(coverage_index) + 포화 안 된 사각형 타일
+  coverage = CoverageIndex(*adapter.origin)
+  verified_rects: List[Tuple[float, float, float, float]] = []
+  metrics = CrawlRecorder(f"recrawl_{adapter.name}", budget)
+  print(f"[refresh] {path}: collector={adapter.name} leaves={len(state['leaves'])} pending={len(state['pending'])} "
+        f"budget={budget} (original crawl {state['crawl_calls']} calls)")
+
+  in_flight: Dict = {}
+  with ThreadPoolExecutor(max_workers=workers) as pool:
+    while queue or in_flight:
+      # 예산: 진행 중 타일이 쓸 최소 호출까지 포함해서 판단
+      while queue and len(in_flight) < workers and calls + len(in_flight) * adapter.calls_per_tile < budget:
+        tile, old = queue.popleft()
+        key = _tile_key(tile)
+        if key in seen:
+          continue
+        seen.add(key)
+        # 이번에 다 받은 영역에 완전히 덮이면 생략(그 장소들은 덮은 타일 결과에 있음)
+        lat, lng = tile["center"]
+        if "rect" not in tile and coverage.prune(lat, lng, tile["radius"], calls_per_tile=adapter.calls_per_tile):
+          stats["pruned"] += 1
+          metrics.pruned(tile.get("depth", 0))
+          continue
+        in_flight[pool.submit(adapter.search, tile)] = (tile, old)
+      if not in_flight:
+        break
+
+      done, _ = wait(list(in_flight), return_when=FIRST_COMPLETED)
+      for fut in done:
+        tile, old = in_flight.pop(fut)
+        places, count, saturated, maxdist, used, known_r = fut.result()
+        calls += used
+        leaf = make_leaf(tile, places, count, saturated, maxdist)
+        new = 0
+        for p in places:
+          if p.get("id"):
+            new += p["id"] not in fresh
+            fresh[p["id"]] = p
+
+        if old is None:
+          stats["new_tiles"] += 1
+        elif leaf["fp"] == old["fp"]:
+          stats["unchanged"] += 1
+        else:
+          stats["changed"] += 1
+
+        if known_r and "rect" in tile:
+          verified_rects.append(tile["rect"])
+        elif known_r:
+          coverage.add(*tile["center"], known_r)
+        children = adapter.children(tile, count, saturated, maxdist)
+        if children:
+          # 새로 포화 → 이 타일만 수집기 분할 규칙대로 다시 내려감
+          stats["descended"] += 1
+          queue.extend((c, None) for c in children)
+          settled = adapter.settled(tile, places, count, maxdist)
+          if settled is not None:
+            leaves.append(settled)
+        else:
+          leaves.append(leaf)
+        metrics.tile(tile.get("depth", 0), tile["radius"], used, count, new, saturated)
+        metrics.progress(calls, len(fresh))
+        print(f"[refresh] depth={tile.get('depth', 0)} r={tile['radius']:.1f} count={count} "
+              f"{'new' if old is None else ('same' if leaf['fp'] == old['fp'] else 'changed')} children={len(children)}")
+
+  # 예산 때문에 못 돈 것: 이전 잎은 그 결과를 유지, 새 타일은 pending 으로
+  pending = []
+  for tile, old in queue:
+    if old is None:
+      pending.append(tile)
+      continue
+    stats["stale"] += 1
+    leaves.append(old)
+    for pid in old["ids"]:
+      if pid not in fresh and pid in old_places:
+        fresh[pid] = old_places[pid]
+
+  def verified(place: Dict) -> bool:
+    loc = place.get("location") or {}
+    lat, lng = loc.get("latitude"), loc.get("longitude")
+    if lat is None or lng is None:
+      return False
+    return (coverage.contains_point(lat, lng)
+            or any(s <= lat <= n and w <= lng <= e for s, w, n, e in verified_rects))
+
+  # 안 나왔지만 다 받은 영역 밖이면 삭제로 단정하지 않고 이전 결과 유지
+  unverified = 0
+  for pid, p in old_places.items():
+    if pid not in fresh and not verified(p):
+      fresh[pid] = p
+      unverified += 1
+
+  added = [fresh[pid] for pid in fresh if pid not in old_places]
+  removed = [old_places[pid] for pid in old_places if pid not in fresh]
+  if adapter.two_phase:
+    # 스윕 결과는 id/location 뿐 → 이미 아는 장소는 이전의 풍부한 필드 유지, 새 장소만 Details
+    for pid in fresh:
+      if pid in old_places:
+        fresh[pid] = old_places[pid]
+    if added:
+      adapter.enrich(added)
+
+  save_leaves(out_path, state["collector"], state["config"], leaves, fresh, pending=pending, calls=calls,
+              crawl_calls=state["crawl_calls"])
+  summary = {
+    "collector": state["collector"],
+    "source": path,
+    "calls": calls,
+    "crawl_calls": state["crawl_calls"],
+    "call_ratio": calls / max(state["crawl_calls"], 1),
+    "leaves": len(leaves),
+    "pending": len(pending),
+    **stats,
+    "places": len(fresh),
+    "added": len(added),
+    "removed": len(removed),
+    "unverified_kept": unverified,
+  }
+  with open(delta_path, "w", encoding="utf-8") as f:
+    json.dump(dict(summary, added=added, removed=removed), f, ensure_ascii=False, indent=2, default=str)
+  metrics.summary()
+
+  print("\n=== REFRESH SUMMARY ===")
+  print(f"calls={calls} (original crawl {state['crawl_calls']}, {summary['call_ratio']:.0%})")
+  print(f"leaves: unchanged={stats['unchanged']} changed={stats['changed']} descended={stats['descended']} "
+        f"new_tiles={stats['new_tiles']} pruned={stats['pruned']} stale={stats['stale']} pending={len(pending)}")
+  print(f"places={len(fresh)} added={len(added)} removed={len(removed)} (unverified kept={unverified})")
+  print(places_cache.get_cache().summary())
+  print(f"Saved delta -> {delta_path}")
+  return summary
+
+
+def print_status(path: str) -> Dict:
+  state = load_leaves(path)
+  leaves = state["leaves"]
+  depths: Dict[int, int] = {}
+  for leaf in leaves:
+    d = leaf["tile"].get("depth", 0)
+    depths[d] = depths.get(d, 0) + 1
+  saturated = sum(1 for leaf in leaves if leaf["saturated"])
+  print(f"[status] {path}: collector={state['collector']} saved_at={state['saved_at']} leaves={len(leaves)} "
+        f"(saturated={saturated}) pending={len(state['pending'])} places={len(state['places'])}")
+  print(f"[status] leaves by depth: {dict(sorted(depths.items()))}")
+  print(f"[status] original crawl calls={state['crawl_calls']}, last run calls={state['calls']}")
+  return {"leaves": len(leaves), "depths": depths, "pending": len(state["pending"])}
+
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description="잎 타일만 다시 조회하는 증분 재수집")
+  sub = parser.add_subparsers(dest="cmd", required=True)
+
+  p_refresh = sub.add_parser("refresh", help="잎 타일 다시 조회 → delta + 잎 파일 갱신")
+  p_refresh.add_argument("--out", default=None, help="갱신된 잎 파일(기본: --leaves 덮어쓰기)")
+  p_refresh.add_argument("--delta", default=None, help="추가/삭제 장소 JSON(기본: <out>_delta.json)")
+  p_refresh.add_argument("--max-calls", type=int, default=None, help="호출 상한(기본: 수집기 예산)")
+  p_refresh.add_argument("--workers", type=int, default=WORKERS)
+  p_refresh.add_argument("--use-cache", action="store_true", help="캐시 응답도 사용(기본: 항상 실제 호출)")
+
+  sub.add_parser("status", help="잎 파일 요약")
+  for p in sub.choices.values():
+    p.add_argument("--leaves", required=True, help="수집기가 저장한 잎 파일(LEAVES_PATH)")
+  args = parser.parse_args()
+
+  if args.cmd == "refresh":
+    if not args.use_cache:
+      places_cache.set_mode("refresh")
+    refresh(args.leaves, args.out, args.delta, args.max_calls, args.workers)
+  else:
+    print_status(args.leaves)
@@ -0,0 +1,248 @@
+# region_polygon.py
+# -----------------
+# 수집 대상 지역을 GeoJSON 폴리곤(자치구, 우편번호 구역 등)으로 지정
+# - 중심+반경+기준 경도선 대신 폴리곤과 겹치는 타일만 생성(밖에 있는 타일은 호출 자체를 안 함)
+# - 사각형 타일은 폴리곤 bbox로 잘라서(clip) 요청, 결과는 폴리곤 안에 있는 것만 남김
+# - 같은 격자를 중심+반경(+경도선)으로 만들었을 때와 시드 타일 수/예상 호출 수 비교 리포트
+# - 좁은 영역이므로 지역 중심 기준 등장방형 투영(미터)에서 기하 계산
+#
+# GeoJSON: Polygon / MultiPolygon geometry, Feature, FeatureCollection 모두 가능(구멍 포함)
+# 사용 예)
+#   python region_polygon.py borough.geojson --cell 800
+
+import argparse
+import json
+import math
+from typing import Dict, List, Optional, Tuple
+
+M_PER_DEG_LAT = 111_320.0
+
+Ring = List[Tuple[float, float]]  # (x, y) 미터
+
+
+def _geometries(obj: Dict) -> List[Dict]:
+  t = obj.get("type")
+  if t == "FeatureCollection":
+    return [g for f in obj.get("features", []) for g in _geometries(f)]
+  if t == "Feature":
+    return _geometries(obj.get("geometry") or {})
+  if t == "GeometryCollection":
+    return [g for sub in obj.get("geometries", []) for g in _geometries(sub)]
+  if t in ("Polygon", "MultiPolygon"):
+    return [obj]
+  return []
+
+
+def _seg_intersect(a, b, c, d) -> bool:
+  def orient(p, q, r):
+    v = (q[0] - p[0]) * (r[1] - p[1]) - (q[1] - p[1]) * (r[0] - p[0])
+    return (v > 0) - (v < 0)
+
+  def on_seg(p, q, r):
+    return min(p[0], r[0]) <= q[0] <= max(p[0], r[0]) and min(p[1], r[1]) <= q[1] <= max(p[1], r[1])
+
+  o1, o2, o3, o4 = orient(a, b, c), orient(a, b, d), orient(c, d, a), orient(c, d, b)
+  if o1 != o2 and o3 != o4:
+    return True
+  return ((o1 == 0 and on_seg(a, c, b)) or (o2 == 0 and on_seg(a, d, b))
+          or (o3 == 0 and on_seg(c, a, d)) or (o4 == 0 and on_seg(c, b, d)))
+
+
+def _seg_point_dist2(a, b, p) -> float:
+  dx, dy = b[0] - a[0], b[1] - a[1]
+  L = dx * dx + dy * dy
+  t = 0.0 if L == 0 else max(0.0, min(1.0, ((p[0] - a[0]) * dx + (p[1] - a[1]) * dy) / L))
+  qx, qy = a[0] + t * dx, a[1] + t * dy
+  return (p[0] - qx) ** 2 + (p[1] - qy) ** 2
+
+
+class Region:
+  def __init__(self, polygons: List[List[List[Tuple[float, float]]]], name: str = "region"):
+    """polygons: [폴리곤][링(0=외곽, 나머지=구멍)][(lng, lat)]"""
+    self.name = name
+    pts = [pt for poly in polygons for ring in poly for pt in ring]
+    if not pts:
+      raise ValueError("빈 폴리곤입니다")
+    self.west = min(p[0] for p in pts)
+    self.east = max(p[0] for p in pts)
+    self.south = min(p[1] for p in pts)
+    self.north = max(p[1] for p in pts)
+    self.origin_lat = (self.south + self.north) / 2.0
+    self.origin_lng = (self.west + self.east) / 2.0
+    self._m_per_deg_lng = M_PER_DEG_LAT * math.cos(math.radians(self.origin_lat))
+    self.polygons: List[List[Ring]] = [[[self._xy(lat, lng) for lng, lat in ring] for ring in poly] for poly in polygons]
+    self._edges = [(ring[i], ring[(i + 1) % len(ring)]) for poly in self.polygons for ring in poly for i in range(len(ring))]
+
+  # -----------------------
+  # 좌표 변환
+  # -----------------------
+  def _xy(self, lat: float, lng: float) -> Tuple[float, float]:
+    return (lng - self.origin_lng) * self._m_per_deg_lng, (lat - self.origin_lat) * M_PER_DEG_LAT
+
+  def _latlng(self, x: float, y: float) -> Tuple[float, float]:
+    return self.origin_lat + y / M_PER_DEG_LAT, self.origin_lng + x / self._m_per_deg_lng
+
+  @property
+  def center(self) -> Tuple[float, float]:
+    return self.origin_lat, self.origin_lng
+
+  # -----------------------
+  # 판정
+  # -----------------------
+  def _contains_xy(self, x: float, y: float) -> bool:
+    # 짝홀 규칙(구멍 포함): 모든 링의 교차 횟수 합
+    inside = False
+    for poly in self.polygons:
+      for ring in poly:
+        n = len(ring)
+        j = n - 1
+        for i in range(n):
+          xi, yi = ring[i]
+          xj, yj = ring[j]
+          if (yi > y) != (yj > y) and x < (xj - xi) * (y - yi) / (yj - yi) + xi:
+            inside = not inside
+          j = i
+    return inside
+
+  def contains(self, lat: float, lng: float) -> bool:
+    if not (self.south <= lat <= self.north and self.west <= lng <= self.east):
+      return False
+    return self._contains_xy(*self._xy(lat, lng))
+
+  def intersects_circle(self, lat: float, lng: float, radius_m: float) -> bool:
+    p = self._xy(lat, lng)
+    if self._contains_xy(*p):
+      return True
+    r2 = radius_m * radius_m
+    return any(_seg_point_dist2(a, b, p) <= r2 for a, b in self._edges)
+
+  def intersects_rect(self, rect: Tuple[float, float, float, float]) -> bool:
+    south, west, north, east = rect
+    if east < self.west or west > self.east or north < self.south or south > self.north:
+      return False
+    x0, y0 = self._xy(south, west)
+    x1, y1 = self._xy(north, east)
+    corners = [(x0, y0), (x1, y0), (x1, y1), (x0, y1)]
+    # 사각형 꼭짓점이 폴리곤 안 / 폴리곤 꼭짓점이 사각형 안 / 변끼리 교차
+    if any(self._contains_xy(*c) for c in corners):
+      return True
+    for a, _ in self._edges:
+      if x0 <= a[0] <= x1 and y0 <= a[1] <= y1:
+        return True
+    rect_edges = [(corners[i], corners[(i + 1) % 4]) for i in range(4)]
+    return any(_seg_intersect(a, b, c, d) for a, b in self._edges for c, d in rect_edges)
+
+  def clip_rect(self, rect: Tuple[float, float, float, float]) -> Optional[Tuple[float, float, float, float]]:
+    """사각형 ∩ 폴리곤 bbox (겹치지 않으면 None)"""
+    south, west, north, east = rect
+    s, w, n, e = max(south, self.south), max(west, self.west), min(north, self.north), min(east, self.east)
+    if s >= n or w >= e:
+      return None
+    return s, w, n, e
+
+  # -----------------------
+  # 타일 계획
+  # -----------------------
+  def rect_grid_plan(self, cell_m: float) -> List[Tuple[float, float, float, float]]:
+    """bbox를 한 변 cell_m 격자로 → 폴리곤과 겹치는 칸만, 각 칸은 bbox로 잘라서 (south, west, north, east)"""
+    x0, y0 = self._xy(self.south, self.west)
+    x1, y1 = self._xy(self.north, self.east)
+    nx = max(1, math.ceil((x1 - x0) / cell_m))
+    ny = max(1, math.ceil((y1 - y0) / cell_m))
+    out = []
+    for i in range(ny):
+      for j in range(nx):
+        s, w = self._latlng(x0 + j * cell_m, y0 + i * cell_m)
+        n, e = self._latlng(x0 + (j + 1) * cell_m, y0 + (i + 1) * cell_m)
+        rect = self.clip_rect((s, w, n, e))
+        if rect and self.intersects_rect(rect):
+          out.append(rect)
+    return out
+
+  def circle_plan(self, radius_m: float) -> List[Tuple[float, float]]:
+    """반경 radius_m 원으로 평면을 빈틈없이 덮는 육각 격자(간격 √3·r, 행 간격 1.5·r) 중 폴리곤과 겹치는 중심"""
+    x0, y0 = self._xy(self.south, self.west)
+    x1, y1 = self._xy(self.north, self.east)
+    dx, dy = math.sqrt(3) * radius_m, 1.5 * radius_m
+    out = []
+    row = 0
+    y = y0 - dy
+    while y <= y1 + dy:
+      x = x0 - dx + (dx / 2.0 if row % 2 else 0.0)
+      while x <= x1 + dx:
+        lat, lng = self._latlng(x, y)
+        if self.intersects_circle(lat, lng, radius_m):
+          out.append((lat, lng))
+        x += dx
+      y += dy
+      row += 1
+    return out
+
+
+def load_region(path: str) -> Region:
+  with open(path, encoding="utf-8") as f:
+    obj = json.load(f)
+  polygons = []
+  for g in _geometries(obj):
+    coords = g["coordinates"]
+    for poly in (coords if g["type"] == "MultiPolygon" else [coords]):
+      polygons.append([[(float(p[0]), float(p[1])) for p in ring] for ring in poly])
+  if not polygons:
+    raise ValueError(f"Polygon/MultiPolygon이 없습니다: {path}")
+  return Region(polygons, name=path)
+
+
+# =======================
+# 절감 리포트
+# =======================
+def region_savings_report(region: Region, polygon_tiles: int, baseline_tiles: List[Dict], calls_per_tile: int,
+                          cutoff_lng: Optional[float] = None) -> Dict:
+  """
+  baseline_tiles: 같은 크기로 중심+반경 방식이 만들었을 시드 타일(center/radius 또는 rect)
+  - outside: 폴리곤과 전혀 안 겹치는 타일(기존 방식이 호출만 하고 결과를 버리던 타일)
+  - left_of_cutoff: 그중 기준선 왼쪽에 완전히 있는 타일(FILTER_RESULTS_TO_RIGHT_ONLY가 결과만 버리던 타일)
+  시드 단계 기준 추정(분할 자식 수는 데이터에 따라 달라지므로 제외)
+  """
+  outside = left = 0
+  for t in baseline_tiles:
+    if "rect" in t:
+      hit = region.intersects_rect(t["rect"])
+      east = t["rect"][3]
+    else:
+      lat, lng = t["center"]
+      hit = region.intersects_circle(lat, lng, t["radius"])
+      east = lng + t["radius"] / (M_PER_DEG_LAT * math.cos(math.radians(lat)))
+    if not hit:
+      outside += 1
+    if cutoff_lng is not None and east <= cutoff_lng:
+      left += 1
+  report = {
+    "region": region.name,
+    "baseline_tiles": len(baseline_tiles),
+    "baseline_outside_region": outside,
+    "baseline_left_of_cutoff": left,
+    "polygon_tiles": polygon_tiles,
+    "seed_calls_baseline": len(baseline_tiles) * calls_per_tile,
+    "seed_calls_polygon": polygon_tiles * calls_per_tile,
+  }
+  report["seed_calls_saved"] = report["seed_calls_baseline"] - report["seed_calls_polygon"]
+  print(f"[region] {region.name}: seed tiles radius+cutoff={len(baseline_tiles)} "
+        f"(outside polygon={outside}, left of cutoff={left}) → polygon={polygon_tiles}, "
+        f"≈{report['seed_calls_saved']} calls saved at seed level ({calls_per_tile} calls/tile)")
+  return report
+
+
+def main():
+  parser = argparse.ArgumentParser(description="GeoJSON 지역의 타일 계획 미리보기")
+  parser.add_argument("geojson")
+  parser.add_argument("--cell", type=float, default=800.0, help="사각형 타일 한 변(m) / 원 타일 반경은 cell/2")
+  args = parser.parse_args()
+  region = load_region(args.geojson)
+  rects = region.rect_grid_plan(args.cell)
+  circles = region.circle_plan(args.cell / 2.0)
+  print(f"bbox=({region.south:.5f},{region.west:.5f})-({region.north:.5f},{region.east:.5f}) "
+        f"rect_tiles={len(rects)} circle_tiles={len(circles)}")
+
+
+if __name__ == "__main__":
+  main()
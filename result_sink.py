@@ -0,0 +1,151 @@
+# result_sink.py
+# --------------
+# 수집 결과 스트리밍 저장소(place id 기준 디듀프)
+# - 새 place는 도착하는 즉시 한 번만 파일에 기록(append) → 메모리에 행 목록을 쌓지 않고, 중단돼도 결과가 남음
+# - 형식은 확장자로 결정: .jsonl(기본, 값 타입 유지) / .csv / .sqlite
+# - 기존 파일을 열면(append) 이미 기록된 id를 읽어 와서 이어서 디듀프(체크포인트 재개용)
+# - 마지막에 export_xlsx()로 엑셀 변환(openpyxl write_only — 행을 스트리밍으로 씀)
+
+import csv
+import json
+import os
+import sqlite3
+from typing import Callable, Dict, Iterator, List, Optional
+
+from openpyxl import Workbook
+
+ID_COL = "id"
+
+
+def _cell(v):
+  # 엑셀/CSV 셀 값: 리스트/딕셔너리는 기존 결과 엑셀처럼 문자열로
+  if isinstance(v, (list, tuple, dict)):
+    return str(v)
+  return v
+
+
+class ResultSink:
+  def __init__(self, path: str, row_fn: Callable[[Dict], Dict], append: bool = False):
+    """
+    path: 결과 파일(.jsonl / .csv / .sqlite)
+    row_fn: place → 한 행(dict, 컬럼 순서 유지)
+    append: True면 기존 파일 뒤에 이어 쓰고 기존 id는 중복으로 취급, False면 새로 시작
+    """
+    self.path = path
+    self.row_fn = row_fn
+    self.fmt = os.path.splitext(path)[1].lower().lstrip(".") or "jsonl"
+    if self.fmt not in ("jsonl", "csv", "sqlite"):
+      raise ValueError(f"지원하지 않는 결과 형식: {path} (jsonl/csv/sqlite)")
+    self._seen = set()
+    self._columns: Optional[List[str]] = None
+    self.written = 0
+    self.duplicates = 0
+
+    if not append and os.path.exists(path):
+      os.remove(path)
+    if self.fmt == "sqlite":
+      self._conn = sqlite3.connect(path)
+      self._conn.execute("PRAGMA journal_mode=WAL")
+      self._conn.execute("CREATE TABLE IF NOT EXISTS results (seq INTEGER PRIMARY KEY, id TEXT UNIQUE, row TEXT NOT NULL)")
+      self._conn.commit()
+      self._seen.update(r[0] for r in self._conn.execute("SELECT id FROM results"))
+      self._fh = None
+    else:
+      for row in self._iter_file():
+        self._seen.add(row[ID_COL])
+        if self._columns is None:
+          self._columns = list(row)
+      self._fh = open(path, "a", encoding="utf-8", newline="")
+      self._csv = None
+      if self.fmt == "csv" and self._columns is not None:
+        self._csv = csv.DictWriter(self._fh, fieldnames=self._columns)
+
+  def __contains__(self, place_id: str) -> bool:
+    return place_id in self._seen
+
+  def __len__(self) -> int:
+    return len(self._seen)
+
+  def add(self, place: Dict) -> bool:
+    """처음 보는 id면 기록하고 True, 이미 있으면 False"""
+    pid = place.get("id")
+    if not pid:
+      return False
+    if pid in self._seen:
+      self.duplicates += 1
+      return False
+    self._seen.add(pid)
+    row = {ID_COL: pid}
+    row.update(self.row_fn(place))
+
+    if self.fmt == "sqlite":
+      self._conn.execute("INSERT OR IGNORE INTO results(id, row) VALUES (?, ?)",
+                         (pid, json.dumps(row, ensure_ascii=False, default=str)))
+      self._conn.commit()
+    elif self.fmt == "csv":
+      if self._csv is None:
+        self._columns = list(row)
+        self._csv = csv.DictWriter(self._fh, fieldnames=self._columns)
+        self._csv.writeheader()
+      self._csv.writerow({k: _cell(row.get(k)) for k in self._columns})
+      self._fh.flush()
+    else:
+      self._fh.write(json.dumps(row, ensure_ascii=False, default=str) + "\n")
+      self._fh.flush()
+    self.written += 1
+    return True
+
+  def close(self):
+    if self._fh is not None:
+      self._fh.close()
+      self._fh = None
+    if self.fmt == "sqlite" and self._conn is not None:
+      self._conn.commit()
+      self._conn.close()
+      self._conn = None
+
+  # -----------------------
+  # 읽기 / 내보내기
+  # -----------------------
+  def _iter_file(self) -> Iterator[Dict]:
+    if not os.path.exists(self.path):
+      return
+    with open(self.path, encoding="utf-8", newline="") as f:
+      if self.fmt == "csv":
+        yield from csv.DictReader(f)
+      else:
+        for line in f:
+          try:
+            yield json.loads(line)
+          except ValueError:
+            break  # 기록 도중 끊긴 마지막 줄
+
+  def rows(self) -> Iterator[Dict]:
+    """기록된 행(id 포함)을 기록 순서대로"""
+    if self._fh is not None:
+      self._fh.flush()
+    if self.fmt == "sqlite":
+      for (raw,) in self._conn.execute("SELECT row FROM results ORDER BY seq"):
+        yield json.loads(raw)
+    else:
+      yield from self._iter_file()
+
+  def export_xlsx(self, xlsx_path: str, include_id: bool = False) -> int:
+    """엑셀로 변환(기본은 기존 결과 엑셀과 같은 컬럼 — id 제외). 기록한 행 수 반환"""
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Sheet1")
+    n = 0
+    header = None
+    for row in self.rows():
+      if header is None:
+        header = [k for k in row if include_id or k != ID_COL]
+        ws.append(header)
+      ws.append([_cell(row.get(k)) for k in header])
+      n += 1
+    if header is None:
+      ws.append([])
+    wb.save(xlsx_path)
+    return n
+
+  def summary(self) -> str:
+    return f"sink {self.path}: rows={len(self._seen)} written_this_run={self.written} duplicates_skipped={self.duplicates}"
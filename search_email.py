@@ -1,4 +1,4 @@
-import time, subprocess, json, re, html
+import time, subprocess, json
 import pandas as pd
 from urllib.parse import urlparse, urljoin
 from bs4 import BeautifulSoup  # ★ 추가: 보이는 텍스트만 추출
@@ -11,8 +11,18 @@ from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
 from webdriver_manager.chrome import ChromeDriverManager
 
-# 기존 크롬 프로필 붙이기 (디버깅 포트)
-subprocess.Popen('C:\\Program Files\\Google\\Chrome\\Application\\chrome.exe --remote-debugging-port=9222 --user-data-dir="C:\\chromeCookie\\kmong_Rohmin_leisure"'.format("C:\\Program Files\\Google\\Chrome\\Application\\chrome.exe"))
+from email_extract import extract_emails, is_valid_email
+from place_store import PlaceStore
+from url_canon import UnitPlan
+
+# 수집 방식: "http"(email_http_fetch 로 먼저, JS 렌더링/차단 사이트만 브라우저) / "browser"(전부 Selenium)
+FETCH_TIER = "http"
+# 브라우저 단계 병렬화: 2 이상이면 헤드리스 크롬 N개 프로세스(email_worker_pool, 리눅스용 — 디버깅 프로필 대신)
+BROWSER_WORKERS = 1
+# 같은 사이트 묶기(url_canon): "domain"(등록 도메인 단위 — 체인/지점 공용 사이트는 한 번만) / "url"(정규화 URL 단위)
+DEDUPE_BY = "domain"
+# 받은 페이지를 압축 저장(page_archive) → 규칙을 고친 뒤 `python page_archive.py re-extract` 로 재크롤링 없이 다시 추출
+ARCHIVE_PATH = "pages.sqlite"   # None 이면 저장 안 함
 
 # ====== 옵션 튜닝 (속도 최적화) ======
 options = Options()
@@ -30,15 +40,6 @@ prefs = {
 }
 options.add_experimental_option("prefs", prefs)
 
-# ====== 정규식/키워드/필터 ======
-EMAIL_REGEX = re.compile(r'\b[A-Z0-9._%+-]+@[A-Z0-9.-]+\.[A-Z]{2,24}\b', re.IGNORECASE)
-
-# 파일 확장자 같은 TLD는 이메일로 간주하지 않음(오탐 컷)
-BAD_TLDS = {
-  "css","js","map","json","png","jpg","jpeg","gif","webp","svg","ico",
-  "woff","woff2","ttf","otf","mp4","webm","mov","avi","pdf","zip","rar","7z","gz","tar","xml","html","htm"
-}
-
 # 후보 링크 가중치: contact > about > support
 def link_weight(txt_lower, href_lower):
   if "contact" in txt_lower or "contact" in href_lower: return 3
@@ -46,51 +47,99 @@ def link_weight(txt_lower, href_lower):
   if "support" in txt_lower or "support" in href_lower: return 1
   return 0
 
-# 이메일 형식 정제/검증
-def is_valid_email(e):
-  if not e or "@" not in e: return False
-  e = e.strip()
-  if not EMAIL_REGEX.fullmatch(e): return False
-  if any(ch in e for ch in [' ', ',', ';', '<', '>', '"', "'"]): return False
-  if e.count("@") != 1: return False
-  local, _, dom = e.rpartition("@")
-  if not local or not dom: return False
-  # 로컬/도메인 양끝 점, 연속 점 방지
-  if local.startswith(".") or local.endswith(".") or ".." in local: return False
-  if dom.startswith(".")   or dom.endswith(".")   or ".." in dom:   return False
-  # TLD 필터
-  tld = dom.split(".")[-1].lower()
-  if tld in BAD_TLDS: return False
-  # 길이 제한(권장)
-  if len(e) > 254 or len(local) > 64: return False
-  return True
-
 # ====== 데이터 적재 ======
 out_rows = []  # 콤마로 합친 Top 1~3
 idx = 0
 xlsx_name = "agency_result.xlsx"
-df = pd.read_excel(xlsx_name)
-url_list = df["웹사이트 주소"].tolist()
-
-# ====== 드라이버 1회 생성/재사용 ======
-service = Service(ChromeDriverManager().install())
-driver = webdriver.Chrome(service=service, options=options)
-driver.set_page_load_timeout(10)
-# 리소스 차단(CDP)
-try:
-  driver.execute_cdp_cmd("Network.enable", {})
-  driver.execute_cdp_cmd("Network.setBlockedURLs", {
-    "urls": [
-      "*.png","*.jpg","*.jpeg","*.gif","*.webp","*.svg",
-      "*.ico","*.mp4","*.avi","*.webm","*.mov",
-      "*.woff","*.woff2","*.ttf","*.otf",
-      # "*.css",
-    ]
-  })
-except Exception:
-  pass
 
-for url in url_list:
+# SQLite 저장소 사용 시(예: "places.sqlite"): 아직 이메일 조회 안 한 행만 꺼내고, 한 행씩 바로 기록
+# 카테고리에 행이 없으면 xlsx_name에서 먼저 가져옴
+STORE_PATH = None
+store = None
+if STORE_PATH:
+  store = PlaceStore(STORE_PATH)
+  store_category = store.ensure_imported(xlsx_name)
+  jobs = store.pending_email(store_category)
+  print(f"[store] {STORE_PATH} 카테고리={store_category} 조회 대상 {len(jobs)}건")
+else:
+  df = pd.read_excel(xlsx_name)
+  jobs = [(None, u) for u in df["웹사이트 주소"].tolist()]
+
+def save_result(place_id, value):
+  out_rows.append({'이메일 주소': value})
+  if store is not None and place_id is not None:
+    store.set_email(place_id, value)
+
+# ====== 드라이버 1회 생성/재사용(브라우저가 필요한 사이트를 처음 만날 때) ======
+def make_driver():
+  # 기존 크롬 프로필 붙이기 (디버깅 포트)
+  subprocess.Popen('C:\\Program Files\\Google\\Chrome\\Application\\chrome.exe --remote-debugging-port=9222 --user-data-dir="C:\\chromeCookie\\kmong_Rohmin_leisure"'.format("C:\\Program Files\\Google\\Chrome\\Application\\chrome.exe"))
+  service = Service(ChromeDriverManager().install())
+  driver = webdriver.Chrome(service=service, options=options)
+  driver.set_page_load_timeout(10)
+  # 리소스 차단(CDP)
+  try:
+    driver.execute_cdp_cmd("Network.enable", {})
+    driver.execute_cdp_cmd("Network.setBlockedURLs", {
+      "urls": [
+        "*.png","*.jpg","*.jpeg","*.gif","*.webp","*.svg",
+        "*.ico","*.mp4","*.avi","*.webm","*.mov",
+        "*.woff","*.woff2","*.ttf","*.otf",
+        # "*.css",
+      ]
+    })
+  except Exception:
+    pass
+  return driver
+
+# 점수화 후 상위 1~3만 선택 → 콤마로 합친 문자열
+def pick_top(url, all_candidates):
+  parts = urlparse(url).netloc.lower().split(".")
+  if len(parts) >= 3 and parts[-2:] == ["co", "uk"]:
+    base_dom = ".".join(parts[-3:])
+  else:
+    base_dom = ".".join(parts[-2:]) if len(parts) >= 2 else urlparse(url).netloc.lower()
+
+  score_map = {
+    "info": 4, "hello": 4, "contact": 4, "support": 3, "help": 3,
+    "sales": 3, "admin": 2, "team": 2, "office": 2, "enquiries": 2
+  }
+
+  ranked = []
+  for e in sorted(all_candidates):
+    local, _, dom = e.partition("@")
+    s = 0
+    if base_dom and base_dom in dom:
+      s -= 5            # 회사 도메인 가점(낮을수록 상위)
+    s -= score_map.get(local, 0)  # 로컬파트 가점
+    ranked.append((s, e))
+  ranked.sort()
+
+  if ranked:
+    return ", ".join([e for _, e in ranked[:3]])
+  return "조회결과 없음"
+
+# ====== 같은 사이트는 한 번만 조회하고 결과를 같은 단위의 모든 행에 복사 ======
+plan = UnitPlan([None if pd.isna(u) else u for _, u in jobs], by=DEDUPE_BY)
+print(plan.report())
+
+archive = None
+if ARCHIVE_PATH:
+  from page_archive import PageArchive
+  archive = PageArchive(ARCHIVE_PATH)
+
+# ====== 1단계: 정적 사이트는 HTTP 로 먼저(브라우저는 나머지에만) ======
+http_results = {}
+if FETCH_TIER == "http":
+  from email_http_fetch import fetch_sites, needs_browser, tier_summary
+  http_results = fetch_sites(plan.crawl_urls(), archive=archive)
+  print(tier_summary(http_results))
+
+driver = None
+browser_jobs = []   # BROWSER_WORKERS > 1: (단위, URL) → 워커 풀
+unit_results = {}   # 단위 → 결과(이미 조회한 사이트는 재사용, 단위를 못 정한 URL(None)은 행마다 따로 조회)
+waiting = {}        # 풀로 넘긴 단위 → [(out_rows 위치, place_id)]
+for place_id, url in jobs:
   idx += 1
 
   # 기본 출력값
@@ -98,17 +147,50 @@ for url in url_list:
 
   # NaN 처리
   if pd.isna(url):
-    out_rows.append({'이메일 주소': top_joined})
+    save_result(place_id, top_joined)
     print(f"{idx} :: 조회할 사이트정보 없음")
     continue
 
   url = str(url).strip()
   print(f"{idx} :: {url}")
 
+  unit = plan.unit_of(url)
+  if unit in unit_results:
+    save_result(place_id, unit_results[unit])
+    print(f"  -> 같은 사이트 결과 사용({unit}): {unit_results[unit]}")
+    continue
+  if unit in waiting:
+    waiting[unit].append((len(out_rows), place_id))
+    out_rows.append({'이메일 주소': '조회 중 오류'})
+    continue
+  if unit is not None:
+    url = plan.crawl_url(unit)
+
+  http = http_results.get(url)
+  if http is not None and not needs_browser(http):
+    top_joined = pick_top(url, set(http["emails"]))
+    if unit is not None:
+      unit_results[unit] = top_joined
+    save_result(place_id, top_joined)
+    print(f"  -> TOP3(HTTP): {top_joined}")
+    continue
+  if http is not None:
+    print(f"  -> 브라우저로 ({http['reason']})")
+  if BROWSER_WORKERS > 1 and unit is not None:
+    # 자리만 잡아 두고 풀 결과로 채움(엑셀은 행 순서대로 맞춰야 하므로)
+    browser_jobs.append((unit, url))
+    waiting[unit] = [(len(out_rows), place_id)]
+    out_rows.append({'이메일 주소': '조회 중 오류'})
+    continue
+
   try:
+    if driver is None:
+      driver = make_driver()
     # 메인 페이지 진입
     driver.get(url)
     WebDriverWait(driver, 8).until(EC.presence_of_element_located((By.TAG_NAME, "body")))
+    if archive is not None:
+      archive.add(url, url, driver.current_url, None, driver.page_source or "", role="main", tier="browser")
 
     visited = [url]
     all_candidates = set()
@@ -141,25 +223,8 @@ for url in url_list:
       for tag in soup(["script","style","noscript","template"]):
         tag.decompose()
       text = soup.get_text(" ", strip=True)
-      # 우회표기 복원 후 정규식 추출
-      deob = html.unescape(text)
-      for pat, rep in [
-        (r'\s*\[?\s*at\s*\]?\s*', '@'),
-        (r'\s*\(?\s*at\s*\)?\s*', '@'),
-        (r'\s+at\s+', '@'),
-        (r'\s*\[?\s*dot\s*\]?\s*', '.'),
-        (r'\s*\(?\s*dot\s*\)?\s*', '.'),
-        (r'\s+dot\s+', '.'),
-        (r'골뱅이', '@'),
-        (r'\s*점\s*', '.'),
-        (r'닷', '.'),
-      ]:
-        deob = re.sub(pat, rep, deob, flags=re.IGNORECASE)
-      deob = re.sub(r'\s*@\s*', '@', deob)
-      deob = re.sub(r'\s*\.\s*', '.', deob)
-
-      for e in EMAIL_REGEX.findall(deob):
-        if is_valid_email(e): all_candidates.add(e)
+      # 우회표기 복원 + 추출(email_extract: 한 번 스캔)
+      all_candidates |= extract_emails(text)
     except Exception:
       pass
 
@@ -190,6 +255,8 @@ for url in url_list:
           driver.get(link)
           WebDriverWait(driver, 6).until(EC.presence_of_element_located((By.TAG_NAME, "body")))
           visited.append(link)
+          if archive is not None:
+            archive.add(url, link, driver.current_url, None, driver.page_source or "", role="link", tier="browser")
 
           # mailto
           for a in driver.find_elements(By.CSS_SELECTOR, 'a[href^="mailto:"]'):
@@ -213,25 +280,7 @@ for url in url_list:
           for tag in soup2(["script","style","noscript","template"]):
             tag.decompose()
           text2 = soup2.get_text(" ", strip=True)
-
-          deob2 = html.unescape(text2)
-          for pat2, rep2 in [
-            (r'\s*\[?\s*at\s*\]?\s*', '@'),
-            (r'\s*\(?\s*at\s*\)?\s*', '@'),
-            (r'\s+at\s+', '@'),
-            (r'\s*\[?\s*dot\s*\]?\s*', '.'),
-            (r'\s*\(?\s*dot\s*\)?\s*', '.'),
-            (r'\s+dot\s+', '.'),
-            (r'골뱅이', '@'),
-            (r'\s*점\s*', '.'),
-            (r'닷', '.'),
-          ]:
-            deob2 = re.sub(pat2, rep2, deob2, flags=re.IGNORECASE)
-          deob2 = re.sub(r'\s*@\s*', '@', deob2)
-          deob2 = re.sub(r'\s*\.\s*', '.', deob2)
-
-          for e in EMAIL_REGEX.findall(deob2):
-            if is_valid_email(e): all_candidates.add(e)
+          all_candidates |= extract_emails(text2)
 
         except Exception:
           pass
@@ -239,52 +288,52 @@ for url in url_list:
       pass
 
     # ===== 4) 점수화 후 상위 1~3만 선택 → 콤마로 합쳐 저장 =====
-    parts = urlparse(url).netloc.lower().split(".")
-    if len(parts) >= 3 and parts[-2:] == ["co", "uk"]:
-      base_dom = ".".join(parts[-3:])
-    else:
-      base_dom = ".".join(parts[-2:]) if len(parts) >= 2 else urlparse(url).netloc.lower()
-
-    score_map = {
-      "info": 4, "hello": 4, "contact": 4, "support": 3, "help": 3,
-      "sales": 3, "admin": 2, "team": 2, "office": 2, "enquiries": 2
-    }
-
-    ranked = []
-    for e in sorted(all_candidates):
-      local, _, dom = e.partition("@")
-      s = 0
-      if base_dom and base_dom in dom:
-        s -= 5            # 회사 도메인 가점(낮을수록 상위)
-      s -= score_map.get(local, 0)  # 로컬파트 가점
-      ranked.append((s, e))
-    ranked.sort()
-
-    if ranked:
-      top_emails = [e for _, e in ranked[:3]]
-      top_joined = ", ".join(top_emails)
-    else:
-      top_joined = "조회결과 없음"
-
-    out_rows.append({'이메일 주소': top_joined})
+    top_joined = pick_top(url, all_candidates)
+
+    if unit is not None:
+      unit_results[unit] = top_joined
+    save_result(place_id, top_joined)
     print(f"  -> TOP3: {top_joined}")
 
   except Exception as e:
-    out_rows.append({'이메일 주소': '조회 중 오류'})
+    save_result(place_id, '조회 중 오류')
     print("  -> 오류:", e)
 
+# ====== 브라우저 워커 풀(BROWSER_WORKERS > 1) ======
+if browser_jobs:
+  from email_worker_pool import pool_summary, run_pool
+
+  def on_pool_result(unit, url, found):
+    value = '조회 중 오류' if found is None else pick_top(url, found)
+    for pos, place_id in waiting[unit]:
+      out_rows[pos] = {'이메일 주소': value}
+      if store is not None and place_id is not None:
+        store.set_email(place_id, value)
+    print(f"{waiting[unit][0][0] + 1} :: {url} ({len(waiting[unit])}행)\n  -> TOP3: {value}")
+
+  print(f"브라우저 워커 {BROWSER_WORKERS}개로 {len(browser_jobs)}건 조회")
+  print(pool_summary(run_pool(browser_jobs, BROWSER_WORKERS, on_pool_result, archive=archive)))
+
 # 드라이버 종료
 try:
-  driver.quit()
+  if driver is not None:
+    driver.quit()
 except Exception:
   pass
-
-# 결과 반영/저장 (한 컬럼에 콤마로)
-try:
-  if "이메일 주소" not in df.columns:
-    df["이메일 주소"] = "-"
-  df["이메일 주소"] = [r["이메일 주소"] for r in out_rows]
-  df.to_excel("agency_result_filled4.xlsx", index=False)
-  print("엑셀 저장: agency_result_filled4.xlsx")
-except Exception as e:
-  print("엑셀 저장 중 오류:", e)
+if archive is not None:
+  archive.close()
+
+# 저장소 모드: 행마다 이미 기록됨 → 엑셀은 내보내기 뷰로만
+if store is not None:
+  store.export_xlsx("agency_result_filled4.xlsx", store_category)
+  store.close()
+else:
+  # 결과 반영/저장 (한 컬럼에 콤마로)
+  try:
+    if "이메일 주소" not in df.columns:
+      df["이메일 주소"] = "-"
+    df["이메일 주소"] = [r["이메일 주소"] for r in out_rows]
+    df.to_excel("agency_result_filled4.xlsx", index=False)
+    print("엑셀 저장: agency_result_filled4.xlsx")
+  except Exception as e:
+    print("엑셀 저장 중 오류:", e)
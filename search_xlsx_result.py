@@ -9,6 +9,8 @@ from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
 from webdriver_manager.chrome import ChromeDriverManager
 
+from place_store import PlaceStore
+
 # 전화번호 저장용 리스트
 phone_numbers = []
 idx = 0
@@ -16,6 +18,9 @@ idx = 0
 # 엑셀 파일 명
 xlsx_name = "lawyer_result.xlsx"
 
+# SQLite 저장소 사용 시(예: "places.sqlite"): 전화번호 미조회 행만 꺼내고 한 행씩 바로 기록
+STORE_PATH = None
+
 # ... 네가 가진 import/옵션/driver/엑셀 로드/normalize_e164 그대로 ...
 
 def xpath_literal(s: str) -> str:
@@ -127,19 +132,29 @@ driver.get("https://www.google.com/maps")
 
 time.sleep(0.5)
 
-# 엑셀 파일 불러오기
-df = pd.read_excel(xlsx_name)
+store = None
+if STORE_PATH:
+  store = PlaceStore(STORE_PATH)
+  store_category = store.ensure_imported(xlsx_name)
+  jobs = store.pending_phone(store_category)
+else:
+  # 엑셀 파일 불러오기
+  df = pd.read_excel(xlsx_name)
+
+  # 1) 특정 컬럼만 리스트로 변환
+  jobs = [(None, n, a) for n, a in zip(df["회사명"].tolist(), df["주소"].tolist())]
 
-# 1) 특정 컬럼만 리스트로 변환
-name_list = df["회사명"].tolist()
-addr_list = df["주소"].tolist()
+def save_phone(place_id, phone):
+  phone_numbers.append(phone)
+  if store is not None:
+    store.set_phone(place_id, phone)
 
 # 2) 행 단위 순회
-for row in name_list:
+for place_id, row, addr in jobs:
   # 검색창 찾기
   search_box = driver.find_element(By.ID, "searchboxinput")
   search_box.clear()
-  search_box.send_keys(f"\"{row}\" {addr_list[idx]}")
+  search_box.send_keys(f"\"{row}\" {addr or ''}")
   search_box.send_keys(Keys.ENTER)
 
   # 검색 결과/상세 로딩 대기
@@ -152,10 +167,10 @@ for row in name_list:
 
   # 상세가 아니라면(여러 결과) → 좌측 리스트에서 '정확 일치' 클릭 (주소 힌트 사용)
   if not title_matches(driver, row):
-    click_exact_in_list(driver, row, hint_addr=str(addr_list[idx]) if idx < len(addr_list) else None)
+    click_exact_in_list(driver, row, hint_addr=str(addr) if addr is not None else None)
     # 그래도 상세가 아니거나 제목 불일치라면 이번 건은 빈값 처리하고 다음으로
     if not title_matches(driver, row):
-      phone_numbers.append("")
+      save_phone(place_id, "")
       print(f"{idx} :: 리스트 다중결과 - 정확 일치 미탐: {row}")
       idx += 1
       continue
@@ -202,11 +217,15 @@ for row in name_list:
     except:
       pass
 
-  phone_numbers.append(phone_display)
+  save_phone(place_id, phone_display)
   print(f"{idx} :: {phone_display} ({phone_source})")
   idx += 1
 
-# 루프 끝난 후 저장
-df["전화번호"] = phone_numbers
-df.to_excel(xlsx_name, index=False)
+# 루프 끝난 후 저장(저장소 모드는 행마다 기록됨 → 엑셀은 내보내기 뷰)
+if store is not None:
+  store.export_xlsx(xlsx_name, store_category)
+  store.close()
+else:
+  df["전화번호"] = phone_numbers
+  df.to_excel(xlsx_name, index=False)
 print(f"저장 완료: {xlsx_name}")
\ No newline at end of file
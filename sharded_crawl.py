@@ -0,0 +1,225 @@
+# sharded_crawl.py
+# ----------------
+# text_api_search.py 의 타일 BFS 를 여러 프로세스 / 여러 머신으로 나눠 돌리기(work_queue 공유)
+# - init  : 시드 타일 계획(파일럿 포함)을 큐 파일에 넣고 수집 설정(쿼리, 분할 방식, 지역, 예산)을 meta 로 저장
+# - work  : 작업자 N개 프로세스 실행. 각자 타일을 임대 → search_text_tile → 분할 자식 push + 결과 병합
+#           다른 머신에서도 같은 큐 파일 경로(공유 디렉터리)로 work 를 실행하면 합류
+#           작업자가 죽으면 임대 만료(--lease) 후 다른 작업자가 그 타일을 다시 가져감
+# - status: 상태별 타일 수, 살아 있는 작업자, 결과 수, 호출 수
+# - export: 병합된 결과 → 엑셀(text_api_search 와 같은 컬럼)
+#
+# 사용 예)
+#   python sharded_crawl.py init --queue crawl_queue.sqlite --split-mode rect
+#   python sharded_crawl.py work --queue crawl_queue.sqlite --workers 4 --qps 10   # 머신마다 실행 가능
+#   python sharded_crawl.py status --queue crawl_queue.sqlite
+#   python sharded_crawl.py export --queue crawl_queue.sqlite --out text_results_creative.xlsx
+#
+# 호출 예산(MAX_TOTAL_CALLS)은 큐에 기록된 호출 수 합계로 판단 → 작업자 수만큼(진행 중 타일) 조금 넘칠 수 있음
+# QPS 제한은 프로세스별 토큰 버킷 → 머신 하나에 준 --qps 를 그 머신의 작업자 수로 나눠 씀
+
+import argparse
+import multiprocessing
+import os
+import socket
+import time
+from typing import Dict, Optional
+
+import text_api_search as tas
+from coverage_index import CoverageIndex
+from rate_limiter import TokenBucket
+from region_polygon import load_region
+from work_queue import WorkQueue, LEASE_S
+
+# =======================
+# 설정값
+# =======================
+QUEUE_PATH = "crawl_queue.sqlite"
+WORKERS = 4
+POLL_S = 2.0     # 할 일이 없지만 다른 작업자 타일이 진행 중일 때 다시 확인하는 간격
+
+
+def open_queue(path: str, lease_s: float = LEASE_S) -> WorkQueue:
+  return WorkQueue(path, key_fn=tas.tile_key, lease_s=lease_s)
+
+
+def apply_meta(meta: Dict):
+  """큐에 저장된 수집 설정을 이 프로세스의 text_api_search 에 반영(모든 작업자가 같은 설정으로 수집)"""
+  tas.CREATIVE_QUERIES = meta["queries"]
+  tas.SPLIT_MODE = meta["split_mode"]
+  tas.MAX_TEXT_PAGES_PER_QUERY = meta.get("max_pages")
+  tas.MAX_TOTAL_CALLS = meta["max_total_calls"]
+  tas.REGION_GEOJSON = meta.get("region")
+  tas.REGION = load_region(tas.REGION_GEOJSON) if tas.REGION_GEOJSON else None
+
+
+# =======================
+# init
+# =======================
+def init_queue(path: str, force: bool = False) -> Dict:
+  if os.path.exists(path):
+    if not force:
+      raise SystemExit(f"이미 큐가 있습니다: {path} (처음부터 다시 하려면 --force)")
+    os.remove(path)
+  tas.REGION = load_region(tas.REGION_GEOJSON) if tas.REGION_GEOJSON else None
+  wq = open_queue(path)
+
+  meta = {"queries": tas.CREATIVE_QUERIES, "split_mode": tas.SPLIT_MODE, "coverage": [], "region": tas.REGION_GEOJSON}
+  seed_plan, pilot_places, pilot_calls = tas.build_seed(meta)
+  origin = tas.REGION.center if tas.REGION is not None else (tas.START_LAT, tas.START_LNG)
+  wq.set_meta({
+    "queries": tas.CREATIVE_QUERIES, "split_mode": tas.SPLIT_MODE, "region": tas.REGION_GEOJSON,
+    "max_pages": tas.MAX_TEXT_PAGES_PER_QUERY, "max_total_calls": tas.MAX_TOTAL_CALLS, "origin": list(origin),
+  })
+
+  # 파일럿(circle 모드)은 init 이 이미 수집 → 완료 타일로 기록(호출 수/결과/완료 영역 포함)
+  if pilot_calls:
+    pilot = {"center": (tas.START_LAT, tas.START_LNG), "radius": tas.PILOT_RADIUS_M, "depth": 0}
+    wq.push([pilot])
+    covered = tuple(meta["coverage"][0]) if meta["coverage"] else None
+    wq.complete(wq.key(pilot), "init", [], pilot_places, pilot_calls, covered)
+  added = wq.push(seed_plan)
+  stats = wq.stats()
+  wq.close()
+  print(f"[init] {path}: seed tiles={added} pilot_calls={pilot_calls} results={stats['results']}")
+  return stats
+
+
+# =======================
+# work
+# =======================
+def work_loop(path: str, worker: str, qps: Optional[float], qpm: Optional[float], lease_s: float) -> Dict:
+  """작업자 1개: 큐가 빌 때까지(또는 예산 소진) 타일 임대 → 수집 → 완료"""
+  wq = open_queue(path, lease_s)
+  meta = wq.get_meta()
+  apply_meta(meta)
+  tas.RATE_LIMITER = TokenBucket(qps=qps, qpm=qpm)
+  coverage = CoverageIndex(*meta["origin"])
+  cov_seq = 0
+  done = added = calls = 0
+
+  while True:
+    if wq.total_calls() >= tas.MAX_TOTAL_CALLS:
+      print(f"[{worker}] call budget reached ({tas.MAX_TOTAL_CALLS})")
+      break
+    leased = wq.lease(worker)
+    if not leased:
+      if wq.idle():
+        break
+      time.sleep(POLL_S)
+      continue
+    key, tile = leased[0]
+    lat, lng = tile["center"]
+    r = tile["radius"]
+
+    # 다른 작업자들이 끝낸 완료 영역까지 따라잡은 뒤 덮인 타일이면 호출 생략
+    for seq, clat, clng, cr in wq.coverage_since(cov_seq):
+      coverage.add(clat, clng, cr)
+      cov_seq = seq
+    if (tas.USE_COVERAGE_INDEX and "rect" not in tile
+        and coverage.prune(lat, lng, r, calls_per_tile=len(tas.CREATIVE_QUERIES))):
+      wq.complete(key, worker, [], [], 0)
+      continue
+
+    can_split = r > tas.MIN_RADIUS_M and tile.get("depth", 0) < tas.MAX_DEPTH
+    try:
+      # known_ids=큐(결과 테이블) → 조기 종료가 모든 작업자의 결과 기준으로 판단
+      places, count, maxdist, saturated, used, partial = tas.search_text_tile(
+        lat, lng, r, tas.CREATIVE_QUERIES, tas.MAX_TEXT_PAGES_PER_QUERY, tile.get("rect"), wq, can_split
+      )
+    except Exception as e:
+      # 반납 → 다른 작업자(또는 자신)가 다시 시도, MAX_ATTEMPTS 넘으면 failed
+      print(f"[{worker}] tile failed {key}: {e!r}")
+      wq.release(key, worker)
+      continue
+
+    children, complete = tas.split_tile(tile, count, saturated, partial)
+    new = wq.complete(key, worker, children, places, used, (lat, lng, r) if complete else None)
+    done += 1
+    added += new
+    calls += used
+    print(f"[{worker}] depth={tile.get('depth', 0)} r={r:.1f} center=({lat:.6f},{lng:.6f}) "
+          f"-> count={count} new={new} saturated={saturated} children={len(children)} calls={used}")
+
+  wq.close()
+  print(f"[{worker}] finished: tiles={done} new_places={added} calls={calls} rate_wait={tas.RATE_LIMITER.waited_s:.1f}s")
+  return {"worker": worker, "tiles": done, "new_places": added, "calls": calls}
+
+
+def run_workers(path: str, workers: int, qps: Optional[float], qpm: Optional[float], lease_s: float):
+  """이 머신에서 작업자 프로세스 N개 실행(QPS/QPM 은 N으로 나눠 각 프로세스에)"""
+  host = socket.gethostname()
+  share_qps = qps / workers if qps else None
+  share_qpm = qpm / workers if qpm else None
+  args = [(path, f"{host}:{os.getpid()}:{i}", share_qps, share_qpm, lease_s) for i in range(workers)]
+  if workers == 1:
+    work_loop(*args[0])
+  else:
+    with multiprocessing.Pool(workers) as pool:
+      pool.starmap(work_loop, args)
+  print_status(path)
+
+
+# =======================
+# status / export
+# =======================
+def print_status(path: str) -> Dict:
+  wq = open_queue(path)
+  s = wq.stats()
+  wq.close()
+  print(f"[status] {path}: pending={s['pending']} leased={s['leased']} (expired={s['expired_leases']}) "
+        f"done={s['done']} failed={s['failed']} results={s['results']} calls={s['calls']}")
+  if s["workers"]:
+    print(f"[status] active workers: {', '.join(s['workers'])}")
+  return s
+
+
+def export_results(path: str, out: str) -> int:
+  wq = open_queue(path)
+  items = list(wq.results())
+  wq.close()
+  tas.save_to_excel(items, out)
+  print(f"Saved Excel -> {out} ({len(items)} places)")
+  return len(items)
+
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description="공유 작업 큐로 나눠 돌리는 Text Search 타일 수집")
+  sub = parser.add_subparsers(dest="cmd", required=True)
+
+  p_init = sub.add_parser("init", help="시드 타일을 큐에 넣기(circle 모드는 파일럿 수집 포함)")
+  p_init.add_argument("--split-mode", choices=["circle", "rect"], default=None)
+  p_init.add_argument("--query-set", default=None, help="query_optimizer.py 가 만든 쿼리 집합 JSON")
+  p_init.add_argument("--region", default=None, help="수집 지역 GeoJSON(Polygon/MultiPolygon)")
+  p_init.add_argument("--max-calls", type=int, default=None, help="전체 호출 상한(기본: MAX_TOTAL_CALLS)")
+  p_init.add_argument("--force", action="store_true", help="기존 큐 파일을 지우고 새로 시작")
+
+  p_work = sub.add_parser("work", help="작업자 프로세스 실행(여러 머신에서 동시에 가능)")
+  p_work.add_argument("--workers", type=int, default=WORKERS)
+  p_work.add_argument("--qps", type=float, default=tas.RATE_LIMIT_QPS, help="이 머신 전체 초당 호출 상한")
+  p_work.add_argument("--qpm", type=float, default=tas.RATE_LIMIT_QPM, help="이 머신 전체 분당 호출 상한")
+  p_work.add_argument("--lease", type=float, default=LEASE_S, help="타일 임대 시간(초)")
+
+  sub.add_parser("status", help="진행 상황")
+  p_export = sub.add_parser("export", help="결과 엑셀 저장")
+  p_export.add_argument("--out", default=tas.XLSX_PATH)
+
+  for p in sub.choices.values():
+    p.add_argument("--queue", default=QUEUE_PATH, help="큐 파일(SQLite) 경로 — 여러 머신이면 공유 디렉터리에")
+  args = parser.parse_args()
+
+  if args.cmd == "init":
+    if args.split_mode:
+      tas.SPLIT_MODE = args.split_mode
+    if args.region:
+      tas.REGION_GEOJSON = args.region
+    if args.query_set:
+      tas.CREATIVE_QUERIES = tas.load_query_set(args.query_set, tas.CREATIVE_QUERIES)
+    if args.max_calls:
+      tas.MAX_TOTAL_CALLS = args.max_calls
+    init_queue(args.queue, force=args.force)
+  elif args.cmd == "work":
+    run_workers(args.queue, args.workers, args.qps, args.qpm, args.lease)
+  elif args.cmd == "status":
+    print_status(args.queue)
+  else:
+    export_results(args.queue, args.out)
@@ -6,15 +6,43 @@
 # - 반경 밖 결과 이중 필터
 # - 경도 기준선 오른쪽만 결과로 남기는 옵션
 # - 엑셀(.xlsx) 저장
-
+# - 타일 N개 동시 처리(스레드 풀) + 토큰 버킷 QPS/QPM 제한
+# - 429/5xx 재시도(지터 백오프, Retry-After) + AIMD 동시성 + 서킷 브레이커(places_http)
+# - 응답 디스크 캐시(places_cache) — PLACES_CACHE_MODE=replay 로 오프라인 재실행
+# - BFS 체크포인트(checkpoint) — 중단 후 --resume 으로 이어서 실행
+# - 완료 타일 합집합에 이미 덮인 타일은 호출 전에 건너뜀(coverage_index)
+# - 분할 방식 선택: 원 7분할(circle) / 사각형 쿼드트리 4분할(rect, 겹침·반경필터 낭비 없음)
+# - 2단계 수집(two_phase): id/location만 스윕 → 고유 id마다 Place Details 1회
+# - GeoJSON 폴리곤 지역(REGION_GEOJSON): 폴리곤과 겹치는 타일만 생성/분할, 결과도 폴리곤 안만
+# - 타일 순서(SCHEDULER): fifo(BFS) / priority(호출당 기대 새 장소 수 — 예산이 빠듯할 때 밀집 지역 먼저)
+# - 잎 타일 + 결과 지문 저장(LEAVES_PATH) → recrawl.py refresh 로 잎만 다시 조회하는 증분 갱신
+# - 계측(crawl_metrics): 깊이별 호출/포화율/호출당 새 장소, 쿼리당 페이지, HTTP 지연 → JSON 요약 + Prometheus
+
+import argparse
 import math
-import time
-from collections import deque
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from typing import List, Dict, Tuple, Optional
 
 import requests
 from openpyxl import Workbook
 
+from checkpoint import BfsCheckpoint
+from coverage_index import CoverageIndex
+from crawl_metrics import CrawlRecorder, observe_pages
+from place_details import (
+  DISCOVERY_FIELD_MASK, TRAFFIC, details_mask_from_search_mask, fetch_place_details, merge_details,
+  print_two_phase_report
+)
+from page_pipeline import run_page_chains
+from places_cache import cached_call, get_cache
+from places_http import PLACES_HTTP
+from query_optimizer import load_query_set
+from recrawl import make_leaf, save_leaves
+from rate_limiter import TokenBucket
+from region_polygon import Region, load_region, region_savings_report
+from tile_scheduler import make_frontier
+
 # =======================
 # 기본 설정
 # =======================
@@ -31,6 +59,11 @@ HEADERS = {
   )
 }
 
+# 수집 방식
+# - "full"     : 모든 페이지에서 위 HEADERS의 풍부한 필드까지 받음(기존)
+# - "two_phase": 스윕은 places.id,places.location 만 → 끝나고 고유 id마다 Details로 풍부한 필드 1회
+DISCOVERY_MODE = "full"
+
 # 시작 위치(중심) 및 파일럿/전체 반경
 START_LAT = 51.5055
 START_LNG = -0.0865
@@ -42,21 +75,50 @@ MARGIN_M = 10.0       # inner cutoff = pilot_maxdist + margin
 MAX_CELL_RADIUS = 400.0   # 타일 반경(작을수록 누락↓ / 호출수↑)
 OVERLAP_RATIO   = 0.2     # 인접 타일 겹침 비율
 
+# 분할 방식
+# - "circle": 파일럿 + 띠(annulus) 원 타일 + r/2 7분할(겹침 있음, 사각형 요청 후 반경 밖은 버림)
+# - "rect"  : 목표 원을 덮는 겹치지 않는 사각형 격자(한 변 2*MAX_CELL_RADIUS) + 4분할 쿼드트리
+SPLIT_MODE = "circle"
+
 # 세분화(분할) 파라미터
 MIN_RADIUS_M = 120.0
 MAX_DEPTH = 4
 SPLIT_COUNT_THRESHOLD = 200   # 한 타일 결과가 이 이상이면 강제 분할
+TEXT_RESULTS_CAP = 60         # Text Search 쿼리당 최대 결과(3페이지) — 쿼리 하나가 이만큼 받았으면 잘렸을 수 있음
 MAX_TOTAL_CALLS = 10000     # 전체 API 호출 상한(세이프가드)
+USE_COVERAGE_INDEX = True   # 분할 안 되고 끝난 타일들의 합집합 안에 완전히 들어가는 타일은 건너뜀
+
+# 타일 순서: "fifo"(BFS) / "priority"(tile_scheduler — 예산 안에서 호출당 새 장소가 많을 타일 먼저)
+SCHEDULER = "fifo"
+SCHEDULER_PRIOR_PATH: Optional[str] = None   # priority: 이전 실행 밀도 격자(있으면 읽고, 끝나면 갱신)
+
+# 동시 실행 / 속도 제한 (고정 sleep 대신 토큰 버킷)
+TILE_WORKERS = 8        # 동시에 진행할 타일 수(1이면 기존 순차 BFS와 동일한 순서)
+CHAIN_WORKERS = 4       # 타일 하나 안에서 동시에 돌릴 쿼리 페이지네이션 체인 수(1이면 쿼리 순서대로)
+RATE_LIMIT_QPS: Optional[float] = 10.0    # 초당 호출 상한(None이면 제한 없음)
+RATE_LIMIT_QPM: Optional[float] = 600.0   # 분당 호출 상한(None이면 제한 없음)
 
 # 텍스트 쿼리 버킷(디자인/마케팅 예시 — 필요 시 확장)
 CREATIVE_QUERIES = [
   "marketing agency", "digital marketing agency", "advertising agency",
   "creative agency", "branding agency", "web design agency", "seo agency"
 ]
+# query_optimizer.py 결과(JSON)를 쓰려면 경로 지정 → 위 목록 대신 사용
+QUERY_SET_PATH: Optional[str] = None
+CREATIVE_QUERIES = load_query_set(QUERY_SET_PATH, CREATIVE_QUERIES)
 
 # 페이지네이션: None이면 끝까지, 숫자면 해당 페이지 수까지만
 MAX_TEXT_PAGES_PER_QUERY: Optional[int] = None
 
+# 페이지네이션 조기 종료(한계 수익)
+# - 최근 EARLY_STOP_WINDOW 페이지에서 '새 ID'(이 타일 + 전체 결과에 없던 것) 비율이 임계값 미만이면 그 쿼리 체인 중단
+# - 중단은 '이미 다른 곳에서 받은 장소만 반복'이라는 뜻 → 포화(분할)로 보지 않고, 타일을 완료 영역으로만 등록하지 않음
+#   (예전처럼 포화로 분할하면 자식 7개 × 쿼리 수 만큼 호출이 늘어남: benchmark_crawl 3000곳 기준 1023 → 1780 호출, recall 동일)
+# - 더 쪼갤 수 없는 타일(최소 반경/최대 깊이)에서는 끝까지 추적
+EARLY_STOP_WINDOW = 2
+# 기본 끔: 켜면(0.1) 호출 965 / recall 0.841, 끄면 1023 / 0.847(benchmark_crawl --synthetic 3000, text_circle)
+EARLY_STOP_MIN_NEW_RATIO: Optional[float] = None   # None이면 끄기(예: 0.1)
+
 # 위치 제한/필터
 USE_LOCATION_RESTRICTION = True   # True → rectangle로 반경 강제 제한
 FILTER_BY_RADIUS = True       # 반경 밖 결과를 거리로 한 번 더 버림(안전)
@@ -64,9 +126,62 @@ FILTER_BY_RADIUS = True       # 반경 밖 결과를 거리로 한 번 더 버
 FILTER_RESULTS_TO_RIGHT_ONLY = True
 CUTOFF_LNG = -0.09038947216087369
 
+# 폴리곤 지역(GeoJSON 경로). 지정하면 위의 중심+반경/기준선 대신 폴리곤으로 타일 생성·결과 필터
+REGION_GEOJSON: Optional[str] = None
+REGION: Optional[Region] = None   # main()에서 로드
+
 # 저장(엑셀)
 XLSX_PATH = "text_results_creative.xlsx"
 
+# 계측: 깊이별 타일/호출/포화율/호출당 새 장소, 쿼리당 페이지 수, 엔드포인트별 지연, 예산 소진 속도
+# → MAX_CELL_RADIUS / OVERLAP_RATIO / SPLIT_COUNT_THRESHOLD 조정 근거
+METRICS_JSON_PATH: Optional[str] = "metrics_text_search.json"   # 실행 요약(None이면 안 씀)
+METRICS_PROM_PATH: Optional[str] = None   # Prometheus 텍스트 파일(node_exporter textfile collector)
+METRICS_PORT: Optional[int] = None        # 수집 중 /metrics HTTP 엔드포인트
+
+# 잎 타일(분할 없이 끝난 타일) + 타일별 결과 지문 → recrawl.py refresh 로 잎만 다시 조회(None이면 안 씀)
+LEAVES_PATH: Optional[str] = "leaves_text_search.json"
+
+# 체크포인트(스냅샷 + 타일별 저널)
+CHECKPOINT_DIR = "checkpoint_text_search"
+CHECKPOINT_EVERY = 50   # 완료 타일 N개마다 스냅샷 압축
+
+
+# =======================
+# HTTP 공용 상태(스레드 공유)
+# =======================
+RATE_LIMITER = TokenBucket(qps=RATE_LIMIT_QPS, qpm=RATE_LIMIT_QPM)
+_thread_local = threading.local()
+_calls_lock = threading.Lock()
+_calls_issued = 0
+
+def get_session() -> requests.Session:
+  # 스레드별 세션(커넥션 풀 재사용)
+  sess = getattr(_thread_local, "session", None)
+  if sess is None:
+    sess = requests.Session()
+    _thread_local.session = sess
+  return sess
+
+def calls_issued() -> int:
+  # 지금까지 '시작된' 호출 수(진행 중 타일 포함) → 예산 체크용
+  with _calls_lock:
+    return _calls_issued
+
+def _count_call():
+  global _calls_issued
+  with _calls_lock:
+    _calls_issued += 1
+
+_stats_lock = threading.Lock()
+PAGINATION_STATS = {"early_stops": 0}
+
+def _set_calls_issued(n: int):
+  # 재개 시 체크포인트의 호출 수부터 이어서 센다
+  global _calls_issued
+  with _calls_lock:
+    _calls_issued = n
+
 
 # =======================
 # 유틸
@@ -145,6 +260,13 @@ def build_ring_tiles_plan(
       })
   return tiles
 
+def tile_key(tile: Dict) -> Tuple:
+  # 중복 타일 판정 키
+  if "rect" in tile:
+    return ("rect",) + tuple(round(v, 6) for v in tile["rect"])
+  lat, lng = tile["center"]
+  return (round(lat, 6), round(lng, 6), round(tile["radius"], 1))
+
 def split_circle_7(center_lat: float, center_lng: float, radius_m: float, parent_depth: int) -> List[Dict]:
   """r/2로 7분할(중심 + 육각)"""
   r2 = radius_m / 2.0
@@ -158,73 +280,176 @@ def split_circle_7(center_lat: float, center_lng: float, radius_m: float, parent
   return out
 
 
+# =======================
+# 사각형 쿼드트리(rect 모드)
+# =======================
+def make_rect_tile(south: float, west: float, north: float, east: float, depth: int) -> Dict:
+  # radius = 짧은 변의 절반(최소 반경/로그용, 원 모드의 r과 같은 의미로 사용)
+  clat, clng = (south + north) / 2.0, (west + east) / 2.0
+  half_ns = haversine_meters(south, clng, north, clng) / 2.0
+  half_ew = haversine_meters(clat, west, clat, east) / 2.0
+  return {"rect": (south, west, north, east), "center": (clat, clng), "radius": min(half_ns, half_ew), "depth": depth}
+
+def rect_restriction(rect: Tuple[float, float, float, float]) -> Dict:
+  south, west, north, east = rect
+  return {
+    "rectangle": {
+      "low":  {"latitude": south, "longitude": west},   # SW
+      "high": {"latitude": north, "longitude": east}  # NE
+    }
+  }
+
+def build_rect_grid_plan(lat0: float, lng0: float, R: float, cell_m: float) -> List[Dict]:
+  """반경 R 원의 bbox를 한 변 cell_m 이하 정사각형 격자로 나누고, 원과 겹치는 칸만 남김(칸끼리 겹침 없음)"""
+  n = max(1, math.ceil(2 * R / cell_m))
+  side = 2 * R / n
+  tiles: List[Dict] = []
+  for i in range(n):
+    y0, y1 = -R + i * side, -R + (i + 1) * side
+    for j in range(n):
+      x0, x1 = -R + j * side, -R + (j + 1) * side
+      # 칸에서 중심에 가장 가까운 점이 원 밖이면 제외
+      nx = min(max(0.0, x0), x1)
+      ny = min(max(0.0, y0), y1)
+      if nx * nx + ny * ny > R * R:
+        continue
+      south, west = offset_latlng(lat0, lng0, north_m=y0, east_m=x0)
+      north, east = offset_latlng(lat0, lng0, north_m=y1, east_m=x1)
+      tiles.append(make_rect_tile(south, west, north, east, depth=0))
+  return tiles
+
+def split_rect_4(tile: Dict) -> List[Dict]:
+  """사각형을 위경도 중점으로 4등분(겹침 없음)"""
+  south, west, north, east = tile["rect"]
+  mlat, mlng = (south + north) / 2.0, (west + east) / 2.0
+  d = tile.get("depth", 0) + 1
+  return [
+    make_rect_tile(south, west, mlat, mlng, d),
+    make_rect_tile(south, mlng, mlat, east, d),
+    make_rect_tile(mlat, west, north, mlng, d),
+    make_rect_tile(mlat, mlng, north, east, d),
+  ]
+
+
 # =======================
 # Text Search
 # =======================
-def text_search_once(lat: float, lng: float, radius_m: float, query: str, page_token: Optional[str] = None):
+def search_field_mask() -> str:
+  if DISCOVERY_MODE == "two_phase":
+    return DISCOVERY_FIELD_MASK + ",nextPageToken"
+  return HEADERS["X-Goog-FieldMask"]
+
+def text_search_once(lat: float, lng: float, radius_m: float, query: str, page_token: Optional[str] = None,
+                     rect: Optional[Tuple[float, float, float, float]] = None):
   # rectangle로 강제 제한 (Text Search의 locationRestriction은 rectangle만 허용)
+  # rect가 있으면(사각형 모드) 그 사각형을 그대로 사용
   payload = {
     "textQuery": query,
-    "locationRestriction": make_viewport_rectangle(lat, lng, radius_m),
+    "locationRestriction": rect_restriction(rect) if rect else make_viewport_rectangle(lat, lng, radius_m),
     "pageSize": 20
   }
   if page_token:
     payload["pageToken"] = page_token
 
-  res = requests.post(TEXT_URL, headers=HEADERS, json=payload, timeout=30)
-  res.raise_for_status()
-  data = res.json()
+  field_mask = search_field_mask()
+  headers = dict(HEADERS, **{"X-Goog-FieldMask": field_mask})
+
+  def fetch():
+    # 429/5xx는 PLACES_HTTP가 백오프 후 재시도(토큰은 시도마다 다시 받음)
+    res = PLACES_HTTP.post(TEXT_URL, session=get_session(), limiter=RATE_LIMITER, headers=headers, json=payload,
+                           timeout=30)
+    TRAFFIC.add("search", len(res.content), field_mask)
+    return res.json()
+
+  # 예산은 캐시 적중 여부와 무관하게 '논리 호출' 기준(replay 시 같은 경로 재현)
+  _count_call()
+  data = cached_call(TEXT_URL, payload, field_mask, fetch)
   return data.get("places", []), data.get("nextPageToken")
 
-def search_text_tile(lat: float, lng: float, radius_m: float, queries: List[str], max_pages_per_query: Optional[int]):
+def search_text_tile(lat: float, lng: float, radius_m: float, queries: List[str], max_pages_per_query: Optional[int],
+                     rect: Optional[Tuple[float, float, float, float]] = None,
+                     known_ids=None, can_split: bool = False):
   """
   한 타일 수집: 여러 쿼리 × 페이지네이션(끝까지 혹은 한도까지)
-  반환: (places_unique, count, max_dist, saturated, calls_used)
-    - saturated: max_pages_per_query 제한으로 '더 남은' 상태에서 중단됐는지
+  반환: (places_unique, count, max_dist, saturated, calls_used, partial)
+    - places_unique 만 폴리곤/경도 기준선 범위 필터 적용, count/max_dist 는 범위 필터 전 결과 기준
+    - saturated: max_pages_per_query 제한으로 '더 남은' 상태에서 끊겼는지(→ 분할)
+    - partial: 어느 쿼리든 끝까지 못 읽었는지(페이지 한도/조기 종료/쿼리당 60개 상한) → 완료 영역으로 등록하지 않음
+  rect가 있으면 사각형 타일: 타일 반경 필터 대신 사각형 경계 + 전체 목표 반경(시작점 기준) 필터
+  known_ids: 전체 결과 id 집합(읽기 전용, `in` 검사만) / can_split: 이 타일이 분할 가능한지(조기 종료 허용 조건)
   """
   by_id: Dict[str, Dict] = {}
-  saturated = False
-  calls_used = 0
-
-  for q in queries:
-    token = None
-    pages = 0
-    while True:
-      places, token = text_search_once(lat, lng, radius_m, q, token)
-      calls_used += 1
-
-      for p in places:
-        loc = p.get("location") or {}
-        lon = loc.get("longitude")
-        la  = loc.get("latitude")
-        if lon is None or la is None:
-          continue
-
-        # 경도 기준선: 결과에서만 필터
-        if FILTER_RESULTS_TO_RIGHT_ONLY and not is_right_of_meridian(lon, CUTOFF_LNG):
+  raw_dist: Dict[str, float] = {}  # 범위 필터 전(타일 모양 필터만 거친) id → 거리
+  early_stop = can_split and EARLY_STOP_MIN_NEW_RATIO is not None
+  yields: Dict[str, List[Tuple[int, int]]] = {q: [] for q in queries}  # 쿼리별 페이지 (새 ID 수, 받은 수)
+  received: Dict[str, int] = {q: 0 for q in queries}  # 쿼리별 받은 결과 수(상한 도달 확인)
+
+  def on_page(q: str, page_no: int, places: List[Dict], has_more: bool) -> bool:
+    # 쿼리 체인들은 동시에 돌고, 이 처리 단계는 한 스레드에서만 실행(by_id 잠금 불필요)
+    new_ids = 0
+    for p in places:
+      loc = p.get("location") or {}
+      lon = loc.get("longitude")
+      la  = loc.get("latitude")
+      if lon is None or la is None:
+        continue
+
+      # 반경 이중 필터(원 밖 노이즈 제거)
+      d = haversine_meters(lat, lng, la, lon)
+      if rect is not None:
+        south, west, north, east = rect
+        if not (south <= la <= north and west <= lon <= east):
           continue
+      elif FILTER_BY_RADIUS and d > radius_m:
+        continue
 
-        # 반경 이중 필터(원 밖 노이즈 제거)
-        d = haversine_meters(lat, lng, la, lon)
-        if FILTER_BY_RADIUS and d > radius_m:
-          continue
+      # 포화/분할/커버 반경은 범위 필터 전 결과 기준(경계에 걸친 타일도 포화를 놓치지 않음)
+      pid = p.get("id")
+      if pid and pid not in raw_dist:
+        raw_dist[pid] = d
 
-        pid = p.get("id")
-        if not pid or pid in by_id:
+      # 폴리곤 지역이면 폴리곤 안만, 아니면 경도 기준선 + 전체 목표 반경(저장 결과에서만 필터)
+      if REGION is not None:
+        if not REGION.contains(la, lon):
           continue
-        p["distanceMeters"] = d
-        by_id[pid] = p
-
-      pages += 1
-      if not token:
-        break
-      if (max_pages_per_query is not None) and (pages >= max_pages_per_query):
-        saturated = True
-        break
+      elif FILTER_RESULTS_TO_RIGHT_ONLY and not is_right_of_meridian(lon, CUTOFF_LNG):
+        continue
+      if rect is not None and REGION is None and FILTER_BY_RADIUS \
+          and haversine_meters(START_LAT, START_LNG, la, lon) > BIG_RADIUS_M:
+        continue
+
+      if not pid or pid in by_id:
+        continue
+      p["distanceMeters"] = d
+      by_id[pid] = p
+      if known_ids is None or pid not in known_ids:
+        new_ids += 1
+
+    recent = yields[q]
+    recent.append((new_ids, len(places)))
+    received[q] += len(places)
+    if early_stop and has_more and len(recent) >= EARLY_STOP_WINDOW:
+      window = recent[-EARLY_STOP_WINDOW:]
+      if sum(n for n, _ in window) < EARLY_STOP_MIN_NEW_RATIO * max(sum(t for _, t in window), 1):
+        with _stats_lock:
+          PAGINATION_STATS["early_stops"] += 1
+        return False
+    return True
+
+  # 조기 종료가 켜진 타일은 판정 후 다음 페이지 요청(선요청하면 끊긴 체인마다 헛호출 1회)
+  chains = run_page_chains(queries, lambda q, token: text_search_once(lat, lng, radius_m, q, token, rect=rect),
+                           on_page, max_pages_per_query, workers=CHAIN_WORKERS, prefetch=not early_stop)
+  saturated = False
+  partial = False
+  calls_used = 0
+  for q, c in chains.items():
+    calls_used += c["pages"]
+    saturated = saturated or c["truncated"]
+    partial = partial or c["truncated"] or c["stopped"] or received.get(q, 0) >= TEXT_RESULTS_CAP
+    observe_pages("text_search", c["pages"])
 
-  dists = [p.get("distanceMeters") for p in by_id.values() if isinstance(p.get("distanceMeters"), (int, float))]
-  max_dist = max(dists) if dists else 0.0
-  return list(by_id.values()), len(by_id), max_dist, saturated, calls_used
+  max_dist = max(raw_dist.values()) if raw_dist else 0.0
+  return list(by_id.values()), len(raw_dist), max_dist, saturated, calls_used, partial
 
 
 # =======================
@@ -264,77 +489,352 @@ def save_to_excel(items: List[Dict], path: str):
 # =======================
 # 메인
 # =======================
-def main():
-  # 0) 파일럿: 중심 원 한 번 수집(내부 컷오프 계산용)
-  pilot_places, pilot_count, pilot_maxdist, pilot_sat, pilot_calls = search_text_tile(
-    START_LAT, START_LNG, PILOT_RADIUS_M, CREATIVE_QUERIES, MAX_TEXT_PAGES_PER_QUERY
-  )
-  print(f"[pilot] right_count={pilot_count}, maxDist={pilot_maxdist:.1f}m, calls={pilot_calls}, saturated={pilot_sat}")
+def build_region_seed(region: Region) -> List[Dict]:
+  """폴리곤과 겹치는 시드 타일(rect: bbox로 자른 사각형 격자 / circle: 빈틈없는 육각 원 격자, 파일럿 없음)"""
+  if SPLIT_MODE == "rect":
+    plan = [make_rect_tile(*r, depth=0) for r in region.rect_grid_plan(2 * MAX_CELL_RADIUS)]
+    baseline = build_rect_grid_plan(START_LAT, START_LNG, BIG_RADIUS_M, 2 * MAX_CELL_RADIUS)
+  else:
+    plan = [{"center": c, "radius": MAX_CELL_RADIUS, "depth": 0} for c in region.circle_plan(MAX_CELL_RADIUS)]
+    # 기존 방식: 파일럿 원 + (파일럿 반경 기준) 띠 타일
+    baseline = [{"center": (START_LAT, START_LNG), "radius": PILOT_RADIUS_M}] + build_ring_tiles_plan(
+      lat0=START_LAT, lng0=START_LNG, R=BIG_RADIUS_M, max_distance=PILOT_RADIUS_M, margin=MARGIN_M,
+      max_cell_radius=MAX_CELL_RADIUS, overlap_ratio=OVERLAP_RATIO
+    )
+  region_savings_report(region, len(plan), baseline, len(CREATIVE_QUERIES),
+                        CUTOFF_LNG if FILTER_RESULTS_TO_RIGHT_ONLY else None)
+  return plan
+
+def tile_in_region(tile: Dict) -> bool:
+  if REGION is None:
+    return True
+  if "rect" in tile:
+    return REGION.intersects_rect(tile["rect"])
+  lat, lng = tile["center"]
+  return REGION.intersects_circle(lat, lng, tile["radius"])
+
+def build_seed(meta: Dict) -> Tuple[List[Dict], List[Dict], int]:
+  """
+  시드 타일 계획 → (seed_plan, 파일럿 결과, 파일럿 호출 수)
+  circle 모드는 파일럿 원을 먼저 수집(meta에 pilot_maxdist / 완료 영역 기록), rect·폴리곤 모드는 파일럿 없음
+  """
+  pilot_places: List[Dict] = []
+  pilot_calls = 0
+  if REGION is not None:
+    seed_plan = build_region_seed(REGION)
+  elif SPLIT_MODE == "rect":
+    # 사각형 모드: 파일럿 없이 목표 원을 덮는 겹치지 않는 격자에서 시작
+    seed_plan = build_rect_grid_plan(START_LAT, START_LNG, BIG_RADIUS_M, 2 * MAX_CELL_RADIUS)
+  else:
+    # 0) 파일럿: 중심 원 한 번 수집(내부 컷오프 계산용)
+    pilot_places, pilot_count, pilot_maxdist, pilot_sat, pilot_calls, pilot_partial = search_text_tile(
+      START_LAT, START_LNG, PILOT_RADIUS_M, CREATIVE_QUERIES, MAX_TEXT_PAGES_PER_QUERY
+    )
+    print(f"[pilot] count={pilot_count} right={len(pilot_places)}, maxDist={pilot_maxdist:.1f}m, calls={pilot_calls}, saturated={pilot_sat}")
 
-  # 1) 바깥 띠(annulus) 타일 계획(전체 반경 기준)
-  seed_plan = build_ring_tiles_plan(
-    lat0=START_LAT, lng0=START_LNG, R=BIG_RADIUS_M,
-    max_distance=pilot_maxdist, margin=MARGIN_M,
-    max_cell_radius=MAX_CELL_RADIUS, overlap_ratio=OVERLAP_RATIO
-  )
-  print(f"[seed] tiles={len(seed_plan)}")
-
-  # 2) BFS 큐
-  queue = deque(seed_plan)
-  visited = set()
-  total_calls = pilot_calls
-  processed = 0
-
-  # 결과(파일럿 포함) 디듀프
-  results_by_id: Dict[str, Dict] = {p.get("id"): p for p in pilot_places if p.get("id")}
-
-  while queue and total_calls < MAX_TOTAL_CALLS:
-    print(f"[queue] remaining={len(queue)} processed={processed} calls={total_calls}")
-    tile = queue.popleft()
-    lat, lng = tile["center"]
-    r = tile["radius"]
-    depth = tile.get("depth", 0)
-
-    key = (round(lat, 6), round(lng, 6), round(r, 1))
-    if key in visited:
-      continue
-    visited.add(key)
-
-    places_right, count, maxdist, saturated, calls_used = search_text_tile(
-      lat, lng, r, CREATIVE_QUERIES, MAX_TEXT_PAGES_PER_QUERY
+    # 1) 바깥 띠(annulus) 타일 계획(전체 반경 기준)
+    seed_plan = build_ring_tiles_plan(
+      lat0=START_LAT, lng0=START_LNG, R=BIG_RADIUS_M,
+      max_distance=pilot_maxdist, margin=MARGIN_M,
+      max_cell_radius=MAX_CELL_RADIUS, overlap_ratio=OVERLAP_RATIO
     )
-    total_calls += calls_used
-    processed += 1
+    meta["pilot_maxdist"] = pilot_maxdist
+    meta["pilot_saturated"] = pilot_sat
 
-    for p in places_right:
-      pid = p.get("id")
-      if pid and pid not in results_by_id:
-        results_by_id[pid] = p
+    # 파일럿 원도 포화되지 않았다면 '완료 영역'
+    if not (pilot_sat or pilot_partial or pilot_count >= SPLIT_COUNT_THRESHOLD):
+      meta["coverage"].append([START_LAT, START_LNG, PILOT_RADIUS_M])
+  print(f"[seed] mode={SPLIT_MODE} tiles={len(seed_plan)}")
+  return seed_plan, pilot_places, pilot_calls
 
-    print(f"[tile] depth={depth} r={r:.1f} center=({lat:.6f},{lng:.6f}) "
-        f"-> count={count} maxDist={maxdist:.1f}m saturated={saturated} uniq_total={len(results_by_id)}")
+def split_tile(tile: Dict, count: int, saturated: bool, partial: bool = False) -> Tuple[List[Dict], bool]:
+  """
+  타일 결과로 다음 단계 결정 → (자식 타일, 완료 영역으로 등록할지)
+  분할 조건: 페이지 한도로 끊겼거나 OR 결과가 매우 많을 때
+  partial: 끝까지 못 읽은 쿼리가 있음(조기 종료 등) → 분할은 안 해도 완료 영역은 아님
+  """
+  r = tile["radius"]
+  depth = tile.get("depth", 0)
+  full = saturated or count >= SPLIT_COUNT_THRESHOLD
+  if full and r > MIN_RADIUS_M and depth < MAX_DEPTH:
+    if "rect" in tile:
+      children = split_rect_4(tile)
+    else:
+      lat, lng = tile["center"]
+      children = split_circle_7(lat, lng, r, parent_depth=depth)
+    # 폴리곤 지역이면 폴리곤과 안 겹치는 자식은 버림
+    return [c for c in children if tile_in_region(c)], False
+  return [], not full and not partial and "rect" not in tile
+
+def new_frontier(tiles: List[Dict], origin_lat: float, origin_lng: float):
+  """SCHEDULER에 맞는 대기열(fifo: deque / priority: PriorityFrontier)"""
+  pages = MAX_TEXT_PAGES_PER_QUERY or 3   # 쿼리당 최대 60개 = 3페이지
+  return make_frontier(tiles, SCHEDULER, origin_lat, origin_lng, calls_floor=len(CREATIVE_QUERIES),
+                       max_calls_per_tile=len(CREATIVE_QUERIES) * pages, prior_path=SCHEDULER_PRIOR_PATH)
+
+def main(resume: bool = False):
+  global REGION
+  REGION = load_region(REGION_GEOJSON) if REGION_GEOJSON else None
+  origin_lat, origin_lng = REGION.center if REGION is not None else (START_LAT, START_LNG)
+
+  ckpt = BfsCheckpoint(CHECKPOINT_DIR, snapshot_every=CHECKPOINT_EVERY, key_fn=tile_key)
+  state = ckpt.load() if resume else None
+  if resume and state is None:
+    print(f"[resume] 체크포인트 없음({CHECKPOINT_DIR}) → 처음부터 시작")
+
+  if state is None:
+    _set_calls_issued(0)
+    results_by_id: Dict[str, Dict] = {}
+    total_calls = 0
+    meta = {"queries": CREATIVE_QUERIES, "split_mode": SPLIT_MODE, "coverage": [], "region": REGION_GEOJSON}
+    seed_plan, pilot_places, pilot_calls = build_seed(meta)
+    # 결과(파일럿 포함) 디듀프
+    results_by_id = {p.get("id"): p for p in pilot_places if p.get("id")}
+    total_calls = pilot_calls
+
+    # 2) BFS 큐
+    queue = new_frontier(seed_plan, origin_lat, origin_lng)
+    visited = set()
+    processed = 0
+    leaves = []
+    if pilot_calls:
+      # 파일럿 잎 = maxDist(+여유) 원(띠 타일은 그 바깥부터)
+      pilot_tile = {"center": (START_LAT, START_LNG), "depth": 0,
+                    "radius": min(PILOT_RADIUS_M, meta["pilot_maxdist"] + MARGIN_M)}
+      leaves.append(make_leaf(pilot_tile, pilot_places, len(pilot_places), meta["pilot_saturated"], meta["pilot_maxdist"]))
+  else:
+    queue = new_frontier(state["pending"], origin_lat, origin_lng)
+    visited = state["visited"]
+    total_calls = state["total_calls"]
+    processed = state["processed"]
+    results_by_id = state["results_by_id"]
+    meta = state["meta"]
+    leaves = state["leaves"]
+    if SCHEDULER == "priority":
+      queue.note_places(results_by_id.values())
+    if meta.get("queries") != CREATIVE_QUERIES:
+      print("[resume] 경고: 체크포인트의 쿼리 목록이 현재 설정과 다릅니다")
+    _set_calls_issued(total_calls)
+
+  coverage = CoverageIndex(origin_lat, origin_lng)
+  coverage.load_list(meta.get("coverage", []))
+
+  # 시작 상태를 바로 스냅샷(재개 직후라면 저널 압축)
+  ckpt.snapshot(queue, visited, results_by_id, total_calls, processed, meta, leaves)
+
+  metrics = CrawlRecorder("text_search", MAX_TOTAL_CALLS, prom_path=METRICS_PROM_PATH, port=METRICS_PORT,
+                          calls=0 if state is None else total_calls,
+                          unique=0 if state is None else len(results_by_id))
+  if state is None and pilot_calls:
+    # 파일럿(circle 모드)은 depth=-1 로 따로
+    metrics.tile(-1, PILOT_RADIUS_M, pilot_calls, len(results_by_id), len(results_by_id), False)
+    metrics.progress(total_calls, len(results_by_id))
+
+  # 타일 N개 동시 진행
+  # - 중복(visited)/예산 체크는 '투입 시점'에 수행 → 순차 버전과 같은 기준
+  # - 예산: 끝난 타일이 쓴 호출 + 진행 중 타일마다 최악의 호출 수(쿼리 수 × 쿼리당 최대 페이지)를 예약해 두고 판단
+  #   → 순차 루프처럼 '남은 예산이 있으면 한 타일 더' 이므로 넘쳐도 마지막 타일 하나 분량까지
+  in_flight: Dict = {}
+  tile_calls_max = len(CREATIVE_QUERIES) * (MAX_TEXT_PAGES_PER_QUERY or math.ceil(TEXT_RESULTS_CAP / 20))
+
+  def snapshot_now():
+    meta["coverage"] = coverage.to_list()
+    # 진행 중 타일은 '미완료'로 되돌려 저장
+    running = list(in_flight.values())
+    running_keys = {tile_key(t) for t in running}
+    ckpt.snapshot(running + list(queue), visited - running_keys, results_by_id, total_calls, processed, meta, leaves)
 
-    # 분할 조건: 페이지 한도로 끊겼거나 OR 결과가 매우 많을 때
-    if (saturated or count >= SPLIT_COUNT_THRESHOLD) and r > MIN_RADIUS_M and depth < MAX_DEPTH:
-      for child in split_circle_7(lat, lng, r, parent_depth=depth):
-        queue.append(child)
+  try:
+    with ThreadPoolExecutor(max_workers=TILE_WORKERS) as pool:
+      while queue or in_flight:
+        while (queue and len(in_flight) < TILE_WORKERS
+               and total_calls + len(in_flight) * tile_calls_max < MAX_TOTAL_CALLS):
+          print(f"[queue] remaining={len(queue)} processed={processed} calls={total_calls} in_flight={len(in_flight)}")
+          tile = queue.popleft()
+          lat, lng = tile["center"]
+          r = tile["radius"]
+
+          key = tile_key(tile)
+          if key in visited:
+            continue
+          visited.add(key)
+
+          # 이미 끝난 타일들에 완전히 덮이면 호출 생략(최소 쿼리 수만큼 절감, 원 타일만 해당)
+          if (USE_COVERAGE_INDEX and "rect" not in tile
+              and coverage.prune(lat, lng, r, calls_per_tile=len(CREATIVE_QUERIES))):
+            print(f"[skip] covered r={r:.1f} center=({lat:.6f},{lng:.6f})")
+            metrics.pruned(tile.get("depth", 0))
+            continue
+
+          can_split = r > MIN_RADIUS_M and tile.get("depth", 0) < MAX_DEPTH
+          fut = pool.submit(search_text_tile, lat, lng, r, CREATIVE_QUERIES, MAX_TEXT_PAGES_PER_QUERY,
+                            tile.get("rect"), results_by_id, can_split)
+          in_flight[fut] = tile
+
+        if not in_flight:
+          break
+
+        done, _ = wait(list(in_flight), return_when=FIRST_COMPLETED)
+        for fut in done:
+          # 실패하면 타일이 in_flight에 남아 체크포인트의 미완료 목록으로 들어감
+          places_right, count, maxdist, saturated, calls_used, partial = fut.result()
+          tile = in_flight.pop(fut)
+          lat, lng = tile["center"]
+          r = tile["radius"]
+          depth = tile.get("depth", 0)
+
+          total_calls += calls_used
+          processed += 1
+
+          new_places = []
+          for p in places_right:
+            pid = p.get("id")
+            if pid and pid not in results_by_id:
+              results_by_id[pid] = p
+              new_places.append(p)
+
+          print(f"[tile] depth={depth} r={r:.1f} center=({lat:.6f},{lng:.6f}) "
+              f"-> count={count} maxDist={maxdist:.1f}m saturated={saturated} uniq_total={len(results_by_id)}")
+          metrics.tile(depth, r, calls_used, count, len(new_places), saturated)
+          metrics.progress(total_calls, len(results_by_id))
+
+          children, complete = split_tile(tile, count, saturated, partial)
+          if SCHEDULER == "priority":
+            queue.observe(tile, count, saturated, new_places)
+          queue.extend(children)
+          disc = (lat, lng, r) if complete else None
+          if disc:
+            coverage.add(*disc)
+
+          leaf = None
+          if not children:
+            leaf = make_leaf(tile, places_right, count, saturated, maxdist)
+            leaves.append(leaf)
+          ckpt.record_tile(tile, calls_used, children, new_places, leaf, disc)
+          if ckpt.due():
+            snapshot_now()
+  except BaseException:
+    # 네트워크 오류/중단 시: 상태 저장 + 지금까지 결과라도 엑셀로
+    snapshot_now()
+    ckpt.close()
+    save_to_excel(list(results_by_id.values()), XLSX_PATH)
+    metrics.summary(METRICS_JSON_PATH, {"aborted": True})
+    metrics.close()
+    print(f"[abort] checkpoint -> {CHECKPOINT_DIR} (--resume 으로 이어서 실행), partial Excel -> {XLSX_PATH}")
+    raise
 
-    time.sleep(0.03)  # QPS 여유
+  snapshot_now()
+  ckpt.close()
+  if SCHEDULER == "priority" and SCHEDULER_PRIOR_PATH:
+    queue.save_prior(SCHEDULER_PRIOR_PATH)
 
   print("\n=== FINAL SUMMARY ===")
+  print(f"Split mode: {meta.get('split_mode', 'circle')}  Scheduler: {SCHEDULER}")
+  if REGION is not None:
+    print(f"Region: {REGION_GEOJSON}")
   print(f"Unique places (right side only={FILTER_RESULTS_TO_RIGHT_ONLY}): {len(results_by_id)}")
   print(f"HTTP calls (approx): {total_calls}")
+  print(f"Unique places per call: {len(results_by_id) / max(total_calls, 1):.3f}")
   print(f"Visited tiles: {len(visited)}")
+  print(f"Pagination early stops: {PAGINATION_STATS['early_stops']}")
+  print(f"Rate limiter wait (s): {RATE_LIMITER.waited_s:.1f}")
+  print(PLACES_HTTP.summary())
+  print(get_cache().summary())
+  print(coverage.summary())
+  run_metrics = metrics.summary(METRICS_JSON_PATH, {
+    "split_mode": meta.get("split_mode", "circle"), "scheduler": SCHEDULER, "max_cell_radius": MAX_CELL_RADIUS,
+    "overlap_ratio": OVERLAP_RATIO, "split_count_threshold": SPLIT_COUNT_THRESHOLD, "tiles_left": len(queue),
+  })
+  metrics.print_depth_table(run_metrics)
+  metrics.close()
+
+  # 2단계: 고유 id마다 Details 1회로 풍부한 필드 채우기
+  if DISCOVERY_MODE == "two_phase":
+    details = fetch_place_details(
+      list(results_by_id), API_KEY, details_mask_from_search_mask(HEADERS["X-Goog-FieldMask"]), limiter=RATE_LIMITER
+    )
+    merge_details(results_by_id.values(), details)
+    print_two_phase_report(total_calls, len(results_by_id))
+  else:
+    print(TRAFFIC.summary())
+
+  if LEAVES_PATH:
+    save_leaves(LEAVES_PATH, "text_search", {
+      "queries": CREATIVE_QUERIES, "split_mode": meta.get("split_mode", "circle"), "region": REGION_GEOJSON,
+      "max_pages": MAX_TEXT_PAGES_PER_QUERY, "discovery_mode": DISCOVERY_MODE,
+    }, leaves, results_by_id, pending=list(queue), calls=total_calls)
 
   # 3) 저장
   items = list(results_by_id.values())
   save_to_excel(items, XLSX_PATH)
   print(f"Saved Excel -> {XLSX_PATH}")
 
+  return {
+    "split_mode": meta.get("split_mode", "circle"),
+    "calls": total_calls,
+    "unique": len(results_by_id),
+    "tiles": processed,
+    "unique_per_call": len(results_by_id) / max(total_calls, 1),
+    "place_ids": list(results_by_id),
+    "metrics": run_metrics,
+  }
+
+
+def compare_split_modes():
+  """같은 영역을 circle / rect 모드로 각각 수집해 호출 수와 호출당 고유 장소 수를 비교"""
+  global SPLIT_MODE, XLSX_PATH, CHECKPOINT_DIR, METRICS_JSON_PATH, LEAVES_PATH
+  base_xlsx, base_ckpt, base_mode, base_metrics = XLSX_PATH, CHECKPOINT_DIR, SPLIT_MODE, METRICS_JSON_PATH
+  base_leaves = LEAVES_PATH
+  rows = []
+  try:
+    for mode in ("circle", "rect"):
+      SPLIT_MODE = mode
+      XLSX_PATH = base_xlsx.replace(".xlsx", f"_{mode}.xlsx")
+      CHECKPOINT_DIR = f"{base_ckpt}_{mode}"
+      if base_metrics:
+        METRICS_JSON_PATH = base_metrics.replace(".json", f"_{mode}.json")
+      if base_leaves:
+        LEAVES_PATH = base_leaves.replace(".json", f"_{mode}.json")
+      rows.append(main())
+  finally:
+    SPLIT_MODE, XLSX_PATH, CHECKPOINT_DIR, METRICS_JSON_PATH = base_mode, base_xlsx, base_ckpt, base_metrics
+    LEAVES_PATH = base_leaves
+
+  print("\n=== SPLIT MODE COMPARISON ===")
+  print(f"{'mode':<8}{'calls':>8}{'tiles':>8}{'unique':>8}{'uniq/call':>11}")
+  for row in rows:
+    print(f"{row['split_mode']:<8}{row['calls']:>8}{row['tiles']:>8}{row['unique']:>8}{row['unique_per_call']:>11.3f}")
+  return rows
+
 
 if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description="Places Text Search 타일 수집기")
+  parser.add_argument("--resume", action="store_true", help=f"{CHECKPOINT_DIR}의 마지막 체크포인트에서 이어서 실행")
+  parser.add_argument("--split-mode", choices=["circle", "rect"], default=None, help="분할 방식(기본: SPLIT_MODE)")
+  parser.add_argument("--compare", action="store_true", help="circle / rect 두 방식을 차례로 실행해 비교")
+  parser.add_argument("--query-set", default=None, help="query_optimizer.py 가 만든 쿼리 집합 JSON")
+  parser.add_argument("--region", default=None, help="수집 지역 GeoJSON(Polygon/MultiPolygon)")
+  parser.add_argument("--scheduler", choices=["fifo", "priority"], default=None, help="타일 순서(기본: SCHEDULER)")
+  parser.add_argument("--metrics-port", type=int, default=None, help="수집 중 Prometheus /metrics 엔드포인트 포트")
+  parser.add_argument("--metrics-file", default=None, help="Prometheus 텍스트 파일 경로(textfile collector)")
+  args = parser.parse_args()
+  if args.scheduler:
+    SCHEDULER = args.scheduler
+  if args.metrics_port is not None:
+    METRICS_PORT = args.metrics_port
+  if args.metrics_file:
+    METRICS_PROM_PATH = args.metrics_file
+  if args.split_mode:
+    SPLIT_MODE = args.split_mode
+  if args.region:
+    REGION_GEOJSON = args.region
+  if args.query_set:
+    CREATIVE_QUERIES = load_query_set(args.query_set, CREATIVE_QUERIES)
   try:
-    main()
+    if args.compare:
+      compare_split_modes()
+    else:
+      main(resume=args.resume)
   except requests.HTTPError as e:
     resp = e.response
     if resp is not None:
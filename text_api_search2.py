@@ -4,6 +4,17 @@ import requests
 import pandas as pd
 from typing import Dict, List, Tuple, Optional
 
+from place_details import (
+  DISCOVERY_FIELD_MASK, TRAFFIC, details_mask_from_search_mask, fetch_place_details, merge_details,
+  print_two_phase_report
+)
+from place_store import PlaceStore, category_of
+from page_pipeline import run_page_chains
+from places_cache import cached_call, get_cache
+from crawl_metrics import observe_pages
+from places_http import PLACES_HTTP
+from query_optimizer import load_query_set
+
 API_KEY = "YOUR_API_KEY"   # ← 교체
 URL_TEXT = "https://places.googleapis.com/v1/places:searchText"
 
@@ -14,9 +25,16 @@ CENTER_LAT = 51.5055
 CENTER_LNG = -0.0865
 SEARCH_RADIUS_M = 3000.0
 MAX_PAGES_PER_QUERY = 10   # 페이지 한도(안전장치). 모두 끝까지면 None
+CHAIN_WORKERS = 4      # 동시에 돌릴 쿼리 페이지네이션 체인 수(1이면 쿼리 순서대로)
 
 CATEGORY_LABEL = "디자인/마케팅 에이전시"
 
+# 수집 방식: "full"(모든 페이지에서 아래 FIELD_MASK 전부) / "two_phase"(id/location만 스윕 → Details 1회)
+DISCOVERY_MODE = "full"
+
+# 공용 SQLite 저장소(예: "places.sqlite")에도 upsert(카테고리 = 출력 엑셀 이름)
+STORE_PATH: Optional[str] = None
+
 USE_EAST_OF_LONGITUDE = True
 CUTOFF_LNG = -0.09038947216087369
 
@@ -34,6 +52,9 @@ CREATIVE_QUERIES = [
   "UX UI agency",
   "performance marketing agency",
 ]
+# query_optimizer.py 결과(JSON)를 쓰려면 경로 지정 → 위 목록 대신 사용
+QUERY_SET_PATH: Optional[str] = None
+CREATIVE_QUERIES = load_query_set(QUERY_SET_PATH, CREATIVE_QUERIES)
 
 # === FieldMask: 필요한 것만 지정해야 실제 응답에 포함됨 ===
 FIELD_MASK = ",".join([
@@ -147,64 +168,83 @@ def text_search_once(query: str, lat: float, lng: float, radius_m: float, page_t
   if page_token:
     body["pageToken"] = page_token
 
-  r = requests.post(URL_TEXT, headers=HEADERS, json=body, timeout=30)
-  if r.status_code >= 400:
+  field_mask = DISCOVERY_FIELD_MASK + ",nextPageToken" if DISCOVERY_MODE == "two_phase" else FIELD_MASK
+  headers = dict(HEADERS, **{"X-Goog-FieldMask": field_mask})
+
+  def fetch():
+    # 429/5xx는 PLACES_HTTP가 백오프 후 재시도, 그 밖의 오류는 본문을 찍고 그대로 예외
     try:
-      print(f"[HTTP {r.status_code}] {r.text[:500]}")
-    finally:
-      r.raise_for_status()
-  data = r.json()
+      r = PLACES_HTTP.post(URL_TEXT, headers=headers, json=body, timeout=30)
+    except requests.HTTPError as e:
+      if e.response is not None:
+        print(f"[HTTP {e.response.status_code}] {e.response.text[:500]}")
+      raise
+    TRAFFIC.add("search", len(r.content), field_mask)
+    return r.json()
+
+  data = cached_call(URL_TEXT, body, field_mask, fetch)
   return data.get("places", []), data.get("nextPageToken")
 
 # ===== 실행 & 저장 =====
+def place_to_row(p: Dict) -> Dict:
+  loc = p.get("location") or {}
+  display_name = (p.get("displayName") or {}).get("text") or ""
+  website = p.get("websiteUri") or ""
+  phone = p.get("nationalPhoneNumber") or p.get("internationalPhoneNumber") or ""
+  primary_type = p.get("primaryType") or ""
+
+  addr_line, postal_addr, postal_code = build_address_fields(p)
+
+  return {
+    "회사명": display_name,
+    "업종": CATEGORY_LABEL,
+    "기본 유형": primary_type,
+    "주소": addr_line,     # 도로/번지 중심
+    "우편주소": postal_addr,  # 완전 우편주소(도시/주/우편번호/국가 포함)
+    "우편번호": postal_code or "",
+    "이메일 주소": "",      # Places는 이메일 미제공(웹 크롤링 필요)
+    "전화번호": phone,
+    "웹사이트 주소": website,
+    "위도": loc.get("latitude"),
+    "경도": loc.get("longitude"),
+  }
+
 def run_text_search_to_excel(output_path: str):
   seen = set()
-  rows = []
-
-  for q in CREATIVE_QUERIES:
-    token = None
-    pages = 0
-    while True:
-      places, token = text_search_once(q, CENTER_LAT, CENTER_LNG, SEARCH_RADIUS_M, token)
-
-      for p in places:
-        pid = p.get("id")
-        if not pid or pid in seen:
-          continue
-
-        loc = p.get("location") or {}
-        plat = loc.get("latitude")
-        plng = loc.get("longitude")
-        if USE_EAST_OF_LONGITUDE and isinstance(plng, (int, float)) and not is_right_of_meridian(plng, CUTOFF_LNG):
-          continue
-
-        seen.add(pid)
-
-        display_name = (p.get("displayName") or {}).get("text") or ""
-        website = p.get("websiteUri") or ""
-        phone = p.get("nationalPhoneNumber") or p.get("internationalPhoneNumber") or ""
-        primary_type = p.get("primaryType") or ""
-
-        addr_line, postal_addr, postal_code = build_address_fields(p)
-
-        row = {
-          "회사명": display_name,
-          "업종": CATEGORY_LABEL,
-          "기본 유형": primary_type,
-          "주소": addr_line,     # 도로/번지 중심
-          "우편주소": postal_addr,  # 완전 우편주소(도시/주/우편번호/국가 포함)
-          "우편번호": postal_code or "",
-          "이메일 주소": "",      # Places는 이메일 미제공(웹 크롤링 필요)
-          "전화번호": phone,
-          "웹사이트 주소": website,
-          "위도": plat,
-          "경도": plng,
-        }
-        rows.append(row)
-
-      pages += 1
-      if not token or (MAX_PAGES_PER_QUERY is not None and pages >= MAX_PAGES_PER_QUERY):
-        break
+  kept: List[Dict] = []
+
+  def on_page(q: str, page_no: int, places: List[Dict], has_more: bool):
+    # 쿼리 체인들은 동시에 돌고, 도착한 페이지는 여기(한 스레드)에서 차례로 처리
+    for p in places:
+      pid = p.get("id")
+      if not pid or pid in seen:
+        continue
+
+      loc = p.get("location") or {}
+      plng = loc.get("longitude")
+      if USE_EAST_OF_LONGITUDE and isinstance(plng, (int, float)) and not is_right_of_meridian(plng, CUTOFF_LNG):
+        continue
+
+      seen.add(pid)
+      kept.append(p)
+
+  chains = run_page_chains(CREATIVE_QUERIES, lambda q, token: text_search_once(q, CENTER_LAT, CENTER_LNG,
+                                                                             SEARCH_RADIUS_M, token),
+                           on_page, MAX_PAGES_PER_QUERY, workers=CHAIN_WORKERS)
+  search_calls = 0
+  for c in chains.values():
+    search_calls += c["pages"]
+    observe_pages("text_search2", c["pages"])
+
+  # 2단계: 고유 id마다 Details 1회로 주소/전화/웹사이트 채우기
+  if DISCOVERY_MODE == "two_phase":
+    details = fetch_place_details([p["id"] for p in kept], API_KEY, details_mask_from_search_mask(FIELD_MASK))
+    merge_details(kept, details)
+    print_two_phase_report(search_calls, len(kept))
+  else:
+    print(TRAFFIC.summary())
+
+  rows = [place_to_row(p) for p in kept]
 
   df = pd.DataFrame(rows, columns=[
     "회사명", "업종", "기본 유형", "주소", "우편주소", "우편번호",
@@ -212,6 +252,21 @@ def run_text_search_to_excel(output_path: str):
   ]).fillna("")
   df.to_excel(output_path, index=False)
   print(f"저장 완료: {output_path} (총 {len(df)}건)")
+  if STORE_PATH:
+    store = PlaceStore(STORE_PATH)
+    for p, row in zip(kept, rows):
+      store.upsert_place(row, category_of(output_path), place_id=p["id"], commit=False)
+    store.close()
+    print(f"[store] upsert {len(rows)} rows -> {STORE_PATH}")
+  print(PLACES_HTTP.summary())
+  print(get_cache().summary())
+  return {"calls": search_calls, "unique": len(kept), "place_ids": [p["id"] for p in kept]}
 
 if __name__ == "__main__":
+  import argparse
+  parser = argparse.ArgumentParser(description="Places Text Search 단일 원 수집기")
+  parser.add_argument("--query-set", default=None, help="query_optimizer.py 가 만든 쿼리 집합 JSON")
+  args = parser.parse_args()
+  if args.query_set:
+    CREATIVE_QUERIES = load_query_set(args.query_set, CREATIVE_QUERIES)
   run_text_search_to_excel("text_results_creative.xlsx")
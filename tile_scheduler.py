@@ -0,0 +1,232 @@
+# tile_scheduler.py
+# -----------------
+# 호출 예산이 정해져 있을 때 타일 순서를 '호출당 기대 새 장소 수'로 정하는 우선순위 대기열
+# - FIFO BFS 는 예산(MAX_TOTAL_CALLS / MAX_CALLS)이 떨어지는 순간 큐 앞쪽(대개 바깥 띠 타일)에서 끊김
+#   → 남은 예산을 밀집 지역 분할 자식에 먼저 쓰도록 순서만 바꿈(수집 범위/분할 규칙은 그대로)
+# - 밀도 격자(셀 GRID_M): 완료된 타일의 관측 밀도(count / 면적)를 겹치는 셀에 누적
+#   · 포화(페이지 한도/20개 꽉 참)된 타일의 관측값은 하한이므로 SATURATION_BOOST 배로 보정 → 부모 포화 신호
+#   · Nearby(DISTANCE 정렬)는 maxDist 원 안 밀도를 정확히 알므로 그 원도 따로 기록
+#   · 관측 없는 셀은 주변 8칸 평균 → 이전 실행의 prior 파일 → 지금까지 전체 평균 순으로 추정
+# - 기대 결과 = Σ(셀 추정 밀도 × 겹친 면적), 기대 호출 = 기대 결과 / 페이지 크기(타일 최소~최대 호출 수 사이)
+#   기대 새 장소 = 받을 결과 수 × (1 − 그 영역에서 이미 찾은 장소 / 기대 결과)
+# - 점수는 관측이 쌓이면 바뀜: 꺼낼 때 다시 계산(lazy) + RESCORE_EVERY 관측마다 전체 재계산
+#   (아직 관측 없을 때 0점으로 들어간 타일이 계속 밀리지 않도록 자주)
+# - deque 와 같은 사용법(append / appendleft / extend / popleft / len / iter) → 수집기 루프 변경 최소화
+
+import heapq
+import itertools
+import json
+import math
+import os
+from collections import deque
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+M_PER_DEG_LAT = 111_320.0
+GRID_M = 250.0
+SATURATION_BOOST = 2.0
+PAGE_SIZE = 20
+RESCORE_EVERY = 5
+
+
+class PriorityFrontier:
+  def __init__(self, origin_lat: float, origin_lng: float, calls_floor: int = 1, max_calls_per_tile: int = 1,
+               grid_m: float = GRID_M):
+    """
+    calls_floor: 타일 하나의 최소 호출 수(text: 쿼리 수, nearby: 1)
+    max_calls_per_tile: 최대 호출 수(text: 쿼리 수 × 3페이지, nearby: 1)
+    """
+    self.origin_lat = origin_lat
+    self.origin_lng = origin_lng
+    self._m_per_deg_lng = M_PER_DEG_LAT * math.cos(math.radians(origin_lat))
+    self.grid_m = grid_m
+    self.calls_floor = calls_floor
+    self.max_calls_per_tile = max_calls_per_tile
+    self._heap: List[Tuple[float, int, Dict]] = []
+    self._seq = itertools.count()
+    self._obs: Dict[Tuple[int, int], List[float]] = {}    # 셀 → [밀도×가중치 합, 가중치 합]
+    self._known: Dict[Tuple[int, int], int] = {}          # 셀 → 이미 찾은 장소 수
+    self._prior: Dict[Tuple[int, int], float] = {}
+    self._total_obs = [0.0, 0.0]
+    self._since_rescore = 0
+    self.rescored = 0
+
+  # -----------------------
+  # 기하(원점 기준 등장방형 투영, 미터)
+  # -----------------------
+  def _xy(self, lat: float, lng: float) -> Tuple[float, float]:
+    return (lng - self.origin_lng) * self._m_per_deg_lng, (lat - self.origin_lat) * M_PER_DEG_LAT
+
+  def _footprint(self, tile: Dict) -> Tuple[float, float, float, float, float]:
+    """타일 → (x0, y0, x1, y1, bbox 대비 실제 면적 비율)"""
+    if "rect" in tile:
+      south, west, north, east = tile["rect"]
+      x0, y0 = self._xy(south, west)
+      x1, y1 = self._xy(north, east)
+      return x0, y0, x1, y1, 1.0
+    x, y = self._xy(*tile["center"])
+    r = tile["radius"]
+    return x - r, y - r, x + r, y + r, math.pi / 4.0
+
+  def _cells(self, tile: Dict) -> Iterator[Tuple[Tuple[int, int], float]]:
+    """타일이 걸치는 셀과 겹친 면적(m², 원은 bbox 겹침 × π/4 근사)"""
+    x0, y0, x1, y1, fill = self._footprint(tile)
+    g = self.grid_m
+    for i in range(math.floor(x0 / g), math.floor(x1 / g) + 1):
+      ox = min(x1, (i + 1) * g) - max(x0, i * g)
+      if ox <= 0:
+        continue
+      for j in range(math.floor(y0 / g), math.floor(y1 / g) + 1):
+        oy = min(y1, (j + 1) * g) - max(y0, j * g)
+        if oy > 0:
+          yield (i, j), ox * oy * fill
+
+  # -----------------------
+  # 추정
+  # -----------------------
+  def _density(self, cell: Tuple[int, int]) -> float:
+    o = self._obs.get(cell)
+    if o:
+      return o[0] / o[1]
+    i, j = cell
+    near = [self._obs[(i + di, j + dj)] for di in (-1, 0, 1) for dj in (-1, 0, 1) if (i + di, j + dj) in self._obs]
+    if near:
+      return sum(s / w for s, w in near) / len(near)
+    if cell in self._prior:
+      return self._prior[cell]
+    if self._total_obs[1] > 0:
+      return self._total_obs[0] / self._total_obs[1]
+    return 0.0
+
+  def estimate(self, tile: Dict) -> Tuple[float, float]:
+    """(기대 새 장소 수, 기대 호출 수)"""
+    cell_area = self.grid_m * self.grid_m
+    total = known = 0.0
+    for cell, w in self._cells(tile):
+      total += self._density(cell) * w
+      known += self._known.get(cell, 0) * w / cell_area
+    calls = max(min(self.max_calls_per_tile, max(self.calls_floor, total / PAGE_SIZE)), 1.0)
+    if total <= 0:
+      return 0.0, calls
+    # 받을 수 있는 결과는 호출당 최대 PAGE_SIZE개, 그중 '아직 모르는' 비율만큼이 새 장소
+    returned = min(total, calls * PAGE_SIZE)
+    return returned * max(0.0, 1.0 - known / total), calls
+
+  def score(self, tile: Dict) -> float:
+    new, calls = self.estimate(tile)
+    return new / calls
+
+  # -----------------------
+  # 관측
+  # -----------------------
+  def _deposit(self, tile: Dict, count: int, boost: float = 1.0):
+    x0, y0, x1, y1, fill = self._footprint(tile)
+    area = max((x1 - x0) * (y1 - y0) * fill, 1.0)
+    rho = count / area * boost
+    for cell, w in self._cells(tile):
+      o = self._obs.setdefault(cell, [0.0, 0.0])
+      o[0] += rho * w
+      o[1] += w
+    self._total_obs[0] += rho * area
+    self._total_obs[1] += area
+
+  def observe(self, tile: Dict, count: int, saturated: bool, new_places: Iterable[Dict] = (),
+              known_radius_m: Optional[float] = None):
+    """
+    완료된 타일 결과 반영(count: 타일 안 결과 수, new_places: 이번에 처음 찾은 장소)
+    known_radius_m: 포화됐어도 이 반경 안은 전부 받았음(Nearby DISTANCE 정렬의 maxDist)
+    """
+    self._deposit(tile, count, SATURATION_BOOST if saturated else 1.0)
+    if saturated and known_radius_m:
+      # maxDist 원 안은 정확한 밀도 → 그 원에 걸친 셀에 한 번 더 기록
+      self._deposit({"center": tile["center"], "radius": known_radius_m}, count)
+    self.note_places(new_places)
+    self._since_rescore += 1
+    if self._since_rescore >= RESCORE_EVERY:
+      self.rescore()
+
+  def note_places(self, places: Iterable[Dict]):
+    """이미 찾은 장소 위치 등록(재개 시 복구 결과 반영용으로도 사용)"""
+    for p in places:
+      loc = p.get("location") or {}
+      if loc.get("latitude") is None or loc.get("longitude") is None:
+        continue
+      x, y = self._xy(loc["latitude"], loc["longitude"])
+      cell = (math.floor(x / self.grid_m), math.floor(y / self.grid_m))
+      self._known[cell] = self._known.get(cell, 0) + 1
+
+  def rescore(self):
+    self._heap = [(-self.score(t), seq, t) for _, seq, t in self._heap]
+    heapq.heapify(self._heap)
+    self._since_rescore = 0
+    self.rescored += 1
+
+  # -----------------------
+  # deque 호환
+  # -----------------------
+  def append(self, tile: Dict):
+    heapq.heappush(self._heap, (-self.score(tile), next(self._seq), tile))
+
+  appendleft = append   # 실패한 타일 되돌리기: 점수 순서로 다시 들어감
+
+  def extend(self, tiles: Iterable[Dict]):
+    for t in tiles:
+      self.append(t)
+
+  def popleft(self) -> Dict:
+    if not self._heap:
+      raise IndexError("pop from an empty frontier")
+    # 꺼낸 항목 점수를 다시 계산해서 다음 후보보다 낮아졌으면 되돌려 넣고 다시 꺼냄(동점은 넣은 순서)
+    while True:
+      _, seq, tile = heapq.heappop(self._heap)
+      fresh = -self.score(tile)
+      if not self._heap or (fresh, seq) <= self._heap[0][:2]:
+        return tile
+      heapq.heappush(self._heap, (fresh, seq, tile))
+
+  def __len__(self) -> int:
+    return len(self._heap)
+
+  def __bool__(self) -> bool:
+    return bool(self._heap)
+
+  def __iter__(self) -> Iterator[Dict]:
+    return (t for _, _, t in sorted(self._heap, key=lambda e: e[:2]))
+
+  # -----------------------
+  # prior(이전 실행의 밀도 격자)
+  # -----------------------
+  def save_prior(self, path: str):
+    cells = {}
+    cell_area = self.grid_m * self.grid_m
+    for cell in set(self._obs) | set(self._known):
+      o = self._obs.get(cell)
+      dens = o[0] / o[1] if o else 0.0
+      cells[f"{cell[0]},{cell[1]}"] = max(dens, self._known.get(cell, 0) / cell_area)
+    with open(path, "w", encoding="utf-8") as f:
+      json.dump({"origin": [self.origin_lat, self.origin_lng], "grid_m": self.grid_m, "cells": cells}, f)
+
+  def load_prior(self, path: str) -> bool:
+    with open(path, encoding="utf-8") as f:
+      data = json.load(f)
+    same_grid = (data.get("grid_m") == self.grid_m
+                 and [round(v, 6) for v in data.get("origin", [])] == [round(self.origin_lat, 6), round(self.origin_lng, 6)])
+    if not same_grid:
+      print(f"[scheduler] prior {path}: 원점/격자가 달라서 무시")
+      return False
+    self._prior = {tuple(int(v) for v in k.split(",")): d for k, d in data["cells"].items()}
+    self.rescore()
+    return True
+
+
+def make_frontier(tiles: Iterable[Dict], scheduler: str, origin_lat: float, origin_lng: float,
+                  calls_floor: int = 1, max_calls_per_tile: int = 1, prior_path: Optional[str] = None):
+  """scheduler: "fifo"(기존 deque BFS) / "priority"(PriorityFrontier)"""
+  if scheduler == "fifo":
+    return deque(tiles)
+  if scheduler != "priority":
+    raise ValueError(f"알 수 없는 스케줄러: {scheduler} (fifo/priority)")
+  frontier = PriorityFrontier(origin_lat, origin_lng, calls_floor, max_calls_per_tile)
+  if prior_path and os.path.exists(prior_path):
+    frontier.load_prior(prior_path)
+  frontier.extend(tiles)
+  return frontier
@@ -0,0 +1,235 @@
+# url_canon.py
+# ------------
+# 웹사이트 URL 정규화 + 사이트 단위(작업 단위) 묶기 — 같은 사이트는 한 번만 크롤링하고 결과를 모든 행에 복사
+# - 정규화(site key): 스킴 무시, 호스트 소문자/www. 제거/기본 포트 제거, 끝 슬래시·index.html 제거,
+#   #fragment 제거, 추적 파라미터(utm_*, gclid, fbclid ...) 제거 후 나머지 쿼리 정렬
+# - 작업 단위(by="domain"): 등록 도메인(예: branch.brand.co.uk → brand.co.uk)
+#     · 영국 2단계 접미사(co.uk, org.uk, ltd.uk ...)와 기타 ccTLD 의 com./co./org. 등 고려
+#     · 호스팅 플랫폼 하위 도메인(x.wixsite.com, x.business.site ...)은 그 호스트 자체가 사이트
+#     · 여러 업체가 경로로 나뉘는 공용 호스트(facebook.com/…, linktr.ee/…)는 도메인으로 묶지 않고 URL 단위
+#     · 단, 한 도메인 단위의 행들이 서로 다른 경로(지점 페이지: brand.co.uk/wapping, brand.co.uk/shad-thames ...)를
+#       가리키면 그 도메인은 묶지 않고 site key 마다 따로 크롤링(루트만 보면 지점 이메일을 놓침) — UnitPlan 에서 판단
+#   by="url": 정규화된 URL 단위만(도메인 병합 없음)
+# - 단위마다 크롤링할 URL 하나: 경로가 가장 짧은 것(보통 루트), 같으면 https 우선
+#
+# 사용:
+#   plan = UnitPlan(urls)             # 행 순서대로의 웹사이트 목록(NaN/"-" 포함 가능)
+#   print(plan.report())              # 행 수 → 단위 수, 줄어든 크롤링 수(중복/정규화/도메인 병합별)
+#   unit = plan.unit_of(url); plan.crawl_url(unit); plan.crawl_urls()
+#   python url_canon.py estate_result.xlsx beauty_result.xlsx   # 엑셀별 리포트만
+
+import re
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+TRACKING_PREFIXES = ("utm_",)
+TRACKING_PARAMS = {
+  "gclid", "gbraid", "wbraid", "dclid", "fbclid", "msclkid", "yclid", "mc_cid", "mc_eid", "_ga", "_gl",
+  "igshid", "ref", "ref_src", "source", "hsa_acc", "hsa_cam", "hsa_grp", "hsa_ad", "hsa_src", "hsa_net", "hsa_ver",
+}
+NON_WEB_SCHEMES = {"mailto", "tel", "sms", "fax", "callto", "whatsapp", "javascript"}
+SCHEME_RE = re.compile(r"^[a-z][a-z0-9+\-]*:(?!\d)", re.IGNORECASE)   # 'brand.co.uk:8080' 은 스킴 아님
+INDEX_PAGES = ("index.html", "index.htm", "index.php", "default.aspx", "home.html")
+
+# .uk 2단계 등록 접미사 / 그 밖의 2글자 ccTLD 에서 흔한 2단계 접미사(com.au, co.nz ...)
+UK_SLDS = {"co", "org", "me", "ltd", "plc", "net", "sch", "ac", "gov", "nhs", "police", "mod", "nic"}
+CC_SLDS = {"co", "com", "org", "net", "gov", "edu", "ac", "ltd", "plc"}
+
+# 하위 도메인마다 다른 사이트인 호스팅 플랫폼(등록 도메인 = 하위 도메인 포함 호스트)
+PLATFORM_SUFFIXES = {
+  "wixsite.com", "business.site", "blogspot.com", "blogspot.co.uk", "squarespace.com", "wordpress.com",
+  "github.io", "netlify.app", "vercel.app", "herokuapp.com", "webflow.io", "godaddysites.com", "square.site",
+  "myshopify.com", "weebly.com", "jimdosite.com", "carrd.co", "mytreatwell.co.uk", "as.me",
+  # 등록 기관형 2단계 접미사(mah.uk.com 은 uk.com 의 하위 사이트가 아님)
+  "uk.com", "uk.net", "gb.com", "gb.net", "eu.com", "co.com",
+}
+# 경로로 업체가 나뉘는 공용 호스트(도메인으로 묶으면 남의 이메일이 복사됨) → URL 단위
+SHARED_HOSTS = {
+  "facebook.com", "instagram.com", "linktr.ee", "linkedin.com", "twitter.com", "x.com", "tiktok.com",
+  "youtube.com", "google.com", "goo.gl", "bit.ly", "yell.com", "wa.me", "booksy.com", "fresha.com",
+  "treatwell.co.uk", "rightmove.co.uk", "zoopla.co.uk", "onthemarket.com", "sites.google.com",
+  # 의사/업체 디렉터리(프로필마다 다른 사람)
+  "topdoctors.co.uk", "doctify.com", "ukmapsgo.org", "nhs.uk",
+}
+
+
+# =======================
+# 정규화
+# =======================
+def _split(url: Optional[str]):
+  """문자열 → urlsplit 결과(스킴 없으면 http 가정). 빈 값/NaN/'-' 는 None"""
+  if url is None:
+    return None
+  s = str(url).strip()
+  if not s or s.lower() in ("nan", "none", "-"):
+    return None
+  if "://" not in s:
+    if SCHEME_RE.match(s) or s.split(":", 1)[0].lower() in NON_WEB_SCHEMES:
+      return None  # mailto:/tel: 등
+    s = "http://" + s.lstrip("/")
+  try:
+    parts = urlsplit(s)
+  except ValueError:
+    return None
+  if parts.scheme not in ("http", "https") or not parts.hostname:
+    return None
+  return parts
+
+def _host(parts) -> str:
+  host = parts.hostname.lower().rstrip(".")
+  return host[4:] if host.startswith("www.") else host
+
+def _path(parts) -> str:
+  path = parts.path or "/"
+  for name in INDEX_PAGES:
+    if path.lower().endswith("/" + name):
+      path = path[:-len(name)]
+      break
+  path = path.rstrip("/")
+  return path or "/"
+
+def _query(parts) -> str:
+  keep = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+          if k.lower() not in TRACKING_PARAMS and not k.lower().startswith(TRACKING_PREFIXES)]
+  return urlencode(sorted(keep))
+
+def site_key(url: Optional[str]) -> Optional[str]:
+  """스킴/www/끝 슬래시/추적 파라미터를 무시한 사이트 키(예: 'brand.co.uk/contact?id=3')"""
+  parts = _split(url)
+  if parts is None:
+    return None
+  port = f":{parts.port}" if parts.port and parts.port not in (80, 443) else ""
+  q = _query(parts)
+  path = _path(parts)
+  return _host(parts) + port + ("" if path == "/" else path) + ("?" + q if q else "")
+
+def canonical_url(url: Optional[str]) -> Optional[str]:
+  """크롤링에 쓸 정리된 URL(스킴/호스트 표기는 원래대로 유지, fragment/추적 파라미터 제거)"""
+  parts = _split(url)
+  if parts is None:
+    return None
+  netloc = parts.hostname.lower().rstrip(".")
+  if parts.port and parts.port not in (80, 443):
+    netloc += f":{parts.port}"
+  return urlunsplit((parts.scheme, netloc, _path(parts), _query(parts), ""))
+
+def registrable_domain(host: str) -> str:
+  """호스트 → 등록 도메인(영국 2단계 접미사, 호스팅 플랫폼 하위 도메인 고려)"""
+  host = host.lower().rstrip(".")
+  if host.startswith("www."):
+    host = host[4:]
+  parts = [p for p in host.split(".") if p]
+  for suffix in PLATFORM_SUFFIXES:
+    n = suffix.count(".") + 1
+    if len(parts) > n and ".".join(parts[-n:]) == suffix:
+      return ".".join(parts[-(n + 1):])
+  if len(parts) >= 3 and len(parts[-1]) == 2:
+    slds = UK_SLDS if parts[-1] == "uk" else CC_SLDS
+    if parts[-2] in slds:
+      return ".".join(parts[-3:])
+  return ".".join(parts[-2:]) if len(parts) >= 2 else host
+
+def is_root_key(key: str) -> bool:
+  """site key 가 사이트 루트인지(경로/쿼리 없음)"""
+  return "/" not in key and "?" not in key
+
+def work_unit(url: Optional[str], by: str = "domain") -> Optional[str]:
+  """크롤링 작업 단위 키(같은 키 = 한 번만 크롤링). 지점 경로로 나뉜 도메인은 UnitPlan 이 site key 로 다시 나눔"""
+  key = site_key(url)
+  if key is None or by == "url":
+    return key
+  host = _host(_split(url))
+  dom = registrable_domain(host)
+  return key if (dom in SHARED_HOSTS or host in SHARED_HOSTS) else dom
+
+
+# =======================
+# 묶음 계획
+# =======================
+class UnitPlan:
+  def __init__(self, urls: Iterable[Optional[str]], by: str = "domain"):
+    self.by = by
+    self.rows = 0          # 전체 행
+    self.rows_with_url = 0
+    self._unit_of: Dict[str, Optional[str]] = {}
+    urls = [None if u is None else str(u).strip() for u in urls]
+    # 도메인 단위 안에 서로 다른 site key 가 있고 그중 루트가 아닌 것(지점 경로)이 있으면 → site key 마다 따로
+    keys_by_domain: Dict[str, set] = {}
+    for raw in urls:
+      unit = work_unit(raw, by)
+      if unit is not None:
+        keys_by_domain.setdefault(unit, set()).add(site_key(raw))
+    self.split_domains = {u for u, keys in keys_by_domain.items()
+                          if len(keys) > 1 and not all(is_root_key(k) for k in keys)}
+    self._raw: Dict[str, set] = {}      # 단위 → 원본 문자열들
+    self._keys: Dict[str, set] = {}     # 단위 → site key 들
+    self._rows: Dict[str, int] = {}     # 단위 → 행 수
+    self._best: Dict[str, Tuple] = {}   # 단위 → (정렬 키, 크롤링 URL)
+    for raw in urls:
+      self.rows += 1
+      unit = self.unit_of(raw)
+      if unit is None:
+        continue
+      self.rows_with_url += 1
+      self._rows[unit] = self._rows.get(unit, 0) + 1
+      self._raw.setdefault(unit, set()).add(raw)
+      self._keys.setdefault(unit, set()).add(site_key(raw))
+      cu = canonical_url(raw)
+      rank = (len(urlsplit(cu).path.rstrip("/")), not cu.startswith("https://"), len(cu), cu)
+      if unit not in self._best or rank < self._best[unit][0]:
+        self._best[unit] = (rank, cu)
+
+  def unit_of(self, url: Optional[str]) -> Optional[str]:
+    raw = None if url is None else str(url).strip()
+    if raw not in self._unit_of:
+      unit = work_unit(raw, self.by)
+      self._unit_of[raw] = site_key(raw) if unit in self.split_domains else unit
+    return self._unit_of[raw]
+
+  def crawl_url(self, unit: str) -> str:
+    return self._best[unit][1]
+
+  def crawl_urls(self) -> List[str]:
+    return [self._best[u][1] for u in self._best]
+
+  def rows_of(self, unit: str) -> int:
+    return self._rows.get(unit, 0)
+
+  def stats(self) -> Dict:
+    units = len(self._best)
+    raw = sum(len(v) for v in self._raw.values())
+    keys = sum(len(v) for v in self._keys.values())
+    return {
+      "rows": self.rows, "rows_with_url": self.rows_with_url, "distinct_raw": raw, "distinct_sites": keys,
+      "units": units, "crawls_eliminated": self.rows_with_url - units,
+      "by_exact_duplicate": self.rows_with_url - raw, "by_normalization": raw - keys, "by_domain": keys - units,
+      "shared_units": sum(1 for u in self._rows if self._rows[u] > 1),
+      "split_domains": len(self.split_domains),
+      "split_units": sum(1 for u in self._best if work_unit(self.crawl_url(u), self.by) in self.split_domains),
+    }
+
+  def report(self) -> str:
+    s = self.stats()
+    pct = 100.0 * s["crawls_eliminated"] / max(s["rows_with_url"], 1)
+    return (f"[dedupe] 웹사이트 있는 행 {s['rows_with_url']}/{s['rows']} → 크롤링 {s['units']}개 단위 "
+            f"(줄어든 크롤링 {s['crawls_eliminated']}건, {pct:.1f}%: 완전 중복 {s['by_exact_duplicate']}, "
+            f"정규화 {s['by_normalization']}, 도메인 병합 {s['by_domain']}; 여러 행이 공유하는 단위 {s['shared_units']}개; "
+            f"지점 경로로 나눈 도메인 {s['split_domains']}개 → 단위 {s['split_units']}개)")
+
+  def top_shared(self, n: int = 10) -> List[Tuple[str, int]]:
+    return sorted(((u, c) for u, c in self._rows.items() if c > 1), key=lambda x: -x[1])[:n]
+
+
+if __name__ == "__main__":
+  import argparse
+  import pandas as pd
+  parser = argparse.ArgumentParser(description="결과 엑셀의 웹사이트를 사이트 단위로 묶었을 때 줄어드는 크롤링 수")
+  parser.add_argument("xlsx", nargs="+")
+  parser.add_argument("--by", choices=["domain", "url"], default="domain")
+  parser.add_argument("--col", default="웹사이트 주소")
+  args = parser.parse_args()
+  for path in args.xlsx:
+    plan = UnitPlan(pd.read_excel(path)[args.col].tolist(), by=args.by)
+    print(f"{path}: {plan.report()}")
+    for unit, rows in plan.top_shared(5):
+      print(f"    {rows:4d}행  {unit}  → {plan.crawl_url(unit)}")
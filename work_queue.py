@@ -0,0 +1,178 @@
+# work_queue.py
+# -------------
+# 타일 작업 큐(SQLite 한 파일) — 여러 프로세스/여러 머신(공유 디렉터리)이 같은 타일 BFS를 나눠서 진행
+# - tiles   : 타일 키(PK)로 중복 제거 → visited 집합 역할. 상태 pending / leased / done / failed
+# - lease   : 작업자가 타일을 '임대'(만료 시각 포함). 작업자가 죽으면 만료 후 다른 작업자가 다시 가져감
+# - complete: 완료 표시 + 분할 자식 push + 결과를 place id 기준으로 병합 + 완료 영역(coverage) 등록을 한 트랜잭션으로
+# - results : place id(PK) → place JSON. 같은 장소를 여러 작업자가 찾아도 한 번만 저장
+# - 잠금은 SQLite 파일 잠금(BEGIN IMMEDIATE)만 사용. WAL은 공유 메모리가 필요해서 네트워크 파일시스템에서는 못 씀
+#   → 기본은 rollback 저널(DELETE), 한 머신에서만 돌릴 때는 wal=True 가 빠름
+#   (NFS/SMB 는 파일 잠금 구현에 따라 안전하지 않을 수 있으니, 가능하면 잠금을 제대로 지원하는 공유 볼륨 사용)
+
+import json
+import sqlite3
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+LEASE_S = 600.0      # 타일 1개 임대 시간(이 안에 못 끝내면 다른 작업자가 가져갈 수 있음)
+MAX_ATTEMPTS = 3     # 이만큼 실패/만료되면 failed 로 빼 둠
+
+
+def _tile_to_json(tile: Dict) -> str:
+  return json.dumps(tile, ensure_ascii=False)
+
+
+def _tile_from_json(raw: str) -> Dict:
+  # JSON에는 튜플이 없으므로 center / rect 를 튜플로 되돌림
+  t = json.loads(raw)
+  for k in ("center", "rect"):
+    if isinstance(t.get(k), list):
+      t[k] = tuple(t[k])
+  return t
+
+
+class WorkQueue:
+  def __init__(self, path: str, key_fn: Optional[Callable[[Dict], Tuple]] = None,
+               lease_s: float = LEASE_S, max_attempts: int = MAX_ATTEMPTS, wal: bool = False):
+    """
+    key_fn: 타일 → 중복 판정 키(text_api_search.tile_key 등)
+    lease_s: 임대 만료 시간 / max_attempts: 이 횟수만큼 임대됐는데도 못 끝낸 타일은 failed
+    """
+    self.path = path
+    self.key_fn = key_fn or (lambda t: (round(t["center"][0], 6), round(t["center"][1], 6), round(t["radius"], 1)))
+    self.lease_s = lease_s
+    self.max_attempts = max_attempts
+    # isolation_level=None: 트랜잭션을 직접 BEGIN IMMEDIATE 로 시작(쓰기 잠금을 먼저 잡아 교착 방지)
+    self._conn = sqlite3.connect(path, timeout=60, isolation_level=None)
+    self._conn.execute(f"PRAGMA journal_mode={'WAL' if wal else 'DELETE'}")
+    with self._tx() as db:
+      db.execute("""
+        CREATE TABLE IF NOT EXISTS tiles (
+          key TEXT PRIMARY KEY, tile TEXT NOT NULL, depth INTEGER NOT NULL DEFAULT 0,
+          state TEXT NOT NULL DEFAULT 'pending', owner TEXT, lease_until REAL,
+          attempts INTEGER NOT NULL DEFAULT 0, calls INTEGER NOT NULL DEFAULT 0, found INTEGER, done_at REAL
+        )""")
+      db.execute("CREATE INDEX IF NOT EXISTS tiles_state ON tiles(state, depth)")
+      db.execute("CREATE TABLE IF NOT EXISTS results (place_id TEXT PRIMARY KEY, place TEXT NOT NULL, tile_key TEXT, worker TEXT)")
+      db.execute("CREATE TABLE IF NOT EXISTS coverage (seq INTEGER PRIMARY KEY, lat REAL, lng REAL, r REAL)")
+      db.execute("CREATE TABLE IF NOT EXISTS meta (k TEXT PRIMARY KEY, v TEXT)")
+
+  @contextmanager
+  def _tx(self):
+    self._conn.execute("BEGIN IMMEDIATE")
+    try:
+      yield self._conn
+    except BaseException:
+      self._conn.execute("ROLLBACK")
+      raise
+    self._conn.execute("COMMIT")
+
+  def key(self, tile: Dict) -> str:
+    return json.dumps(list(self.key_fn(tile)))
+
+  def close(self):
+    self._conn.close()
+
+  # -----------------------
+  # 메타(수집 설정 공유)
+  # -----------------------
+  def set_meta(self, meta: Dict):
+    with self._tx() as db:
+      db.executemany("INSERT OR REPLACE INTO meta(k, v) VALUES (?, ?)",
+                     [(k, json.dumps(v, ensure_ascii=False)) for k, v in meta.items()])
+
+  def get_meta(self) -> Dict:
+    return {k: json.loads(v) for k, v in self._conn.execute("SELECT k, v FROM meta")}
+
+  # -----------------------
+  # 타일
+  # -----------------------
+  def _push(self, db: sqlite3.Connection, tiles: Iterable[Dict]) -> int:
+    before = db.total_changes
+    db.executemany("INSERT OR IGNORE INTO tiles(key, tile, depth) VALUES (?, ?, ?)",
+                   [(self.key(t), _tile_to_json(t), t.get("depth", 0)) for t in tiles])
+    return db.total_changes - before
+
+  def push(self, tiles: Iterable[Dict]) -> int:
+    """새 타일 추가(이미 있는 키는 무시). 추가된 수 반환"""
+    with self._tx() as db:
+      return self._push(db, tiles)
+
+  def lease(self, worker: str, n: int = 1) -> List[Tuple[str, Dict]]:
+    """대기 중이거나 임대가 만료된 타일을 최대 n개 임대(얕은 깊이 먼저 = BFS 순서) → [(키, 타일)]"""
+    now = time.time()
+    with self._tx() as db:
+      rows = db.execute(
+        "SELECT key, tile, attempts FROM tiles WHERE state = 'pending' OR (state = 'leased' AND lease_until < ?) "
+        "ORDER BY depth, rowid LIMIT ?", (now, n)
+      ).fetchall()
+      out = []
+      for key, raw, attempts in rows:
+        if attempts >= self.max_attempts:
+          db.execute("UPDATE tiles SET state = 'failed', owner = NULL, lease_until = NULL WHERE key = ?", (key,))
+          continue
+        db.execute("UPDATE tiles SET state = 'leased', owner = ?, lease_until = ?, attempts = attempts + 1 WHERE key = ?",
+                   (worker, now + self.lease_s, key))
+        out.append((key, _tile_from_json(raw)))
+      return out
+
+  def release(self, key: str, worker: str):
+    """실패한 타일 반납(다시 pending — 임대 횟수는 그대로 남아 max_attempts 에 반영)"""
+    with self._tx() as db:
+      db.execute("UPDATE tiles SET state = 'pending', owner = NULL, lease_until = NULL "
+                 "WHERE key = ? AND state = 'leased' AND owner = ?", (key, worker))
+
+  def complete(self, key: str, worker: str, children: List[Dict], places: List[Dict], calls: int,
+               covered: Optional[Tuple[float, float, float]] = None) -> int:
+    """
+    타일 완료: 자식 push + 결과 병합(place id 기준) + 완료 영역 등록을 한 번에. 새로 추가된 place 수 반환
+    임대가 만료돼 다른 작업자가 같은 타일을 먼저 끝냈어도 안전(결과/자식은 키로 중복 제거, 쓴 호출 수만 더함)
+    """
+    with self._tx() as db:
+      db.execute("UPDATE tiles SET state = 'done', owner = ?, lease_until = NULL, calls = calls + ?, found = ?, "
+                 "done_at = ? WHERE key = ?", (worker, calls, len(places), time.time(), key))
+      self._push(db, children)
+      before = db.total_changes
+      db.executemany("INSERT OR IGNORE INTO results(place_id, place, tile_key, worker) VALUES (?, ?, ?, ?)",
+                     [(p["id"], json.dumps(p, ensure_ascii=False, default=str), key, worker)
+                      for p in places if p.get("id")])
+      added = db.total_changes - before
+      if covered is not None:
+        db.execute("INSERT INTO coverage(lat, lng, r) VALUES (?, ?, ?)", covered)
+      return added
+
+  def total_calls(self) -> int:
+    return self._conn.execute("SELECT COALESCE(SUM(calls), 0) FROM tiles").fetchone()[0]
+
+  def idle(self) -> bool:
+    """대기/임대 중인 타일이 하나도 없으면 True(전체 작업 끝)"""
+    row = self._conn.execute("SELECT 1 FROM tiles WHERE state IN ('pending', 'leased') LIMIT 1").fetchone()
+    return row is None
+
+  # -----------------------
+  # 결과 / 완료 영역
+  # -----------------------
+  def __contains__(self, place_id: str) -> bool:
+    return self._conn.execute("SELECT 1 FROM results WHERE place_id = ?", (place_id,)).fetchone() is not None
+
+  def results(self) -> Iterator[Dict]:
+    for (raw,) in self._conn.execute("SELECT place FROM results ORDER BY rowid"):
+      yield json.loads(raw)
+
+  def coverage_since(self, seq: int) -> List[Tuple[int, float, float, float]]:
+    """seq 이후 등록된 완료 영역 → [(seq, lat, lng, r)] (작업자가 자기 CoverageIndex 를 따라잡는 용도)"""
+    return self._conn.execute("SELECT seq, lat, lng, r FROM coverage WHERE seq > ? ORDER BY seq", (seq,)).fetchall()
+
+  def stats(self) -> Dict:
+    now = time.time()
+    out = {s: 0 for s in ("pending", "leased", "done", "failed")}
+    for state, n in self._conn.execute("SELECT state, COUNT(*) FROM tiles GROUP BY state"):
+      out[state] = n
+    out["expired_leases"] = self._conn.execute(
+      "SELECT COUNT(*) FROM tiles WHERE state = 'leased' AND lease_until < ?", (now,)).fetchone()[0]
+    out["workers"] = [w for (w,) in self._conn.execute(
+      "SELECT DISTINCT owner FROM tiles WHERE state = 'leased' AND lease_until >= ? ORDER BY owner", (now,))]
+    out["results"] = self._conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+    out["calls"] = self.total_calls()
+    return out